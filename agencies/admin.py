@@ -1,7 +1,9 @@
 # agencies/admin.py
+# version: 1.1.0
+# FEATURE: Read-only admin for AgencyDailyRollup.
 
 from django.contrib import admin
-from .models import Agency, AgencyTransaction, Contract, StaticRate
+from .models import Agency, AgencyTransaction, Contract, StaticRate, AgencyDailyRollup
 from .forms import ContractForm, AgencyTransactionForm
 
 class AgencyTransactionInline(admin.TabularInline):
@@ -35,3 +37,15 @@ class ContractAdmin(admin.ModelAdmin):
     list_display = ('title', 'agency', 'hotel', 'start_date', 'end_date', 'contract_type')
     list_filter = ('agency', 'hotel', 'contract_type')
     inlines = [StaticRateInline]
+
+
+@admin.register(AgencyDailyRollup)
+class AgencyDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ('agency', 'date', 'bookings', 'cancelled_bookings', 'room_nights', 'gross_amount', 'paid_amount', 'debt_increase', 'debt_decrease')
+    list_filter = ('agency',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,158 @@
+# agencies/ledger.py
+# version: 1.2.0
+# FEATURE: Agency ledger service.
+#   - Agency.current_balance (debt) is a running balance updated with atomic F() deltas.
+#   - Credit bookings are charged with a single conditional UPDATE that enforces credit_limit.
+#   - reconcile() recomputes balances in bulk from AgencyTransaction and reports drift.
+# FEATURE: adjust_many() - bulk adjustments (e.g. credit returned by a bulk cancellation).
+# FIX: The credit blacklist is read inside the charging transaction, after the agency row is
+#      locked by the balance UPDATE, instead of from a per-process cache that stayed stale for
+#      up to an hour; blacklist additions lock the same row (signals.py), so they serialize.
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Sum, When
+
+from .models import Agency, AgencyTransaction
+from . import rollups
+
+CREDIT_LIMIT_ERROR = "اعتبار آژانس برای این رزرو کافی نیست."
+BLACKLIST_ERROR = "رزرو اعتباری برای این هتل برای آژانس شما مجاز نیست."
+
+
+def signed(transaction_type, amount):
+    """Effect of one transaction on the agency debt (payments reduce it)."""
+    return -amount if transaction_type == 'payment' else amount
+
+
+# ==============================================================================
+# 1. RUNNING BALANCE
+# ==============================================================================
+
+def apply_delta(agency_id, delta):
+    """Adds delta to the agency debt in one UPDATE, without reading the row first."""
+    if delta:
+        Agency.objects.filter(pk=agency_id).update(current_balance=F('current_balance') + delta)
+
+
+def charge_booking_on_credit(agency, booking, amount, created_by=None):
+    """
+    Puts a booking on the agency's credit.
+    The balance is raised only if it stays within credit_limit, decided by the database
+    in a single conditional UPDATE, so concurrent bookings cannot overdraw the limit.
+    Raises ValidationError when the hotel is blacklisted or the limit would be exceeded.
+    The blacklist is checked after the UPDATE has locked the agency row, so a blacklist entry
+    committed before this charge is always seen.
+    """
+    amount = Decimal(amount)
+    with transaction.atomic():
+        updated = Agency.objects.filter(
+            pk=agency.pk,
+            current_balance__lte=F('credit_limit') - amount,
+        ).update(current_balance=F('current_balance') + amount)
+        # Rolled back with the savepoint when either check fails.
+        if is_blacklisted(agency.pk, booking):
+            raise ValidationError(BLACKLIST_ERROR)
+        if not updated:
+            raise ValidationError(CREDIT_LIMIT_ERROR)
+
+        agency_transaction = AgencyTransaction(
+            agency=agency,
+            booking=booking,
+            amount=amount,
+            transaction_type='booking',
+            description=f"رزرو اعتباری کد {booking.booking_code}",
+            created_by=created_by,
+        )
+        # Already applied above; tells the post_save signal not to apply it twice.
+        agency_transaction._balance_applied = True
+        agency_transaction.save()
+        return agency_transaction
+
+
+def adjust_many(adjustments, created_by=None):
+    """
+    adjustments: iterable of (agency_id, booking_id, amount, description); a negative amount
+    reduces the debt. The rows are inserted with one bulk_create, which sends no signals, so
+    the balances get one F() delta per agency and the rollups are refreshed here.
+    """
+    rows = [
+        AgencyTransaction(agency_id=agency_id, booking_id=booking_id, amount=amount,
+                          transaction_type='adjustment', description=description, created_by=created_by)
+        for agency_id, booking_id, amount, description in adjustments
+    ]
+    AgencyTransaction.objects.bulk_create(rows, batch_size=1000)
+    deltas = defaultdict(Decimal)
+    for row in rows:
+        deltas[(row.agency_id, row.transaction_date)] += row.amount
+    for (agency_id, day), delta in deltas.items():
+        apply_delta(agency_id, delta)
+        rollups.schedule_refresh(agency_id, day)
+    return rows
+
+
+# ==============================================================================
+# 2. CREDIT BLACKLIST
+# ==============================================================================
+
+def lock_agencies(agency_ids):
+    """
+    Locks the agencies' rows until the current transaction ends. Blacklist additions take
+    it, so they wait for (or are waited on by) concurrent credit charges.
+    """
+    list(Agency.objects.select_for_update().filter(pk__in=agency_ids).values_list('pk', flat=True))
+
+
+def is_blacklisted(agency_id, booking):
+    """True if any hotel of the booking is on the agency's credit blacklist (one query)."""
+    return Agency.credit_blacklist_hotels.through.objects.filter(
+        agency_id=agency_id,
+        hotel_id__in=booking.booking_rooms.values('room_type__hotel_id'),
+    ).exists()
+
+
+# ==============================================================================
+# 3. RECONCILIATION
+# ==============================================================================
+
+def _signed_amount():
+    return Case(
+        When(transaction_type='payment', then=-F('amount')),
+        default=F('amount'),
+        output_field=DecimalField(max_digits=20, decimal_places=0),
+    )
+
+
+def ledger_balances():
+    """{agency_id: balance} recomputed from AgencyTransaction in one aggregate query."""
+    rows = AgencyTransaction.objects.values('agency_id').annotate(total=Sum(_signed_amount())).order_by()
+    return {row['agency_id']: row['total'] or Decimal(0) for row in rows}
+
+
+def reconcile(fix=False, batch_size=500):
+    """
+    Compares every Agency.current_balance with its ledger.
+    Returns a list of (agency_id, name, stored, expected) for the agencies that drifted.
+    The scan is lock-free; with fix=True each drifted agency is re-checked under a row
+    lock before it is corrected, so a transaction written mid-scan is not mistaken for drift.
+    """
+    expected = ledger_balances()
+    drifted = []
+    for agency in Agency.objects.only('id', 'name', 'current_balance').iterator(chunk_size=batch_size):
+        balance = expected.get(agency.pk, Decimal(0))
+        if agency.current_balance != balance:
+            drifted.append((agency.pk, agency.name, agency.current_balance, balance))
+    if fix:
+        for agency_id, _, _, _ in drifted:
+            _fix_balance(agency_id)
+    return drifted
+
+
+@transaction.atomic
+def _fix_balance(agency_id):
+    Agency.objects.select_for_update().filter(pk=agency_id).first()
+    total = AgencyTransaction.objects.filter(agency_id=agency_id).aggregate(total=Sum(_signed_amount()))['total']
+    Agency.objects.filter(pk=agency_id).update(current_balance=total or Decimal(0))
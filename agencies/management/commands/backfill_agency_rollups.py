@@ -0,0 +1,19 @@
+# agencies/management/commands/backfill_agency_rollups.py
+# version: 1.0.0
+# FEATURE: Rebuilds AgencyDailyRollup from bookings and agency transactions.
+
+from django.core.management.base import BaseCommand
+
+from agencies import rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the daily agency rollups used by the date-range reports (all agencies, or one with --agency)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--agency', type=int, help="Only rebuild the rows of this agency id.")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Rows streamed / inserted per batch.")
+
+    def handle(self, *args, **options):
+        count = rollups.backfill(agency_id=options['agency'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"{count} daily rollup row(s) written."))
@@ -0,0 +1,26 @@
+# agencies/management/commands/reconcile_agency_balances.py
+# version: 1.0.0
+# FEATURE: Recomputes agency balances from AgencyTransaction in bulk and reports drift.
+
+from django.core.management.base import BaseCommand
+
+from agencies import ledger
+
+
+class Command(BaseCommand):
+    help = "Compares Agency.current_balance with the transaction ledger; --fix corrects the drifted agencies."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help="Write the recomputed balances.")
+
+    def handle(self, *args, **options):
+        drifted = ledger.reconcile(fix=options['fix'])
+        for agency_id, name, stored, expected in drifted:
+            self.stdout.write(f"#{agency_id} {name}: stored {stored}, ledger {expected}, drift {stored - expected}")
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS("All agency balances match the ledger."))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f"{len(drifted)} agency balance(s) corrected."))
+        else:
+            self.stdout.write(self.style.WARNING(f"{len(drifted)} agency balance(s) drifted. Run with --fix to correct them."))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:12
+
+import django.db.models.deletion
+import django_jalali.db.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agencies', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgencyDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', django_jalali.db.models.jDateField(verbose_name='تاریخ')),
+                ('bookings', models.PositiveIntegerField(default=0, verbose_name='تعداد رزرو')),
+                ('cancelled_bookings', models.PositiveIntegerField(default=0, verbose_name='تعداد رزرو لغو شده')),
+                ('room_nights', models.PositiveIntegerField(default=0, verbose_name='اتاق-شب')),
+                ('gross_amount', models.DecimalField(decimal_places=0, default=0, max_digits=20, verbose_name='مبلغ ناخالص (تومان)')),
+                ('paid_amount', models.DecimalField(decimal_places=0, default=0, max_digits=20, verbose_name='مبلغ پرداخت شده (تومان)')),
+                ('debt_increase', models.DecimalField(decimal_places=0, default=0, max_digits=20, verbose_name='افزایش بدهی (تومان)')),
+                ('debt_decrease', models.DecimalField(decimal_places=0, default=0, max_digits=20, verbose_name='کاهش بدهی (تومان)')),
+                ('agency', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='agencies.agency', verbose_name='آژانس')),
+            ],
+            options={
+                'verbose_name': 'خلاصه روزانه آژانس',
+                'verbose_name_plural': 'خلاصه\u200cهای روزانه آژانس',
+                'ordering': ['agency', 'date'],
+                'unique_together': {('agency', 'date')},
+            },
+        ),
+    ]
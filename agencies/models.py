@@ -1,5 +1,6 @@
-# agencies/models.py v1.2
+# agencies/models.py v1.3
 # Feature: Added priority field to Contract model to resolve ambiguity.
+# Feature: Added AgencyDailyRollup (per-agency daily totals for date-range reports).
 from django.db import models
 from django.conf import settings
 from hotels.models import Hotel, RoomType
@@ -100,3 +101,30 @@ class StaticRate(models.Model):
 
     def __str__(self):
         return f"نرخ {self.room_type.name} برای قرارداد {self.contract.title}"
+
+
+class AgencyDailyRollup(models.Model):
+    """
+    Per-agency totals of one day, kept current by booking / transaction signals and
+    rebuilt by the backfill_agency_rollups command (see agencies/rollups.py).
+    Booking columns count bookings created that day (cancelled ones separately);
+    debt columns follow AgencyTransaction.transaction_date.
+    """
+    agency = models.ForeignKey(Agency, on_delete=models.CASCADE, related_name="daily_rollups", verbose_name="آژانس")
+    date = jmodels.jDateField(verbose_name="تاریخ")
+    bookings = models.PositiveIntegerField(default=0, verbose_name="تعداد رزرو")
+    cancelled_bookings = models.PositiveIntegerField(default=0, verbose_name="تعداد رزرو لغو شده")
+    room_nights = models.PositiveIntegerField(default=0, verbose_name="اتاق-شب")
+    gross_amount = models.DecimalField(max_digits=20, decimal_places=0, default=0, verbose_name="مبلغ ناخالص (تومان)")
+    paid_amount = models.DecimalField(max_digits=20, decimal_places=0, default=0, verbose_name="مبلغ پرداخت شده (تومان)")
+    debt_increase = models.DecimalField(max_digits=20, decimal_places=0, default=0, verbose_name="افزایش بدهی (تومان)")
+    debt_decrease = models.DecimalField(max_digits=20, decimal_places=0, default=0, verbose_name="کاهش بدهی (تومان)")
+
+    class Meta:
+        verbose_name = "خلاصه روزانه آژانس"
+        verbose_name_plural = "خلاصه‌های روزانه آژانس"
+        unique_together = ('agency', 'date')
+        ordering = ['agency', 'date']
+
+    def __str__(self):
+        return f"{self.agency.name} - {self.date}"
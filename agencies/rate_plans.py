@@ -0,0 +1,210 @@
+# agencies/rate_plans.py
+# version: 1.3.0
+# FEATURE: Compiled per-agency rate plan. Contracts are compiled into a per-hotel
+#          interval index and static rates into dict lookups, cached with a version
+#          key that the Contract / StaticRate / Agency signals bump.
+# FEATURE: plan_version() exposes the version for ETags of agency-priced responses.
+# FIX: The version key lives in the cache shared by all processes (settings.CACHES), so an
+#      invalidation reaches every worker; it is bumped again on commit so a worker that
+#      recompiles before the commit cannot keep the old contracts under the new version.
+# FEATURE: RatePlan.version - the version the plan was loaded under, for watermarks of
+#          agency-priced deltas (pricing/ari.py).
+
+import bisect
+import time
+from datetime import datetime
+from decimal import Decimal
+
+import jdatetime
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Agency, Contract, StaticRate
+
+CACHE_TIMEOUT = 60 * 60 * 24
+
+# Process-local copies: {agency_id: (version, RatePlan)}
+_local_plans = {}
+
+
+def _version_key(agency_id):
+    return f'agency_rate_plan:version:{agency_id}'
+
+
+def _plan_key(agency_id, version):
+    return f'agency_rate_plan:{agency_id}:{version}'
+
+
+def _current_version(agency_id):
+    """
+    The version starts from a timestamp rather than 0, so a version key lost to cache
+    eviction can never come back with a value a process already has a plan for.
+    """
+    key = _version_key(agency_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def plan_version(agency_id):
+    """Changes whenever the agency's compiled plan is invalidated."""
+    return _current_version(agency_id)
+
+
+def day_number(value):
+    """Gregorian ordinal of a date; accepts datetime.date, datetime and jdatetime.date."""
+    if isinstance(value, jdatetime.datetime):
+        value = value.togregorian().date()
+    elif isinstance(value, jdatetime.date):
+        value = value.togregorian()
+    elif isinstance(value, datetime):
+        value = value.date()
+    return value.toordinal()
+
+
+class ContractIntervalIndex:
+    """
+    The contracts of one agency for one hotel, flattened into non-overlapping
+    segments that each carry their winning contract (highest priority, then newest).
+    A lookup is one bisect over the segment boundaries.
+    """
+
+    def __init__(self, contracts):
+        # contracts: iterable of (start_day, end_day, priority, contract_id, contract_data)
+        contracts = list(contracts)
+        points = sorted({c[0] for c in contracts} | {c[1] + 1 for c in contracts})
+        self.boundaries = []
+        self.winners = []
+        for start, next_start in zip(points, points[1:]):
+            covering = [c for c in contracts if c[0] <= start and c[1] >= next_start - 1]
+            winner = max(covering, key=lambda c: (c[2], c[3]))[4] if covering else None
+            if self.winners and self.winners[-1] is winner:
+                continue  # merge with the previous segment
+            self.boundaries.append(start)
+            self.winners.append(winner)
+        if points:
+            self.boundaries.append(points[-1])
+            self.winners.append(None)
+
+    def lookup(self, day):
+        i = bisect.bisect_right(self.boundaries, day) - 1
+        return self.winners[i] if i >= 0 else None
+
+
+class RatePlan:
+    """Everything needed to turn public prices into one agency's prices, without queries."""
+
+    def __init__(self, agency_id, default_discount_percentage, contracts_by_hotel):
+        self.agency_id = agency_id
+        # Set by get_rate_plan(); the plan reflects at least this version's rows.
+        self.version = None
+        self.default_discount_percentage = default_discount_percentage or 0
+        self.contracts_by_hotel = contracts_by_hotel
+
+    def contract_for(self, hotel_id, date):
+        index = self.contracts_by_hotel.get(hotel_id)
+        return index.lookup(day_number(date)) if index else None
+
+    def apply(self, price_info, hotel_id, room_type_id, date):
+        """
+        Returns the agency price for one night, given the public price dict
+        (price_per_night, extra_person_price, child_price).
+        - a static contract with a rate for this room type replaces the price;
+        - a dynamic contract applies its discount to price_per_night;
+        - with no contract at all, Agency.default_discount_percentage is applied.
+        """
+        final_price = dict(price_info)
+        contract = self.contract_for(hotel_id, date)
+
+        if contract is None:
+            discount_percentage = self.default_discount_percentage
+        else:
+            static_rate = contract['static_rates'].get(room_type_id)
+            if static_rate:
+                final_price.update(static_rate)
+                return final_price
+            discount_percentage = contract['discount_percentage'] if contract['contract_type'] == 'dynamic' else 0
+
+        if discount_percentage:
+            discount = final_price['price_per_night'] * (Decimal(discount_percentage) / Decimal(100))
+            final_price['price_per_night'] -= discount
+        return final_price
+
+
+def compile_plan(agency_id):
+    """Builds the RatePlan of one agency with three queries."""
+    default_discount = Agency.objects.filter(pk=agency_id).values_list('default_discount_percentage', flat=True).first()
+
+    contracts = {}
+    for contract in Contract.objects.filter(agency_id=agency_id).values(
+            'id', 'hotel_id', 'start_date', 'end_date', 'priority', 'contract_type', 'discount_percentage'):
+        contract['static_rates'] = {}
+        contracts[contract['id']] = contract
+
+    for rate in StaticRate.objects.filter(contract__agency_id=agency_id).values(
+            'contract_id', 'room_type_id', 'price_per_night', 'extra_person_price', 'child_price'):
+        contracts[rate['contract_id']]['static_rates'][rate['room_type_id']] = {
+            'price_per_night': rate['price_per_night'],
+            'extra_person_price': rate['extra_person_price'],
+            'child_price': rate['child_price'],
+        }
+
+    by_hotel = {}
+    for contract in contracts.values():
+        by_hotel.setdefault(contract['hotel_id'], []).append((
+            day_number(contract['start_date']), day_number(contract['end_date']),
+            contract['priority'], contract['id'],
+            {key: contract[key] for key in ('id', 'contract_type', 'discount_percentage', 'static_rates')},
+        ))
+
+    return RatePlan(
+        agency_id,
+        default_discount,
+        {hotel_id: ContractIntervalIndex(items) for hotel_id, items in by_hotel.items()},
+    )
+
+
+def get_rate_plan(agency_id):
+    """Compiled plan of an agency: process-local copy -> shared cache -> compile."""
+    version = _current_version(agency_id)
+    local = _local_plans.get(agency_id)
+    if local and local[0] == version:
+        return local[1]
+
+    plan = cache.get(_plan_key(agency_id, version))
+    if plan is None:
+        plan = compile_plan(agency_id)
+        cache.set(_plan_key(agency_id, version), plan, CACHE_TIMEOUT)
+    plan.version = version
+    _local_plans[agency_id] = (version, plan)
+    return plan
+
+
+def _bump(agency_id):
+    try:
+        cache.incr(_version_key(agency_id))
+    except ValueError:
+        # No version yet (or evicted): the next reader starts a fresh one.
+        pass
+    _local_plans.pop(agency_id, None)
+
+
+def invalidate(agency_id):
+    """
+    Called by signals whenever anything that feeds the plan changes. Bumped now for this
+    process and again on commit: a process compiling in between still reads the old rows.
+    """
+    _bump(agency_id)
+    transaction.on_commit(lambda: _bump(agency_id))
+
+
+def get_rate_plan_for_user(user):
+    """RatePlan of the user's agency, or None for guests and non-agency users."""
+    if not user or not user.is_authenticated:
+        return None
+    agency_user = getattr(user, 'agency_profile', None)
+    if agency_user is None:
+        return None
+    return get_rate_plan(agency_user.agency_id)
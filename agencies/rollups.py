@@ -0,0 +1,188 @@
+# agencies/rollups.py
+# version: 1.0.0
+# FEATURE: Daily per-agency rollups (AgencyDailyRollup) for date-range financial reports.
+#   - refresh_day() recomputes one (agency, day) row; signals schedule it after commit.
+#   - backfill() rebuilds the table from bookings and transactions in chunks.
+#   - report_rows() / monthly_rows() answer report ranges from the rollup table alone.
+
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+
+import jdatetime
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import AgencyDailyRollup, AgencyTransaction
+
+# Bookings in these states are counted in cancelled_bookings and left out of the totals.
+CANCELLED_STATUSES = ('cancelled', 'no_capacity')
+
+AMOUNT_FIELDS = ('gross_amount', 'paid_amount', 'debt_increase', 'debt_decrease')
+COUNT_FIELDS = ('bookings', 'cancelled_bookings', 'room_nights')
+TOTAL_FIELDS = COUNT_FIELDS + AMOUNT_FIELDS
+
+
+def to_jalali(value):
+    """jdatetime.date of a gregorian date / jdatetime.date."""
+    if isinstance(value, jdatetime.date):
+        return value
+    return jdatetime.date.fromgregorian(date=value)
+
+
+def booking_day(created_at):
+    """Local (Asia/Tehran) Jalali day a booking was created on."""
+    if isinstance(created_at, datetime) and timezone.is_aware(created_at):
+        created_at = timezone.localtime(created_at)
+    return to_jalali(created_at.date() if isinstance(created_at, datetime) else created_at)
+
+
+def _nights(check_in, check_out):
+    nights = (check_out - check_in).days
+    return nights if nights > 0 else 0
+
+
+def _empty_row():
+    row = {field: 0 for field in COUNT_FIELDS}
+    row.update({field: Decimal(0) for field in AMOUNT_FIELDS})
+    return row
+
+
+# ==============================================================================
+# 1. INCREMENTAL MAINTENANCE
+# ==============================================================================
+
+def compute_day(agency_id, day):
+    """Field values of one (agency, day) row, computed from the source tables."""
+    from reservations.models import Booking, BookingRoom
+
+    day = to_jalali(day)
+    row = _empty_row()
+    bookings = Booking.objects.filter(agency_id=agency_id, created_at__date=day.togregorian())
+
+    totals = bookings.aggregate(
+        bookings=Count('id', filter=~Q(status__in=CANCELLED_STATUSES)),
+        cancelled_bookings=Count('id', filter=Q(status__in=CANCELLED_STATUSES)),
+        gross_amount=Sum('total_price', filter=~Q(status__in=CANCELLED_STATUSES)),
+        paid_amount=Sum('paid_amount', filter=~Q(status__in=CANCELLED_STATUSES)),
+    )
+    row.update({key: value for key, value in totals.items() if value is not None})
+
+    for room in BookingRoom.objects.filter(booking__in=bookings.exclude(status__in=CANCELLED_STATUSES)).values(
+            'quantity', 'booking__check_in', 'booking__check_out'):
+        row['room_nights'] += room['quantity'] * _nights(room['booking__check_in'], room['booking__check_out'])
+
+    for item in AgencyTransaction.objects.filter(agency_id=agency_id, transaction_date=day).values(
+            'transaction_type').annotate(total=Sum('amount')).order_by():
+        field = 'debt_decrease' if item['transaction_type'] == 'payment' else 'debt_increase'
+        row[field] += item['total'] or Decimal(0)
+    return row
+
+
+def refresh_day(agency_id, day):
+    """Recomputes one rollup row; days with no activity keep no row."""
+    day = to_jalali(day)
+    row = compute_day(agency_id, day)
+    if not any(row.values()):
+        AgencyDailyRollup.objects.filter(agency_id=agency_id, date=day).delete()
+        return None
+    rollup, _ = AgencyDailyRollup.objects.update_or_create(agency_id=agency_id, date=day, defaults=row)
+    return rollup
+
+
+def schedule_refresh(agency_id, day):
+    """Refreshes after the current transaction commits, so the rollup sees the saved rows."""
+    if agency_id and day:
+        transaction.on_commit(lambda: refresh_day(agency_id, day))
+
+
+# ==============================================================================
+# 2. BACKFILL
+# ==============================================================================
+
+def backfill(agency_id=None, chunk_size=2000):
+    """
+    Rebuilds the rollup table (or one agency's rows) from the source tables.
+    Booking and transaction totals are grouped in the database; room-nights are
+    accumulated while streaming booking rooms in chunks. Returns the row count written.
+    """
+    from reservations.models import Booking, BookingRoom
+
+    bookings = Booking.objects.filter(agency__isnull=False)
+    transactions = AgencyTransaction.objects.all()
+    if agency_id:
+        bookings = bookings.filter(agency_id=agency_id)
+        transactions = transactions.filter(agency_id=agency_id)
+
+    rows = defaultdict(_empty_row)
+    cancelled = Q(status__in=CANCELLED_STATUSES)
+    for item in bookings.annotate(day=TruncDate('created_at')).values('agency_id', 'day').annotate(
+            bookings=Count('id', filter=~cancelled),
+            cancelled_bookings=Count('id', filter=cancelled),
+            gross_amount=Sum('total_price', filter=~cancelled),
+            paid_amount=Sum('paid_amount', filter=~cancelled)).order_by():
+        row = rows[(item['agency_id'], to_jalali(item['day']))]
+        for field in ('bookings', 'cancelled_bookings', 'gross_amount', 'paid_amount'):
+            row[field] += item[field] or 0
+
+    for room in BookingRoom.objects.filter(booking__in=bookings.exclude(cancelled)).values(
+            'quantity', 'booking__agency_id', 'booking__created_at',
+            'booking__check_in', 'booking__check_out').iterator(chunk_size=chunk_size):
+        key = (room['booking__agency_id'], booking_day(room['booking__created_at']))
+        rows[key]['room_nights'] += room['quantity'] * _nights(room['booking__check_in'], room['booking__check_out'])
+
+    for item in transactions.values('agency_id', 'transaction_date', 'transaction_type').annotate(
+            total=Sum('amount')).order_by():
+        field = 'debt_decrease' if item['transaction_type'] == 'payment' else 'debt_increase'
+        rows[(item['agency_id'], to_jalali(item['transaction_date']))][field] += item['total'] or Decimal(0)
+
+    objects = [
+        AgencyDailyRollup(agency_id=agency, date=day, **values)
+        for (agency, day), values in rows.items() if any(values.values())
+    ]
+    with transaction.atomic():
+        existing = AgencyDailyRollup.objects.all()
+        if agency_id:
+            existing = existing.filter(agency_id=agency_id)
+        existing.delete()
+        AgencyDailyRollup.objects.bulk_create(objects, batch_size=chunk_size)
+    return len(objects)
+
+
+# ==============================================================================
+# 3. REPORTS
+# ==============================================================================
+
+def _row_dict(rollup):
+    return {field: getattr(rollup, field) for field in TOTAL_FIELDS}
+
+
+def _add(total, row):
+    for field in TOTAL_FIELDS:
+        total[field] += row[field]
+
+
+def report_rows(agency_id, date_from, date_to):
+    """(days, totals) for an inclusive Jalali range, read from the rollup table only."""
+    totals = _empty_row()
+    days = []
+    for rollup in AgencyDailyRollup.objects.filter(agency_id=agency_id, date__range=(date_from, date_to)).order_by('date'):
+        row = _row_dict(rollup)
+        _add(totals, row)
+        row['date'] = str(to_jalali(rollup.date))
+        days.append(row)
+    return days, totals
+
+
+def monthly_rows(agency_id, date_from, date_to):
+    """(months, totals): the daily rows of the range grouped by Jalali month ('YYYY-MM')."""
+    days, totals = report_rows(agency_id, date_from, date_to)
+    months = {}
+    for row in days:
+        month = row['date'][:7]
+        if month not in months:
+            months[month] = dict(_empty_row(), month=month)
+        _add(months[month], row)
+    return list(months.values()), totals
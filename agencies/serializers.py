@@ -1,4 +1,6 @@
 # agencies/serializers.py
+# version: 1.1.0
+# FEATURE: Serializers for the date-range reports answered from AgencyDailyRollup.
 
 from rest_framework import serializers
 from .models import Agency, AgencyTransaction
@@ -21,3 +23,30 @@ class AgencyReportSerializer(serializers.Serializer):
     agency = AgencySerializer()
     bookings = BookingListSerializer(many=True)
     transactions = AgencyTransactionSerializer(many=True)
+
+
+class AgencyRollupTotalsSerializer(serializers.Serializer):
+    bookings = serializers.IntegerField()
+    cancelled_bookings = serializers.IntegerField()
+    room_nights = serializers.IntegerField()
+    gross_amount = serializers.DecimalField(max_digits=20, decimal_places=0)
+    paid_amount = serializers.DecimalField(max_digits=20, decimal_places=0)
+    debt_increase = serializers.DecimalField(max_digits=20, decimal_places=0)
+    debt_decrease = serializers.DecimalField(max_digits=20, decimal_places=0)
+
+
+class AgencyDailyRowSerializer(AgencyRollupTotalsSerializer):
+    date = serializers.CharField()
+
+
+class AgencyMonthlyRowSerializer(AgencyRollupTotalsSerializer):
+    month = serializers.CharField()
+
+
+class AgencyRangeReportSerializer(serializers.Serializer):
+    """گزارش مالی آژانس در بازه دلخواه، بر اساس جدول خلاصه روزانه."""
+    date_from = serializers.CharField()
+    date_to = serializers.CharField()
+    totals = AgencyRollupTotalsSerializer()
+    days = AgencyDailyRowSerializer(many=True, required=False)
+    months = AgencyMonthlyRowSerializer(many=True, required=False)
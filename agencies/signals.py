@@ -1,19 +1,113 @@
 # agencies/signals.py
+# version: 1.4.0
+# FEATURE: Invalidates the compiled agency rate plan (rate_plans.py) on Contract,
+#          StaticRate and Agency discount changes.
+# PERF: Agency.current_balance is maintained with atomic deltas (ledger.py) instead of
+#       re-summing the whole transaction history on every save.
+# FEATURE: Keeps AgencyDailyRollup (rollups.py) current on Booking, BookingRoom and
+#          AgencyTransaction changes.
+# FIX: Credit blacklist additions lock the agency rows instead of invalidating a cached
+#      blacklist, so they are serialized with concurrent credit charges (ledger.py).
 
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
 from django.dispatch import receiver
-from django.db.models import Sum
-from .models import AgencyTransaction, Agency
+from reservations.models import Booking, BookingRoom
+from .models import AgencyTransaction, Agency, Contract, StaticRate
+from . import rate_plans, ledger, rollups
+
+@receiver(pre_save, sender=AgencyTransaction)
+def remember_previous_transaction_effect(sender, instance, **kwargs):
+    instance._previous_effect = None
+    instance._previous_rollup_day = None
+    if instance.pk:
+        previous = AgencyTransaction.objects.filter(pk=instance.pk).values('agency_id', 'transaction_type', 'amount', 'transaction_date').first()
+        if previous:
+            instance._previous_effect = (previous['agency_id'], ledger.signed(previous['transaction_type'], previous['amount']))
+            instance._previous_rollup_day = (previous['agency_id'], previous['transaction_date'])
+
 
 @receiver(post_save, sender=AgencyTransaction)
 def update_agency_balance(sender, instance, **kwargs):
     """
-    پس از ذخیره هر تراکنش، بدهی کل آژانس را دوباره محاسبه و ذخیره می‌کند.
+    بدهی آژانس را به صورت افزایشی (با F expression) به‌روزرسانی می‌کند.
+    Only the difference made by this save is applied, so the cost no longer grows with
+    the agency's history and concurrent saves cannot overwrite each other.
     """
-    agency = instance.agency
-    
-    # محاسبه مجموع با استفاده از signed_amount
-    total_balance = sum(transaction.signed_amount for transaction in AgencyTransaction.objects.filter(agency=agency))
-    
-    agency.current_balance = total_balance
-    agency.save(update_fields=['current_balance'])
+    if getattr(instance, '_balance_applied', False):
+        instance._balance_applied = False
+        return
+    previous = getattr(instance, '_previous_effect', None)
+    if previous:
+        ledger.apply_delta(previous[0], -previous[1])
+    ledger.apply_delta(instance.agency_id, instance.signed_amount)
+
+
+@receiver(post_delete, sender=AgencyTransaction)
+def revert_agency_balance(sender, instance, **kwargs):
+    ledger.apply_delta(instance.agency_id, -instance.signed_amount)
+
+
+@receiver(m2m_changed, sender=Agency.credit_blacklist_hotels.through)
+def lock_agencies_on_blacklist_add(sender, instance, action, reverse, pk_set, **kwargs):
+    # Runs inside the add's transaction; removals only make charging more permissive.
+    if action == 'pre_add':
+        ledger.lock_agencies(pk_set if reverse else [instance.pk])
+
+
+@receiver(post_save, sender=Contract)
+@receiver(post_delete, sender=Contract)
+def invalidate_rate_plan_on_contract_change(sender, instance, **kwargs):
+    rate_plans.invalidate(instance.agency_id)
+
+
+@receiver(post_save, sender=StaticRate)
+@receiver(post_delete, sender=StaticRate)
+def invalidate_rate_plan_on_static_rate_change(sender, instance, **kwargs):
+    agency_id = Contract.objects.filter(pk=instance.contract_id).values_list('agency_id', flat=True).first()
+    if agency_id:
+        rate_plans.invalidate(agency_id)
+
+
+@receiver(post_save, sender=Agency)
+def invalidate_rate_plan_on_agency_change(sender, instance, update_fields=None, **kwargs):
+    # Balance updates (update_agency_balance) do not touch pricing.
+    if update_fields and set(update_fields) <= {'current_balance'}:
+        return
+    rate_plans.invalidate(instance.pk)
+
+
+# --- Daily rollups ---
+
+@receiver(post_save, sender=AgencyTransaction)
+@receiver(post_delete, sender=AgencyTransaction)
+def refresh_rollup_on_transaction_change(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_rollup_day', None)
+    if previous and previous != (instance.agency_id, instance.transaction_date):
+        rollups.schedule_refresh(*previous)
+    rollups.schedule_refresh(instance.agency_id, instance.transaction_date)
+
+
+@receiver(pre_save, sender=Booking)
+def remember_previous_booking_agency(sender, instance, **kwargs):
+    instance._previous_agency_id = None
+    if instance.pk:
+        instance._previous_agency_id = Booking.objects.filter(pk=instance.pk).values_list('agency_id', flat=True).first()
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def refresh_rollup_on_booking_change(sender, instance, **kwargs):
+    day = rollups.booking_day(instance.created_at)
+    previous_agency_id = getattr(instance, '_previous_agency_id', None)
+    if previous_agency_id and previous_agency_id != instance.agency_id:
+        rollups.schedule_refresh(previous_agency_id, day)
+    rollups.schedule_refresh(instance.agency_id, day)
+
+
+@receiver(post_save, sender=BookingRoom)
+@receiver(post_delete, sender=BookingRoom)
+def refresh_rollup_on_booking_room_change(sender, instance, **kwargs):
+    # On a cascade delete the booking row is already gone; its own signal covers it.
+    booking = Booking.objects.filter(pk=instance.booking_id).values('agency_id', 'created_at').first()
+    if booking:
+        rollups.schedule_refresh(booking['agency_id'], rollups.booking_day(booking['created_at']))
@@ -1,3 +1,284 @@
+# agencies/tests.py
+# version: 1.5.0
+# FEATURE: Tests for the compiled agency rate plan (agencies/rate_plans.py).
+# FEATURE: Tests for the agency ledger (running balance, credit limit, blacklist, reconciliation).
+# FEATURE: Tests for the daily agency rollups and the date-range report endpoints.
+# FEATURE: Test for the streaming agency booking export.
+# FEATURE: Tests that rate-plan changes reach other processes and blacklist changes apply at once.
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache, caches
+from django.core.exceptions import ValidationError
 from django.test import TestCase
+from django.utils import timezone
+from jdatetime import date as jdate
+from rest_framework.test import APIClient
+
+from core.models import CustomUser, AgencyUserRole
+from hotels.models import City, Hotel, RoomType, BoardType
+from pricing.models import Availability, Price
+from reservations.models import Booking, BookingRoom
+from .models import Agency, AgencyUser, AgencyTransaction, AgencyDailyRollup, Contract, StaticRate
+from . import rate_plans, ledger, rollups
+
+PUBLIC_PRICE = {
+    'price_per_night': Decimal('1000000'),
+    'extra_person_price': Decimal('200000'),
+    'child_price': Decimal('100000'),
+}
+
+
+class RatePlanTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        city = City.objects.create(name="Mashhad", slug="mashhad")
+        cls.hotel = Hotel.objects.create(name="Homa", slug="homa", city=city, address="-")
+        cls.other_hotel = Hotel.objects.create(name="Sinoor", slug="sinoor", city=city, address="-")
+        cls.room = RoomType.objects.create(hotel=cls.hotel, name="Double", code="HOMA-D", price_per_night=1)
+        cls.suite = RoomType.objects.create(hotel=cls.hotel, name="Suite", code="HOMA-S", price_per_night=1)
+
+        cls.agency = Agency.objects.create(name="Safar", default_discount_percentage=5)
+        cls.user = CustomUser.objects.create_user(username='safar', password='password', mobile='09120000001')
+        AgencyUser.objects.create(user=cls.user, agency=cls.agency)
+
+        # A year-long 10% contract with a higher-priority 20% contract in the middle.
+        Contract.objects.create(agency=cls.agency, hotel=cls.hotel, title="Year", contract_type='dynamic',
+                                discount_percentage=10, start_date=jdate(1404, 1, 1), end_date=jdate(1404, 12, 29))
+        cls.nowruz = Contract.objects.create(agency=cls.agency, hotel=cls.hotel, title="Summer", contract_type='dynamic',
+                                             discount_percentage=20, priority=5,
+                                             start_date=jdate(1404, 4, 1), end_date=jdate(1404, 4, 31))
+        static = Contract.objects.create(agency=cls.agency, hotel=cls.hotel, title="Static", contract_type='static',
+                                         priority=9, start_date=jdate(1404, 7, 1), end_date=jdate(1404, 7, 10))
+        StaticRate.objects.create(contract=static, room_type=cls.room, price_per_night=700000)
+
+    def setUp(self):
+        cache.clear()
+
+    def _price(self, date, hotel=None, room=None):
+        plan = rate_plans.get_rate_plan(self.agency.pk)
+        hotel, room = hotel or self.hotel, room or self.room
+        return plan.apply(PUBLIC_PRICE, hotel.pk, room.pk, date)['price_per_night']
+
+    def test_contract_resolution(self):
+        self.assertEqual(self._price(jdate(1404, 2, 10)), Decimal('900000'))
+        # Higher priority wins inside its interval, including both end days.
+        self.assertEqual(self._price(jdate(1404, 4, 1)), Decimal('800000'))
+        self.assertEqual(self._price(jdate(1404, 4, 31)), Decimal('800000'))
+        self.assertEqual(self._price(jdate(1404, 5, 1)), Decimal('900000'))
+        # Gregorian dates resolve to the same contracts.
+        self.assertEqual(self._price(jdate(1404, 4, 15).togregorian()), Decimal('800000'))
+        # Static rate for the room; a static contract without a rate leaves the public price.
+        self.assertEqual(self._price(jdate(1404, 7, 5)), Decimal('700000'))
+        self.assertEqual(self._price(jdate(1404, 7, 5), room=self.suite), Decimal('1000000'))
+
+    def test_default_discount_without_contract(self):
+        self.assertEqual(self._price(jdate(1405, 1, 10)), Decimal('950000'))
+        self.assertEqual(self._price(jdate(1404, 2, 10), hotel=self.other_hotel), Decimal('950000'))
+
+    def test_lookups_are_query_free_and_invalidated(self):
+        plan = rate_plans.get_rate_plan(self.agency.pk)
+        with self.assertNumQueries(0):
+            for day in range(1, 30):
+                plan.apply(PUBLIC_PRICE, self.hotel.pk, self.room.pk, jdate(1404, 4, day))
+            rate_plans.get_rate_plan(self.agency.pk)
+
+        self.nowruz.discount_percentage = 30
+        self.nowruz.save()
+        self.assertEqual(self._price(jdate(1404, 4, 10)), Decimal('700000'))
+
+        self.agency.default_discount_percentage = 0
+        self.agency.save()
+        self.assertEqual(self._price(jdate(1405, 1, 10)), Decimal('1000000'))
+
+    def test_invalidation_from_another_process_is_seen(self):
+        self.assertEqual(self._price(jdate(1404, 4, 10)), Decimal('800000'))
+        Contract.objects.filter(pk=self.nowruz.pk).update(discount_percentage=30)  # saved elsewhere
+        # The other process bumps the version through its own connection to the shared cache.
+        caches.create_connection('default').incr(rate_plans._version_key(self.agency.pk))
+        self.assertEqual(self._price(jdate(1404, 4, 10)), Decimal('700000'))
+
+    def test_rate_plan_for_user(self):
+        self.assertEqual(rate_plans.get_rate_plan_for_user(self.user).agency_id, self.agency.pk)
+        self.assertIsNone(rate_plans.get_rate_plan_for_user(None))
+
+
+class AgencyLedgerTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        city = City.objects.create(name="Tabriz", slug="tabriz")
+        cls.hotel = Hotel.objects.create(name="Pars El Goli", slug="pars-el-goli", city=city, address="-")
+        cls.room = RoomType.objects.create(hotel=cls.hotel, name="Twin", code="PEG-T", price_per_night=1)
+        cls.board = BoardType.objects.create(name="BB", code="BB")
+        cls.agency = Agency.objects.create(name="Gasht", credit_limit=1000)
+        cls.user = CustomUser.objects.create_user(username='gasht', password='password', mobile='09120000002')
+        AgencyUser.objects.create(user=cls.user, agency=cls.agency)
+
+    def _balance(self):
+        return Agency.objects.get(pk=self.agency.pk).current_balance
+
+    def _booking(self):
+        booking = Booking.objects.create(check_in=jdate(1404, 5, 1), check_out=jdate(1404, 5, 2), agency=self.agency)
+        BookingRoom.objects.create(booking=booking, room_type=self.room, board_type=self.board, quantity=1, total_price=0)
+        return booking
+
+    def test_running_balance(self):
+        charge = AgencyTransaction.objects.create(agency=self.agency, amount=500, transaction_type='adjustment')
+        AgencyTransaction.objects.create(agency=self.agency, amount=200, transaction_type='payment')
+        self.assertEqual(self._balance(), 300)
+
+        charge.amount = 600
+        charge.save()
+        self.assertEqual(self._balance(), 400)
+
+        charge.delete()
+        self.assertEqual(self._balance(), -200)
+        self.assertEqual(ledger.reconcile(), [])
+
+    def test_credit_limit_is_enforced(self):
+        ledger.charge_booking_on_credit(self.agency, self._booking(), 700)
+        self.assertEqual(self._balance(), 700)
+        with self.assertRaisesMessage(ValidationError, ledger.CREDIT_LIMIT_ERROR):
+            ledger.charge_booking_on_credit(self.agency, self._booking(), 301)
+        ledger.charge_booking_on_credit(self.agency, self._booking(), 300)
+        self.assertEqual(self._balance(), 1000)
+        self.assertEqual(AgencyTransaction.objects.filter(transaction_type='booking').count(), 2)
+        self.assertEqual(ledger.reconcile(), [])
+
+    def test_blacklist_is_checked_in_the_charging_transaction(self):
+        booking = self._booking()
+        # A blacklist row written behind the ORM's back (no signal) is still enforced.
+        Agency.credit_blacklist_hotels.through.objects.create(agency=self.agency, hotel=self.hotel)
+        with self.assertRaisesMessage(ValidationError, ledger.BLACKLIST_ERROR):
+            ledger.charge_booking_on_credit(self.agency, booking, 100)
+        self.assertEqual(self._balance(), 0)  # the balance UPDATE was rolled back
+
+        self.agency.credit_blacklist_hotels.remove(self.hotel)
+        ledger.charge_booking_on_credit(self.agency, booking, 100)
+        self.assertEqual(self._balance(), 100)
+        self.hotel.agency_set.add(self.agency)
+        with self.assertRaisesMessage(ValidationError, ledger.BLACKLIST_ERROR):
+            ledger.charge_booking_on_credit(self.agency, self._booking(), 100)
+
+    def test_reconcile_reports_and_fixes_drift(self):
+        AgencyTransaction.objects.create(agency=self.agency, amount=250, transaction_type='adjustment')
+        Agency.objects.filter(pk=self.agency.pk).update(current_balance=999)
+        self.assertEqual(ledger.reconcile(), [(self.agency.pk, 'Gasht', 999, 250)])
+        ledger.reconcile(fix=True)
+        self.assertEqual(self._balance(), 250)
+
+    def test_credit_booking_api_rolls_back_over_limit(self):
+        day = jdate(1404, 5, 1)
+        Availability.objects.create(room_type=self.room, date=day, quantity=2)
+        Price.objects.create(room_type=self.room, board_type=self.board, date=day,
+                             price_per_night=800, extra_person_price=0, child_price=0)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        payload = {
+            'booking_rooms': [{'room_type_id': self.room.pk, 'board_type_id': self.board.pk, 'quantity': 1}],
+            'check_in': '1404-05-01', 'check_out': '1404-05-02',
+            'guests': [{'first_name': 'Ali', 'last_name': 'Rezaei'}],
+            'agency_id': self.agency.pk, 'pay_with_credit': True, 'rules_accepted': True,
+        }
+        response = client.post('/reservations/bookings/', payload, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['payment_type'], 'credit')
+        self.assertEqual(self._balance(), 800)
+
+        response = client.post('/reservations/bookings/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], ledger.CREDIT_LIMIT_ERROR)
+        self.assertEqual(Availability.objects.get(room_type=self.room, date=day).quantity, 1)
+        self.assertEqual(Booking.objects.count(), 1)
+
+
+class AgencyRollupTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        city = City.objects.create(name="Kish", slug="kish")
+        hotel = Hotel.objects.create(name="Dariush", slug="dariush", city=city, address="-")
+        cls.room = RoomType.objects.create(hotel=hotel, name="Double", code="DAR-D", price_per_night=1)
+        cls.board = BoardType.objects.create(name="HB", code="HB")
+        cls.agency = Agency.objects.create(name="Parvaz", credit_limit=10 ** 9)
+        cls.user = CustomUser.objects.create_user(
+            username='parvaz', password='password', mobile='09120000003', agency=cls.agency,
+            agency_role=AgencyUserRole.objects.create(name='finance_manager'))
+
+    def _booking(self, nights=2, quantity=1, total=1000, status='confirmed'):
+        check_in = jdate(1404, 5, 1)
+        booking = Booking.objects.create(check_in=check_in, check_out=check_in + timedelta(days=nights),
+                                         agency=self.agency, total_price=total, paid_amount=total, status=status)
+        BookingRoom.objects.create(booking=booking, room_type=self.room, board_type=self.board, quantity=quantity)
+        return booking
+
+    def _today(self):
+        return rollups.booking_day(timezone.now())
+
+    def test_rollup_follows_bookings_and_transactions(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = self._booking(nights=2, quantity=2, total=1000)
+            self._booking(status='cancelled')
+            AgencyTransaction.objects.create(agency=self.agency, amount=1000, transaction_type='booking')
+            AgencyTransaction.objects.create(agency=self.agency, amount=400, transaction_type='payment')
+
+        row = AgencyDailyRollup.objects.get(agency=self.agency, date=self._today())
+        self.assertEqual((row.bookings, row.cancelled_bookings, row.room_nights), (1, 1, 4))
+        self.assertEqual((row.gross_amount, row.paid_amount), (1000, 1000))
+        self.assertEqual((row.debt_increase, row.debt_decrease), (1000, 400))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.status = 'cancelled'
+            booking.save()
+        row.refresh_from_db()
+        self.assertEqual((row.bookings, row.cancelled_bookings, row.room_nights, row.gross_amount), (0, 2, 0, 0))
+
+    def test_backfill_matches_incremental_rows(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._booking(nights=3)
+            AgencyTransaction.objects.create(agency=self.agency, amount=300, transaction_type='payment',
+                                             transaction_date=jdate(1404, 4, 10))
+        incremental = sorted(AgencyDailyRollup.objects.values_list(
+            'date', 'bookings', 'room_nights', 'gross_amount', 'debt_decrease'))
+
+        AgencyDailyRollup.objects.all().delete()
+        self.assertEqual(rollups.backfill(chunk_size=1), 2)
+        self.assertEqual(sorted(AgencyDailyRollup.objects.values_list(
+            'date', 'bookings', 'room_nights', 'gross_amount', 'debt_decrease')), incremental)
+
+    def test_range_reports(self):
+        AgencyDailyRollup.objects.create(agency=self.agency, date=jdate(1404, 1, 31), bookings=1, gross_amount=100)
+        AgencyDailyRollup.objects.create(agency=self.agency, date=jdate(1404, 2, 1), bookings=2, gross_amount=200)
+        AgencyDailyRollup.objects.create(agency=self.agency, date=jdate(1404, 2, 20), bookings=3, room_nights=6)
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        response = client.get('/agencies/api/my-report/daily/', {'from': '۱۴۰۴-۰۲-۰۱', 'to': '1404-02-31'})
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual([day['date'] for day in response.data['days']], ['1404-02-01', '1404-02-20'])
+        self.assertEqual(response.data['totals']['bookings'], 5)
+
+        with self.assertNumQueries(1):
+            rollups.monthly_rows(self.agency.pk, jdate(1404, 1, 1), jdate(1404, 2, 31))
+        response = client.get('/agencies/api/my-report/monthly/', {'from': '1404-01-01', 'to': '1404-02-31'})
+        self.assertEqual([(m['month'], m['bookings']) for m in response.data['months']], [('1404-01', 1), ('1404-02', 5)])
+        self.assertEqual(response.data['totals']['gross_amount'], '300')
+
+        self.assertEqual(client.get('/agencies/api/my-report/daily/', {'from': '1404-02-10', 'to': '1404-02-01'}).status_code, 400)
+        self.assertEqual(client.get('/agencies/api/my-report/daily/', {'from': 'x'}).status_code, 400)
 
-# Create your tests here.
+    def test_booking_export_streams_rows(self):
+        for _ in range(3):
+            self._booking(total=1500000)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/agencies/api/my-report/export/bookings/', {'as': 'csv'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertIn(',Dariush,1404-05-01,1404-05-03,تایید شده,1500000,1500000', lines[1])
+        self.assertEqual(client.get('/agencies/api/my-report/export/other/').status_code, 404)
@@ -1,4 +1,7 @@
 # agencies/urls.py
+# version: 1.2.0
+# FEATURE: Date-range daily / monthly report endpoints.
+# FEATURE: Streaming booking / transaction exports.
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from . import views
@@ -11,4 +14,7 @@ app_name = 'agencies'
 urlpatterns = [
     path('api/', include(router.urls)),
     path('api/my-report/', views.AgencyReportAPIView.as_view(), name='agency_report_api'),
+    path('api/my-report/daily/', views.AgencyDailyReportAPIView.as_view(), name='agency_daily_report_api'),
+    path('api/my-report/monthly/', views.AgencyMonthlyReportAPIView.as_view(), name='agency_monthly_report_api'),
+    path('api/my-report/export/<str:kind>/', views.AgencyExportAPIView.as_view(), name='agency_export_api'),
 ]
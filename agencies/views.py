@@ -1,5 +1,10 @@
 # agencies/views.py
+# version: 1.2.0
+# FEATURE: Date-range daily / monthly financial reports answered from AgencyDailyRollup.
+# FEATURE: Streaming CSV / XLSX exports of the agency's bookings and transactions.
 
+import jdatetime
+from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, viewsets
@@ -7,31 +12,52 @@ from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
 
-from .serializers import AgencyReportSerializer
+from .serializers import AgencyReportSerializer, AgencyRangeReportSerializer
+from .models import AgencyTransaction
+from . import rollups
 from reservations.models import Booking
+from reservations.exports import BOOKING_COLUMNS, booking_export_rows
+from core.exports import EXPORT_FORMATS, ExportColumn, export_response
 from core.models import CustomUser, AgencyUserRole
 from core.serializers import AgencySubUserSerializer, AgencyUserRoleSerializer
 
+REPORT_ROLES = ['admin', 'finance_manager', 'viewer']
+DEFAULT_REPORT_DAYS = 30
+MAX_REPORT_DAYS = 3 * 366
+
+
+def _report_agency(user):
+    """(agency, None) for users allowed to read the agency reports, else (None, error Response)."""
+    if not hasattr(user, 'agency') or not user.agency:
+        return None, Response(
+            {"error": "شما کاربر آژانسی نیستید."},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    # بررسی سطح دسترسی بر اساس نقش کاربر
+    if not user.agency_role or user.agency_role.name not in REPORT_ROLES:
+        return None, Response(
+            {"error": "شما مجوز مشاهده گزارش مالی را ندارید."},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    return user.agency, None
+
+
+def _parse_jalali(value):
+    """'1404-05-01' (Persian or English digits) -> jdatetime.date; raises ValueError."""
+    value = value.strip().translate(str.maketrans('۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩', '01234567890123456789'))
+    year, month, day = map(int, value.split('-'))
+    return jdatetime.date(year, month, day)
+
+
 class AgencyReportAPIView(APIView):
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        user = request.user
-        if not hasattr(user, 'agency') or not user.agency:
-            return Response(
-                {"error": "شما کاربر آژانسی نیستید."},
-                status=status.HTTP_403_FORBIDDEN
-            )
-        
-        # بررسی سطح دسترسی بر اساس نقش کاربر
-        if user.agency_role.name not in ['admin', 'finance_manager', 'viewer']:
-            return Response(
-                {"error": "شما مجوز مشاهده گزارش مالی را ندارید."},
-                status=status.HTTP_403_FORBIDDEN
-            )
-        
-        agency = user.agency
+        agency, error = _report_agency(request.user)
+        if error:
+            return error
 
         # دریافت ۲۰ رزرو آخر مربوط به تمام کاربران این آژانس
         bookings = Booking.objects.filter(agency=agency).order_by('-created_at')[:20]
@@ -50,6 +76,108 @@ class AgencyReportAPIView(APIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+class AgencyRangeReportAPIView(APIView):
+    """
+    Base of the date-range reports: ?from=&to= are inclusive Jalali dates
+    (default: the last 30 days). Answered from AgencyDailyRollup only, so the cost
+    depends on the length of the range, not on the agency's booking history.
+    """
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    group_by = 'days'
+
+    def get(self, request):
+        agency, error = _report_agency(request.user)
+        if error:
+            return error
+
+        today = jdatetime.date.fromgregorian(date=timezone.localdate())
+        try:
+            date_to = _parse_jalali(request.query_params['to']) if request.query_params.get('to') else today
+            date_from = (_parse_jalali(request.query_params['from']) if request.query_params.get('from')
+                         else date_to - jdatetime.timedelta(days=DEFAULT_REPORT_DAYS - 1))
+        except ValueError:
+            return Response({"error": "فرمت تاریخ نامعتبر است. (YYYY-MM-DD)"}, status=status.HTTP_400_BAD_REQUEST)
+        if date_from > date_to:
+            return Response({"error": "تاریخ شروع نمی‌تواند بعد از تاریخ پایان باشد."}, status=status.HTTP_400_BAD_REQUEST)
+        if (date_to - date_from).days >= MAX_REPORT_DAYS:
+            return Response({"error": "بازه گزارش بیش از حد مجاز است."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if self.group_by == 'months':
+            rows, totals = rollups.monthly_rows(agency.pk, date_from, date_to)
+        else:
+            rows, totals = rollups.report_rows(agency.pk, date_from, date_to)
+
+        serializer = AgencyRangeReportSerializer({
+            'date_from': str(date_from),
+            'date_to': str(date_to),
+            'totals': totals,
+            self.group_by: rows,
+        })
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class AgencyDailyReportAPIView(AgencyRangeReportAPIView):
+    group_by = 'days'
+
+
+class AgencyMonthlyReportAPIView(AgencyRangeReportAPIView):
+    group_by = 'months'
+
+
+TRANSACTION_COLUMNS = [
+    ExportColumn("تاریخ تراکنش", 'transaction_date'),
+    ExportColumn("نوع تراکنش", 'transaction_type', choices=AgencyTransaction.TRANSACTION_TYPES),
+    ExportColumn("مبلغ", 'amount'),
+    ExportColumn("کد رزرو", 'booking__booking_code'),
+    ExportColumn("کد پیگیری", 'tracking_code'),
+    ExportColumn("توضیحات", 'description'),
+    ExportColumn("زمان ثبت", 'created_at'),
+]
+
+
+class AgencyExportAPIView(APIView):
+    """
+    Full booking / transaction history of the user's agency as a streamed file.
+    ?as=csv|xlsx (default csv); optional ?from=&to= Jalali dates limit the range
+    (booking creation day / transaction date).
+    """
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, kind):
+        if kind not in ('bookings', 'transactions'):
+            return Response({"error": "نوع خروجی نامعتبر است."}, status=status.HTTP_404_NOT_FOUND)
+        agency, error = _report_agency(request.user)
+        if error:
+            return error
+
+        export_format = request.query_params.get('as', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return Response({"error": "فرمت خروجی نامعتبر است."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            date_from = _parse_jalali(request.query_params['from']) if request.query_params.get('from') else None
+            date_to = _parse_jalali(request.query_params['to']) if request.query_params.get('to') else None
+        except ValueError:
+            return Response({"error": "فرمت تاریخ نامعتبر است. (YYYY-MM-DD)"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if kind == 'bookings':
+            queryset = Booking.objects.filter(agency=agency)
+            if date_from:
+                queryset = queryset.filter(created_at__date__gte=date_from.togregorian())
+            if date_to:
+                queryset = queryset.filter(created_at__date__lte=date_to.togregorian())
+            return export_response(export_format, 'agency-bookings', BOOKING_COLUMNS, booking_export_rows(queryset))
+
+        queryset = AgencyTransaction.objects.filter(agency=agency)
+        if date_from:
+            queryset = queryset.filter(transaction_date__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(transaction_date__lte=date_to)
+        rows = queryset.order_by('-transaction_date', '-id').values(*[column.key for column in TRANSACTION_COLUMNS])
+        return export_response(export_format, 'agency-transactions', TRANSACTION_COLUMNS, rows)
+
+
 class AgencyUserManagementViewSet(viewsets.ModelViewSet):
     serializer_class = AgencySubUserSerializer
     authentication_classes = [TokenAuthentication]
@@ -1,6 +1,6 @@
 # attractions/serializers.py
-# version: 2.0.0
-# FEATURE: Updated serializers to support list of categories, amenities, and audiences.
+# version: 2.1.0
+# FEATURE: Added NearbyAttractionSerializer for geo index (radius / nearest / bbox) results.
 
 from rest_framework import serializers
 from .models import (
@@ -56,3 +56,16 @@ class AttractionSerializer(serializers.ModelSerializer):
             'best_time': obj.get_best_visit_time_display(),
             'fee': obj.entry_fee
         }
+
+
+class NearbyAttractionSerializer(serializers.ModelSerializer):
+    """Compact attraction card returned by geo searches, with distance from the query point."""
+    city_name = serializers.CharField(source='city.name', read_only=True)
+    distance_km = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Attraction
+        fields = [
+            'id', 'name', 'slug', 'city_name', 'short_description',
+            'latitude', 'longitude', 'rating', 'is_featured', 'distance_km'
+        ]
@@ -0,0 +1,27 @@
+# attractions/signals.py
+# version: 1.1.0
+# FEATURE: Keeps the geo index (hotels.GeoIndexEntry) in sync with Attraction coordinates.
+# FEATURE: Refreshes the city landing aggregate (featured attractions) on change.
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from hotels import geo_index, landing
+from hotels.models import GeoIndexEntry
+from .models import Attraction
+
+
+@receiver(post_save, sender=Attraction)
+def index_attraction_location(sender, instance, **kwargs):
+    geo_index.index_point(GeoIndexEntry.KIND_ATTRACTION, instance.pk, instance.latitude, instance.longitude)
+
+
+@receiver(post_delete, sender=Attraction)
+def unindex_attraction_location(sender, instance, **kwargs):
+    geo_index.remove_point(GeoIndexEntry.KIND_ATTRACTION, instance.pk)
+
+
+@receiver(post_save, sender=Attraction)
+@receiver(post_delete, sender=Attraction)
+def refresh_city_landing(sender, instance, **kwargs):
+    landing.schedule_refresh(instance.city_id)
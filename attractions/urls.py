@@ -1,5 +1,6 @@
 # attractions/urls.py
-# version: 1.0.0
+# version: 1.1.0
+# FEATURE: Added 'geo/' search endpoint.
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
@@ -12,5 +13,6 @@ router.register(r'list', views.AttractionViewSet, basename='attraction')
 
 urlpatterns = [
     path('categories/', views.AttractionCategoryListView.as_view(), name='category-list'),
+    path('geo/', views.AttractionGeoSearchAPIView.as_view(), name='attraction-geo-search'),
     path('', include(router.urls)),
 ]
@@ -1,13 +1,21 @@
 # attractions/views.py
-# version: 2.0.0
-# FEATURE: Updated filters to handle M2M relationships (categories, audiences).
+# version: 2.1.1
+# FEATURE: Added geo search endpoint and 'nearby-hotels' action backed by hotels/geo_index.py.
+# FIX: 'nearby-hotels' returns [] for an attraction without coordinates instead of a 400.
 
-from rest_framework import viewsets, generics
+from rest_framework import viewsets, generics, status
 from rest_framework.permissions import AllowAny
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
+from hotels import geo_index
+from hotels.models import Hotel, GeoIndexEntry
+from hotels.serializers import NearbyHotelSerializer
 from .models import Attraction, AttractionCategory
-from .serializers import AttractionSerializer, AttractionCategorySerializer
+from .serializers import AttractionSerializer, AttractionCategorySerializer, NearbyAttractionSerializer
+
 
 class AttractionCategoryListView(generics.ListAPIView):
     """
@@ -42,3 +50,35 @@ class AttractionViewSet(viewsets.ReadOnlyModelViewSet):
     }
     
     search_fields = ['name', 'description', 'city__name', 'amenities__name']
+
+    @action(detail=True, methods=['get'], url_path='nearby-hotels')
+    def nearby_hotels(self, request, slug=None):
+        """Hotels around this attraction (?radius=3 km by default, or ?k=10 nearest)."""
+        attraction = self.get_object()
+        if attraction.latitude is None or attraction.longitude is None:
+            return Response([])
+
+        params = {key: request.query_params.get(key) for key in ('radius', 'k') if request.query_params.get(key)}
+        params.update({'lat': attraction.latitude, 'lng': attraction.longitude})
+        try:
+            hits = geo_index.search_from_params(GeoIndexEntry.KIND_HOTEL, params)
+        except (KeyError, ValueError, TypeError):
+            return Response({"error": geo_index.PARAMS_ERROR_MESSAGE}, status=status.HTTP_400_BAD_REQUEST)
+        hotels = geo_index.load_objects(Hotel.objects.select_related('city'), hits)
+        return Response(NearbyHotelSerializer(hotels, many=True).data)
+
+
+class AttractionGeoSearchAPIView(APIView):
+    """
+    Attractions around a point or inside a map box.
+    ?lat=&lng=&radius=3  |  ?lat=&lng=&k=10  |  ?bbox=south,west,north,east
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        try:
+            hits = geo_index.search_from_params(GeoIndexEntry.KIND_ATTRACTION, request.query_params)
+        except (KeyError, ValueError, TypeError):
+            return Response({"error": geo_index.PARAMS_ERROR_MESSAGE}, status=status.HTTP_400_BAD_REQUEST)
+        attractions = geo_index.load_objects(Attraction.objects.select_related('city'), hits)
+        return Response(NearbyAttractionSerializer(attractions, many=True).data)
@@ -1,9 +1,14 @@
 # cancellations/admin.py
-# version: 1.0.0
+# version: 1.2.0
 # FEATURE: Register CancellationPolicy and CancellationRule models with the Django admin.
+# FEATURE: BulkCancellationJobAdmin - saving a new job starts it; progress is read-only.
+# FIX: BulkCancellationJobAdmin offers only the cancellable booking statuses (BulkCancellationJobForm).
 
-from django.contrib import admin
-from .models import CancellationPolicy, CancellationRule
+from django.contrib import admin, messages
+from django.db import transaction
+from . import bulk
+from .forms import BulkCancellationJobForm
+from .models import CancellationPolicy, CancellationRule, BulkCancellationJob
 
 class CancellationRuleInline(admin.TabularInline):
     """
@@ -32,3 +37,40 @@ class CancellationPolicyAdmin(admin.ModelAdmin):
 #     list_display = ('policy', 'days_before_checkin_min', 'days_before_checkin_max', 'penalty_type', 'penalty_value')
 #     list_filter = ('policy', 'penalty_type')
 #     search_fields = ('policy__name',)
+
+
+@admin.register(BulkCancellationJob)
+class BulkCancellationJobAdmin(admin.ModelAdmin):
+    form = BulkCancellationJobForm
+    list_display = ('id', 'reason', 'hotel', 'status', 'progress_display', 'cancelled_bookings', 'refund_amount', 'created_at')
+    list_filter = ('status',)
+    fields = ('hotel', 'check_in_from', 'check_in_to', 'booking_statuses', 'reason', 'waive_fees',
+              'status', 'total_bookings', 'processed_bookings', 'cancelled_bookings', 'fee_amount',
+              'refund_amount', 'error', 'created_by', 'finished_at')
+    readonly_fields = ('status', 'total_bookings', 'processed_bookings', 'cancelled_bookings', 'fee_amount',
+                       'refund_amount', 'error', 'created_by', 'finished_at')
+    actions = ['resume_jobs']
+
+    @admin.display(description="پیشرفت")
+    def progress_display(self, obj):
+        return f"{obj.progress}%"
+
+    def has_change_permission(self, request, obj=None):
+        # Filters of a started job cannot change under it.
+        return obj is None or obj.status == 'pending'
+
+    @transaction.atomic
+    def save_model(self, request, obj, form, change):
+        if not change:
+            obj.created_by = request.user
+        super().save_model(request, obj, form, change)
+        if not change:
+            bulk.start(obj)
+
+    @admin.action(description="ادامه کارهای ناموفق")
+    @transaction.atomic
+    def resume_jobs(self, request, queryset):
+        jobs = list(queryset.filter(status='failed'))
+        for job in jobs:
+            bulk.start(job)
+        self.message_user(request, f"{len(jobs)} کار دوباره در صف قرار گرفت.", messages.SUCCESS)
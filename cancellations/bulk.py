@@ -0,0 +1,139 @@
+# cancellations/bulk.py
+# version: 1.0.1
+# FEATURE: Bulk cancellation (hotel closures, force majeure).
+#   Matching bookings are processed in id-ordered chunks; each chunk is one database
+#   transaction that cancels the bookings with one UPDATE, computes their fees in batch
+#   (engine.booking_fees), restocks Availability set-based, returns agency credit and wallet
+#   money with bulk inserts, advances the job's cursor and queues one notification task.
+#   A chunk that fails rolls back entirely, so a resumed job continues from the cursor.
+# FIX: Only BULK_CANCELLABLE_STATUSES are ever matched, whatever the job row holds, so an
+#      already-cancelled booking is never cancelled and refunded again.
+
+from collections import defaultdict
+from decimal import Decimal
+
+import jdatetime
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from agencies import ledger as agency_ledger, rollups
+from agencies.models import AgencyTransaction
+from core import ledger as wallet_ledger
+from core.models import Wallet
+from pricing import inventory
+from reservations.models import Booking, BookingRoom
+from .engine import booking_fees
+from .models import BULK_CANCELLABLE_STATUSES, BulkCancellationJob
+
+CHUNK_SIZE = 200
+
+
+def job_statuses(job):
+    """The job's booking statuses that may be cancelled; never 'cancelled' itself."""
+    allowed = {value for value, _ in BULK_CANCELLABLE_STATUSES}
+    return [status for status in job.booking_statuses if status in allowed]
+
+
+def matching_bookings(job):
+    bookings = Booking.objects.filter(status__in=job_statuses(job))
+    if job.hotel_id:
+        bookings = bookings.filter(id__in=BookingRoom.objects.filter(room_type__hotel_id=job.hotel_id).values('booking_id'))
+    if job.check_in_from:
+        bookings = bookings.filter(check_in__gte=job.check_in_from)
+    if job.check_in_to:
+        bookings = bookings.filter(check_in__lte=job.check_in_to)
+    return bookings
+
+
+def start(job):
+    """Counts the remaining bookings and queues the job (also resumes a failed one)."""
+    from .tasks import run_bulk_cancellation
+
+    remaining = matching_bookings(job).filter(id__gt=job.last_booking_id).count()
+    job.total_bookings = job.processed_bookings + remaining
+    job.status = 'running'
+    job.error = ''
+    job.finished_at = None
+    job.save(update_fields=['total_bookings', 'status', 'error', 'finished_at'])
+    transaction.on_commit(lambda: run_bulk_cancellation.delay(job.pk))
+
+
+def _restock_cells(bookings, booking_ids):
+    """{(room_id, date): rooms} held by the bookings, one cell per night."""
+    stays = {booking_id: (check_in, check_out) for booking_id, _, _, _, check_in, check_out, _, _ in bookings}
+    cells = defaultdict(int)
+    for booking_id, room_id, quantity in BookingRoom.objects.filter(booking_id__in=booking_ids).values_list(
+            'booking_id', 'room_type_id', 'quantity'):
+        check_in, check_out = stays[booking_id]
+        for night in range((check_out - check_in).days):
+            cells[(room_id, check_in + jdatetime.timedelta(days=night))] += quantity
+    return cells
+
+
+@transaction.atomic
+def run_chunk(job_id, chunk_size=None):
+    """Processes the next chunk of a job. Returns True while bookings remain."""
+    chunk_size = chunk_size or CHUNK_SIZE
+    job = BulkCancellationJob.objects.select_for_update().get(pk=job_id)
+    if job.status != 'running':
+        return False
+
+    candidate_ids = list(matching_bookings(job).filter(id__gt=job.last_booking_id).order_by('id').values_list(
+        'id', flat=True)[:chunk_size])
+    if not candidate_ids:
+        job.status = 'completed'
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'finished_at'])
+        return False
+
+    # Re-read under lock: a booking cancelled or paid meanwhile is seen as it is now.
+    bookings = list(Booking.objects.select_for_update().filter(
+        id__in=candidate_ids, status__in=job_statuses(job)).exclude(status='cancelled').order_by('id').values_list(
+        'id', 'booking_code', 'user_id', 'paid_amount', 'check_in', 'check_out', 'agency_id', 'created_at'))
+    booking_ids = [row[0] for row in bookings]
+    fees = {} if job.waive_fees else booking_fees(booking_ids)
+
+    Booking.objects.filter(id__in=booking_ids).update(status='cancelled', updated_at=timezone.now())
+    inventory.restock(_restock_cells(bookings, booking_ids))
+
+    charged = {
+        row['booking_id']: (row['agency_id'], row['total'])
+        for row in AgencyTransaction.objects.filter(booking_id__in=booking_ids, transaction_type='booking').values(
+            'booking_id', 'agency_id').annotate(total=Sum('amount')).order_by()
+    }
+    wallets = dict(Wallet.objects.filter(user_id__in={row[2] for row in bookings if row[2]}).values_list('user_id', 'id'))
+    adjustments, credits = [], []
+    fee_total = refund_total = Decimal(0)
+    for booking_id, booking_code, user_id, paid_amount, _, _, agency_id, created_at in bookings:
+        fee = fees.get(booking_id, Decimal(0))
+        refundable = max(Decimal(0), (paid_amount or Decimal(0)) - fee)
+        description = f"لغو گروهی رزرو {booking_code}: {job.reason} (جریمه: {fee})"
+        fee_total += fee
+        # Credit bookings are returned to the agency account first, the rest to the wallet.
+        # Guest bookings (no wallet) are left for a manual refund.
+        credit_agency_id, credit_charged = charged.get(booking_id, (None, Decimal(0)))
+        to_agency = min(refundable, credit_charged)
+        if to_agency > 0:
+            adjustments.append((credit_agency_id, booking_id, -to_agency, description))
+            refund_total += to_agency
+        if refundable - to_agency > 0 and user_id in wallets:
+            credits.append((wallets[user_id], refundable - to_agency, {'booking_id': booking_id, 'description': description}))
+            refund_total += refundable - to_agency
+        if agency_id:
+            rollups.schedule_refresh(agency_id, rollups.booking_day(created_at))
+
+    agency_ledger.adjust_many(adjustments, created_by=job.created_by)
+    wallet_ledger.credit_many(credits)
+
+    job.processed_bookings += len(candidate_ids)
+    job.cancelled_bookings += len(booking_ids)
+    job.fee_amount += fee_total
+    job.refund_amount += refund_total
+    job.last_booking_id = candidate_ids[-1]
+    job.save(update_fields=['processed_bookings', 'cancelled_bookings', 'fee_amount', 'refund_amount', 'last_booking_id'])
+
+    if booking_ids:
+        from .tasks import notify_cancelled_bookings
+        transaction.on_commit(lambda: notify_cancelled_bookings.delay(booking_ids, job.reason))
+    return True
@@ -0,0 +1,210 @@
+# cancellations/engine.py
+# version: 1.2.0
+# FEATURE: Compiled cancellation engine.
+#   - Each policy's rules are compiled into a table indexed by days before check-in, and
+#     SpecialPeriod rows into a sorted interval array (one bisect per peak lookup). Both are
+#     built once per process and reference-data version (core/reference.py).
+#   - Fees are computed from the nightly amounts snapshotted on BookingRoom; bookings made
+#     before the snapshot fall back to total / nights.
+#   - booking_fees() prices any number of bookings with three queries per chunk.
+# FEATURE: fee_schedule() - every cancellation-date segment of a booking with its fee,
+#          derived from the compiled rule table in one pass.
+# FIX: Policies compile into sorted, non-overlapping day intervals searched with bisect
+#      (like PeakCalendar) instead of a list with one entry per day up to the widest rule,
+#      so memory and schedule() time depend on the number of rules, not on their range.
+
+import bisect
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+
+from agencies.rate_plans import day_number
+from core import reference
+from core.models import SpecialPeriod
+from hotels.models import Hotel
+from reservations.models import Booking, BookingRoom
+
+CHUNK_SIZE = 1000
+
+
+class PeakCalendar:
+    """SpecialPeriod dates merged into sorted, non-overlapping day-number intervals."""
+
+    def __init__(self, periods):
+        merged = []
+        for start, end in sorted((day_number(start), day_number(end)) for start, end in periods):
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        self.starts = [start for start, _ in merged]
+        self.ends = [end for _, end in merged]
+
+    def is_peak(self, number):
+        index = bisect.bisect_right(self.starts, number) - 1
+        return index >= 0 and number <= self.ends[index]
+
+
+class CompiledPolicy:
+    """The rules of one policy as sorted, non-overlapping intervals of days before check-in."""
+
+    def __init__(self, rules):
+        # rules: (days_min, days_max, penalty_type, penalty_value), most specific first
+        bounds = sorted({days_min for days_min, _, _, _ in rules} | {days_max + 1 for _, days_max, _, _ in rules})
+        intervals = []
+        for start, next_start in zip(bounds, bounds[1:]):
+            # The first (most specific) rule covering the interval wins where rules overlap.
+            rule = next(((penalty_type, penalty_value) for days_min, days_max, penalty_type, penalty_value in rules
+                         if days_min <= start <= days_max), None)
+            if rule is None:
+                continue
+            if intervals and intervals[-1][1] == start - 1 and intervals[-1][2] == rule:
+                intervals[-1][1] = next_start - 1
+            else:
+                intervals.append([start, next_start - 1, rule])
+        self.starts = [start for start, _, _ in intervals]
+        self.ends = [end for _, end, _ in intervals]
+        self.rules = [rule for _, _, rule in intervals]
+
+    def rule_for(self, days):
+        index = bisect.bisect_right(self.starts, days) - 1
+        return self.rules[index] if index >= 0 and days <= self.ends[index] else None
+
+    def spans(self):
+        """(most_days, fewest_days, rule) from the widest rule down to day 0, gaps as rule None."""
+        below = None
+        for start, end, rule in zip(reversed(self.starts), reversed(self.ends), reversed(self.rules)):
+            if below is not None and end < below - 1:
+                yield below - 1, end + 1, None
+            yield end, start, rule
+            below = start
+        if below:
+            yield below - 1, 0, None
+
+
+class CancellationEngine:
+
+    def __init__(self, policies, peaks):
+        self.policies = policies
+        self.peaks = peaks
+
+    def policy_for(self, policy_ids, check_in):
+        """The compiled policy of a hotel ((normal id, peak id)) for a check-in day number."""
+        normal_id, peak_id = policy_ids
+        policy_id = peak_id if peak_id and self.peaks.is_peak(check_in) else normal_id
+        return self.policies.get(policy_id)
+
+    @staticmethod
+    def amount(rule, total, nights):
+        """Fee of one rule; nights: the amount charged for each night of the stay."""
+        if rule is None:
+            return Decimal(0)
+        penalty_type, penalty_value = rule
+        fee = Decimal(0)
+        if penalty_type == 'PERCENT_TOTAL':
+            fee = total * penalty_value / Decimal(100)
+        elif penalty_type == 'PERCENT_FIRST_NIGHT':
+            fee = nights[0] * penalty_value / Decimal(100) if nights else Decimal(0)
+        elif penalty_type == 'FIXED_NIGHTS':
+            # Whole nights in stay order, then the fraction of the next one.
+            whole = int(penalty_value)
+            fee = sum(nights[:whole], Decimal(0))
+            if whole < len(nights):
+                fee += nights[whole] * (penalty_value - whole)
+        return min(fee, total).quantize(Decimal('1'))
+
+    def fee(self, policy_ids, check_in, today, total, nights):
+        """
+        policy_ids: (normal policy id, peak policy id) of the hotel; check_in / today: day
+        numbers; nights: the amount charged for each night of the stay.
+        """
+        policy = self.policy_for(policy_ids, check_in)
+        if policy is None:
+            return Decimal(0)
+        return self.amount(policy.rule_for(max(0, check_in - today)), total, nights)
+
+    def schedule(self, policy_ids, check_in, total, nights):
+        """
+        [(first_day, last_day, fee)]: the fee for cancelling on any day of each segment, in
+        date order. The first segment is open at the start (first_day None) and the last one
+        at the end (last_day None, cancelling on or after check-in).
+        """
+        policy = self.policy_for(policy_ids, check_in)
+        segments = []
+        first_day, fee = None, Decimal(0)  # before the widest rule applies
+        for most_days, _, rule in (policy.spans() if policy else ()):
+            span_fee = self.amount(rule, total, nights)
+            if span_fee != fee:
+                segments.append((first_day, check_in - most_days - 1, fee))
+                first_day, fee = check_in - most_days, span_fee
+        segments.append((first_day, None, fee))
+        return segments
+
+
+@reference.dataset
+def cancellation_engine():
+    return CancellationEngine(
+        {policy_id: CompiledPolicy(rules) for policy_id, rules in reference.cancellation_policies().items()},
+        PeakCalendar(SpecialPeriod.objects.values_list('start_date', 'end_date')),
+    )
+
+
+def _nights(total, room_total, vat, duration, snapshots):
+    """Nightly amounts including their share of VAT; total / nights when a row has no snapshot."""
+    if snapshots and all(len(snapshot) == duration for snapshot in snapshots) and room_total:
+        scale = (room_total + vat) / room_total
+        return [sum((Decimal(snapshot[night]) for snapshot in snapshots), Decimal(0)) * scale
+                for night in range(duration)]
+    return [total / Decimal(duration)] * duration
+
+
+def _booking_inputs(booking_ids):
+    """(booking_id, policy_ids, check_in day, total, nights) of each booking with a hotel, in three queries."""
+    hotels, snapshots = {}, defaultdict(list)
+    for booking_id, hotel_id, nightly_prices in BookingRoom.objects.filter(booking_id__in=booking_ids).order_by('id').values_list(
+            'booking_id', 'room_type__hotel_id', 'nightly_prices'):
+        hotels.setdefault(booking_id, hotel_id)
+        snapshots[booking_id].append(nightly_prices)
+    policy_ids = {
+        hotel_id: (normal_id, peak_id)
+        for hotel_id, normal_id, peak_id in Hotel.objects.filter(id__in=set(hotels.values())).values_list(
+            'id', 'cancellation_policy_normal_id', 'cancellation_policy_peak_id')
+    }
+
+    for booking_id, check_in, check_out, total, room_total, vat in Booking.objects.filter(id__in=booking_ids).values_list(
+            'id', 'check_in', 'check_out', 'total_price', 'total_room_price', 'total_vat'):
+        hotel_id = hotels.get(booking_id)
+        if hotel_id is None or not check_in:
+            continue
+        total = total or Decimal(0)
+        duration = max(1, day_number(check_out) - day_number(check_in)) if check_out else 1
+        nights = _nights(total, room_total, vat or Decimal(0), duration, snapshots[booking_id])
+        yield booking_id, policy_ids[hotel_id], day_number(check_in), total, nights
+
+
+def _fees_chunk(engine, booking_ids, today):
+    fees = dict.fromkeys(booking_ids, Decimal(0))
+    for booking_id, policy_ids, check_in, total, nights in _booking_inputs(booking_ids):
+        fees[booking_id] = engine.fee(policy_ids, check_in, today, total, nights)
+    return fees
+
+
+def booking_fees(booking_ids, today=None):
+    """
+    {booking_id: cancellation fee} if the bookings were cancelled today, for any number of
+    bookings (e.g. every booking of a closing hotel) in chunks of CHUNK_SIZE.
+    """
+    engine = cancellation_engine()
+    today = day_number(today or datetime.date.today())
+    booking_ids = list(booking_ids)
+    fees = {}
+    for start in range(0, len(booking_ids), CHUNK_SIZE):
+        fees.update(_fees_chunk(engine, booking_ids[start:start + CHUNK_SIZE], today))
+    return fees
+
+
+def fee_schedule(booking_id):
+    """engine.schedule() segments of one booking (day numbers), or [] if it has no hotel."""
+    for _, policy_ids, check_in, total, nights in _booking_inputs([booking_id]):
+        return cancellation_engine().schedule(policy_ids, check_in, total, nights)
+    return []
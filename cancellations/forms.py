@@ -0,0 +1,15 @@
+# cancellations/forms.py
+# version: 1.0.0
+# FEATURE: BulkCancellationJobForm - booking statuses picked from the cancellable ones.
+
+from django import forms
+from .models import BULK_CANCELLABLE_STATUSES, BulkCancellationJob
+
+
+class BulkCancellationJobForm(forms.ModelForm):
+    booking_statuses = forms.MultipleChoiceField(
+        choices=BULK_CANCELLABLE_STATUSES, widget=forms.CheckboxSelectMultiple, label="وضعیت‌های رزرو")
+
+    class Meta:
+        model = BulkCancellationJob
+        fields = ['hotel', 'check_in_from', 'check_in_to', 'booking_statuses', 'reason', 'waive_fees']
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:41
+
+import cancellations.models
+import django.db.models.deletion
+import django_jalali.db.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cancellations', '0001_initial'),
+        ('hotels', '0009_citylandingaggregate'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BulkCancellationJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('check_in_from', django_jalali.db.models.jDateField(blank=True, null=True, verbose_name='ورود از تاریخ')),
+                ('check_in_to', django_jalali.db.models.jDateField(blank=True, null=True, verbose_name='ورود تا تاریخ')),
+                ('booking_statuses', models.JSONField(default=cancellations.models.default_job_statuses, verbose_name='وضعیت\u200cهای رزرو')),
+                ('reason', models.CharField(max_length=255, verbose_name='علت لغو')),
+                ('waive_fees', models.BooleanField(default=False, verbose_name='بدون جریمه (فورس ماژور)')),
+                ('status', models.CharField(choices=[('pending', 'در صف'), ('running', 'در حال اجرا'), ('completed', 'پایان یافته'), ('failed', 'ناموفق')], default='pending', max_length=20, verbose_name='وضعیت')),
+                ('total_bookings', models.PositiveIntegerField(default=0, verbose_name='تعداد کل رزروها')),
+                ('processed_bookings', models.PositiveIntegerField(default=0, verbose_name='رزروهای پردازش شده')),
+                ('cancelled_bookings', models.PositiveIntegerField(default=0, verbose_name='رزروهای لغو شده')),
+                ('fee_amount', models.DecimalField(decimal_places=0, default=0, max_digits=20, verbose_name='جمع جریمه\u200cها')),
+                ('refund_amount', models.DecimalField(decimal_places=0, default=0, max_digits=20, verbose_name='جمع مبالغ بازگشتی')),
+                ('last_booking_id', models.PositiveBigIntegerField(default=0, verbose_name='آخرین رزرو پردازش شده')),
+                ('error', models.TextField(blank=True, verbose_name='خطا')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='زمان ثبت')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='زمان پایان')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='ثبت توسط')),
+                ('hotel', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='bulk_cancellation_jobs', to='hotels.hotel', verbose_name='هتل')),
+            ],
+            options={
+                'verbose_name': 'لغو گروهی',
+                'verbose_name_plural': '۳. لغوهای گروهی',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
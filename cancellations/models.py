@@ -1,9 +1,15 @@
 # cancellations/models.py
-# version: 1.0.0
+# version: 1.2.0
 # FEATURE: Initial models for the Cancellation Penalty Engine.
+# FEATURE: BulkCancellationJob - cancels the bookings of a hotel / date span in resumable
+#          chunks (cancellations/bulk.py) and records its progress.
+# FIX: BulkCancellationJob.booking_statuses is limited to BULK_CANCELLABLE_STATUSES (clean()).
 
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django_jalali.db import models as jmodels
 
 class CancellationPolicy(models.Model):
     """
@@ -73,3 +79,75 @@ class CancellationRule(models.Model):
 
     def __str__(self):
         return f"قانون {self.policy.name}: {self.days_before_checkin_min}-{self.days_before_checkin_max} روز مانده"
+
+
+# Booking statuses a bulk cancellation may cancel (Booking.STATUS_CHOICES labels).
+# 'cancelled' and 'no_capacity' hold no room and no refundable payment.
+BULK_CANCELLABLE_STATUSES = (
+    ('pending', 'در انتظار پرداخت'),
+    ('awaiting_confirmation', 'منتظر تایید'),
+    ('awaiting_completion', 'در انتظار تکمیل وجه'),
+    ('confirmed', 'تایید شده'),
+    ('cancellation_requested', 'درخواست لغو شده'),
+    ('modification_requested', 'درخواست ویرایش شده'),
+)
+
+
+def default_job_statuses():
+    return ['pending', 'awaiting_confirmation', 'awaiting_completion', 'confirmed']
+
+
+class BulkCancellationJob(models.Model):
+    """
+    Cancels every booking matching the filters (hotel, check-in span, statuses), e.g. when a
+    hotel closes. Bookings are processed in id order; last_booking_id is the resume cursor,
+    saved in the same database transaction as each chunk's cancellations.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'در صف'),
+        ('running', 'در حال اجرا'),
+        ('completed', 'پایان یافته'),
+        ('failed', 'ناموفق'),
+    )
+    hotel = models.ForeignKey('hotels.Hotel', on_delete=models.CASCADE, null=True, blank=True, related_name="bulk_cancellation_jobs", verbose_name="هتل")
+    check_in_from = jmodels.jDateField(null=True, blank=True, verbose_name="ورود از تاریخ")
+    check_in_to = jmodels.jDateField(null=True, blank=True, verbose_name="ورود تا تاریخ")
+    booking_statuses = models.JSONField(default=default_job_statuses, verbose_name="وضعیت‌های رزرو")
+    reason = models.CharField(max_length=255, verbose_name="علت لغو")
+    waive_fees = models.BooleanField(default=False, verbose_name="بدون جریمه (فورس ماژور)")
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name="وضعیت")
+    total_bookings = models.PositiveIntegerField(default=0, verbose_name="تعداد کل رزروها")
+    processed_bookings = models.PositiveIntegerField(default=0, verbose_name="رزروهای پردازش شده")
+    cancelled_bookings = models.PositiveIntegerField(default=0, verbose_name="رزروهای لغو شده")
+    fee_amount = models.DecimalField(max_digits=20, decimal_places=0, default=0, verbose_name="جمع جریمه‌ها")
+    refund_amount = models.DecimalField(max_digits=20, decimal_places=0, default=0, verbose_name="جمع مبالغ بازگشتی")
+    last_booking_id = models.PositiveBigIntegerField(default=0, verbose_name="آخرین رزرو پردازش شده")
+    error = models.TextField(blank=True, verbose_name="خطا")
+
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="ثبت توسط")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="زمان ثبت")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="زمان پایان")
+
+    class Meta:
+        verbose_name = "لغو گروهی"
+        verbose_name_plural = "۳. لغوهای گروهی"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"لغو گروهی #{self.pk}: {self.reason}"
+
+    def clean(self):
+        allowed = {value for value, _ in BULK_CANCELLABLE_STATUSES}
+        statuses = self.booking_statuses
+        if not isinstance(statuses, list) or not statuses or not set(statuses) <= allowed:
+            raise ValidationError({'booking_statuses': "وضعیت‌های رزرو باید از وضعیت‌های قابل لغو انتخاب شوند."})
+
+    @property
+    def progress(self):
+        """Percent of the matching bookings processed so far."""
+        if self.status == 'completed':
+            return 100
+        if not self.total_bookings:
+            return 0
+        return min(100, self.processed_bookings * 100 // self.total_bookings)
@@ -1,9 +1,11 @@
 # cancellations/serializers.py
-# version: 1.0.0
+# version: 1.2.0
 # FEATURE: Initial serializers for CancellationPolicy and CancellationRule.
+# FEATURE: BulkCancellationJobSerializer (filters in, progress out).
+# FIX: booking_statuses only accepts the cancellable statuses (BULK_CANCELLABLE_STATUSES).
 
 from rest_framework import serializers
-from .models import CancellationPolicy, CancellationRule
+from .models import BULK_CANCELLABLE_STATUSES, CancellationPolicy, CancellationRule, BulkCancellationJob
 
 class CancellationRuleSerializer(serializers.ModelSerializer):
     """
@@ -30,3 +32,26 @@ class CancellationPolicySerializer(serializers.ModelSerializer):
     class Meta:
         model = CancellationPolicy
         fields = ['id', 'name', 'description', 'rules']
+
+
+class BulkCancellationJobSerializer(serializers.ModelSerializer):
+    progress = serializers.IntegerField(read_only=True)
+    booking_statuses = serializers.ListField(
+        child=serializers.ChoiceField(choices=BULK_CANCELLABLE_STATUSES), required=False, allow_empty=False)
+
+    class Meta:
+        model = BulkCancellationJob
+        fields = [
+            'id', 'hotel', 'check_in_from', 'check_in_to', 'booking_statuses', 'reason', 'waive_fees',
+            'status', 'progress', 'total_bookings', 'processed_bookings', 'cancelled_bookings',
+            'fee_amount', 'refund_amount', 'error', 'created_at', 'finished_at',
+        ]
+        read_only_fields = [
+            'status', 'total_bookings', 'processed_bookings', 'cancelled_bookings',
+            'fee_amount', 'refund_amount', 'error', 'created_at', 'finished_at',
+        ]
+
+    def validate(self, data):
+        if not (data.get('hotel') or data.get('check_in_from') or data.get('check_in_to')):
+            raise serializers.ValidationError("حداقل یکی از هتل یا بازه تاریخ ورود را مشخص کنید.")
+        return data
@@ -1,93 +1,75 @@
 # cancellations/services.py
-# version: 1.0.0
+# version: 2.1.0
 # FEATURE: Implemented the core cancellation fee calculation logic.
+# REFACTOR: Fees come from the compiled cancellation engine (cancellations/engine.py), which
+#           charges the snapshotted nightly amounts instead of total / nights.
+# FIX: Read the actual Booking fields (check_in, check_out, total_price); the old names
+#      (check_in_date, total_amount) raised AttributeError on every cancellation.
+# FEATURE: fee_preview() - the fee / refund for every cancellation date from today on, served
+#          from a schedule cached per booking until the booking, its hotel's policies or the
+#          reference data (policies, rules, peak periods) change.
 
 import datetime
 from decimal import Decimal
-from reservations.models import Booking  # Assuming Booking model is in reservations app
-from core.models import SpecialPeriod   # Import SpecialPeriod from core app
-from .models import CancellationRule   # Import CancellationRule from current app
 
-def calculate_cancellation_fee(booking: Booking) -> Decimal:
+from django.core.cache import cache
+from jdatetime import date as jdate
+
+from agencies.rate_plans import day_number
+from core import reference
+from reservations.models import Booking, BookingRoom  # Assuming Booking model is in reservations app
+from .engine import booking_fees, fee_schedule
+
+SCHEDULE_CACHE_TIMEOUT = 60 * 60 * 24
+
+def calculate_cancellation_fee(booking: Booking, today=None) -> Decimal:
     """
     Calculates the cancellation fee for a given booking based on hotel policies.
 
     Args:
         booking: The Booking object to calculate the fee for.
+        today: Cancellation date (defaults to today).
 
     Returns:
         The calculated cancellation fee as a Decimal, or Decimal(0) if no fee applies.
     """
-    if not booking or not booking.check_in_date or not booking.hotel:
-        # Cannot calculate without essential booking info
-        return Decimal(0)
-
-    # 1. Calculate days difference
-    today = datetime.date.today()
-    check_in_date = booking.check_in_date
-    if today >= check_in_date:
-        # Cancellation on or after check-in date usually means full charge or specific hotel policy
-        # For simplicity, let's consider it as 0 days before check-in. Handle specific cases if needed.
-        days_difference = 0
-    else:
-        days_difference = (check_in_date - today).days
-
-    # 2. Determine if check-in is during a peak season
-    is_peak_season = SpecialPeriod.objects.filter(
-        start_date__lte=check_in_date,
-        end_date__gte=check_in_date
-    ).exists()
-
-    # 3. Select the correct policy from the hotel
-    hotel = booking.hotel
-    policy = None
-    if is_peak_season and hotel.cancellation_policy_peak:
-        policy = hotel.cancellation_policy_peak
-    elif hotel.cancellation_policy_normal:
-        policy = hotel.cancellation_policy_normal
-
-    if not policy:
-        # No applicable policy found for the hotel
+    if not booking or not booking.pk:
         return Decimal(0)
+    return booking_fees([booking.pk], today).get(booking.pk, Decimal(0))
 
-    # 4. Find the matching rule within the policy
-    # We look for the rule where days_difference falls within its range.
-    # Order by min days descending to find the most specific rule first if ranges overlap (though they shouldn't).
-    applicable_rule = policy.rules.filter(
-        days_before_checkin_min__lte=days_difference,
-        days_before_checkin_max__gte=days_difference
-    ).order_by('-days_before_checkin_min').first() # Get the most specific matching rule
-
-    if not applicable_rule:
-        # No rule covers this number of days (e.g., cancelled very far in advance)
-        return Decimal(0)
 
-    # 5. Calculate the penalty based on the rule
-    penalty_value = applicable_rule.penalty_value
-    penalty_type = applicable_rule.penalty_type
-    total_amount = booking.total_amount or Decimal(0)
-    duration = (booking.check_out_date - booking.check_in_date).days if booking.check_out_date and booking.check_in_date else 1
-    duration = max(1, duration) # Avoid division by zero
+def cancellation_schedule(booking: Booking):
+    """engine.fee_schedule() of a booking, cached until anything it depends on changes."""
+    normal_id, peak_id = BookingRoom.objects.filter(booking=booking).order_by('id').values_list(
+        'room_type__hotel__cancellation_policy_normal_id', 'room_type__hotel__cancellation_policy_peak_id').first() or (None, None)
+    key = (f"cancellations:schedule:{reference.current_version()}:{booking.pk}:"
+           f"{booking.updated_at.timestamp() if booking.updated_at else ''}:{normal_id}:{peak_id}")
+    schedule = cache.get(key)
+    if schedule is None:
+        schedule = fee_schedule(booking.pk)
+        cache.set(key, schedule, SCHEDULE_CACHE_TIMEOUT)
+    return schedule
 
-    # Calculate approximate price per night for relevant penalty types
-    # NOTE: This is an approximation. A more accurate calculation might require
-    # summing the actual prices for each night from the 'Price' model if available.
-    price_per_night_approx = total_amount / Decimal(duration)
 
-    calculated_fee = Decimal(0)
+def _jalali(number):
+    return str(jdate.fromgregorian(date=datetime.date.fromordinal(number))) if number is not None else None
 
-    if penalty_type == 'PERCENT_TOTAL':
-        calculated_fee = total_amount * (penalty_value / Decimal(100))
-    elif penalty_type == 'PERCENT_FIRST_NIGHT':
-        # Using approximation for first night price
-        calculated_fee = price_per_night_approx * (penalty_value / Decimal(100))
-    elif penalty_type == 'FIXED_NIGHTS':
-        # Using approximation for price per night
-        # Ensure penalty_value represents the number of nights
-        calculated_fee = price_per_night_approx * penalty_value
 
-    # Ensure fee doesn't exceed total amount
-    calculated_fee = min(calculated_fee, total_amount)
-    
-    # Return the fee rounded to 0 decimal places (or adjust as needed)
-    return calculated_fee.quantize(Decimal('1'))
+def fee_preview(booking: Booking, today=None):
+    """
+    The cancellation fee and refund for every date from today on, one entry per range of
+    dates with the same fee (to_date None: from then until check-in and after).
+    """
+    today = day_number(today or datetime.date.today())
+    paid_amount = booking.paid_amount or Decimal(0)
+    preview = []
+    for first_day, last_day, fee in cancellation_schedule(booking):
+        if last_day is not None and last_day < today:
+            continue
+        preview.append({
+            'from_date': _jalali(max(first_day or today, today)),
+            'to_date': _jalali(last_day),
+            'cancellation_fee': fee,
+            'refund_amount': max(Decimal(0), paid_amount - fee),
+        })
+    return preview
@@ -0,0 +1,52 @@
+# cancellations/tasks.py
+# version: 1.1.0
+# FEATURE: Bulk cancellation job runner (one chunk per task run, re-queued until done)
+#          and the batched notification of the cancelled bookings.
+# PERF: The chunk's SMS are queued together and sent in coalesced batches.
+
+import logging
+
+from celery import shared_task
+
+from core import reference
+from notifications import sms
+from reservations.models import Guest
+from . import bulk
+from .models import BulkCancellationJob
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def run_bulk_cancellation(job_id):
+    """
+    Runs the next chunk of a job and queues itself for the following one. A failed chunk is
+    rolled back and the job marked 'failed'; bulk.start() resumes it from its cursor.
+    """
+    try:
+        more = bulk.run_chunk(job_id)
+    except Exception as e:
+        logger.exception("Bulk cancellation job %s failed", job_id)
+        BulkCancellationJob.objects.filter(pk=job_id).update(status='failed', error=str(e))
+        return f"Failed: {e}"
+    if more:
+        run_bulk_cancellation.delay(job_id)
+        return "Chunk done."
+    return "Completed."
+
+
+@shared_task
+def notify_cancelled_bookings(booking_ids, reason):
+    """One SMS per cancelled booking (to its first guest with a phone number), for a whole chunk."""
+    site_settings = reference.site_settings()
+    site_name = site_settings.site_name if site_settings else "سامانه رزرواسیون"
+    notified, messages = set(), []
+    for booking_id, booking_code, phone_number in Guest.objects.filter(
+            booking_id__in=booking_ids, phone_number__isnull=False).exclude(phone_number='').order_by(
+            'booking_id', 'id').values_list('booking_id', 'booking__booking_code', 'phone_number'):
+        if booking_id in notified:
+            continue
+        notified.add(booking_id)
+        messages.append((phone_number, f"رزرو شما با کد {booking_code} به دلیل {reason} لغو شد. {site_name}"))
+    sms.queue_many(messages)
+    return f"Notified {len(notified)} bookings."
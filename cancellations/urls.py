@@ -1,6 +1,7 @@
 # cancellations/urls.py
-# version: 1.0.0
+# version: 1.1.0
 # FEATURE: Initial URL configuration for cancellation policies and rules.
+# FEATURE: Bulk cancellation jobs.
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
@@ -12,6 +13,7 @@ app_name = 'cancellations'
 router = DefaultRouter()
 router.register(r'policies', views.CancellationPolicyViewSet, basename='cancellation-policy')
 router.register(r'rules', views.CancellationRuleViewSet, basename='cancellation-rule')
+router.register(r'bulk-jobs', views.BulkCancellationJobViewSet, basename='bulk-cancellation-job')
 
 # The API URLs are automatically determined by the router.
 urlpatterns = [
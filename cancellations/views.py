@@ -1,10 +1,16 @@
 # cancellations/views.py
-# version: 1.0.0
+# version: 1.1.0
 # FEATURE: Initial ViewSets for CancellationPolicy and CancellationRule.
+# FEATURE: BulkCancellationJobViewSet - start, follow and resume bulk cancellations (staff only).
 
-from rest_framework import viewsets
-from .models import CancellationPolicy, CancellationRule
-from .serializers import CancellationPolicySerializer, CancellationRuleSerializer
+from django.db import transaction
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from . import bulk
+from .models import CancellationPolicy, CancellationRule, BulkCancellationJob
+from .serializers import CancellationPolicySerializer, CancellationRuleSerializer, BulkCancellationJobSerializer
 
 class CancellationPolicyViewSet(viewsets.ModelViewSet):
     """
@@ -23,3 +29,28 @@ class CancellationRuleViewSet(viewsets.ModelViewSet):
     queryset = CancellationRule.objects.all()
     serializer_class = CancellationRuleSerializer
     # Add permissions later, e.g., [IsAdminUser]
+
+
+class BulkCancellationJobViewSet(mixins.CreateModelMixin, mixins.ListModelMixin,
+                                 mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Creating a job starts it; GET reports its progress. A failed job is continued from its
+    last processed booking with POST .../resume/.
+    """
+    queryset = BulkCancellationJob.objects.all()
+    serializer_class = BulkCancellationJobSerializer
+    permission_classes = [IsAdminUser]
+
+    @transaction.atomic
+    def perform_create(self, serializer):
+        job = serializer.save(created_by=self.request.user)
+        bulk.start(job)
+
+    @action(detail=True, methods=['post'])
+    @transaction.atomic
+    def resume(self, request, pk=None):
+        job = self.get_object()
+        if job.status != 'failed':
+            return Response({"error": "فقط کار ناموفق قابل ادامه است."}, status=status.HTTP_400_BAD_REQUEST)
+        bulk.start(job)
+        return Response(self.get_serializer(job).data)
@@ -1,13 +1,15 @@
 # core/admin.py
-# version: 0.0.6
+# version: 0.0.7
 # FEATURE: Registered Wallet and WalletTransaction models to the admin panel.
+# PERF: The wallet list shows the last ledger checkpoint instead of a full SUM per row;
+#       balance_after is shown on transactions.
 
 from django.contrib import admin
 from django.db import models
 from django.contrib.auth.admin import UserAdmin
 from django.forms import inlineformset_factory
 from jalali_date.widgets import AdminJalaliDateWidget
-from .models import CustomUser, SiteSettings, Menu, MenuItem, AgencyUserRole, Wallet, WalletTransaction, SpecialPeriod
+from .models import CustomUser, SiteSettings, Menu, MenuItem, AgencyUserRole, Wallet, WalletTransaction, WalletCheckpoint, SpecialPeriod
 
 # --- Custom Inline for Menu Items ---
 class MenuItemInline(admin.TabularInline):
@@ -25,7 +27,7 @@ class WalletTransactionInline(admin.TabularInline):
     """
     model = WalletTransaction
     extra = 0
-    readonly_fields = ('transaction_type', 'amount', 'booking', 'description', 'created_at')
+    readonly_fields = ('transaction_type', 'amount', 'balance_after', 'booking', 'description', 'created_at')
     can_delete = False
 
     def has_add_permission(self, request, obj=None):
@@ -49,12 +51,18 @@ class SpecialPeriodAdmin(admin.ModelAdmin):
 @admin.register(Wallet)
 class WalletAdmin(admin.ModelAdmin):
     """Admin configuration for the Wallet model."""
-    list_display = ('user', 'balance', 'calculated_balance')
+    list_display = ('user', 'balance', 'checkpoint_balance')
+    list_select_related = ('user', 'checkpoint')
     search_fields = ('user__username',)
     # The balance field is read-only because it should be updated via signals from transactions.
     readonly_fields = ('user', 'balance', 'calculated_balance')
     inlines = [WalletTransactionInline]
 
+    @admin.display(description="موجودی آخرین بررسی")
+    def checkpoint_balance(self, obj):
+        checkpoint = getattr(obj, 'checkpoint', None)
+        return checkpoint.ledger_balance if checkpoint else '-'
+
     def calculated_balance(self, obj):
         """A method to display the real-time calculated balance for verification."""
         return obj.calculate_balance()
@@ -66,10 +74,10 @@ class WalletTransactionAdmin(admin.ModelAdmin):
     Admin configuration for WalletTransaction. Primarily for viewing, searching, and filtering.
     Transactions should not be editable.
     """
-    list_display = ('wallet', 'transaction_type', 'amount', 'booking', 'created_at')
+    list_display = ('wallet', 'transaction_type', 'amount', 'balance_after', 'booking', 'created_at')
     list_filter = ('transaction_type',)
     search_fields = ('wallet__user__username', 'booking__booking_code', 'description')
-    readonly_fields = ('wallet', 'transaction_type', 'amount', 'booking', 'description', 'created_at')
+    readonly_fields = ('wallet', 'transaction_type', 'amount', 'balance_after', 'booking', 'description', 'created_at')
     
     def has_add_permission(self, request):
         return False
@@ -77,6 +85,23 @@ class WalletTransactionAdmin(admin.ModelAdmin):
     def has_delete_permission(self, request, obj=None):
         return False
 
+@admin.register(WalletCheckpoint)
+class WalletCheckpointAdmin(admin.ModelAdmin):
+    """Read-only results of the wallet ledger verification (core/ledger.py)."""
+    list_display = ('wallet', 'balance', 'ledger_balance', 'is_consistent', 'checked_at')
+    list_select_related = ('wallet__user',)
+    search_fields = ('wallet__user__username',)
+
+    @admin.display(boolean=True, description="منطبق")
+    def is_consistent(self, obj):
+        return obj.is_consistent
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
 # --- Existing Model Admin Classes ---
 
 @admin.register(CustomUser)
@@ -1,6 +1,8 @@
 # core/apps.py
-# version: 1.0.1
+# version: 1.2.0
 # CONFIG: Imported signals to ensure they are connected when the app is ready.
+# FEATURE: Connects the reference-data cache invalidation signals (core/reference.py).
+# FEATURE: Registers the shared-cache system check (core/checks.py).
 
 from django.apps import AppConfig
 
@@ -13,3 +15,6 @@ class CoreConfig(AppConfig):
         Import signals when the app is initialized.
         """
         import core.signals
+        import core.checks  # noqa: F401
+        from core import reference
+        reference.connect_signals()
@@ -0,0 +1,20 @@
+# core/checks.py
+# version: 1.0.0
+# FEATURE: System check that the default cache is shared between processes; the
+#          reference-data and rate-plan version keys are invalidated through it.
+
+from django.core.checks import Tags, Warning, register
+
+from . import reference
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    if reference.cache_is_shared():
+        return []
+    return [Warning(
+        "The default cache is local to each process.",
+        hint="Invalidations of reference data and agency rate plans would not reach other "
+             "web / Celery processes. Configure a shared backend (Redis) in CACHES.",
+        id='core.W001',
+    )]
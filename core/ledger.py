@@ -0,0 +1,189 @@
+# core/ledger.py
+# version: 1.2.0
+# FEATURE: Wallet ledger service.
+#   - Wallet.balance is a running balance: each completed transaction applies its amount
+#     once, under the wallet row lock, and records balance_after.
+#   - Saves that do not touch the status (e.g. description updates) cost nothing.
+#   - verify() compares balances with the full SUM of completed transactions in chunks of
+#     wallets and stores the result as each wallet's WalletCheckpoint.
+# FEATURE: debit() / credit() - wallet payments and refunds as one conditional UPDATE
+#          (balance >= amount) plus the transaction insert, inside one database transaction.
+# FEATURE: credit_many() - bulk refunds: one bulk insert of applied transactions and one
+#          bulk balance update for any number of wallets.
+
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F, Max, Q, Sum
+from django.utils import timezone
+
+from .models import Wallet, WalletCheckpoint, WalletTransaction
+
+
+# ==============================================================================
+# 1. RUNNING BALANCE
+# ==============================================================================
+
+@transaction.atomic
+def apply(wallet_transaction):
+    """
+    Applies a completed transaction that is not applied yet (balance_after is null).
+    The transaction is claimed with a conditional UPDATE while the wallet row is locked,
+    so a repeated or concurrent save cannot apply it twice. Returns True if applied.
+    """
+    balance = Wallet.objects.select_for_update().filter(pk=wallet_transaction.wallet_id).values_list('balance', flat=True).first()
+    if balance is None:
+        return False
+    balance_after = balance + wallet_transaction.amount
+    claimed = WalletTransaction.objects.filter(
+        pk=wallet_transaction.pk, status='completed', balance_after__isnull=True,
+    ).update(balance_after=balance_after)
+    if not claimed:
+        return False
+    Wallet.objects.filter(pk=wallet_transaction.wallet_id).update(balance=balance_after)
+    wallet_transaction.balance_after = balance_after
+    return True
+
+
+@transaction.atomic
+def revert(wallet_transaction):
+    """Takes back an applied transaction that is no longer completed. Returns True if reverted."""
+    Wallet.objects.select_for_update().filter(pk=wallet_transaction.wallet_id).values_list('id', flat=True).first()
+    released = WalletTransaction.objects.filter(
+        pk=wallet_transaction.pk, balance_after__isnull=False,
+    ).exclude(status='completed').update(balance_after=None)
+    if not released:
+        return False
+    Wallet.objects.filter(pk=wallet_transaction.wallet_id).update(balance=F('balance') - wallet_transaction.amount)
+    wallet_transaction.balance_after = None
+    return True
+
+
+def apply_delta(wallet_id, delta):
+    """Adds delta to a wallet in one UPDATE (used when an applied transaction is deleted)."""
+    if delta:
+        Wallet.objects.filter(pk=wallet_id).update(balance=F('balance') + delta)
+
+
+# ==============================================================================
+# 2. PAYMENTS AND REFUNDS
+# ==============================================================================
+
+INSUFFICIENT_BALANCE_ERROR = "موجودی کیف پول شما برای پرداخت این رزرو کافی نیست."
+
+
+def _record(wallet_id, amount, transaction_type, **fields):
+    """Inserts a completed transaction whose amount is already in the wallet balance."""
+    balance_after = Wallet.objects.filter(pk=wallet_id).values_list('balance', flat=True).get()
+    # balance_after is set, so the post_save signal does not apply it a second time.
+    return WalletTransaction.objects.create(
+        wallet_id=wallet_id, transaction_type=transaction_type, amount=amount,
+        status='completed', balance_after=balance_after, **fields,
+    )
+
+
+@transaction.atomic
+def debit(wallet_id, amount, transaction_type='payment', **fields):
+    """
+    Takes amount out of a wallet. The database decides in a single conditional UPDATE
+    (balance >= amount), so concurrent payments cannot overdraw the wallet; the row stays
+    locked until the transaction row is inserted. Raises ValidationError on a short balance.
+    """
+    amount = Decimal(amount)
+    updated = Wallet.objects.filter(pk=wallet_id, balance__gte=amount).update(balance=F('balance') - amount)
+    if not updated:
+        raise ValidationError(INSUFFICIENT_BALANCE_ERROR)
+    return _record(wallet_id, -amount, transaction_type, **fields)
+
+
+@transaction.atomic
+def credit(wallet_id, amount, transaction_type='refund', **fields):
+    """Adds amount to a wallet in one UPDATE and records the completed transaction."""
+    amount = Decimal(amount)
+    Wallet.objects.filter(pk=wallet_id).update(balance=F('balance') + amount)
+    return _record(wallet_id, amount, transaction_type, **fields)
+
+
+@transaction.atomic
+def credit_many(credits, transaction_type='refund'):
+    """
+    credits: iterable of (wallet_id, amount, fields). The wallets are locked in id order, the
+    transactions are inserted already applied (with their running balance_after) in one
+    bulk_create and the new balances written in one bulk_update. Credits to unknown wallets
+    are skipped. Returns the created transactions.
+    """
+    credits = list(credits)
+    wallet_ids = sorted({wallet_id for wallet_id, _, _ in credits})
+    balances = dict(Wallet.objects.select_for_update().filter(pk__in=wallet_ids).order_by('id').values_list('id', 'balance'))
+    transactions = []
+    for wallet_id, amount, fields in credits:
+        if wallet_id not in balances:
+            continue
+        balances[wallet_id] += Decimal(amount)
+        transactions.append(WalletTransaction(
+            wallet_id=wallet_id, transaction_type=transaction_type, amount=amount,
+            status='completed', balance_after=balances[wallet_id], **fields,
+        ))
+    WalletTransaction.objects.bulk_create(transactions, batch_size=1000)
+    Wallet.objects.bulk_update(
+        [Wallet(pk=wallet_id, balance=balance) for wallet_id, balance in balances.items()], ['balance'], batch_size=1000)
+    return transactions
+
+
+# ==============================================================================
+# 3. VERIFICATION
+# ==============================================================================
+
+def _ledger_chunk(wallet_ids):
+    """{wallet_id: (sum of completed amounts, last transaction id)} in one aggregate query."""
+    rows = WalletTransaction.objects.filter(wallet_id__in=wallet_ids).values('wallet_id').annotate(
+        total=Sum('amount', filter=Q(status='completed')), last_id=Max('id'),
+    ).order_by()
+    return {row['wallet_id']: (row['total'] or Decimal(0), row['last_id'] or 0) for row in rows}
+
+
+def verify(fix=False, chunk_size=500):
+    """
+    Compares every Wallet.balance with the full sum of its completed transactions, one
+    aggregate query per chunk of wallets, and upserts each wallet's WalletCheckpoint.
+    Returns a list of (wallet_id, username, stored, expected) for the wallets that drifted.
+    With fix=True each drifted wallet is re-checked under its row lock before it is corrected,
+    so a transaction written mid-scan is not mistaken for drift.
+    """
+    drifted = []
+    wallets = Wallet.objects.order_by('id').values_list('id', 'user__username', 'balance')
+    last_id = 0
+    while True:
+        chunk = list(wallets.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            break
+        last_id = chunk[-1][0]
+        ledger = _ledger_chunk([wallet_id for wallet_id, _, _ in chunk])
+        now = timezone.now()
+        checkpoints = []
+        for wallet_id, username, balance in chunk:
+            expected, last_transaction_id = ledger.get(wallet_id, (Decimal(0), 0))
+            checkpoints.append(WalletCheckpoint(
+                wallet_id=wallet_id, balance=balance, ledger_balance=expected,
+                last_transaction_id=last_transaction_id, checked_at=now,
+            ))
+            if balance != expected:
+                drifted.append((wallet_id, username, balance, expected))
+        WalletCheckpoint.objects.bulk_create(
+            checkpoints, update_conflicts=True, unique_fields=['wallet'],
+            update_fields=['balance', 'ledger_balance', 'last_transaction_id', 'checked_at'],
+        )
+    if fix:
+        for wallet_id, _, _, _ in drifted:
+            _fix_balance(wallet_id)
+    return drifted
+
+
+@transaction.atomic
+def _fix_balance(wallet_id):
+    Wallet.objects.select_for_update().filter(pk=wallet_id).first()
+    total = WalletTransaction.objects.filter(wallet_id=wallet_id, status='completed').aggregate(total=Sum('amount'))['total']
+    total = total or Decimal(0)
+    Wallet.objects.filter(pk=wallet_id).update(balance=total)
+    WalletCheckpoint.objects.filter(wallet_id=wallet_id).update(balance=total, ledger_balance=total, checked_at=timezone.now())
@@ -0,0 +1,27 @@
+# core/management/commands/verify_wallet_ledger.py
+# version: 1.0.0
+# FEATURE: Compares wallet balances with the full sum of completed transactions.
+
+from django.core.management.base import BaseCommand
+
+from core import ledger
+
+
+class Command(BaseCommand):
+    help = "Compares Wallet.balance with the sum of completed transactions (in chunks); --fix corrects the drifted wallets."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help="Write the recomputed balances.")
+        parser.add_argument('--chunk-size', type=int, default=500, help="Wallets verified per aggregate query.")
+
+    def handle(self, *args, **options):
+        drifted = ledger.verify(fix=options['fix'], chunk_size=options['chunk_size'])
+        for wallet_id, username, stored, expected in drifted:
+            self.stdout.write(f"#{wallet_id} {username}: stored {stored}, ledger {expected}, drift {stored - expected}")
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS("All wallet balances match the ledger."))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f"{len(drifted)} wallet balance(s) corrected."))
+        else:
+            self.stdout.write(self.style.WARNING(f"{len(drifted)} wallet balance(s) drifted. Run with --fix to correct them."))
@@ -0,0 +1,68 @@
+# core/menus.py
+# version: 1.0.0
+# FEATURE: Menu trees. A menu and all of its items are read in one query (Menu LEFT JOIN
+#          MenuItem), assembled into a tree in memory and cached as rendered JSON with its
+#          ETag. The cache key carries the reference-data version (core/reference.py), which
+#          every Menu / MenuItem save or delete bumps.
+
+import hashlib
+import json
+from collections import defaultdict
+
+from django.core.cache import cache
+
+from . import reference
+from .models import Menu
+
+CACHE_TIMEOUT = 60 * 60 * 24
+
+ITEM_FIELDS = ('items__id', 'items__parent_id', 'items__title', 'items__url', 'items__order')
+
+
+def build_tree(rows):
+    """
+    rows: (id, parent_id, title, url, order) in display order. Returns the top-level items,
+    each with its children nested to any depth. Items whose parent is not in the menu are
+    shown at the top level; items caught in a parent cycle are left out.
+    """
+    ids = {row[0] for row in rows}
+    children = defaultdict(list)
+    for row in rows:
+        children[row[1] if row[1] in ids else None].append(row)
+
+    def nodes(parent_id, seen):
+        result = []
+        for item_id, _, title, url, order in children[parent_id]:
+            if item_id in seen:
+                continue
+            seen.add(item_id)
+            result.append({'title': title, 'url': url, 'order': order, 'children': nodes(item_id, seen)})
+        return result
+
+    return nodes(None, set())
+
+
+def load_tree(slug):
+    """{'name', 'slug', 'items'} of a menu from one query, or None for an unknown slug."""
+    rows = list(
+        Menu.objects.filter(slug=slug).order_by('items__order', 'items__id').values_list('name', *ITEM_FIELDS)
+    )
+    if not rows:
+        return None
+    items = [row[1:] for row in rows if row[1] is not None]
+    return {'name': rows[0][0], 'slug': slug, 'items': build_tree(items)}
+
+
+def rendered_items(slug):
+    """(etag, JSON bytes of the menu's item tree), or None for an unknown slug."""
+    key = f'core:menu:{reference.current_version()}:{slug}'
+    rendered = cache.get(key)
+    if rendered is None:
+        menu = load_tree(slug)
+        if menu is None:
+            rendered = ()  # cached too, so unknown slugs cost no query either
+        else:
+            body = json.dumps(menu['items'], ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            rendered = ('"%s"' % hashlib.sha1(body).hexdigest(), body)
+        cache.set(key, rendered, CACHE_TIMEOUT)
+    return rendered or None
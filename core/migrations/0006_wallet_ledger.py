@@ -0,0 +1,50 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_running_balances(apps, schema_editor):
+    """Marks existing completed transactions as applied, with their running balance per wallet."""
+    Wallet = apps.get_model('core', 'Wallet')
+    WalletTransaction = apps.get_model('core', 'WalletTransaction')
+    for wallet in Wallet.objects.only('id').iterator(chunk_size=500):
+        balance = 0
+        updated = []
+        for txn in WalletTransaction.objects.filter(wallet_id=wallet.pk, status='completed').order_by('created_at', 'id').only('id', 'amount'):
+            balance += txn.amount
+            txn.balance_after = balance
+            updated.append(txn)
+        WalletTransaction.objects.bulk_update(updated, ['balance_after'], batch_size=1000)
+        Wallet.objects.filter(pk=wallet.pk).update(balance=balance)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_alter_customuser_mobile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wallettransaction',
+            name='balance_after',
+            field=models.DecimalField(blank=True, decimal_places=0, editable=False, max_digits=20, null=True, verbose_name='موجودی پس از تراکنش'),
+        ),
+        migrations.CreateModel(
+            name='WalletCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('balance', models.DecimalField(decimal_places=0, max_digits=20, verbose_name='موجودی ثبت\u200cشده')),
+                ('ledger_balance', models.DecimalField(decimal_places=0, max_digits=20, verbose_name='جمع تراکنش\u200cهای انجام شده')),
+                ('last_transaction_id', models.PositiveBigIntegerField(default=0, verbose_name='آخرین تراکنش بررسی\u200cشده')),
+                ('checked_at', models.DateTimeField(verbose_name='زمان بررسی')),
+                ('wallet', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoint', to='core.wallet', verbose_name='کیف پول')),
+            ],
+            options={
+                'verbose_name': 'نقطه کنترل کیف پول',
+                'verbose_name_plural': 'نقاط کنترل کیف پول',
+            },
+        ),
+        migrations.RunPython(backfill_running_balances, migrations.RunPython.noop),
+    ]
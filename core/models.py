@@ -1,6 +1,8 @@
 # core/models.py
-# version: 1.1.3
+# version: 1.2.0
 # FIX: Removed 'reservations.models' import to break circular dependency chain (Core -> Reservations -> Hotels -> Core).
+# PERF: Wallet balances are a running ledger (core/ledger.py): completed transactions store
+#       balance_after, and WalletCheckpoint keeps the last full-sum verification per wallet.
 
 import uuid
 from django.contrib.auth.models import AbstractUser
@@ -84,6 +86,9 @@ class WalletTransaction(models.Model):
     booking = models.ForeignKey('reservations.Booking', on_delete=models.SET_NULL, null=True, blank=True, related_name='wallet_transactions', verbose_name="رزرو مرتبط")
     description = models.CharField(max_length=255, blank=True, null=True, verbose_name="توضیحات")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="زمان ثبت")
+    # Wallet balance right after this transaction was applied; null while it is not applied
+    # (pending / failed), which is also what guards against applying it twice.
+    balance_after = models.DecimalField(max_digits=20, decimal_places=0, null=True, blank=True, editable=False, verbose_name="موجودی پس از تراکنش")
 
     class Meta:
         verbose_name = "تراکنش کیف پول"
@@ -93,6 +98,26 @@ class WalletTransaction(models.Model):
     def __str__(self):
         return f"{self.get_transaction_type_display()} ({self.get_status_display()}) - {self.wallet.user.username}"
 
+
+class WalletCheckpoint(models.Model):
+    """Result of the last full-sum verification of a wallet (core/ledger.py verify())."""
+    wallet = models.OneToOneField(Wallet, on_delete=models.CASCADE, related_name='checkpoint', verbose_name="کیف پول")
+    balance = models.DecimalField(max_digits=20, decimal_places=0, verbose_name="موجودی ثبت‌شده")
+    ledger_balance = models.DecimalField(max_digits=20, decimal_places=0, verbose_name="جمع تراکنش‌های انجام شده")
+    last_transaction_id = models.PositiveBigIntegerField(default=0, verbose_name="آخرین تراکنش بررسی‌شده")
+    checked_at = models.DateTimeField(verbose_name="زمان بررسی")
+
+    class Meta:
+        verbose_name = "نقطه کنترل کیف پول"
+        verbose_name_plural = "نقاط کنترل کیف پول"
+
+    @property
+    def is_consistent(self):
+        return self.balance == self.ledger_balance
+
+    def __str__(self):
+        return f"{self.wallet} @ {self.checked_at}"
+
 class SpecialPeriod(models.Model):
     name = models.CharField(max_length=255, verbose_name="نام دوره", help_text="مثال: نوروز ۱۴۰۵")
     start_date = models.DateField(verbose_name="تاریخ شروع")
@@ -0,0 +1,139 @@
+# core/reference.py
+# version: 1.5.0
+# FEATURE: Process-local cache of reference data (site settings, board types,
+#          amenities, cities, cancellation policies). Each dataset is loaded on first use
+#          and kept until the shared version key changes; post_save / post_delete of any
+#          reference model bumps the key, so every process reloads on its next access.
+#          Hot paths read reference data with one cache get and no database query.
+# REFACTOR: Menus moved to core/menus.py (one query per menu, rendered JSON cached by
+#           this module's version).
+# FEATURE: SpecialPeriod is reference data too (peak calendar of the cancellation engine);
+#          other apps register their compiled datasets with @dataset.
+# FEATURE: EmailSettings / SmsSettings are reference data (notifications/mailer.py pools
+#          its connection per version).
+# FIX: The version key needs a cache shared by all processes (settings.CACHES is Redis);
+#      cache_is_shared() backs the core.W001 system check.
+
+import functools
+import threading
+import time
+from collections import defaultdict
+
+from django.apps import apps
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+VERSION_CACHE_KEY = 'core:reference:version'
+
+REFERENCE_MODELS = (
+    'core.SiteSettings', 'core.Menu', 'core.MenuItem', 'core.SpecialPeriod',
+    'hotels.BoardType', 'hotels.Amenity', 'hotels.City',
+    'cancellations.CancellationPolicy', 'cancellations.CancellationRule',
+    'notifications.EmailSettings', 'notifications.SmsSettings',
+)
+
+# {name: loader}, filled by the @dataset decorator below.
+_loaders = {}
+_local = {'version': None, 'data': {}}
+_lock = threading.Lock()
+
+
+def cache_is_shared(alias='default'):
+    """False for the per-process backends, which cannot carry versions between processes."""
+    return not isinstance(caches[alias], (LocMemCache, DummyCache))
+
+
+def current_version():
+    """
+    The version starts from a timestamp rather than 0, so a version key lost to cache
+    eviction can never come back with a value a process already holds data for.
+    """
+    version = cache.get(VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(VERSION_CACHE_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_CACHE_KEY)
+    return version
+
+
+def invalidate():
+    cache.set(VERSION_CACHE_KEY, time.time_ns(), timeout=None)
+
+
+def get(name):
+    version = current_version()
+    data = _local['data']
+    if _local['version'] != version:
+        with _lock:
+            if _local['version'] != version:
+                _local['data'] = {}
+                _local['version'] = version
+            data = _local['data']
+    if name not in data:
+        data[name] = _loaders[name]()
+    return data[name]
+
+
+def dataset(loader):
+    """Registers loader and returns its cached accessor (the loader runs once per version)."""
+    _loaders[loader.__name__] = loader
+
+    @functools.wraps(loader)
+    def cached():
+        return get(loader.__name__)
+    return cached
+
+
+# ==============================================================================
+# DATASETS
+# ==============================================================================
+
+@dataset
+def site_settings():
+    return apps.get_model('core', 'SiteSettings').objects.first()
+
+
+@dataset
+def board_types():
+    return list(apps.get_model('hotels', 'BoardType').objects.all())
+
+
+@dataset
+def amenities():
+    return list(apps.get_model('hotels', 'Amenity').objects.all())
+
+
+@dataset
+def cities():
+    return list(apps.get_model('hotels', 'City').objects.all())
+
+
+@dataset
+def cancellation_policies():
+    """{policy_id: [(days_min, days_max, penalty_type, penalty_value)]}, most specific rule first."""
+    CancellationRule = apps.get_model('cancellations', 'CancellationRule')
+    policies = defaultdict(list)
+    for policy_id, *rule in CancellationRule.objects.order_by('policy_id', '-days_before_checkin_min').values_list(
+            'policy_id', 'days_before_checkin_min', 'days_before_checkin_max', 'penalty_type', 'penalty_value'):
+        policies[policy_id].append(tuple(rule))
+    return dict(policies)
+
+
+# ==============================================================================
+# INVALIDATION
+# ==============================================================================
+
+def _reference_changed(sender, **kwargs):
+    # Bumped now for this process, and again on commit: another process reloading in
+    # between still reads the old committed rows and must not keep them.
+    invalidate()
+    transaction.on_commit(invalidate)
+
+
+def connect_signals():
+    for label in REFERENCE_MODELS:
+        model = apps.get_model(label)
+        post_save.connect(_reference_changed, sender=model, dispatch_uid=f'reference:save:{label}')
+        post_delete.connect(_reference_changed, sender=model, dispatch_uid=f'reference:delete:{label}')
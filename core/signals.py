@@ -1,11 +1,14 @@
 # core/signals.py
-# version: 1.0.2
+# version: 1.1.0
 # REFACTOR: Updated wallet signal to react to status changes, not just creation.
+# PERF: Wallet balances are updated incrementally through the ledger (core/ledger.py)
+#       instead of re-summing every completed transaction on each save.
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.conf import settings
 from .models import Wallet, WalletTransaction
+from . import ledger
 
 User = settings.AUTH_USER_MODEL
 
@@ -15,18 +18,20 @@ def create_user_wallet(sender, instance, created, **kwargs):
         Wallet.objects.create(user=instance)
 
 @receiver(post_save, sender=WalletTransaction)
-def update_wallet_balance(sender, instance, **kwargs):
+def update_wallet_balance(sender, instance, update_fields=None, **kwargs):
     """
-    Signal handler to update the wallet's balance whenever a transaction's
-    status is changed to 'completed' or a completed one is created.
+    Applies a transaction to its wallet when it is created as, or changed to, 'completed',
+    and takes it back when an applied transaction leaves 'completed'.
+    Saves that do not include the status (e.g. a description update) are skipped.
     """
-    # We check if the status is 'completed'. The calculation method already sums up only completed transactions.
-    # This logic will correctly handle new transactions created as 'completed'
-    # and existing transactions updated to 'completed'.
-    wallet = instance.wallet
-    new_balance = wallet.calculate_balance()
-    
-    # Update only if the balance has changed to avoid recursive signals
-    if wallet.balance != new_balance:
-        wallet.balance = new_balance
-        wallet.save(update_fields=['balance'])
+    if update_fields is not None and 'status' not in update_fields:
+        return
+    if instance.status == 'completed' and instance.balance_after is None:
+        ledger.apply(instance)
+    elif instance.status != 'completed' and instance.balance_after is not None:
+        ledger.revert(instance)
+
+@receiver(post_delete, sender=WalletTransaction)
+def revert_wallet_balance(sender, instance, **kwargs):
+    if instance.balance_after is not None:
+        ledger.apply_delta(instance.wallet_id, -instance.amount)
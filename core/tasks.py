@@ -0,0 +1,14 @@
+# core/tasks.py
+# version: 1.0.0
+# FEATURE: Periodic verification of the wallet ledger.
+
+from celery import shared_task
+
+from . import ledger
+
+
+@shared_task
+def verify_wallet_ledger(fix=False):
+    """Scheduled in CELERY_BEAT_SCHEDULE (settings.py); see ledger.verify()."""
+    drifted = ledger.verify(fix=fix)
+    return f"Verified wallet ledger: {len(drifted)} drifted wallet(s)."
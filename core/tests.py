@@ -1,3 +1,233 @@
-from django.test import TestCase
+# core/tests.py
+# version: 1.5.0
+# FEATURE: Tests for the streaming CSV / XLSX exports (core/exports.py).
+# FEATURE: Tests for the incremental wallet ledger (core/ledger.py).
+# FEATURE: Tests for conditional wallet debits, including a concurrent stress test.
+# FEATURE: Tests for the process-local reference-data cache (core/reference.py).
+# FEATURE: Tests for the cached menu tree API (core/menus.py).
+# FEATURE: Tests that reference-data invalidations reach other processes.
 
-# Create your tests here.
+import io
+import os
+import subprocess
+import sys
+import threading
+import time
+import zipfile
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from jdatetime import date as jdate
+from rest_framework.test import APIClient
+
+from . import ledger, reference
+from .exports import ExportColumn, csv_stream, format_value, xlsx_stream
+from .models import CustomUser, Wallet, WalletTransaction, WalletCheckpoint, SiteSettings, Menu, MenuItem
+
+COLUMNS = [ExportColumn("نام", 'name'), ExportColumn("مبلغ", 'amount')]
+
+
+class ExportTests(TestCase):
+
+    def test_format_value(self):
+        self.assertEqual(format_value(jdate(1404, 5, 1).togregorian()), '1404-05-01')
+        self.assertEqual(format_value(Decimal('1500000')), 1500000)
+        self.assertEqual(format_value(None), '')
+
+    def test_csv_and_xlsx_streams(self):
+        rows = [['a<b', 10], ['ج', 20]]
+        csv_text = ''.join(csv_stream(COLUMNS, iter(rows)))
+        self.assertEqual(csv_text, '\ufeffنام,مبلغ\r\na<b,10\r\nج,20\r\n')
+
+        chunks = list(xlsx_stream(COLUMNS, iter(rows * 300), flush_every=100))
+        self.assertGreater(len(chunks), 1)
+        with zipfile.ZipFile(io.BytesIO(b''.join(chunks))) as archive:
+            sheet = archive.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        self.assertEqual(sheet.count('<row>'), 601)
+        self.assertIn('a&lt;b', sheet)
+
+    def test_wallet_export_api(self):
+        user = CustomUser.objects.create_user(username='wallet', password='password', mobile='09120000020')
+        wallet, _ = Wallet.objects.get_or_create(user=user)
+        WalletTransaction.objects.create(wallet=wallet, transaction_type='deposit', amount=5000, status='completed')
+        client = APIClient()
+        client.force_authenticate(user)
+
+        response = client.get('/api/wallet/export/', {'as': 'csv'})
+        self.assertEqual(response.status_code, 200)
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('شارژ کیف پول,5000,انجام شده', lines[1])
+        self.assertEqual(client.get('/api/wallet/export/', {'as': 'pdf'}).status_code, 400)
+
+
+class WalletLedgerTests(TestCase):
+
+    def setUp(self):
+        user = CustomUser.objects.create_user(username='ledger', password='password', mobile='09120000021')
+        self.wallet = Wallet.objects.get(user=user)
+
+    def balance(self):
+        return Wallet.objects.get(pk=self.wallet.pk).balance
+
+    def test_transactions_apply_once_with_running_balance(self):
+        deposit = WalletTransaction.objects.create(wallet=self.wallet, transaction_type='deposit', amount=5000, status='completed')
+        pending = WalletTransaction.objects.create(wallet=self.wallet, transaction_type='deposit', amount=700)
+        self.assertEqual((self.balance(), deposit.balance_after, pending.balance_after), (5000, 5000, None))
+
+        pending.status = 'completed'
+        pending.save(update_fields=['status'])
+        pending.save()
+        payment = WalletTransaction.objects.create(wallet=self.wallet, transaction_type='payment', amount=-1200, status='completed')
+        self.assertEqual(self.balance(), 4500)
+        self.assertEqual(list(WalletTransaction.objects.order_by('id').values_list('balance_after', flat=True)), [5000, 5700, 4500])
+
+        # Description-only saves run no ledger query at all.
+        payment.description = "updated"
+        with self.assertNumQueries(1):
+            payment.save(update_fields=['description'])
+
+        payment.status = 'failed'
+        payment.save(update_fields=['status'])
+        deposit.delete()
+        self.assertEqual(self.balance(), 700)
+
+    def test_verify_reports_and_fixes_drift(self):
+        WalletTransaction.objects.create(wallet=self.wallet, transaction_type='deposit', amount=300, status='completed')
+        self.assertEqual(ledger.verify(chunk_size=1), [])
+        Wallet.objects.filter(pk=self.wallet.pk).update(balance=999)
+
+        self.assertEqual(ledger.verify(), [(self.wallet.pk, 'ledger', 999, 300)])
+        self.assertFalse(WalletCheckpoint.objects.get(wallet=self.wallet).is_consistent)
+        ledger.verify(fix=True)
+        self.assertEqual(self.balance(), 300)
+        self.assertTrue(WalletCheckpoint.objects.get(wallet=self.wallet).is_consistent)
+
+    def test_debit_is_conditional_and_credit_is_applied_once(self):
+        WalletTransaction.objects.create(wallet=self.wallet, transaction_type='deposit', amount=1000, status='completed')
+        payment = ledger.debit(self.wallet.pk, 600, description="payment")
+        self.assertEqual((payment.amount, payment.balance_after, self.balance()), (-600, 400, 400))
+
+        with self.assertRaises(ValidationError):
+            ledger.debit(self.wallet.pk, 401)
+        self.assertEqual(WalletTransaction.objects.count(), 2)
+
+        refund = ledger.credit(self.wallet.pk, 250)
+        self.assertEqual((refund.transaction_type, refund.balance_after, self.balance()), ('refund', 650, 650))
+        self.assertEqual(ledger.verify(), [])
+
+
+class ReferenceDataTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        menu = Menu.objects.create(name="اصلی", slug='main')
+        parent = MenuItem.objects.create(menu=menu, title="هتل‌ها", url='/hotels', order=1)
+        MenuItem.objects.create(menu=menu, title="تهران", url='/hotels/tehran', order=2, parent=parent)
+        SiteSettings.objects.create(site_name="رزرو")
+
+    def test_reference_data_is_read_once_until_a_change(self):
+        self.assertEqual(reference.site_settings().site_name, "رزرو")
+        with self.assertNumQueries(0):
+            reference.site_settings()
+
+        SiteSettings.objects.update(site_name="قدیمی")  # bulk updates send no signal
+        self.assertEqual(reference.site_settings().site_name, "رزرو")
+        settings = SiteSettings.objects.get()
+        settings.site_name = "جدید"
+        settings.save()
+        self.assertEqual(reference.site_settings().site_name, "جدید")
+
+    def test_menu_tree_is_one_query_then_cached_with_etag(self):
+        menu = Menu.objects.get(slug='main')
+        child = MenuItem.objects.get(title="تهران")
+        MenuItem.objects.create(menu=menu, title="مشهد", url='/hotels/mashhad', order=3, parent=child)
+        client = APIClient()
+
+        with self.assertNumQueries(1):
+            response = client.get('/api/menu/main/')
+        self.assertEqual(response.json(), [
+            {'title': "هتل‌ها", 'url': '/hotels', 'order': 1, 'children': [
+                {'title': "تهران", 'url': '/hotels/tehran', 'order': 2, 'children': [
+                    {'title': "مشهد", 'url': '/hotels/mashhad', 'order': 3, 'children': []},
+                ]},
+            ]},
+        ])
+        etag = response['ETag']
+        self.assertEqual(client.get('/api/menu/missing/').status_code, 404)
+        with self.assertNumQueries(0):
+            self.assertEqual(client.get('/api/menu/main/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            self.assertEqual(client.get('/api/menu/missing/').status_code, 404)
+
+        child.title = "تهران بزرگ"
+        child.save()
+        response = client.get('/api/menu/main/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class SharedReferenceVersionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        SiteSettings.objects.create(site_name="رزرو")
+
+    def test_invalidation_through_another_cache_connection_is_seen(self):
+        self.assertEqual(reference.site_settings().site_name, "رزرو")
+        SiteSettings.objects.update(site_name="جدید")  # saved elsewhere: no signal in this process
+        # Another process bumps the version through its own connection to the shared cache.
+        caches.create_connection('default').set(reference.VERSION_CACHE_KEY, time.time_ns(), timeout=None)
+        self.assertEqual(reference.site_settings().site_name, "جدید")
+
+    @skipUnless(reference.cache_is_shared(), "The configured cache is local to this process.")
+    def test_invalidation_from_another_process_is_seen(self):
+        version = reference.current_version()
+        subprocess.run(
+            [sys.executable, '-c', 'import django; django.setup(); from core import reference; reference.invalidate()'],
+            check=True, cwd=settings.BASE_DIR, env=os.environ.copy(),
+        )
+        self.assertNotEqual(reference.current_version(), version)
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class WalletDebitConcurrencyTests(TransactionTestCase):
+    """Runs against a database with row locking (PostgreSQL); SQLite serializes writers anyway."""
+
+    THREADS = 20
+
+    def test_concurrent_debits_never_overdraw(self):
+        user = CustomUser.objects.create_user(username='stress', password='password', mobile='09120000022')
+        wallet = Wallet.objects.get(user=user)
+        WalletTransaction.objects.create(wallet=wallet, transaction_type='deposit', amount=1000, status='completed')
+
+        results = []
+        barrier = threading.Barrier(self.THREADS)
+
+        def pay():
+            try:
+                barrier.wait()
+                ledger.debit(wallet.pk, 300)
+                results.append(True)
+            except ValidationError:
+                results.append(False)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=pay) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results.count(True), 3)
+        self.assertEqual(Wallet.objects.get(pk=wallet.pk).balance, 100)
+        self.assertEqual(
+            sorted(WalletTransaction.objects.filter(transaction_type='payment').values_list('balance_after', flat=True)),
+            [100, 400, 700],
+        )
+        self.assertEqual(ledger.verify(), [])
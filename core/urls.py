@@ -1,6 +1,7 @@
 # core/urls.py
-# version: 1.0.5
+# version: 1.0.6
 # FEATURE: Added the API endpoint for initiating a wallet deposit.
+# FEATURE: Wallet transaction export endpoint.
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
@@ -23,6 +24,7 @@ urlpatterns = [
     
     # Wallet APIs
     path('api/wallet/', views.UserWalletDetailAPIView.as_view(), name='user_wallet_api'),
+    path('api/wallet/export/', views.WalletTransactionExportAPIView.as_view(), name='wallet_export_api'),
     path('api/wallet/initiate-deposit/', views.InitiateWalletDepositAPIView.as_view(), name='initiate_wallet_deposit_api'),
     path('', include(router.urls)),
 ]
@@ -1,34 +1,46 @@
 # core/views.py
-# version: 1.0.3
+# version: 1.2.1
 # FEATURE: Added InitiateWalletDepositAPIView to create pending deposit transactions.
+# FEATURE: Streaming CSV / XLSX export of the user's wallet transactions.
+# PERF: Site settings are served from the reference-data cache (core/reference.py).
+# PERF: MenuView serves the cached rendered menu tree (core/menus.py) with ETag / If-None-Match.
+# FIX: Dropped the imports the cached MenuView no longer uses.
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, generics, serializers, viewsets
 from rest_framework.authtoken.models import Token
-from django.shortcuts import get_object_or_404
+from django.http import Http404, HttpResponse, HttpResponseNotModified
 from rest_framework.permissions import IsAuthenticated
 
-from .models import SiteSettings, Menu, CustomUser, Wallet, WalletTransaction, SpecialPeriod
+from . import menus, reference
+from .exports import EXPORT_FORMATS, ExportColumn, export_response
+from .models import SiteSettings, CustomUser, Wallet, WalletTransaction, SpecialPeriod
 from .serializers import (
-    SiteSettingsSerializer, MenuItemSerializer, UserRegisterSerializer, 
-    UserLoginSerializer, UserAuthSerializer, MenuSerializer, WalletSerializer,SpecialPeriodSerializer
+    SiteSettingsSerializer, UserRegisterSerializer,
+    UserLoginSerializer, UserAuthSerializer, WalletSerializer,SpecialPeriodSerializer
 )
 
 # ... (SiteSettingsAPIView, MenuView, UserRegisterAPIView, UserLoginAPIView remain unchanged) ...
 class SiteSettingsAPIView(APIView):
     def get(self, request):
-        settings = SiteSettings.objects.first()
+        settings = reference.site_settings()
         if not settings:
             return Response({"error": "تنظیمات سایت هنوز پیکربندی نشده است."}, status=status.HTTP_404_NOT_FOUND)
         serializer = SiteSettingsSerializer(settings)
         return Response(serializer.data, status=status.HTTP_200_OK)
 class MenuView(APIView):
     def get(self, request, menu_slug):
-        menu = get_object_or_404(Menu, slug=menu_slug)
-        menu_items = menu.items.all()
-        serializer = MenuItemSerializer(menu_items, many=True)
-        return Response(serializer.data)
+        rendered = menus.rendered_items(menu_slug)
+        if rendered is None:
+            raise Http404("منو یافت نشد.")
+        etag, body = rendered
+        if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        return response
 class UserRegisterAPIView(generics.CreateAPIView):
     queryset = CustomUser.objects.all()
     serializer_class = UserRegisterSerializer
@@ -58,6 +70,32 @@ class UserWalletDetailAPIView(APIView):
         serializer = WalletSerializer(wallet)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+WALLET_TRANSACTION_COLUMNS = [
+    ExportColumn("شناسه تراکنش", 'transaction_id'),
+    ExportColumn("زمان ثبت", 'created_at'),
+    ExportColumn("نوع تراکنش", 'transaction_type', choices=WalletTransaction.TRANSACTION_TYPES),
+    ExportColumn("مبلغ", 'amount'),
+    ExportColumn("وضعیت", 'status', choices=WalletTransaction.STATUS_CHOICES),
+    ExportColumn("کد رزرو", 'booking__booking_code'),
+    ExportColumn("توضیحات", 'description'),
+]
+
+
+class WalletTransactionExportAPIView(APIView):
+    """All transactions of the user's wallet as a streamed file (?as=csv|xlsx)."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        export_format = request.query_params.get('as', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return Response({"error": "فرمت خروجی نامعتبر است."}, status=status.HTTP_400_BAD_REQUEST)
+        rows = (
+            WalletTransaction.objects.filter(wallet__user=request.user)
+            .order_by('-created_at')
+            .values(*[column.key for column in WALLET_TRANSACTION_COLUMNS])
+        )
+        return export_response(export_format, 'wallet-transactions', WALLET_TRANSACTION_COLUMNS, rows)
+
 # --- NEW: Wallet Deposit Views ---
 
 class InitiateWalletDepositSerializer(serializers.Serializer):
@@ -0,0 +1,244 @@
+# hotels/autocomplete.py
+# version: 1.1.0
+# FEATURE: In-process prefix index over City and Hotel names for the autocomplete endpoint.
+#          Persian/Arabic letter variants, ZWNJ and digits are normalized before indexing.
+# FIX: One sorted array per kind, so a kinds filter no longer comes up empty when the
+#      over-fetched candidates of a prefix were all of the other kind (e.g. many cities).
+
+import bisect
+import heapq
+import re
+import threading
+from operator import itemgetter
+
+from django.core.cache import cache
+
+# Bumped by every process that changes the index; other processes see a newer
+# value on their next lookup and rebuild from the database.
+VERSION_CACHE_KEY = 'hotels:autocomplete:version'
+
+KIND_CITY = 'city'
+KIND_HOTEL = 'hotel'
+KIND_ORDER = {KIND_CITY: 0, KIND_HOTEL: 1}
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 30
+# Upper bound on matching keys ranked per lookup. Only very short prefixes
+# (one letter) reach it; ranking among those is then approximate.
+MAX_SCAN = 5000
+# Prefix ranges at least this wide keep their ranked candidates in memory.
+MEMO_MIN_RANGE = 200
+
+_CHAR_MAP = str.maketrans({
+    '\u064a': '\u06cc', '\u0649': '\u06cc', '\u0626': '\u06cc',   # ي ى ئ -> ی
+    '\u0643': '\u06a9',                                          # ك -> ک
+    '\u0629': '\u0647', '\u06c0': '\u0647',                      # ة ۀ -> ه
+    '\u0623': '\u0627', '\u0625': '\u0627', '\u0671': '\u0627', '\u0622': '\u0627',  # أ إ ٱ آ -> ا
+    '\u0624': '\u0648',                                          # ؤ -> و
+    '\u0640': '',                                                # tatweel
+    '\u200c': ' ',                                               # ZWNJ
+    '\u200e': '', '\u200f': '',                                  # LRM / RLM
+    **{chr(0x06F0 + i): str(i) for i in range(10)},               # Persian digits
+    **{chr(0x0660 + i): str(i) for i in range(10)},               # Arabic digits
+})
+_DIACRITICS_RE = re.compile('[\u064b-\u065f\u0670]')
+_SEPARATORS_RE = re.compile(r'[\s\-_.,،()/]+')
+
+
+def normalize(text):
+    """
+    Canonical form used for both indexed names and queries:
+    lower case, unified ی/ک/ا/ه/و, no diacritics, ZWNJ treated as a space, ascii digits.
+    """
+    text = _DIACRITICS_RE.sub('', (text or '').lower().translate(_CHAR_MAP))
+    return ' '.join(_SEPARATORS_RE.split(text)).strip()
+
+
+def index_keys(name):
+    """
+    Keys under which a name is findable: the whole name and the tail starting at each
+    later word. Spaces are removed, so "هتل‌ پارس", "هتل پارس" and "هتلپارس" are equal.
+    Returns (key, word_position) pairs.
+    """
+    words = normalize(name).split(' ')
+    return [(''.join(words[i:]), i) for i in range(len(words)) if words[i]]
+
+
+class PrefixIndex:
+    """
+    One sorted array of (key, rank, kind, object_id) per kind, searched with bisect.
+    The rank is stored in each item so a prefix range can be ranked with one C-level
+    heapq.nsmallest instead of per-item Python lookups; the ranked kinds are then merged.
+    add() / remove() keep the arrays sorted, so single-object updates need no rebuild.
+    Results of wide prefixes ("هتل", "h", ...) are memoized per kind; a change only drops
+    the memoized prefixes of the changed name.
+    """
+
+    def __init__(self):
+        self._keys = {kind: [] for kind in KIND_ORDER}
+        self._entries = {}
+        self._memo = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _make_entry(self, kind, object_id, name, slug, weight, extra):
+        base_rank = (KIND_ORDER[kind], -weight, len(name), name)
+        return {
+            'result': {'type': kind, 'id': object_id, 'name': name, 'slug': slug, **(extra or {})},
+            # A whole-name match ranks above a match on a later word.
+            'items': [(key, (position > 0,) + base_rank, kind, object_id) for key, position in index_keys(name)],
+        }
+
+    def _forget_prefixes(self, items):
+        if not self._memo:
+            return
+        for key, _, kind, _ in items:
+            for length in range(1, len(key) + 1):
+                self._memo.pop((kind, key[:length]), None)
+
+    def add(self, kind, object_id, name, slug, weight=0, extra=None):
+        self.remove(kind, object_id)
+        entry = self._entries[(kind, object_id)] = self._make_entry(kind, object_id, name, slug, weight, extra)
+        for item in entry['items']:
+            bisect.insort(self._keys[kind], item)
+        self._forget_prefixes(entry['items'])
+
+    def remove(self, kind, object_id):
+        entry = self._entries.pop((kind, object_id), None)
+        if entry is None:
+            return
+        keys = self._keys[kind]
+        for item in entry['items']:
+            i = bisect.bisect_left(keys, item)
+            if i < len(keys) and keys[i] == item:
+                del keys[i]
+        self._forget_prefixes(entry['items'])
+
+    def bulk_load(self, rows):
+        """Replaces the contents with (kind, object_id, name, slug, weight, extra) rows in one sort."""
+        entries, keys = {}, {kind: [] for kind in KIND_ORDER}
+        for kind, object_id, name, slug, weight, extra in rows:
+            entry = entries[(kind, object_id)] = self._make_entry(kind, object_id, name, slug, weight, extra)
+            keys[kind].extend(entry['items'])
+        for kind_keys in keys.values():
+            kind_keys.sort()
+        self._entries, self._keys, self._memo = entries, keys, {}
+
+    def _ranked(self, kind, prefix):
+        ranked = self._memo.get((kind, prefix))
+        if ranked is None:
+            keys = self._keys[kind]
+            start = bisect.bisect_left(keys, (prefix,))
+            end = bisect.bisect_left(keys, (prefix + '\U0010ffff',), lo=start)
+            candidates = keys[start:min(end, start + MAX_SCAN)]
+            # Over-fetch: one object can match on several words.
+            ranked = heapq.nsmallest(MAX_LIMIT * 2, candidates, key=itemgetter(1))
+            if end - start >= MEMO_MIN_RANGE:
+                self._memo[(kind, prefix)] = ranked
+        return ranked
+
+    def search(self, query, limit=DEFAULT_LIMIT, kinds=None):
+        prefix = normalize(query).replace(' ', '')
+        if not prefix:
+            return []
+        ranked = heapq.merge(*(self._ranked(kind, prefix) for kind in KIND_ORDER if not kinds or kind in kinds),
+                             key=itemgetter(1))
+
+        results, seen = [], set()
+        for _, _, kind, object_id in ranked:
+            if (kind, object_id) in seen:
+                continue
+            seen.add((kind, object_id))
+            results.append(self._entries[(kind, object_id)]['result'])
+            if len(results) >= limit:
+                break
+        return results
+
+
+# ==============================================================================
+# PROCESS-WIDE INDEX
+# ==============================================================================
+
+_index = PrefixIndex()
+_loaded_version = None
+_lock = threading.Lock()
+
+
+def _city_row(city):
+    return (KIND_CITY, city.pk, city.name, city.slug, 1 if city.is_featured else 0, None)
+
+
+def _hotel_row(hotel, city_name):
+    weight = hotel.stars + (10 if hotel.is_suggested else 0)
+    return (KIND_HOTEL, hotel.pk, hotel.name, hotel.slug, weight, {'city_name': city_name})
+
+
+def rebuild():
+    """Loads every City and Hotel into the process-wide index."""
+    from .models import City, Hotel
+
+    global _loaded_version
+    with _lock:
+        version = cache.get(VERSION_CACHE_KEY, 0)
+        rows = [_city_row(city) for city in City.objects.only('id', 'name', 'slug', 'is_featured')]
+        rows += [
+            _hotel_row(hotel, hotel.city.name)
+            for hotel in Hotel.objects.select_related('city').only(
+                'id', 'name', 'slug', 'stars', 'is_suggested', 'city__name')
+        ]
+        _index.bulk_load(rows)
+        _loaded_version = version
+
+
+def get_index():
+    if _loaded_version is None or cache.get(VERSION_CACHE_KEY, 0) != _loaded_version:
+        rebuild()
+    return _index
+
+
+def _bump_version():
+    """Publishes a change; this process stays current unless another one changed the index too."""
+    global _loaded_version
+    cache.add(VERSION_CACHE_KEY, 0, timeout=None)
+    try:
+        version = cache.incr(VERSION_CACHE_KEY)
+    except ValueError:
+        # Key evicted between add() and incr(): force a rebuild everywhere.
+        _loaded_version = None
+        return
+    if _loaded_version is not None and version == _loaded_version + 1:
+        _loaded_version = version
+    else:
+        _loaded_version = None
+
+
+def _apply(change):
+    if _loaded_version is None:
+        # Nothing loaded in this process yet; the first lookup will load fresh data.
+        _bump_version()
+        return
+    with _lock:
+        change()
+        _bump_version()
+
+
+def index_city(city):
+    def change():
+        _index.add(*_city_row(city))
+        # Hotel suggestions show the city name.
+        for hotel in city.hotels.only('id', 'name', 'slug', 'stars', 'is_suggested'):
+            _index.add(*_hotel_row(hotel, city.name))
+    _apply(change)
+
+
+def index_hotel(hotel):
+    _apply(lambda: _index.add(*_hotel_row(hotel, hotel.city.name)))
+
+
+def remove(kind, object_id):
+    _apply(lambda: _index.remove(kind, object_id))
+
+
+def suggest(query, limit=DEFAULT_LIMIT, kinds=None):
+    return get_index().search(query, limit=min(limit, MAX_LIMIT), kinds=kinds)
@@ -0,0 +1,68 @@
+# hotels/feature_bits.py
+# version: 1.0.0
+# FEATURE: Amenity / HotelCategory bitsets stored on Hotel, so search filters are
+#          evaluated on one small row per hotel instead of M2M joins.
+
+from collections import defaultdict
+
+from .models import Hotel
+
+
+def encode(ids):
+    """Packs a collection of ids into bytes (bit N set for id N)."""
+    value = 0
+    for pk in ids:
+        value |= 1 << pk
+    if not value:
+        return b''
+    return value.to_bytes((value.bit_length() + 7) // 8, 'big')
+
+
+def decode(bits):
+    """Inverse of encode() as a Python int; accepts bytes or memoryview (psycopg)."""
+    if not bits:
+        return 0
+    return int.from_bytes(bytes(bits), 'big')
+
+
+def mask_of(ids):
+    return decode(encode(ids))
+
+
+def refresh_hotels(hotel_ids):
+    """Recomputes both bitsets for the given hotels with two queries plus one UPDATE per hotel."""
+    hotel_ids = list(hotel_ids)
+    if not hotel_ids:
+        return
+    amenities, categories = defaultdict(list), defaultdict(list)
+    for hotel_id, amenity_id in Hotel.amenities.through.objects.filter(
+            hotel_id__in=hotel_ids).values_list('hotel_id', 'amenity_id'):
+        amenities[hotel_id].append(amenity_id)
+    for hotel_id, category_id in Hotel.hotel_categories.through.objects.filter(
+            hotel_id__in=hotel_ids).values_list('hotel_id', 'hotelcategory_id'):
+        categories[hotel_id].append(category_id)
+
+    for hotel_id in hotel_ids:
+        # queryset.update() bypasses post_save, so the geo/other Hotel signals are not re-fired.
+        Hotel.objects.filter(pk=hotel_id).update(
+            amenity_bits=encode(amenities[hotel_id]),
+            category_bits=encode(categories[hotel_id]),
+        )
+
+
+def matching_hotel_ids(hotel_rows, amenity_ids=None, category_ids=None):
+    """
+    Filters (hotel_id, amenity_bits, category_bits) rows.
+    - amenity_ids: the hotel must have ALL of them.
+    - category_ids: the hotel must be in ANY of them.
+    """
+    amenity_mask = mask_of(amenity_ids or [])
+    category_mask = mask_of(category_ids or [])
+    matched = []
+    for hotel_id, amenity_bits, category_bits in hotel_rows:
+        if amenity_mask and decode(amenity_bits) & amenity_mask != amenity_mask:
+            continue
+        if category_mask and not decode(category_bits) & category_mask:
+            continue
+        matched.append(hotel_id)
+    return matched
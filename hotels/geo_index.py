@@ -0,0 +1,208 @@
+# hotels/geo_index.py
+# version: 1.0.0
+# FEATURE: Grid-bucket spatial index for Hotel, City and Attraction coordinates.
+#          Radius, k-nearest and bounding-box queries without PostGIS.
+
+import math
+
+from .models import GeoIndexEntry
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+# Size of one grid bucket in degrees (~5.5 km of latitude). Small enough that a
+# typical "within 3 km" search touches a handful of buckets, large enough that a
+# city-wide search does not turn into thousands of them.
+CELL_SIZE_DEG = 0.05
+
+# k-nearest search starts with this radius and doubles it until enough points
+# have been found (or the whole globe has been covered).
+KNN_INITIAL_RADIUS_KM = 5.0
+KNN_MAX_RADIUS_KM = math.pi * EARTH_RADIUS_KM
+
+PARAMS_ERROR_MESSAGE = "پارامترهای جستجوی مکانی نامعتبر است. (lat, lng و یکی از radius / k یا bbox)"
+
+
+# ==============================================================================
+# 1. GEOMETRY HELPERS
+# ==============================================================================
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points in kilometres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def cell_of(lat, lng):
+    """Returns the (cell_lat, cell_lng) bucket a coordinate falls into."""
+    return math.floor(lat / CELL_SIZE_DEG), math.floor(lng / CELL_SIZE_DEG)
+
+
+def radius_bbox(lat, lng, radius_km):
+    """
+    Smallest lat/lng box that contains the circle around (lat, lng).
+    Longitude is clamped to [-180, 180]; searches across the antimeridian are not needed here.
+    """
+    d_lat = radius_km / KM_PER_DEGREE_LAT
+    cos_lat = math.cos(math.radians(lat))
+    if cos_lat < 1e-6 or lat + d_lat >= 90 or lat - d_lat <= -90:
+        d_lng = 180.0
+    else:
+        d_lng = min(180.0, radius_km / (KM_PER_DEGREE_LAT * cos_lat))
+    return (
+        max(-90.0, lat - d_lat), max(-180.0, lng - d_lng),
+        min(90.0, lat + d_lat), min(180.0, lng + d_lng),
+    )
+
+
+def _cell_filter(south, west, north, east):
+    min_lat_cell, min_lng_cell = cell_of(south, west)
+    max_lat_cell, max_lng_cell = cell_of(north, east)
+    return {
+        'cell_lat__range': (min_lat_cell, max_lat_cell),
+        'cell_lng__range': (min_lng_cell, max_lng_cell),
+    }
+
+
+# ==============================================================================
+# 2. INDEX MAINTENANCE
+# ==============================================================================
+
+def index_point(kind, object_id, latitude, longitude):
+    """Creates, moves or removes the index entry of one object."""
+    if latitude is None or longitude is None:
+        remove_point(kind, object_id)
+        return None
+    lat, lng = float(latitude), float(longitude)
+    cell_lat, cell_lng = cell_of(lat, lng)
+    entry, _ = GeoIndexEntry.objects.update_or_create(
+        kind=kind,
+        object_id=object_id,
+        defaults={'latitude': lat, 'longitude': lng, 'cell_lat': cell_lat, 'cell_lng': cell_lng},
+    )
+    return entry
+
+
+def remove_point(kind, object_id):
+    GeoIndexEntry.objects.filter(kind=kind, object_id=object_id).delete()
+
+
+def build_entries(kind, rows):
+    """
+    Builds unsaved GeoIndexEntry objects from (object_id, latitude, longitude) rows,
+    skipping rows without coordinates. Used by the rebuild and benchmark commands.
+    """
+    entries = []
+    for object_id, latitude, longitude in rows:
+        if latitude is None or longitude is None:
+            continue
+        lat, lng = float(latitude), float(longitude)
+        cell_lat, cell_lng = cell_of(lat, lng)
+        entries.append(GeoIndexEntry(
+            kind=kind, object_id=object_id, latitude=lat, longitude=lng,
+            cell_lat=cell_lat, cell_lng=cell_lng,
+        ))
+    return entries
+
+
+# ==============================================================================
+# 3. QUERIES
+# ==============================================================================
+# All queries return a list of (object_id, distance_km) tuples sorted by distance.
+# Callers load the actual model rows with a single `in_bulk` (see load_objects).
+
+def _candidates(kind, south, west, north, east):
+    return GeoIndexEntry.objects.filter(
+        kind=kind, **_cell_filter(south, west, north, east)
+    ).values_list('object_id', 'latitude', 'longitude')
+
+
+def within_radius(kind, lat, lng, radius_km, limit=None, exclude_id=None):
+    """Objects of `kind` whose distance from (lat, lng) is at most radius_km."""
+    south, west, north, east = radius_bbox(lat, lng, radius_km)
+    results = []
+    for object_id, p_lat, p_lng in _candidates(kind, south, west, north, east):
+        if object_id == exclude_id:
+            continue
+        distance = haversine_km(lat, lng, p_lat, p_lng)
+        if distance <= radius_km:
+            results.append((object_id, distance))
+    results.sort(key=lambda item: item[1])
+    return results[:limit] if limit else results
+
+
+def nearest(kind, lat, lng, k=10, max_radius_km=KNN_MAX_RADIUS_KM, exclude_id=None):
+    """
+    The k objects of `kind` closest to (lat, lng).
+    Expands the search radius geometrically; every point inside the searched circle
+    is guaranteed to have been seen, so once k hits are inside it the answer is exact.
+    """
+    radius = min(KNN_INITIAL_RADIUS_KM, max_radius_km)
+    while True:
+        hits = within_radius(kind, lat, lng, radius, exclude_id=exclude_id)
+        if len(hits) >= k or radius >= max_radius_km:
+            return hits[:k]
+        radius = min(radius * 2, max_radius_km)
+
+
+def within_bbox(kind, south, west, north, east, limit=None):
+    """
+    Objects of `kind` inside the box, sorted by distance from the box centre.
+    """
+    centre_lat, centre_lng = (south + north) / 2, (west + east) / 2
+    results = []
+    for object_id, p_lat, p_lng in _candidates(kind, south, west, north, east):
+        if south <= p_lat <= north and west <= p_lng <= east:
+            results.append((object_id, haversine_km(centre_lat, centre_lng, p_lat, p_lng)))
+    results.sort(key=lambda item: item[1])
+    return results[:limit] if limit else results
+
+
+def load_objects(queryset, hits):
+    """
+    Resolves (object_id, distance_km) hits into model instances in hit order.
+    Each instance gets a `distance_km` attribute for serializers.
+    """
+    objects = queryset.in_bulk([object_id for object_id, _ in hits])
+    ordered = []
+    for object_id, distance in hits:
+        obj = objects.get(object_id)
+        if obj is None:
+            continue
+        obj.distance_km = round(distance, 3)
+        ordered.append(obj)
+    return ordered
+
+
+def search_from_params(kind, params, default_radius_km=3.0, max_results=100):
+    """
+    Runs the query described by request query params:
+      - bbox=south,west,north,east        -> bounding-box search
+      - lat, lng, k                       -> k nearest
+      - lat, lng, radius (km, default 3)  -> radius search
+    Raises ValueError on malformed input.
+    """
+    bbox = params.get('bbox')
+    if bbox:
+        south, west, north, east = (float(v) for v in bbox.split(','))
+        if south > north or west > east:
+            raise ValueError("bbox must be south,west,north,east")
+        return within_bbox(kind, south, west, north, east, limit=max_results)
+
+    lat, lng = float(params['lat']), float(params['lng'])
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError("lat/lng out of range")
+
+    if params.get('k'):
+        k = min(int(params['k']), max_results)
+        if k <= 0:
+            raise ValueError("k must be positive")
+        return nearest(kind, lat, lng, k=k)
+
+    radius = float(params.get('radius', default_radius_km))
+    if radius <= 0:
+        raise ValueError("radius must be positive")
+    return within_radius(kind, lat, lng, radius, limit=max_results)
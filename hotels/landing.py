@@ -0,0 +1,120 @@
+# hotels/landing.py
+# version: 1.1.0
+# FEATURE: Builds CityLandingAggregate rows (hotel count, star distribution, min nightly
+#          price, featured attractions, suggested hotels) with a fixed number of queries.
+# FEATURE: Min nightly prices include season rate ranges (pricing.RateRange).
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Min
+from persiantools.jdatetime import JalaliDate
+
+from .models import City, Hotel, HotelImage, CityLandingAggregate
+
+# "Starting from" prices look at public prices for the next N days.
+PRICE_WINDOW_DAYS = 30
+MAX_SUGGESTED_HOTELS = 12
+MAX_FEATURED_ATTRACTIONS = 12
+
+
+def _price_window():
+    start = JalaliDate.today().to_gregorian()
+    return start, start + timedelta(days=PRICE_WINDOW_DAYS)
+
+
+def _hotel_min_prices(hotel_ids):
+    """
+    Lowest positive public nightly price per hotel within the price window, over per-day
+    prices and the season ranges overlapping the window (a range hidden on every day by
+    per-day overrides still counts; "starting from" tolerates that).
+    """
+    from pricing.models import Price, RateRange
+
+    start, end = _price_window()
+    prices = {}
+    for model, date_filter in (
+            (Price, {'date__gte': start, 'date__lt': end}),
+            (RateRange, {'start_date__lt': end, 'end_date__gte': start})):
+        rows = model.objects.filter(
+            room_type__hotel_id__in=hotel_ids, price_per_night__gt=0, **date_filter,
+        ).values('room_type__hotel_id').annotate(min_price=Min('price_per_night')).order_by()
+        for row in rows:
+            hotel_id = row['room_type__hotel_id']
+            prices[hotel_id] = min(prices.get(hotel_id, row['min_price']), row['min_price'])
+    return prices
+
+
+def _main_images(hotel_ids):
+    images = {}
+    for image in HotelImage.objects.filter(hotel_id__in=hotel_ids).order_by('hotel_id', 'order'):
+        images.setdefault(image.hotel_id, image.image.url)
+    return images
+
+
+def _featured_attractions(city_id):
+    from attractions.models import Attraction, AttractionGallery
+
+    attractions = list(
+        Attraction.objects.filter(city_id=city_id, is_featured=True)
+        .order_by('-rating', '-created_at')
+        .values('id', 'name', 'slug', 'short_description', 'rating')[:MAX_FEATURED_ATTRACTIONS]
+    )
+    covers = {}
+    for image in AttractionGallery.objects.filter(
+            attraction_id__in=[a['id'] for a in attractions]).order_by('attraction_id', '-is_cover', 'order'):
+        covers.setdefault(image.attraction_id, image.image.url)
+    for attraction in attractions:
+        attraction['rating'] = float(attraction['rating'])
+        attraction['image'] = covers.get(attraction['id'])
+    return attractions
+
+
+def build(city_id):
+    """Computes (without saving) the aggregate field values of one city."""
+    hotels = Hotel.objects.filter(city_id=city_id)
+    star_distribution = {
+        str(row['stars']): row['count']
+        for row in hotels.values('stars').annotate(count=Count('id')).order_by('stars')
+    }
+    hotel_ids = list(hotels.values_list('id', flat=True))
+    min_prices = _hotel_min_prices(hotel_ids)
+
+    suggested = list(
+        hotels.filter(is_suggested=True).order_by('-stars', 'name')
+        .values('id', 'name', 'slug', 'stars')[:MAX_SUGGESTED_HOTELS]
+    )
+    images = _main_images([hotel['id'] for hotel in suggested])
+    for hotel in suggested:
+        price = min_prices.get(hotel['id'])
+        hotel['min_price'] = int(price) if price is not None else 0
+        hotel['main_image'] = images.get(hotel['id'])
+
+    return {
+        'hotel_count': len(hotel_ids),
+        'star_distribution': star_distribution,
+        'min_nightly_price': min(min_prices.values()) if min_prices else None,
+        'featured_attractions': _featured_attractions(city_id),
+        'suggested_hotels': suggested,
+    }
+
+
+def refresh_city(city_id):
+    if not City.objects.filter(pk=city_id).exists():
+        return None
+    aggregate, _ = CityLandingAggregate.objects.update_or_create(city_id=city_id, defaults=build(city_id))
+    return aggregate
+
+
+def refresh_all():
+    count = 0
+    for city_id in City.objects.values_list('id', flat=True):
+        refresh_city(city_id)
+        count += 1
+    return count
+
+
+def schedule_refresh(city_id):
+    """Refreshes after the current transaction commits, so the aggregate sees the saved rows."""
+    if city_id:
+        transaction.on_commit(lambda: refresh_city(city_id))
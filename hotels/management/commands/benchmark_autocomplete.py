@@ -0,0 +1,81 @@
+# hotels/management/commands/benchmark_autocomplete.py
+# version: 1.0.0
+# FEATURE: Measures autocomplete lookup latency on a synthetic in-memory index
+#          and compares it with a linear scan over normalized names. No database writes.
+
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from hotels import autocomplete
+
+PERSIAN_SYLLABLES = ['پا', 'رس', 'آ', 'زا', 'دی', 'کو', 'ثر', 'عبا', 'سی', 'نا', 'شی', 'راز', 'مهر', 'گان', 'نگی', 'ار', 'ستا', 'ره', 'بها', 'ران']
+LATIN_SYLLABLES = ['pa', 'ris', 'ho', 'ma', 'es', 'pi', 'nas', 'ko', 'sar', 'sim', 'org', 'ta', 'briz', 'ki', 'sh', 'ar', 'van', 'mel', 'lat', 'ra']
+PREFIX_WORDS = {False: ['هتل', 'هتل آپارتمان', 'اقامتگاه', 'مهمانپذیر'], True: ['hotel', 'grand', 'boutique']}
+
+
+def synthetic_name(rng, latin):
+    syllables = LATIN_SYLLABLES if latin else PERSIAN_SYLLABLES
+    words = [''.join(rng.choices(syllables, k=rng.randint(2, 3))) for _ in range(rng.randint(1, 2))]
+    if rng.random() < 0.7:
+        words.insert(0, rng.choice(PREFIX_WORDS[latin]))
+    return ' '.join(words)
+
+
+class Command(BaseCommand):
+    help = "Benchmarks autocomplete prefix lookups on synthetic city / hotel names (default 50k)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--names', type=int, default=50_000)
+        parser.add_argument('--queries', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        rows = []
+        for i in range(options['names']):
+            name = synthetic_name(rng, latin=(i % 3 == 0))
+            kind = autocomplete.KIND_CITY if i % 50 == 0 else autocomplete.KIND_HOTEL
+            rows.append((kind, i, name, f'item-{i}', rng.randint(1, 5), None))
+
+        index = autocomplete.PrefixIndex()
+        started = time.perf_counter()
+        index.bulk_load(rows)
+        self.stdout.write(f"Built index of {len(index)} names in {time.perf_counter() - started:.2f}s")
+
+        updated = rows[:1000]
+        started = time.perf_counter()
+        for kind, object_id, name, slug, weight, extra in updated:
+            index.add(kind, object_id, name + ' 2', slug, weight, extra)
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stdout.write(f"Incremental update: {elapsed / len(updated):.3f} ms per name")
+
+        # Prefixes of real names, as a user would type them.
+        names = [rng.choice(rows)[2] for _ in range(options['queries'])]
+        for length in (1, 2, 3, 5, 8):
+            queries = [name[:length] for name in names]
+            # Cold: memoized wide prefixes are dropped before each lookup.
+            self._run(f"index, {length} chars (cold)", queries, lambda q: (index._memo.clear(), index.search(q)))
+            self._run(f"index, {length} chars", queries, lambda q: index.search(q))
+
+        normalized = [(autocomplete.normalize(row[2]).replace(' ', ''), row) for row in rows]
+
+        def linear_scan(query):
+            prefix = autocomplete.normalize(query).replace(' ', '')
+            return [row for key, row in normalized if prefix in key][:autocomplete.DEFAULT_LIMIT]
+
+        self._run("linear scan, 3 chars", [name[:3] for name in names[:100]], linear_scan)
+
+    def _run(self, label, queries, lookup):
+        durations = []
+        for query in queries:
+            started = time.perf_counter()
+            lookup(query)
+            durations.append((time.perf_counter() - started) * 1000)
+        durations.sort()
+        p99 = durations[min(len(durations) - 1, int(len(durations) * 0.99))]
+        self.stdout.write(
+            f"{label:<28} median {statistics.median(durations):.3f} ms   p99 {p99:.3f} ms   ({len(durations)} queries)"
+        )
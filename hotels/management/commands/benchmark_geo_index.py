@@ -0,0 +1,88 @@
+# hotels/management/commands/benchmark_geo_index.py
+# version: 1.0.0
+# FEATURE: Benchmarks geo index queries against a full scan on synthetic points.
+#          All synthetic rows are written inside a transaction that is rolled back.
+
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from hotels.models import GeoIndexEntry
+from hotels import geo_index
+
+# Roughly the bounding box of Iran.
+SOUTH, WEST, NORTH, EAST = 25.0, 44.0, 39.8, 63.3
+SYNTHETIC_ID_OFFSET = 10 ** 12
+
+
+class Command(BaseCommand):
+    help = "Benchmarks radius / k-nearest / bbox geo queries on synthetic points (default 100k)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--points', type=int, default=100_000)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--radius', type=float, default=3.0, help="Radius in km")
+        parser.add_argument('--k', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        kind = GeoIndexEntry.KIND_HOTEL
+
+        with transaction.atomic():
+            # Clustered around "cities" like real hotels, plus uniform noise.
+            centres = [(rng.uniform(SOUTH, NORTH), rng.uniform(WEST, EAST)) for _ in range(300)]
+            rows = []
+            for i in range(options['points']):
+                if i % 5:
+                    c_lat, c_lng = rng.choice(centres)
+                    lat, lng = rng.gauss(c_lat, 0.08), rng.gauss(c_lng, 0.08)
+                else:
+                    lat, lng = rng.uniform(SOUTH, NORTH), rng.uniform(WEST, EAST)
+                rows.append((SYNTHETIC_ID_OFFSET + i, lat, lng))
+
+            started = time.perf_counter()
+            GeoIndexEntry.objects.bulk_create(geo_index.build_entries(kind, rows), batch_size=5000)
+            self.stdout.write(f"Inserted {len(rows)} points in {time.perf_counter() - started:.2f}s")
+
+            probes = [rng.choice(rows)[1:] for _ in range(options['queries'])]
+            radius, k = options['radius'], options['k']
+
+            self._run("radius (index)", probes, lambda lat, lng: geo_index.within_radius(kind, lat, lng, radius))
+            self._run("k-nearest (index)", probes, lambda lat, lng: geo_index.nearest(kind, lat, lng, k=k))
+            self._run("bbox 0.2deg (index)", probes, lambda lat, lng: geo_index.within_bbox(kind, lat - 0.1, lng - 0.1, lat + 0.1, lng + 0.1))
+
+            def full_scan(lat, lng):
+                hits = []
+                for object_id, p_lat, p_lng in GeoIndexEntry.objects.filter(kind=kind).values_list('object_id', 'latitude', 'longitude'):
+                    distance = geo_index.haversine_km(lat, lng, p_lat, p_lng)
+                    if distance <= radius:
+                        hits.append((object_id, distance))
+                return sorted(hits, key=lambda item: item[1])
+
+            # The full scan is slow; a few probes are enough for the comparison.
+            self._run("radius (full scan)", probes[:5], full_scan)
+
+            for lat, lng in probes[:5]:
+                if [h[0] for h in full_scan(lat, lng)] != [h[0] for h in geo_index.within_radius(kind, lat, lng, radius)]:
+                    self.stderr.write(self.style.ERROR("Index and full scan disagree!"))
+                    break
+            else:
+                self.stdout.write("Index results match the full scan.")
+
+            transaction.set_rollback(True)
+
+    def _run(self, label, probes, query):
+        durations, total_hits = [], 0
+        for lat, lng in probes:
+            started = time.perf_counter()
+            total_hits += len(query(lat, lng))
+            durations.append(time.perf_counter() - started)
+        durations.sort()
+        avg_ms = sum(durations) / len(durations) * 1000
+        p95_ms = durations[int(len(durations) * 0.95) - 1 if len(durations) > 1 else 0] * 1000
+        self.stdout.write(
+            f"{label:<24} avg {avg_ms:8.2f} ms   p95 {p95_ms:8.2f} ms   avg hits {total_hits / len(probes):.1f}"
+        )
@@ -0,0 +1,29 @@
+# hotels/management/commands/rebuild_geo_index.py
+# version: 1.0.0
+# FEATURE: Full rebuild of GeoIndexEntry from Hotel, City and Attraction coordinates.
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from hotels.models import Hotel, City, GeoIndexEntry
+from hotels import geo_index
+from attractions.models import Attraction
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the geo index (GeoIndexEntry) from scratch. Signals keep it in sync afterwards."
+
+    def handle(self, *args, **options):
+        sources = (
+            (GeoIndexEntry.KIND_HOTEL, Hotel.objects.all()),
+            (GeoIndexEntry.KIND_CITY, City.objects.all()),
+            (GeoIndexEntry.KIND_ATTRACTION, Attraction.objects.all()),
+        )
+        with transaction.atomic():
+            GeoIndexEntry.objects.all().delete()
+            for kind, queryset in sources:
+                rows = queryset.values_list('id', 'latitude', 'longitude').iterator(chunk_size=2000)
+                entries = geo_index.build_entries(kind, rows)
+                GeoIndexEntry.objects.bulk_create(entries, batch_size=2000)
+                self.stdout.write(f"{kind}: {len(entries)} entries indexed")
+        self.stdout.write(self.style.SUCCESS("Geo index rebuilt."))
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0006_hotel_tax_percentage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeoIndexEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('hotel', 'هتل'), ('city', 'شهر'), ('attraction', 'جاذبه')], max_length=20, verbose_name='نوع موجودیت')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='شناسه موجودیت')),
+                ('latitude', models.FloatField(verbose_name='عرض جغرافیایی')),
+                ('longitude', models.FloatField(verbose_name='طول جغرافیایی')),
+                ('cell_lat', models.IntegerField(verbose_name='سلول عرض')),
+                ('cell_lng', models.IntegerField(verbose_name='سلول طول')),
+            ],
+            options={
+                'verbose_name': 'نمایه مکانی',
+                'verbose_name_plural': 'نمایه\u200cهای مکانی',
+                'indexes': [models.Index(fields=['kind', 'cell_lat', 'cell_lng'], name='geo_kind_cell_idx')],
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:59
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def _encode(ids):
+    value = 0
+    for pk in ids:
+        value |= 1 << pk
+    return value.to_bytes((value.bit_length() + 7) // 8, 'big') if value else b''
+
+
+def backfill_feature_bits(apps, schema_editor):
+    Hotel = apps.get_model('hotels', 'Hotel')
+    amenities, categories = defaultdict(list), defaultdict(list)
+    for hotel_id, amenity_id in Hotel.amenities.through.objects.values_list('hotel_id', 'amenity_id'):
+        amenities[hotel_id].append(amenity_id)
+    for hotel_id, category_id in Hotel.hotel_categories.through.objects.values_list('hotel_id', 'hotelcategory_id'):
+        categories[hotel_id].append(category_id)
+    for hotel_id in set(amenities) | set(categories):
+        Hotel.objects.filter(pk=hotel_id).update(
+            amenity_bits=_encode(amenities[hotel_id]),
+            category_bits=_encode(categories[hotel_id]),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0007_geoindexentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hotel',
+            name='amenity_bits',
+            field=models.BinaryField(default=b'', verbose_name='بیت\u200cهای امکانات'),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='category_bits',
+            field=models.BinaryField(default=b'', verbose_name='بیت\u200cهای دسته\u200cبندی'),
+        ),
+        migrations.RunPython(backfill_feature_bits, migrations.RunPython.noop),
+    ]
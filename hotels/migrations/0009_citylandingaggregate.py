@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0008_hotel_feature_bits'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CityLandingAggregate',
+            fields=[
+                ('city', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='landing_aggregate', serialize=False, to='hotels.city', verbose_name='شهر')),
+                ('hotel_count', models.PositiveIntegerField(default=0, verbose_name='تعداد هتل\u200cها')),
+                ('star_distribution', models.JSONField(blank=True, default=dict, verbose_name='توزیع ستاره\u200cها')),
+                ('min_nightly_price', models.DecimalField(blank=True, decimal_places=0, max_digits=20, null=True, verbose_name='کمترین قیمت هر شب (تومان)')),
+                ('featured_attractions', models.JSONField(blank=True, default=list, verbose_name='جاذبه\u200cهای برجسته')),
+                ('suggested_hotels', models.JSONField(blank=True, default=list, verbose_name='هتل\u200cهای پیشنهادی')),
+                ('refreshed_at', models.DateTimeField(auto_now=True, verbose_name='آخرین به\u200cروزرسانی')),
+            ],
+            options={
+                'verbose_name': 'خلاصه صفحه شهر',
+                'verbose_name_plural': 'خلاصه\u200cهای صفحه شهر',
+            },
+        ),
+    ]
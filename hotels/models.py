@@ -1,6 +1,7 @@
 # hotels/models.py
-# version: 1.0.1
-# FEATURE: Added 'is_suggested' field to Hotel model for homepage display.
+# version: 1.3.0
+# FEATURE: Added precomputed amenity/category bitsets on Hotel for search filtering.
+# FEATURE: Added CityLandingAggregate (precomputed city landing page data).
 
 from django.db import models
 from django.conf import settings
@@ -103,6 +104,11 @@ class Hotel(models.Model):
     contact_email = models.EmailField(blank=True, null=True, verbose_name="ایمیل")
     rules = models.TextField(blank=True, null=True, verbose_name="قوانین هتل")
 
+    # Precomputed bitsets (bit N set = Amenity/HotelCategory with id N is linked).
+    # Maintained by m2m_changed signals, see hotels/feature_bits.py.
+    amenity_bits = models.BinaryField(default=b'', editable=False, verbose_name="بیت‌های امکانات")
+    category_bits = models.BinaryField(default=b'', editable=False, verbose_name="بیت‌های دسته‌بندی")
+
     cancellation_policy_normal = models.ForeignKey(
         'cancellations.CancellationPolicy',
         on_delete=models.SET_NULL,
@@ -190,3 +196,61 @@ class RoomImage(ImageMetadata):
         verbose_name = "تصویر اتاق"
         verbose_name_plural = "تصاویر اتاق"
         # ordering is inherited from ImageMetadata
+
+
+class GeoIndexEntry(models.Model):
+    """
+    Grid-bucket spatial index row. Every located Hotel, City and Attraction has one
+    entry, kept in sync by signals (see hotels/geo_index.py). Radius, nearest and
+    bounding-box lookups filter on the (kind, cell_lat, cell_lng) index first and
+    only compute exact distances for the few candidates in the touched cells.
+    """
+    KIND_HOTEL = 'hotel'
+    KIND_CITY = 'city'
+    KIND_ATTRACTION = 'attraction'
+    KIND_CHOICES = (
+        (KIND_HOTEL, 'هتل'),
+        (KIND_CITY, 'شهر'),
+        (KIND_ATTRACTION, 'جاذبه'),
+    )
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, verbose_name="نوع موجودیت")
+    object_id = models.PositiveBigIntegerField(verbose_name="شناسه موجودیت")
+    latitude = models.FloatField(verbose_name="عرض جغرافیایی")
+    longitude = models.FloatField(verbose_name="طول جغرافیایی")
+    cell_lat = models.IntegerField(verbose_name="سلول عرض")
+    cell_lng = models.IntegerField(verbose_name="سلول طول")
+
+    class Meta:
+        verbose_name = "نمایه مکانی"
+        verbose_name_plural = "نمایه‌های مکانی"
+        unique_together = ('kind', 'object_id')
+        indexes = [
+            models.Index(fields=['kind', 'cell_lat', 'cell_lng'], name='geo_kind_cell_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.object_id} ({self.latitude}, {self.longitude})"
+
+
+class CityLandingAggregate(models.Model):
+    """
+    Everything a city landing page shows, precomputed so the page is one indexed read.
+    Refreshed by signals (hotel / attraction changes) and by a periodic Celery task
+    (prices), see hotels/landing.py.
+    """
+    city = models.OneToOneField(City, on_delete=models.CASCADE, primary_key=True, related_name="landing_aggregate", verbose_name="شهر")
+    hotel_count = models.PositiveIntegerField(default=0, verbose_name="تعداد هتل‌ها")
+    # {"3": 4, "5": 1} -> hotel count per star rating
+    star_distribution = models.JSONField(default=dict, blank=True, verbose_name="توزیع ستاره‌ها")
+    min_nightly_price = models.DecimalField(max_digits=20, decimal_places=0, null=True, blank=True, verbose_name="کمترین قیمت هر شب (تومان)")
+    featured_attractions = models.JSONField(default=list, blank=True, verbose_name="جاذبه‌های برجسته")
+    suggested_hotels = models.JSONField(default=list, blank=True, verbose_name="هتل‌های پیشنهادی")
+    refreshed_at = models.DateTimeField(auto_now=True, verbose_name="آخرین به‌روزرسانی")
+
+    class Meta:
+        verbose_name = "خلاصه صفحه شهر"
+        verbose_name_plural = "خلاصه‌های صفحه شهر"
+
+    def __str__(self):
+        return f"Landing: {self.city}"
@@ -1,10 +1,12 @@
 # hotels/serializers.py
-# version: 2.1.1
-# FIX: Robust handling of None values in price calculation (TypeError fix).
-#      Added safety checks for 'current_total_extra' and 'current_total_child'.
+# version: 2.5.0
+# FEATURE: Added NearbyHotelSerializer for geo index (radius / nearest / bbox) results.
+# FEATURE: Added CityLandingSerializer (precomputed CityLandingAggregate).
+# FEATURE: Room extra-adult / child averages read resolved rates (season ranges + overrides).
+# PERF: Board types come from the reference-data cache instead of a query per loop.
 
 from rest_framework import serializers
-from django.db.models import Count, Min, Avg
+from django.db.models import Count, Min
 from datetime import timedelta
 from persiantools.jdatetime import JalaliDate
 from decimal import Decimal
@@ -12,12 +14,14 @@ from decimal import Decimal
 from .models import (
     City, Amenity, Hotel, RoomType, BoardType,
     HotelCategory, BedType, RoomCategory,
-    HotelImage, RoomImage
+    HotelImage, RoomImage, CityLandingAggregate
 )
 
 from attractions.models import Attraction, AttractionGallery
+from core import reference
 
-from pricing.models import Availability, Price
+from pricing.models import Availability
+from pricing import rates
 from pricing.selectors import _get_daily_price_for_user
 from cancellations.serializers import CancellationPolicySerializer
 
@@ -53,7 +57,7 @@ def calculate_hotel_min_price(hotel_obj, context):
     user = request.user if request else None
     
     for room in hotel_obj.room_types.all():
-        for board in BoardType.objects.all():
+        for board in reference.board_types():
             price_info = _get_daily_price_for_user(room, board, target_date, user)
             if price_info and price_info.get('price_per_night'):
                 price = price_info['price_per_night']
@@ -170,15 +174,11 @@ class RoomTypeSerializer(serializers.ModelSerializer):
         if not date_range:
             return getattr(obj, static_field, 0)
 
-        avg_price = Price.objects.filter(
-            room_type=obj,
-            date__in=date_range
-        ).aggregate(
-            avg_val=Avg(static_field)
-        )['avg_val']
+        component = 1 if field_name == 'extra' else 2
+        amounts = [cell[component] for cell in rates.resolve([obj.id], date_range).values()]
 
-        if avg_price is not None:
-            return int(avg_price)
+        if amounts:
+            return int(sum(amounts) / len(amounts))
         
         return getattr(obj, static_field, 0)
 
@@ -214,7 +214,7 @@ class RoomTypeSerializer(serializers.ModelSerializer):
         user = self.context.get('request').user if self.context.get('request') else None
         
         priced_boards = []
-        for board_type in BoardType.objects.all():
+        for board_type in reference.board_types():
             current_total_price = Decimal(0)
             current_total_extra = Decimal(0) 
             current_total_child = Decimal(0) 
@@ -313,3 +313,50 @@ class SuggestedHotelSerializer(serializers.ModelSerializer):
     def get_min_price(self, obj):
         return calculate_hotel_min_price(obj, self.context)
 
+
+
+class NearbyHotelSerializer(serializers.ModelSerializer):
+    """
+    Lightweight hotel card for geo searches. Deliberately skips min_price,
+    which would cost a price lookup per room and board for every hit.
+    """
+    city_name = serializers.CharField(source='city.name', read_only=True)
+    distance_km = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Hotel
+        fields = ['id', 'name', 'slug', 'stars', 'city_name', 'address', 'latitude', 'longitude', 'distance_km']
+
+
+class CityLandingSerializer(serializers.ModelSerializer):
+    """City landing page payload, read from CityLandingAggregate without further queries."""
+    id = serializers.IntegerField(source='city.id', read_only=True)
+    name = serializers.CharField(source='city.name', read_only=True)
+    slug = serializers.CharField(source='city.slug', read_only=True)
+    description = serializers.CharField(source='city.description', read_only=True)
+    image = serializers.ImageField(source='city.image', read_only=True)
+    latitude = serializers.DecimalField(source='city.latitude', max_digits=9, decimal_places=6, read_only=True)
+    longitude = serializers.DecimalField(source='city.longitude', max_digits=9, decimal_places=6, read_only=True)
+    meta_title = serializers.CharField(source='city.meta_title', read_only=True)
+    meta_description = serializers.CharField(source='city.meta_description', read_only=True)
+
+    class Meta:
+        model = CityLandingAggregate
+        fields = [
+            'id', 'name', 'slug', 'description', 'image', 'latitude', 'longitude',
+            'meta_title', 'meta_description',
+            'hotel_count', 'star_distribution', 'min_nightly_price',
+            'featured_attractions', 'suggested_hotels', 'refreshed_at',
+        ]
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        request = self.context.get('request')
+        if request:
+            for card in data['suggested_hotels']:
+                if card.get('main_image'):
+                    card['main_image'] = request.build_absolute_uri(card['main_image'])
+            for card in data['featured_attractions']:
+                if card.get('image'):
+                    card['image'] = request.build_absolute_uri(card['image'])
+        return data
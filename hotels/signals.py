@@ -0,0 +1,119 @@
+# hotels/signals.py
+# version: 1.3.0
+# FEATURE: Refreshes Hotel.amenity_bits / category_bits on M2M changes.
+# FEATURE: Keeps the in-process autocomplete index current on City / Hotel save and delete.
+# FEATURE: Schedules CityLandingAggregate refreshes when hotels change.
+
+from django.db.models.signals import pre_save, post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+
+from .models import Hotel, City, Amenity, HotelCategory, GeoIndexEntry
+from . import geo_index, feature_bits, autocomplete, landing
+
+
+@receiver(post_save, sender=Hotel)
+def index_hotel_location(sender, instance, **kwargs):
+    geo_index.index_point(GeoIndexEntry.KIND_HOTEL, instance.pk, instance.latitude, instance.longitude)
+
+
+@receiver(post_delete, sender=Hotel)
+def unindex_hotel_location(sender, instance, **kwargs):
+    geo_index.remove_point(GeoIndexEntry.KIND_HOTEL, instance.pk)
+
+
+@receiver(post_save, sender=City)
+def index_city_location(sender, instance, **kwargs):
+    geo_index.index_point(GeoIndexEntry.KIND_CITY, instance.pk, instance.latitude, instance.longitude)
+
+
+@receiver(post_delete, sender=City)
+def unindex_city_location(sender, instance, **kwargs):
+    geo_index.remove_point(GeoIndexEntry.KIND_CITY, instance.pk)
+
+
+# --- Amenity / category bitsets ---
+
+@receiver(m2m_changed, sender=Hotel.amenities.through)
+@receiver(m2m_changed, sender=Hotel.hotel_categories.through)
+def refresh_hotel_feature_bits(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # Reverse clear (amenity.hotel_set.clear()) does not pass pk_set afterwards.
+        instance._cleared_hotel_ids = list(_hotels_linked_to(sender, instance).values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        feature_bits.refresh_hotels([instance.pk])
+    elif action == 'post_clear':
+        feature_bits.refresh_hotels(getattr(instance, '_cleared_hotel_ids', []))
+    else:
+        feature_bits.refresh_hotels(pk_set or [])
+
+
+def _hotels_linked_to(through, instance):
+    if through is Hotel.amenities.through:
+        return Hotel.objects.filter(amenities=instance)
+    return Hotel.objects.filter(hotel_categories=instance)
+
+
+@receiver(pre_delete, sender=Amenity)
+@receiver(pre_delete, sender=HotelCategory)
+def remember_hotels_of_deleted_feature(sender, instance, **kwargs):
+    through = Hotel.amenities.through if sender is Amenity else Hotel.hotel_categories.through
+    instance._affected_hotel_ids = list(_hotels_linked_to(through, instance).values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Amenity)
+@receiver(post_delete, sender=HotelCategory)
+def refresh_hotels_of_deleted_feature(sender, instance, **kwargs):
+    feature_bits.refresh_hotels(getattr(instance, '_affected_hotel_ids', []))
+
+
+# --- Autocomplete prefix index ---
+
+@receiver(post_save, sender=City)
+def index_city_name(sender, instance, **kwargs):
+    autocomplete.index_city(instance)
+
+
+@receiver(post_delete, sender=City)
+def unindex_city_name(sender, instance, **kwargs):
+    autocomplete.remove(autocomplete.KIND_CITY, instance.pk)
+
+
+@receiver(post_save, sender=Hotel)
+def index_hotel_name(sender, instance, **kwargs):
+    autocomplete.index_hotel(instance)
+
+
+@receiver(post_delete, sender=Hotel)
+def unindex_hotel_name(sender, instance, **kwargs):
+    autocomplete.remove(autocomplete.KIND_HOTEL, instance.pk)
+
+
+# --- City landing aggregates ---
+
+@receiver(pre_save, sender=Hotel)
+def remember_previous_hotel_city(sender, instance, **kwargs):
+    instance._previous_city_id = None
+    if instance.pk:
+        instance._previous_city_id = Hotel.objects.filter(pk=instance.pk).values_list('city_id', flat=True).first()
+
+
+@receiver(post_save, sender=Hotel)
+def refresh_landing_of_hotel_city(sender, instance, **kwargs):
+    landing.schedule_refresh(instance.city_id)
+    previous_city_id = getattr(instance, '_previous_city_id', None)
+    if previous_city_id and previous_city_id != instance.city_id:
+        landing.schedule_refresh(previous_city_id)
+
+
+@receiver(post_delete, sender=Hotel)
+def refresh_landing_after_hotel_delete(sender, instance, **kwargs):
+    landing.schedule_refresh(instance.city_id)
+
+
+@receiver(post_save, sender=City)
+def create_city_landing(sender, instance, created, **kwargs):
+    if created:
+        landing.schedule_refresh(instance.pk)
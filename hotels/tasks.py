@@ -0,0 +1,19 @@
+# hotels/tasks.py
+# version: 1.0.0
+# FEATURE: Periodic refresh of CityLandingAggregate (prices change without any hotel signal).
+
+from celery import shared_task
+
+from . import landing
+
+
+@shared_task
+def refresh_city_landing_aggregates(city_id=None):
+    """
+    Rebuilds the landing aggregate of one city, or of every city when city_id is None.
+    Scheduled in CELERY_BEAT_SCHEDULE (settings.py).
+    """
+    if city_id is not None:
+        landing.refresh_city(city_id)
+        return "Refreshed 1 city."
+    return f"Refreshed {landing.refresh_all()} cities."
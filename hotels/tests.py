@@ -1,3 +1,248 @@
+# hotels/tests.py
+# version: 1.4.1
+# FEATURE: Tests for the geo index (signals, radius / nearest / bbox queries and API).
+# FEATURE: Tests for amenity / category bitsets and their use in find_available_hotels.
+# FEATURE: Tests for the autocomplete prefix index (normalization, incremental updates, API).
+# FEATURE: Tests for CityLandingAggregate refresh and the landing endpoint.
+
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from attractions.models import Attraction
+from attractions.views import AttractionViewSet
+from pricing.models import Availability, Price
+from pricing.selectors import find_available_hotels
+from .models import City, Hotel, GeoIndexEntry, Amenity, HotelCategory, RoomType, BoardType, CityLandingAggregate
+from . import geo_index, feature_bits, autocomplete, landing
+
+
+class GeoIndexTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.city = City.objects.create(name="Isfahan", slug="isfahan", latitude=Decimal('32.654600'), longitude=Decimal('51.667900'))
+        # Naqsh-e Jahan square and hotels at increasing distance from it.
+        cls.square = Attraction.objects.create(
+            name="Naqsh-e Jahan", slug="naqsh-e-jahan", city=cls.city, description="-",
+            latitude=Decimal('32.657500'), longitude=Decimal('51.677500'),
+        )
+        cls.near = Hotel.objects.create(name="Abbasi", slug="abbasi", city=cls.city, address="-",
+                                        latitude=Decimal('32.650000'), longitude=Decimal('51.670000'))   # ~1.1 km
+        cls.mid = Hotel.objects.create(name="Kowsar", slug="kowsar", city=cls.city, address="-",
+                                       latitude=Decimal('32.640000'), longitude=Decimal('51.660000'))    # ~2.5 km
+        cls.far = Hotel.objects.create(name="Far Away", slug="far-away", city=cls.city, address="-",
+                                       latitude=Decimal('32.750000'), longitude=Decimal('51.800000'))    # ~15 km
+        cls.unlocated = Hotel.objects.create(name="No Coordinates", slug="no-coords", city=cls.city, address="-")
+
+    def test_signals_maintain_entries(self):
+        self.assertEqual(GeoIndexEntry.objects.filter(kind=GeoIndexEntry.KIND_HOTEL).count(), 3)
+        self.assertTrue(GeoIndexEntry.objects.filter(kind=GeoIndexEntry.KIND_CITY, object_id=self.city.id).exists())
+
+        self.far.latitude, self.far.longitude = None, None
+        self.far.save()
+        self.assertFalse(GeoIndexEntry.objects.filter(kind=GeoIndexEntry.KIND_HOTEL, object_id=self.far.id).exists())
+
+        self.near.delete()
+        self.assertEqual(GeoIndexEntry.objects.filter(kind=GeoIndexEntry.KIND_HOTEL).count(), 1)
+
+    def test_radius_and_nearest(self):
+        lat, lng = float(self.square.latitude), float(self.square.longitude)
+        hits = geo_index.within_radius(GeoIndexEntry.KIND_HOTEL, lat, lng, 3)
+        self.assertEqual([object_id for object_id, _ in hits], [self.near.id, self.mid.id])
+
+        hits = geo_index.nearest(GeoIndexEntry.KIND_HOTEL, lat, lng, k=3)
+        self.assertEqual([object_id for object_id, _ in hits], [self.near.id, self.mid.id, self.far.id])
+
+    def test_bbox(self):
+        hits = geo_index.within_bbox(GeoIndexEntry.KIND_HOTEL, 32.6, 51.6, 32.7, 51.7)
+        self.assertEqual({object_id for object_id, _ in hits}, {self.near.id, self.mid.id})
+
+    def test_api_endpoints(self):
+        client = APIClient()
+        response = client.get('/api/hotels/geo/', {'lat': '32.6575', 'lng': '51.6775', 'radius': '3'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['slug'] for item in response.data], ['abbasi', 'kowsar'])
+
+        response = client.get('/api/attractions/list/naqsh-e-jahan/nearby-hotels/', {'k': '1'})
+        self.assertEqual([item['slug'] for item in response.data], ['abbasi'])
+
+        response = client.get('/api/hotels/abbasi/nearby-attractions/')
+        self.assertEqual([item['slug'] for item in response.data], ['naqsh-e-jahan'])
+
+        # Without coordinates there is nothing nearby, in either direction.
+        unmapped = Attraction(name="Unmapped", slug="unmapped", city=self.city, latitude=None, longitude=None)
+        with mock.patch.object(AttractionViewSet, 'get_object', return_value=unmapped):
+            response = client.get('/api/attractions/list/unmapped/nearby-hotels/')
+        self.assertEqual((response.status_code, response.data), (200, []))
+        self.assertEqual(client.get('/api/hotels/no-coords/nearby-attractions/').data, [])
+
+        response = client.get('/api/hotels/geo/', {'lat': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+
+class FeatureBitsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.city = City.objects.create(name="Shiraz", slug="shiraz")
+        cls.pool = Amenity.objects.create(name="Pool")
+        cls.parking = Amenity.objects.create(name="Parking")
+        cls.family = HotelCategory.objects.create(name="Family", slug="family")
+        cls.luxury = HotelCategory.objects.create(name="Luxury", slug="luxury")
+        cls.board = BoardType.objects.create(name="BB", code="BB")
+
+        cls.both = Hotel.objects.create(name="Both", slug="both", city=cls.city, address="-", stars=5)
+        cls.both.amenities.add(cls.pool, cls.parking)
+        cls.both.hotel_categories.add(cls.luxury)
+        cls.pool_only = Hotel.objects.create(name="Pool Only", slug="pool-only", city=cls.city, address="-", stars=3)
+        cls.pool_only.amenities.add(cls.pool)
+        cls.pool_only.hotel_categories.add(cls.family)
+
+        cls.check_in = date(2026, 3, 1)
+        for index, hotel in enumerate((cls.both, cls.pool_only)):
+            room = RoomType.objects.create(hotel=hotel, name="Double", code=f"D{index}", price_per_night=100)
+            for offset in range(2):
+                day = cls.check_in + timedelta(days=offset)
+                Availability.objects.create(room_type=room, date=day, quantity=3)
+                Price.objects.create(room_type=room, board_type=cls.board, date=day,
+                                     price_per_night=100, extra_person_price=0, child_price=0)
+
+    def _rows(self):
+        return Hotel.objects.values_list('id', 'amenity_bits', 'category_bits')
+
+    def test_signals_keep_bits_in_sync(self):
+        self.assertEqual(feature_bits.matching_hotel_ids(self._rows(), [self.pool.id, self.parking.id]), [self.both.id])
+
+        self.pool_only.amenities.add(self.parking)
+        self.assertEqual(
+            sorted(feature_bits.matching_hotel_ids(self._rows(), [self.pool.id, self.parking.id])),
+            sorted([self.both.id, self.pool_only.id]),
+        )
+
+        self.parking.delete()
+        self.assertEqual(len(feature_bits.matching_hotel_ids(self._rows(), [self.pool.id])), 2)
+
+        self.family.hotels.clear()
+        self.assertEqual(feature_bits.matching_hotel_ids(self._rows(), category_ids=[self.family.id]), [])
+
+    def test_search_filters_before_pricing(self):
+        check_out = self.check_in + timedelta(days=2)
+        results = find_available_hotels(self.city.id, self.check_in, check_out, None)
+        self.assertEqual(len(results), 2)
+
+        results = find_available_hotels(self.city.id, self.check_in, check_out, None,
+                                        amenities=f"{self.pool.id},{self.parking.id}")
+        self.assertEqual([r['hotel_id'] for r in results], [self.both.id])
+
+        results = find_available_hotels(self.city.id, self.check_in, check_out, None,
+                                        categories=str(self.family.id))
+        self.assertEqual([r['hotel_id'] for r in results], [self.pool_only.id])
+
+        results = find_available_hotels(self.city.id, self.check_in, check_out, None, stars="3,4")
+        self.assertEqual([r['hotel_id'] for r in results], [self.pool_only.id])
+
+
+class AutocompleteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tehran = City.objects.create(name="تهران", slug="tehran", is_featured=True)
+        cls.kish = City.objects.create(name="کیش", slug="kish")
+        cls.parsian = Hotel.objects.create(name="هتل پارسیان آزادی", slug="parsian-azadi", city=cls.tehran, address="-", stars=5)
+        cls.espinas = Hotel.objects.create(name="Espinas Palace", slug="espinas-palace", city=cls.tehran, address="-", stars=5)
+        cls.toranj = Hotel.objects.create(name="هتل ترنج", slug="toranj", city=cls.kish, address="-", stars=4)
+
+    def setUp(self):
+        # The index is process-wide; rows from other tests were rolled back without signals.
+        autocomplete.rebuild()
+
+    def test_normalization(self):
+        # Arabic yeh / kaf, ZWNJ and diacritics all map to the same key.
+        self.assertEqual(autocomplete.normalize("كيش"), autocomplete.normalize("کیش"))
+        self.assertEqual(autocomplete.normalize("هتل\u200cها"), "هتل ها")
+        self.assertEqual([r['slug'] for r in autocomplete.suggest("كي")], ['kish'])
+        self.assertEqual([r['slug'] for r in autocomplete.suggest("هتل\u200cپارس")], ['parsian-azadi'])
+        self.assertEqual([r['slug'] for r in autocomplete.suggest("espi")], ['espinas-palace'])
+
+    def test_ranking_and_later_words(self):
+        # A city whose name starts with the prefix ranks above hotels matching a later word.
+        self.assertEqual([r['slug'] for r in autocomplete.suggest("ت")], ['tehran', 'toranj'])
+        self.assertEqual([r['slug'] for r in autocomplete.suggest("آزاد")], ['parsian-azadi'])
+        self.assertEqual([r['slug'] for r in autocomplete.suggest("هتل", kinds={autocomplete.KIND_HOTEL})],
+                         ['parsian-azadi', 'toranj'])
+
+    def test_kinds_filter_is_not_crowded_out_by_the_other_kind(self):
+        City.objects.bulk_create([
+            City(name=f"تست {i}", slug=f"test-city-{i}", is_featured=True) for i in range(autocomplete.MAX_LIMIT * 2 + 5)
+        ])
+        Hotel.objects.create(name="تست هتل", slug="test-hotel", city=self.kish, address="-", stars=1)
+        autocomplete.rebuild()
+        self.assertEqual([r['slug'] for r in autocomplete.suggest("تست", kinds={autocomplete.KIND_HOTEL})],
+                         ['test-hotel'])
+        self.assertEqual(len(autocomplete.suggest("تست", limit=autocomplete.MAX_LIMIT)), autocomplete.MAX_LIMIT)
+
+    def test_incremental_updates(self):
+        self.toranj.name = "هتل مارینا"
+        self.toranj.save()
+        self.assertEqual(autocomplete.suggest("ترنج"), [])
+        self.assertEqual([r['slug'] for r in autocomplete.suggest("مارین")], ['toranj'])
+
+        self.espinas.delete()
+        self.assertEqual(autocomplete.suggest("espi"), [])
+
+        self.kish.name = "جزیره کیش"
+        self.kish.save()
+        result = autocomplete.suggest("مارین")[0]
+        self.assertEqual(result['city_name'], "جزیره کیش")
+
+    def test_api(self):
+        response = APIClient().get('/api/hotels/autocomplete/', {'q': 'تهر'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [{'type': 'city', 'id': self.tehran.id, 'name': 'تهران', 'slug': 'tehran'}])
+        self.assertEqual(APIClient().get('/api/hotels/autocomplete/').data, [])
+
+
+class CityLandingTests(TestCase):
+
+    def test_signals_and_endpoint(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            city = City.objects.create(name="Yazd", slug="yazd")
+            board = BoardType.objects.create(name="BB", code="BB")
+            moshir = Hotel.objects.create(name="Moshir", slug="moshir", city=city, address="-", stars=5, is_suggested=True)
+            Hotel.objects.create(name="Dad", slug="dad", city=city, address="-", stars=4)
+            Hotel.objects.create(name="Silk Road", slug="silk-road", city=city, address="-", stars=4)
+            Attraction.objects.create(name="Amir Chakhmaq", slug="amir-chakhmaq", city=city, description="-",
+                                      latitude=Decimal('31.89'), longitude=Decimal('54.37'), is_featured=True)
+            room = RoomType.objects.create(hotel=moshir, name="Double", code="M-D", price_per_night=100)
+            today, _ = landing._price_window()
+            Price.objects.create(room_type=room, board_type=board, date=today + timedelta(days=3),
+                                 price_per_night=900, extra_person_price=0, child_price=0)
+
+        aggregate = CityLandingAggregate.objects.get(city=city)
+        self.assertEqual(aggregate.hotel_count, 3)
+        self.assertEqual(aggregate.star_distribution, {'4': 2, '5': 1})
+        self.assertEqual([a['slug'] for a in aggregate.featured_attractions], ['amir-chakhmaq'])
+        self.assertEqual(aggregate.min_nightly_price, 900)
+
+        # Price edits fire no hotel signal; the periodic task picks them up.
+        Price.objects.create(room_type=room, board_type=board, date=today + timedelta(days=4),
+                             price_per_night=700, extra_person_price=0, child_price=0)
+        self.assertEqual(CityLandingAggregate.objects.get(city=city).min_nightly_price, 900)
+        landing.refresh_all()
+        with self.assertNumQueries(1):
+            response = APIClient().get('/api/hotels/cities/yazd/landing/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['min_nightly_price'], '700')
+        self.assertEqual(response.data['suggested_hotels'][0]['slug'], 'moshir')
+        self.assertEqual(response.data['suggested_hotels'][0]['min_price'], 700)
 
-# Create your tests here.
+    def test_missing_aggregate_is_built_on_demand(self):
+        city = City.objects.create(name="Qom", slug="qom")
+        self.assertFalse(CityLandingAggregate.objects.filter(city=city).exists())
+        response = APIClient().get('/api/hotels/cities/qom/landing/')
+        self.assertEqual(response.data['hotel_count'], 0)
+        self.assertEqual(APIClient().get('/api/hotels/cities/nowhere/landing/').status_code, 404)
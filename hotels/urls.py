@@ -1,6 +1,8 @@
 # hotels/urls.py
-# version: 1.0.4
-# REFACTOR: Removed all prefixes (api/, hotels/) as they are now handled in the root URLconf.
+# version: 1.3.0
+# FEATURE: Added geo search endpoints ('geo/' and '<slug>/nearby-attractions/').
+# FEATURE: Added 'autocomplete/' for city and hotel name suggestions.
+# FEATURE: Added 'cities/<slug>/landing/' (precomputed city landing data).
 
 from django.urls import path
 from . import views
@@ -10,11 +12,15 @@ app_name = 'hotels'
 urlpatterns = [
     # Paths are now relative to /api/hotels/
     path('cities/', views.CityListAPIView.as_view(), name='city-list'),
+    path('cities/<slug:slug>/landing/', views.CityLandingAPIView.as_view(), name='city-landing'),
     path('amenities/', views.AmenityListAPIView.as_view(), name='amenity-list'),
     path('suggested/', views.SuggestedHotelListAPIView.as_view(), name='suggested-hotel-list'),
     path('board-types/', views.BoardTypeListAPIView.as_view(), name='board-type-list'),
+    path('autocomplete/', views.AutocompleteAPIView.as_view(), name='autocomplete'),
+    path('geo/', views.HotelGeoSearchAPIView.as_view(), name='hotel-geo-search'),
     path('<int:hotel_id>/rooms/', views.RoomTypeListAPIView.as_view(), name='room-type-list'),
     path('<int:pk>/', views.HotelDetailPKView.as_view(), name='hotel-detail-pk'),
+    path('<slug:slug>/nearby-attractions/', views.HotelNearbyAttractionsAPIView.as_view(), name='hotel-nearby-attractions'),
     path('<slug:slug>/', views.HotelViewSet.as_view({'get': 'retrieve'}), name='hotel-detail'),
     path('<int:hotel_id>/rooms/', views.RoomTypeListAPIView.as_view(), name='room-type-list'),
     
@@ -1,6 +1,9 @@
 # hotels/views.py
-# version: 0.1.1
-# FEATURE: Added SuggestedHotelListAPIView to serve homepage hotel data.
+# version: 0.5.0
+# FEATURE: Added geo search endpoints (hotels near a point / in a box, attractions near a hotel).
+# FEATURE: Added AutocompleteAPIView (city / hotel names from the in-process prefix index).
+# FEATURE: Added CityLandingAPIView (one read of the precomputed CityLandingAggregate).
+# PERF: Board type, city and amenity lists are served from the reference-data cache.
 
 from rest_framework import generics, viewsets
 from rest_framework.response import Response
@@ -13,10 +16,15 @@ from .serializers import (
     CitySerializer, HotelSerializer, AmenitySerializer,
     RoomTypeSerializer,
     HotelCategorySerializer, BedTypeSerializer, BoardTypeSerializer, RoomCategorySerializer,
-    SuggestedHotelSerializer # Import the new serializer
+    SuggestedHotelSerializer, # Import the new serializer
+    NearbyHotelSerializer, CityLandingSerializer
 )
 from django.shortcuts import get_object_or_404
 from rest_framework.views import APIView
+from rest_framework import status
+from .models import GeoIndexEntry, CityLandingAggregate
+from . import geo_index, autocomplete, landing
+from core import reference
 
 # --- API Views required by hotels/urls.py ---
 
@@ -28,16 +36,25 @@ class HotelDetailPKView(generics.RetrieveAPIView):
 class BoardTypeListAPIView(generics.ListAPIView):
     queryset = BoardType.objects.all()
     serializer_class = BoardTypeSerializer
+
+    def get_queryset(self):
+        return reference.board_types()
                                                                                     
 
 class CityListAPIView(generics.ListAPIView):
     queryset = City.objects.all()
     serializer_class = CitySerializer
 
+    def get_queryset(self):
+        return reference.cities()
+
 class AmenityListAPIView(generics.ListAPIView):
     queryset = Amenity.objects.all()
     serializer_class = AmenitySerializer
 
+    def get_queryset(self):
+        return reference.amenities()
+
 class HotelListAPIView(generics.ListAPIView):
     queryset = Hotel.objects.all()
     serializer_class = HotelSerializer
@@ -67,6 +84,75 @@ class SuggestedHotelListAPIView(generics.ListAPIView):
     serializer_class = SuggestedHotelSerializer
 
 
+class CityLandingAPIView(APIView):
+    """
+    Everything the city landing page needs (city info, hotel count, star distribution,
+    min nightly price, featured attractions, suggested hotels) in one response.
+    """
+    def get(self, request, slug):
+        aggregate = CityLandingAggregate.objects.select_related('city').filter(city__slug=slug).first()
+        if aggregate is None:
+            # Not built yet (e.g. city created before the aggregates existed).
+            city = get_object_or_404(City, slug=slug)
+            aggregate = landing.refresh_city(city.pk)
+        return Response(CityLandingSerializer(aggregate, context={'request': request}).data)
+
+
+# --- Geo Search Views (backed by hotels/geo_index.py) ---
+
+class AutocompleteAPIView(APIView):
+    """
+    City and hotel name suggestions.
+    ?q=<prefix>&limit=10&type=city|hotel
+    """
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        try:
+            limit = int(request.query_params.get('limit', autocomplete.DEFAULT_LIMIT))
+        except ValueError:
+            limit = autocomplete.DEFAULT_LIMIT
+        kind = request.query_params.get('type')
+        kinds = {kind} if kind in autocomplete.KIND_ORDER else None
+        return Response(autocomplete.suggest(query, limit=max(limit, 1), kinds=kinds))
+
+
+class HotelGeoSearchAPIView(APIView):
+    """
+    Hotels around a point or inside a map box.
+    ?lat=&lng=&radius=3  |  ?lat=&lng=&k=10  |  ?bbox=south,west,north,east
+    """
+    def get(self, request):
+        try:
+            hits = geo_index.search_from_params(GeoIndexEntry.KIND_HOTEL, request.query_params)
+        except (KeyError, ValueError, TypeError):
+            return Response({"error": geo_index.PARAMS_ERROR_MESSAGE}, status=status.HTTP_400_BAD_REQUEST)
+        hotels = geo_index.load_objects(Hotel.objects.select_related('city'), hits)
+        return Response(NearbyHotelSerializer(hotels, many=True).data)
+
+
+class HotelNearbyAttractionsAPIView(APIView):
+    """
+    Attractions around a hotel. Accepts the same radius / k params as the geo search.
+    """
+    def get(self, request, slug):
+        # Imported here: attractions depends on hotels, not the other way round.
+        from attractions.models import Attraction
+        from attractions.serializers import NearbyAttractionSerializer
+
+        hotel = get_object_or_404(Hotel, slug=slug)
+        if hotel.latitude is None or hotel.longitude is None:
+            return Response([])
+
+        params = {key: request.query_params.get(key) for key in ('radius', 'k') if request.query_params.get(key)}
+        params.update({'lat': hotel.latitude, 'lng': hotel.longitude})
+        try:
+            hits = geo_index.search_from_params(GeoIndexEntry.KIND_ATTRACTION, params)
+        except (KeyError, ValueError, TypeError):
+            return Response({"error": geo_index.PARAMS_ERROR_MESSAGE}, status=status.HTTP_400_BAD_REQUEST)
+        attractions = geo_index.load_objects(Attraction.objects.select_related('city'), hits)
+        return Response(NearbyAttractionSerializer(attractions, many=True).data)
+
+
 # --- Existing ViewSets (can be used for full CRUD with routers) ---
 
 class CityViewSet(viewsets.ModelViewSet):
@@ -1,9 +1,13 @@
 
 
 # notifications/admin.py
+# version: 1.3.0
+# FEATURE: Read-only list of queued / sent SMS.
+# FEATURE: Read-only notification outbox.
+# FEATURE: Reviewed 'unknown' / 'failed' SMS can be queued again from the list.
 
 from django.contrib import admin
-from .models import SmsSettings, EmailSettings
+from .models import SmsSettings, EmailSettings, OutgoingSms, OutboxEvent
 
 @admin.register(SmsSettings)
 class SmsSettingsAdmin(admin.ModelAdmin):
@@ -14,3 +18,24 @@ class SmsSettingsAdmin(admin.ModelAdmin):
 class EmailSettingsAdmin(admin.ModelAdmin):
     list_display = ('provider_name', 'host', 'port', 'username', 'is_active')
     list_editable = ('is_active',)
+
+@admin.register(OutgoingSms)
+class OutgoingSmsAdmin(admin.ModelAdmin):
+    list_display = ('recipient', 'status', 'attempts', 'created_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('recipient',)
+    readonly_fields = ('recipient', 'message', 'status', 'attempts', 'error', 'created_at', 'sent_at')
+    actions = ['requeue_messages']
+
+    @admin.action(description="ارسال مجدد پیامک‌های نامشخص / ناموفق انتخاب شده")
+    def requeue_messages(self, request, queryset):
+        count = queryset.filter(status__in=('unknown', 'failed')).update(status='queued', attempts=0, error='')
+        self.message_user(request, f"{count} پیامک دوباره در صف ارسال قرار گرفت.")
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ('booking', 'event_type', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status', 'event_type')
+    search_fields = ('booking__booking_code',)
+    raw_id_fields = ('booking',)
+    readonly_fields = ('booking', 'event_type', 'status', 'attempts', 'next_attempt_at', 'error', 'created_at', 'sent_at')
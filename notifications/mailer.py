@@ -0,0 +1,80 @@
+# notifications/mailer.py
+# version: 1.0.0
+# FEATURE: Email dispatcher with one pooled SMTP connection per worker process.
+#   - The active EmailSettings row is a reference dataset (core/reference.py): no query per
+#     email, and the pooled connection is rebuilt when the reference version changes.
+#   - send_messages() sends a whole batch in one SMTP session of the pooled connection and
+#     keeps it open for the next batch. A connection dropped by the server (idle timeout,
+#     restart) is reopened and the unsent message retried once, so nothing is sent twice.
+
+import contextlib
+import logging
+import smtplib
+import threading
+
+from django.core.mail import get_connection
+
+from core import reference
+from .models import EmailSettings
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean the session is gone (rather than the message being rejected).
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+_pool = {'key': None, 'connection': None}
+_lock = threading.RLock()
+
+
+@reference.dataset
+def email_settings():
+    return EmailSettings.objects.filter(is_active=True).first()
+
+
+def close():
+    """Closes the pooled connection (the next send opens a new one)."""
+    with _lock:
+        connection, _pool['connection'], _pool['key'] = _pool['connection'], None, None
+        if connection is not None:
+            with contextlib.suppress(smtplib.SMTPException, OSError):
+                connection.close()
+
+
+def _connection(settings):
+    key = (reference.current_version(), settings.pk)
+    if _pool['key'] != key:
+        close()
+        _pool['connection'] = get_connection(
+            host=settings.host,
+            port=settings.port,
+            username=settings.username,
+            password=settings.password,
+            use_tls=settings.use_tls,
+            use_ssl=settings.use_ssl,
+            fail_silently=False,
+        )
+        _pool['key'] = key
+    connection = _pool['connection']
+    connection.open()  # no-op while the session is open
+    return connection
+
+
+def send_messages(messages, settings=None):
+    """
+    Sends EmailMessage objects through the pooled connection in one SMTP session.
+    Returns the number sent; raises if a message fails (the earlier ones stay sent).
+    """
+    settings = settings or email_settings()
+    sent = 0
+    with _lock:
+        for message in messages:
+            for attempt in (1, 2):
+                try:
+                    sent += _connection(settings).send_messages([message])
+                    break
+                except CONNECTION_ERRORS:
+                    close()
+                    if attempt == 2:
+                        raise
+                    logger.warning("SMTP connection to %s lost; reconnecting.", settings.host)
+    return sent
@@ -0,0 +1,73 @@
+# notifications/management/commands/benchmark_email.py
+# version: 1.0.0
+# FEATURE: Benchmarks email throughput against a local stand-in SMTP server: a connection
+#          per email (the old tasks) vs the pooled mailer, one email per call and batched.
+#          The EmailSettings row is written inside a transaction that is rolled back.
+
+import time
+
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+
+from notifications import mailer
+from notifications.models import EmailSettings
+from notifications.stubs import StubSMTPServer
+
+
+class Command(BaseCommand):
+    help = "Benchmarks SMTP sending (messages per second) against a local stub server."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=500)
+        parser.add_argument('--batch', type=int, default=50)
+
+    def handle(self, *args, **options):
+        server = StubSMTPServer().start()
+        try:
+            with transaction.atomic(), override_settings(EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend'):
+                settings = EmailSettings.objects.create(
+                    provider_name="benchmark", host='127.0.0.1', port=server.port,
+                    username='noreply@example.com', password='', use_tls=False,
+                )
+                count, batch = options['messages'], options['batch']
+
+                def connection_per_email(messages):
+                    for message in messages:
+                        message.connection = get_connection(host=settings.host, port=settings.port, use_tls=False)
+                        message.send(fail_silently=False)
+
+                def pooled(messages):
+                    for message in messages:
+                        mailer.send_messages([message], settings)
+
+                def pooled_batches(messages):
+                    for start in range(0, len(messages), batch):
+                        mailer.send_messages(messages[start:start + batch], settings)
+
+                for label, send in (("connection per email", connection_per_email),
+                                    ("pooled", pooled),
+                                    (f"pooled, batches of {batch}", pooled_batches)):
+                    self._run(label, server, send, self._messages(count, settings))
+                mailer.close()
+                transaction.set_rollback(True)
+        finally:
+            server.stop()
+
+    def _messages(self, count, settings):
+        return [
+            EmailMessage(subject=f"تاییدیه رزرو {i}", body="<p>رزرو شما ثبت شد.</p>",
+                         from_email=settings.username, to=[f"guest{i}@example.com"])
+            for i in range(count)
+        ]
+
+    def _run(self, label, server, send, messages):
+        connections, received = server.connections, len(server.messages)
+        started = time.perf_counter()
+        send(messages)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{label:<24} {len(messages) / elapsed:9.1f} msg/s   "
+            f"{len(server.messages) - received} sent over {server.connections - connections} connections"
+        )
@@ -0,0 +1,62 @@
+# notifications/management/commands/benchmark_sms.py
+# version: 1.0.1
+# FEATURE: Benchmarks SMS throughput against the local stub provider: a new connection and
+#          request per message (the old task) vs the pooled session, per message and through
+#          the queued, coalesced flush. Rows are written inside a transaction that is rolled back.
+# FIX: The benchmark settings carry panel credentials, which flush() now requires.
+
+import time
+
+import requests
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+
+from notifications import sms
+from notifications.models import SmsSettings
+from notifications.stubs import StubSMSProvider
+
+
+class Command(BaseCommand):
+    help = "Benchmarks SMS sending (messages per second) against a local stub provider."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=1000)
+        parser.add_argument('--texts', type=int, default=10, help="Distinct message texts")
+        parser.add_argument('--latency', type=float, default=0.005, help="Stub provider latency (seconds)")
+
+    def handle(self, *args, **options):
+        provider = StubSMSProvider(latency=options['latency']).start()
+        try:
+            with transaction.atomic(), override_settings(SMS_PROVIDER_URL=provider.url):
+                settings = SmsSettings.objects.create(username='benchmark', password='benchmark', sender_number='3000')
+                messages = [(f"0912{i:07d}", f"کد تخفیف شما: OFF{i % options['texts']}")
+                            for i in range(options['messages'])]
+
+                def request_per_message():
+                    for recipient, message in messages:
+                        requests.post(provider.url, json={'message': message, 'to': [recipient]}, timeout=10).raise_for_status()
+
+                def pooled_per_message():
+                    for recipient, message in messages:
+                        sms.send_to_provider(settings, message, [recipient])
+
+                def queued_flush():
+                    sms.queue_many(messages)
+                    more = True
+                    while more:
+                        _, _, more = sms.flush(settings)
+
+                for label, send in (("request per message", request_per_message),
+                                    ("pooled session", pooled_per_message),
+                                    ("queued, coalesced", queued_flush)):
+                    requests_before, started = provider.requests, time.perf_counter()
+                    send()
+                    elapsed = time.perf_counter() - started
+                    self.stdout.write(
+                        f"{label:<22} {len(messages) / elapsed:9.1f} msg/s   "
+                        f"{provider.requests - requests_before} provider requests"
+                    )
+                transaction.set_rollback(True)
+        finally:
+            provider.stop()
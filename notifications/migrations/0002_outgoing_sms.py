@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutgoingSms',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipient', models.CharField(max_length=20, verbose_name='شماره گیرنده')),
+                ('message', models.TextField(verbose_name='متن پیام')),
+                ('status', models.CharField(choices=[('queued', 'در صف ارسال'), ('sent', 'ارسال شده'), ('failed', 'ناموفق')], default='queued', max_length=10, verbose_name='وضعیت')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='تعداد تلاش')),
+                ('error', models.TextField(blank=True, verbose_name='خطا')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='زمان ثبت')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='زمان ارسال')),
+            ],
+            options={
+                'verbose_name': 'پیامک ارسالی',
+                'verbose_name_plural': 'پیامک\u200cهای ارسالی',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'id'], name='notificatio_status_8d2e4a_idx')],
+            },
+        ),
+    ]
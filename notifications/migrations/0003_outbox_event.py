@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:51
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_outgoing_sms'),
+        ('reservations', '0006_bookingroom_nightly_prices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('booking_confirmed', 'تایید رزرو')], max_length=30, verbose_name='رویداد')),
+                ('status', models.CharField(choices=[('pending', 'در انتظار ارسال'), ('sent', 'ارسال شده'), ('failed', 'ناموفق')], default='pending', max_length=10, verbose_name='وضعیت')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='تعداد تلاش')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='زمان تلاش بعدی')),
+                ('error', models.TextField(blank=True, verbose_name='خطا')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='زمان ثبت')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='زمان ارسال')),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outbox_events', to='reservations.booking', verbose_name='رزرو')),
+            ],
+            options={
+                'verbose_name': 'رویداد اطلاع\u200cرسانی',
+                'verbose_name_plural': 'صف اطلاع\u200cرسانی\u200cها',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='notificatio_status_19f442_idx')],
+                'constraints': [models.UniqueConstraint(fields=('booking', 'event_type'), name='unique_outbox_event_per_booking')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-19 09:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0003_outbox_event'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outgoingsms',
+            name='lease_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='مهلت ارسال'),
+        ),
+        migrations.AddField(
+            model_name='smssettings',
+            name='password',
+            field=models.CharField(blank=True, max_length=255, verbose_name='رمز عبور پنل'),
+        ),
+        migrations.AddField(
+            model_name='smssettings',
+            name='username',
+            field=models.CharField(blank=True, max_length=100, verbose_name='نام کاربری پنل'),
+        ),
+        migrations.AlterField(
+            model_name='outgoingsms',
+            name='status',
+            field=models.CharField(choices=[('queued', 'در صف ارسال'), ('sending', 'در حال ارسال'), ('sent', 'ارسال شده'), ('failed', 'ناموفق')], default='queued', max_length=10, verbose_name='وضعیت'),
+        ),
+    ]
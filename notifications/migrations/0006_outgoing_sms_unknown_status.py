@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 09:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0005_outbox_processing_status'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='outgoingsms',
+            name='status',
+            field=models.CharField(choices=[('queued', 'در صف ارسال'), ('sending', 'در حال ارسال'), ('sent', 'ارسال شده'), ('unknown', 'نامشخص (نیازمند بررسی)'), ('failed', 'ناموفق')], default='queued', max_length=10, verbose_name='وضعیت'),
+        ),
+    ]
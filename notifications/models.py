@@ -1,10 +1,24 @@
 # notifications/models.py
+# version: 1.5.0
+# FEATURE: OutgoingSms - queued text messages, sent in coalesced batches by notifications/sms.py.
+# FEATURE: OutboxEvent - notification events written in the booking's transaction and
+#          delivered after commit by notifications/outbox.py.
+# FIX: SmsSettings.username / password - the provider credentials sent by notifications/sms.py.
+# FIX: OutgoingSms 'sending' status with lease_until - rows claimed by a flush while their
+#      batch is sent outside any transaction.
+# FIX: OutboxEvent 'processing' status - events claimed by a drain; next_attempt_at is then
+#      the end of the claim's lease.
+# FIX: OutgoingSms 'unknown' status - batches the provider may have delivered (5xx, read
+#      errors); never re-sent automatically, only after a manual review.
 
 from django.db import models
+from django.utils import timezone
 
 class SmsSettings(models.Model):
     provider_name = models.CharField(max_length=100, default="فراز اس‌ام‌اس", verbose_name="نام سرویس‌دهنده")
     api_key = models.CharField(max_length=255, blank=True, null=True, verbose_name="کلید API")
+    username = models.CharField(max_length=100, blank=True, verbose_name="نام کاربری پنل")
+    password = models.CharField(max_length=255, blank=True, verbose_name="رمز عبور پنل")
     sender_number = models.CharField(max_length=20, blank=True, null=True, verbose_name="شماره خط ارسال‌کننده")
     is_active = models.BooleanField(default=False, help_text="تنها یک کانفیگ می‌تواند فعال باشد.", verbose_name="فعال است؟")
 
@@ -38,3 +52,62 @@ class EmailSettings(models.Model):
         super().save(*args, **kwargs)
 
 
+
+
+class OutgoingSms(models.Model):
+    STATUS_CHOICES = (
+        ('queued', 'در صف ارسال'),
+        ('sending', 'در حال ارسال'),
+        ('sent', 'ارسال شده'),
+        ('unknown', 'نامشخص (نیازمند بررسی)'),
+        ('failed', 'ناموفق'),
+    )
+    recipient = models.CharField(max_length=20, verbose_name="شماره گیرنده")
+    message = models.TextField(verbose_name="متن پیام")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued', verbose_name="وضعیت")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="تعداد تلاش")
+    error = models.TextField(blank=True, verbose_name="خطا")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="زمان ثبت")
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name="زمان ارسال")
+    # While 'sending': after this time the claim has expired and another flush may retry it.
+    lease_until = models.DateTimeField(null=True, blank=True, verbose_name="مهلت ارسال")
+
+    class Meta:
+        verbose_name = "پیامک ارسالی"
+        verbose_name_plural = "پیامک‌های ارسالی"
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'id'])]
+
+    def __str__(self):
+        return f"{self.recipient}: {self.get_status_display()}"
+
+
+class OutboxEvent(models.Model):
+    EVENT_CHOICES = (
+        ('booking_confirmed', 'تایید رزرو'),
+    )
+    STATUS_CHOICES = (
+        ('pending', 'در انتظار ارسال'),
+        ('processing', 'در حال ارسال'),
+        ('sent', 'ارسال شده'),
+        ('failed', 'ناموفق'),
+    )
+    booking = models.ForeignKey('reservations.Booking', on_delete=models.CASCADE, related_name="outbox_events", verbose_name="رزرو")
+    event_type = models.CharField(max_length=30, choices=EVENT_CHOICES, verbose_name="رویداد")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', verbose_name="وضعیت")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="تعداد تلاش")
+    # While 'processing': the end of the drain's lease, after which the event is claimed again.
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name="زمان تلاش بعدی")
+    error = models.TextField(blank=True, verbose_name="خطا")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="زمان ثبت")
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name="زمان ارسال")
+
+    class Meta:
+        verbose_name = "رویداد اطلاع‌رسانی"
+        verbose_name_plural = "صف اطلاع‌رسانی‌ها"
+        ordering = ['-created_at']
+        constraints = [models.UniqueConstraint(fields=['booking', 'event_type'], name='unique_outbox_event_per_booking')]
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
+    def __str__(self):
+        return f"{self.get_event_type_display()} - {self.booking_id}"
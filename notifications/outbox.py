@@ -0,0 +1,136 @@
+# notifications/outbox.py
+# version: 1.1.0
+# FEATURE: Transactional notification outbox.
+#   - record() writes an OutboxEvent in the caller's transaction: one INSERT that is ignored
+#     if the (booking, event type) pair already exists, so each event is delivered once
+#     however often the booking is saved. Nothing else runs on the request path.
+#   - After commit a drain is scheduled (one per DRAIN_WINDOW); beat drains periodically too.
+#   - drain() runs each due event's handler in its own savepoint. A failed event is retried
+#     with exponential backoff (RETRY_BASE_DELAY * 2^attempts) and given up after MAX_ATTEMPTS.
+# FIX: drain() claims the due events ('processing' with a lease) and commits before any
+#      delivery. A handler sends outside any transaction and returns its database follow-up,
+#      committed with the event's 'sent' mark in one short transaction, so a failed commit of
+#      other events can no longer re-send emails that were already delivered.
+
+import datetime
+import logging
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core import reference
+from reservations.models import Booking, BookingRoom, Guest
+from . import mailer, sms
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+DRAIN_SCHEDULED_KEY = 'notifications:outbox:drain-scheduled'
+DRAIN_WINDOW = 1  # seconds
+DRAIN_BATCH = 200
+MAX_ATTEMPTS = 8
+RETRY_BASE_DELAY = datetime.timedelta(seconds=30)
+# A claimed event not finished within this time (a crashed worker) is delivered again.
+DELIVERY_LEASE = datetime.timedelta(minutes=5)
+
+
+def record(booking_id, event_type):
+    OutboxEvent.objects.bulk_create([OutboxEvent(booking_id=booking_id, event_type=event_type)], ignore_conflicts=True)
+    transaction.on_commit(schedule_drain)
+
+
+def schedule_drain():
+    from .tasks import drain_outbox_task
+
+    if cache.add(DRAIN_SCHEDULED_KEY, True, DRAIN_WINDOW):
+        try:
+            drain_outbox_task.apply_async(countdown=DRAIN_WINDOW)
+        except Exception as e:
+            # The events are committed; the periodic drain delivers them.
+            logger.warning("Could not schedule the outbox drain: %s", e)
+
+
+# ==============================================================================
+# HANDLERS
+# ==============================================================================
+# A handler does the external delivery outside any transaction and returns a callable
+# (or None) with its database writes; drain() runs it in the transaction that marks the
+# event sent.
+
+def booking_confirmed(booking_id):
+    """Confirmation SMS to the first guest and the PDF email to the booking user."""
+    from .tasks import booking_confirmation_email
+
+    booking = Booking.objects.select_related('user').get(pk=booking_id)
+    phone_number = Guest.objects.filter(booking_id=booking_id).order_by('id').values_list('phone_number', flat=True).first()
+    message = None
+    if phone_number:
+        hotel_name = BookingRoom.objects.filter(booking_id=booking_id).order_by('id').values_list(
+            'room_type__hotel__name', flat=True).first() or ""
+        site_settings = reference.site_settings()
+        site_name = site_settings.site_name if site_settings else "سامانه رزرواسیون"
+        message = f"رزرو شما با کد {booking.booking_code} در هتل {hotel_name} تایید شد. {site_name}"
+
+    settings = mailer.email_settings()
+    if settings and booking.user and booking.user.email:
+        mailer.send_messages([booking_confirmation_email(booking, settings, 'confirmed')], settings)
+    elif not phone_number:
+        logger.warning(f"Booking {booking.booking_code} confirmed but has no guest phone or user email.")
+
+    def finish():
+        if message:
+            sms.queue(phone_number, message)
+        Booking.objects.filter(pk=booking_id).update(notification_sent=True)
+    return finish
+
+
+HANDLERS = {
+    'booking_confirmed': booking_confirmed,
+}
+
+
+# ==============================================================================
+# DRAIN
+# ==============================================================================
+
+def _claim(now, limit):
+    """Marks up to limit due events (or expired claims) as 'processing' and commits."""
+    with transaction.atomic():
+        events = list(OutboxEvent.objects.select_for_update(skip_locked=True).filter(
+            status__in=('pending', 'processing'), next_attempt_at__lte=now).order_by(
+            'next_attempt_at', 'id').values_list('id', 'booking_id', 'event_type', 'attempts')[:limit])
+        OutboxEvent.objects.filter(id__in=[event[0] for event in events]).update(
+            status='processing', next_attempt_at=now + DELIVERY_LEASE, attempts=F('attempts') + 1)
+    return events
+
+
+def drain(limit=DRAIN_BATCH):
+    """
+    Delivers up to limit due events. Returns (delivered, failed, more): failed events are
+    rescheduled; more is True when due events may remain.
+    Events are claimed and committed first; each one is then delivered with no transaction
+    open and marked sent in its own short transaction.
+    """
+    events = _claim(timezone.now(), limit)
+    delivered = failed = 0
+    for event_id, booking_id, event_type, attempts in events:
+        attempts += 1
+        try:
+            finish = HANDLERS[event_type](booking_id)
+            with transaction.atomic():
+                if finish:
+                    finish()
+                OutboxEvent.objects.filter(pk=event_id, status='processing').update(
+                    status='sent', sent_at=timezone.now())
+            delivered += 1
+        except Exception as e:
+            logger.warning("Outbox event %s (%s, booking %s) failed: %s", event_id, event_type, booking_id, e)
+            failed += 1
+            OutboxEvent.objects.filter(pk=event_id, status='processing').update(
+                error=str(e),
+                status='failed' if attempts >= MAX_ATTEMPTS else 'pending',
+                next_attempt_at=timezone.now() + RETRY_BASE_DELAY * 2 ** (attempts - 1),
+            )
+    return delivered, failed, len(events) == limit
@@ -0,0 +1,188 @@
+# notifications/sms.py
+# version: 1.2.0
+# FEATURE: Batched SMS dispatch.
+#   - queue() / queue_many() store messages as OutgoingSms rows in the caller's transaction
+#     and, after commit, schedule one flush per COALESCE_WINDOW seconds.
+#   - flush() sends the queued messages grouped by text through the provider's
+#     multi-recipient request (up to MAX_RECIPIENTS numbers each), over a pooled
+#     requests.Session that retries transient errors with exponential backoff.
+#   - A batch the provider did not accept stays queued for the periodic flush, up to MAX_ATTEMPTS.
+# FIX: A broker error while scheduling the flush no longer fails the committed request.
+# FIX: Requests carry the panel credentials from SmsSettings instead of placeholders.
+# FIX: Only failures where the provider cannot have accepted the send are retried
+#      (connection errors, 429); a 5xx or read timeout on the POST may have been delivered.
+# FIX: flush() claims its rows in a short transaction ('sending' with a lease), sends with
+#      no transaction or row locks held, then records each batch's result.
+# FIX: A failed batch is requeued only when it cannot have been delivered (no connection,
+#      429). After a 5xx or a read error it is marked 'unknown' for manual review instead of
+#      being re-sent by a later flush; other 4xx rejections are marked 'failed'.
+
+import datetime
+import logging
+import threading
+from collections import defaultdict
+
+import requests
+from django.conf import settings as django_settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from urllib3.util.retry import Retry
+
+from core import reference
+from .models import OutgoingSms, SmsSettings
+
+logger = logging.getLogger(__name__)
+
+FLUSH_SCHEDULED_KEY = 'notifications:sms:flush-scheduled'
+COALESCE_WINDOW = 2  # seconds
+MAX_RECIPIENTS = 100
+FLUSH_BATCH = 1000
+MAX_ATTEMPTS = 5
+REQUEST_TIMEOUT = 10
+# A claimed batch not recorded within this time (a crashed worker) is sent again.
+SEND_LEASE = datetime.timedelta(minutes=5)
+
+_pool = {'session': None}
+_lock = threading.Lock()
+
+
+@reference.dataset
+def sms_settings():
+    return SmsSettings.objects.filter(is_active=True).first()
+
+
+def session():
+    """
+    The process's requests.Session: keep-alive connections, retries with backoff.
+    The send is a POST and not idempotent, so only requests the provider did not accept are
+    retried: connection failures and 429. Read errors and 5xx are never retried (see flush()).
+    """
+    if _pool['session'] is None:
+        with _lock:
+            if _pool['session'] is None:
+                retry = Retry(total=3, connect=3, read=0, status=3, other=0, backoff_factor=0.5,
+                              status_forcelist=(429,), allowed_methods=frozenset({'POST'}))
+                adapter = HTTPAdapter(max_retries=retry, pool_maxsize=10)
+                pooled = requests.Session()
+                pooled.mount('http://', adapter)
+                pooled.mount('https://', adapter)
+                _pool['session'] = pooled
+    return _pool['session']
+
+
+def queue(recipient, message):
+    return queue_many([(recipient, message)])
+
+
+def queue_many(messages):
+    """Queues (recipient, message) pairs; they are sent together shortly after commit."""
+    rows = OutgoingSms.objects.bulk_create(
+        [OutgoingSms(recipient=recipient, message=message) for recipient, message in messages if recipient])
+    if rows:
+        transaction.on_commit(schedule_flush)
+    return len(rows)
+
+
+def schedule_flush():
+    """One delayed flush per window, however many messages are queued meanwhile."""
+    from .tasks import flush_sms_task
+
+    if cache.add(FLUSH_SCHEDULED_KEY, True, COALESCE_WINDOW):
+        try:
+            flush_sms_task.apply_async(countdown=COALESCE_WINDOW)
+        except Exception as e:
+            # The messages are committed; the periodic flush sends them.
+            logger.warning("Could not schedule the SMS flush: %s", e)
+
+
+def send_to_provider(settings, message, recipients):
+    """One multi-recipient request; raises requests.RequestException on failure."""
+    url = getattr(django_settings, 'SMS_PROVIDER_URL', '')
+    if not url:
+        # No provider configured (development): only log the send.
+        print(f"Simulating SMS send to {recipients}: '{message}'")
+        return
+    payload = {
+        "op": "send",
+        "uname": settings.username,
+        "pass": settings.password,
+        "message": message,
+        "from": settings.sender_number,
+        "to": recipients,
+    }
+    response = session().post(url, json=payload, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+
+
+def _outcome(error):
+    """
+    Status of a batch whose request failed: 'queued' when the provider cannot have accepted
+    it (no connection, rate limited), 'failed' when it rejected it, 'unknown' when it may
+    have delivered it (5xx, the connection lost after the request was sent, read timeout).
+    """
+    if isinstance(error, (requests.ConnectTimeout, requests.exceptions.RetryError)):
+        return 'queued'  # RetryError: 429 until the session's retries ran out
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        if status == 429:
+            return 'queued'
+        return 'failed' if 400 <= status < 500 else 'unknown'
+    if isinstance(error, requests.ConnectionError) and not isinstance(error, requests.ReadTimeout):
+        reason = error.args[0] if error.args else None
+        if isinstance(getattr(reason, 'reason', reason), NewConnectionError):
+            return 'queued'
+    return 'unknown'
+
+
+def _claim(now):
+    """Marks up to FLUSH_BATCH queued (or expired) rows as 'sending' and commits."""
+    with transaction.atomic():
+        rows = list(OutgoingSms.objects.select_for_update(skip_locked=True).filter(
+            Q(status='queued') | Q(status='sending', lease_until__lt=now)).order_by(
+            'id').values_list('id', 'recipient', 'message')[:FLUSH_BATCH])
+        OutgoingSms.objects.filter(id__in=[sms_id for sms_id, _, _ in rows]).update(
+            status='sending', lease_until=now + SEND_LEASE, attempts=F('attempts') + 1)
+    return rows
+
+
+def flush(settings=None):
+    """
+    Sends up to FLUSH_BATCH queued messages. Returns (sent, failed, more); more is True when
+    queued messages remain. A failed batch stays queued (until MAX_ATTEMPTS) only if it was
+    not delivered; one that may have been is marked 'unknown' and never re-sent (_outcome).
+    The rows are claimed and committed first, so no transaction is open during the requests.
+    """
+    settings = settings or sms_settings()
+    if not settings or not settings.username or not settings.password:
+        print("خطا: تنظیمات فعال پیامک یا نام کاربری و رمز عبور پنل یافت نشد.")
+        return 0, 0, False
+
+    rows = _claim(timezone.now())
+    by_message = defaultdict(list)
+    for sms_id, recipient, message in rows:
+        by_message[message].append((sms_id, recipient))
+
+    sent = failed = 0
+    for message, items in by_message.items():
+        for start in range(0, len(items), MAX_RECIPIENTS):
+            chunk = items[start:start + MAX_RECIPIENTS]
+            sms_ids = [sms_id for sms_id, _ in chunk]
+            try:
+                send_to_provider(settings, message, [recipient for _, recipient in chunk])
+            except requests.RequestException as e:
+                outcome = _outcome(e)
+                logger.warning("SMS batch of %s recipients failed (%s): %s", len(chunk), outcome, e)
+                failed += len(chunk)
+                if outcome == 'queued':
+                    outcome = Case(When(attempts__gte=MAX_ATTEMPTS, then=Value('failed')), default=Value('queued'))
+                OutgoingSms.objects.filter(id__in=sms_ids, status='sending').update(
+                    error=str(e), lease_until=None, status=outcome)
+            else:
+                sent += len(chunk)
+                OutgoingSms.objects.filter(id__in=sms_ids, status='sending').update(
+                    status='sent', sent_at=timezone.now(), lease_until=None)
+    return sent, failed, len(rows) == FLUSH_BATCH and not failed
@@ -0,0 +1,166 @@
+# notifications/stubs.py
+# version: 1.2.0
+# FEATURE: Local stand-in servers for tests and benchmarks (no third-party packages needed).
+#   - StubSMTPServer: a minimal threaded SMTP server that accepts every message and counts
+#     connections, so connection reuse and reconnects can be observed.
+#   - StubSMSProvider: an HTTP endpoint accepting the provider's multi-recipient send; it
+#     records each request and can fail the next ones to exercise retries.
+# FEATURE: StubSMSProvider.fail_next() takes the status code to answer with (429, 503, ...).
+
+import json
+import socket
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, *lines):
+        self.wfile.write(''.join(f"{line}\r\n" for line in lines).encode())
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+            server.sockets.add(self.connection)
+        try:
+            self.reply("220 stub ESMTP")
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    break
+                command = line.split(b' ', 1)[0].strip().upper()
+                if command == b'EHLO':
+                    self.reply("250-stub", "250-8BITMIME", "250 SMTPUTF8")
+                elif command in (b'HELO', b'MAIL', b'RCPT', b'RSET', b'NOOP'):
+                    self.reply("250 OK")
+                elif command == b'DATA':
+                    self.reply("354 End data with <CR><LF>.<CR><LF>")
+                    data = []
+                    for data_line in iter(self.rfile.readline, b''):
+                        if data_line == b'.\r\n':
+                            break
+                        data.append(data_line)
+                    with server.lock:
+                        server.messages.append(b''.join(data))
+                    self.reply("250 OK")
+                elif command == b'QUIT':
+                    self.reply("221 Bye")
+                    break
+                else:
+                    self.reply("502 Command not implemented")
+        except OSError:
+            pass  # dropped by drop_connections()
+        finally:
+            with server.lock:
+                server.sockets.discard(self.connection)
+
+
+class StubSMTPServer(socketserver.ThreadingTCPServer):
+    """
+    Usage: server = StubSMTPServer().start(); ... server.port ...; server.stop()
+    server.connections: connections accepted so far; server.messages: raw message bytes.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0):
+        super().__init__((host, port), _SMTPHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = []
+        self.sockets = set()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.drop_connections()
+        self.server_close()
+
+    def drop_connections(self):
+        """Closes every open client connection, like a server dropping idle sessions."""
+        with self.lock:
+            sockets = list(self.sockets)
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class _SMSHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real provider
+    # One write per response: separate header / body segments stall keep-alive clients on
+    # delayed ACKs.
+    wbufsize = 64 * 1024
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        with server.lock:
+            server.requests += 1
+            failing = server.failures > 0
+            if failing:
+                server.failures -= 1
+                failure_status = server.failure_status
+            else:
+                server.payloads.append(payload)
+        if server.latency:
+            time.sleep(server.latency)
+        body = json.dumps({'status': 'error' if failing else 'OK'}).encode()
+        self.send_response(failure_status if failing else 200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubSMSProvider(ThreadingHTTPServer):
+    """
+    Usage: provider = StubSMSProvider().start(); ... provider.url ...; provider.stop()
+    provider.payloads: accepted send requests; provider.requests: all requests, failed included.
+    fail_next(n, status): answers the next n requests with status. latency: seconds added per request.
+    """
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0):
+        super().__init__((host, port), _SMSHandler)
+        self.lock = threading.Lock()
+        self.latency = latency
+        self.requests = 0
+        self.failures = 0
+        self.failure_status = 503
+        self.payloads = []
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}/api/select"
+
+    @property
+    def recipients(self):
+        return [recipient for payload in self.payloads for recipient in payload['to']]
+
+    def fail_next(self, count, status=503):
+        with self.lock:
+            self.failures, self.failure_status = count, status
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
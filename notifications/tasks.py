@@ -1,54 +1,57 @@
 # notifications/tasks.py
-# version: 1.0.0
+# version: 1.3.0
+# PERF: Emails go through notifications.mailer: the active settings are cached and every
+#       email of a worker shares one pooled SMTP connection instead of opening its own.
+# FEATURE: send_email_batch_task - many emails in one SMTP session.
+# FIX: The confirmation email is sent to the booking user's email (Booking has no 'guest').
+# PERF: SMS are queued and sent in coalesced multi-recipient batches (notifications/sms.py).
+# FEATURE: drain_outbox_task delivers the notification outbox (notifications/outbox.py);
+#          booking_confirmation_email() is shared with it.
 
 from celery import shared_task
-from django.core.mail import send_mail, get_connection, EmailMessage
+from django.core.mail import EmailMessage, EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.utils.translation import gettext_lazy as _
-import requests
 
-from .models import EmailSettings, SmsSettings
+from . import mailer, outbox, sms
 # Import models and utils needed for confirmation task
 from reservations.models import Booking
 from reservations.pdf_utils import generate_booking_confirmation_pdf
 
 
+def _build_email(settings, subject, text_content, html_template_name, recipient_list, context):
+    # رندر کردن قالب HTML ایمیل با داده‌های داینامیک
+    email = EmailMultiAlternatives(subject=subject, body=text_content, from_email=settings.username, to=recipient_list)
+    email.attach_alternative(render_to_string(html_template_name, context), 'text/html')
+    return email
+
+
 @shared_task
 def send_email_task(subject, text_content, html_template_name, recipient_list, context):
     """
     تسک Celery برای ارسال ایمیل با استفاده از تنظیمات ذخیره شده در دیتابیس.
     """
+    return send_email_batch_task([{
+        'subject': subject, 'text_content': text_content, 'html_template_name': html_template_name,
+        'recipient_list': recipient_list, 'context': context,
+    }])
+
+
+@shared_task
+def send_email_batch_task(emails):
+    """
+    Sends many emails (dicts with send_email_task's arguments) in one SMTP session of the
+    worker's pooled connection.
+    """
     try:
         # پیدا کردن تنظیمات فعال ایمیل
-        settings = EmailSettings.objects.filter(is_active=True).first()
+        settings = mailer.email_settings()
         if not settings:
             print("خطا: هیچ تنظیمات ایمیل فعالی پیدا نشد.")
             return "Failed: No active email settings."
 
-        # ساخت یک اتصال ایمیل سفارشی بر اساس تنظیمات دیتابیس
-        connection = get_connection(
-            host=settings.host,
-            port=settings.port,
-            username=settings.username,
-            password=settings.password,
-            use_tls=settings.use_tls,
-            use_ssl=settings.use_ssl
-        )
-
-        # رندر کردن قالب HTML ایمیل با داده‌های داینامیک
-        html_content = render_to_string(html_template_name, context)
-
-        # ارسال ایمیل
-        send_mail(
-            subject=subject,
-            message=text_content,
-            from_email=settings.username,
-            recipient_list=recipient_list,
-            html_message=html_content,
-            connection=connection, # استفاده از اتصال سفارشی
-            fail_silently=False,
-        )
-        return f"Email sent successfully to {recipient_list}"
+        sent = mailer.send_messages([_build_email(settings, **email) for email in emails], settings)
+        return f"{sent} emails sent successfully to {[email['recipient_list'] for email in emails]}"
     except Exception as e:
         # در صورت بروز خطا، آن را لاگ می‌گیریم تا بعدا بررسی شود
         print(f"Error sending email: {e}")
@@ -58,37 +61,57 @@ def send_email_task(subject, text_content, html_template_name, recipient_list, c
 @shared_task
 def send_sms_task(recipient_number, message):
     """
-    تسک Celery برای ارسال پیامک با استفاده از API فراز اس‌ام‌اس.
+    تسک Celery برای ارسال پیامک: پیام در صف قرار می‌گیرد و همراه پیام‌های هم‌زمان ارسال می‌شود.
     """
-    try:
-        settings = SmsSettings.objects.filter(is_active=True).first()
-        if not settings or not settings.api_key:
-            print("خطا: تنظیمات فعال پیامک یا کلید API یافت نشد.")
-            return "Failed: No active SMS settings or API key."
-
-        url = "http://ippanel.com/api/select"
-        payload = {
-            "op": "send",
-            "uname": "YOUR_USERNAME", # نام کاربری پنل فراز اس‌ام‌اس
-            "pass": "YOUR_PASSWORD", # رمز عبور پنل فراز اس‌ام‌اس
-            "message": message,
-            "from": settings.sender_number,
-            "to": [recipient_number],
-        }
-        headers = {
-            'Content-Type': 'application/json'
-        }
-
-        # response = requests.post(url, json=payload, headers=headers)
-        # response.raise_for_status() # اگر خطا بود، Exception ایجاد می‌کند
-
-        # برای تست، درخواست واقعی را کامنت می‌کنیم و یک پیام موفقیت چاپ می‌کنیم
-        print(f"Simulating SMS send to {recipient_number}: '{message}'")
-        return f"SMS sent successfully to {recipient_number}"
+    sms.queue(recipient_number, message)
+    return f"SMS queued for {recipient_number}"
 
-    except Exception as e:
-        print(f"Error sending SMS: {e}")
-        return f"Failed to send SMS: {e}"
+
+@shared_task
+def flush_sms_task():
+    """Sends the queued SMS in batches (scheduled by sms.queue() and periodically by beat)."""
+    sent, failed, more = sms.flush()
+    if more:
+        flush_sms_task.delay()
+    return f"SMS sent: {sent}, failed: {failed}"
+
+
+def booking_confirmation_email(booking, settings, email_type='initial'):
+    """The confirmation email of a booking with its PDF attached (to the booking user's email)."""
+    # Generate the PDF in memory
+    pdf_bytes = generate_booking_confirmation_pdf(booking)
+
+    # Determine email subject based on type
+    if email_type == 'payment':
+        subject = _(f"تاییدیه پرداخت رزرو شما: {booking.booking_code}")
+    elif email_type == 'final':
+        subject = _(f"رزرو شما نهایی شد: {booking.booking_code}")
+    else: # 'initial'
+        subject = _(f"تاییدیه رزرو اولیه: {booking.booking_code}")
+
+    # Render email body (using the existing template from your project)
+    context = {'booking': booking, 'email_type': email_type}
+    html_content = render_to_string(
+        'notifications/email/booking_confrimation.html', 
+        context
+    )
+
+    # Create EmailMessage to support attachments
+    email = EmailMessage(
+        subject=subject,
+        body=html_content,
+        from_email=settings.username,
+        to=[booking.user.email],
+    )
+    email.content_subtype = "html"  # Set email body as HTML
+
+    # Attach the generated PDF
+    email.attach(
+        f'booking_confirmation_{booking.booking_code}.pdf', 
+        pdf_bytes, 
+        'application/pdf'
+    )
+    return email
 
 
 @shared_task
@@ -99,69 +122,40 @@ def send_booking_confirmation_email_task(booking_id: int, email_type: str = 'ini
     """
     try:
         # Get active email settings
-        settings = EmailSettings.objects.filter(is_active=True).first()
+        settings = mailer.email_settings()
         if not settings:
             print(f"Error: No active email settings found for booking {booking_id}.")
             return f"Failed: No active email settings."
 
         # Get booking object
         try:
-            booking = Booking.objects.get(id=booking_id)
+            booking = Booking.objects.select_related('user').get(id=booking_id)
         except Booking.DoesNotExist:
             print(f"Error: Booking with id {booking_id} does not exist.")
             return f"Failed: Booking not found."
 
-        # Generate the PDF in memory
-        pdf_bytes = generate_booking_confirmation_pdf(booking)
-
-        # Determine email subject based on type
-        if email_type == 'payment':
-            subject = _(f"تاییدیه پرداخت رزرو شما: {booking.booking_code}")
-        elif email_type == 'final':
-            subject = _(f"رزرو شما نهایی شد: {booking.booking_code}")
-        else: # 'initial'
-            subject = _(f"تاییدیه رزرو اولیه: {booking.booking_code}")
-
-        # Render email body (using the existing template from your project)
-        context = {'booking': booking, 'email_type': email_type}
-        html_content = render_to_string(
-            'notifications/email/booking_confrimation.html', 
-            context
-        )
-        
-        # Get custom email connection
-        connection = get_connection(
-            host=settings.host,
-            port=settings.port,
-            username=settings.username,
-            password=settings.password,
-            use_tls=settings.use_tls,
-            use_ssl=settings.use_ssl
-        )
-
-        # Create EmailMessage to support attachments
-        email = EmailMessage(
-            subject=subject,
-            body=html_content,
-            from_email=settings.username,
-            to=[booking.guest.email], # Send to the guest's email
-            connection=connection
-        )
-        email.content_subtype = "html"  # Set email body as HTML
-
-        # Attach the generated PDF
-        email.attach(
-            f'booking_confirmation_{booking.booking_code}.pdf', 
-            pdf_bytes, 
-            'application/pdf'
-        )
-
-        # Send the email
-        email.send(fail_silently=False)
-        
-        return f"Confirmation PDF email sent successfully to {booking.guest.email}"
+        recipient = booking.user.email if booking.user else None
+        if not recipient:
+            print(f"Error: Booking {booking_id} has no recipient email.")
+            return f"Failed: No recipient email."
+
+        email = booking_confirmation_email(booking, settings, email_type)
+
+        # Send the email through the pooled connection
+        mailer.send_messages([email], settings)
+
+        return f"Confirmation PDF email sent successfully to {recipient}"
 
     except Exception as e:
         print(f"Error sending confirmation email for booking {booking_id}: {e}")
         # Add retry logic if needed
         return f"Failed to send confirmation email: {e}"
+
+
+@shared_task
+def drain_outbox_task():
+    """Delivers due outbox events (scheduled after each commit and periodically by beat)."""
+    delivered, failed, more = outbox.drain()
+    if more:
+        drain_outbox_task.delay()
+    return f"Outbox delivered: {delivered}, failed: {failed}"
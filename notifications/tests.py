@@ -1,3 +1,195 @@
-from django.test import TestCase
+# notifications/tests.py
+# version: 1.4.0
+# FEATURE: Tests for the pooled SMTP mailer against the local stub server.
+# FEATURE: Tests for the batched SMS dispatch against the local stub provider.
+# FEATURE: Tests for the transactional notification outbox.
+# FIX: SMS tests cover the credentials, the retry policy (429 only) and the claimed 'sending' rows.
+# FIX: Outbox tests cover events claimed ('processing') during delivery and expired claims.
+# FIX: SMS batches that may have been delivered (5xx) are marked 'unknown', not re-sent.
 
-# Create your tests here.
+from datetime import timedelta
+from unittest import mock
+
+import requests
+import urllib3
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from jdatetime import date as jdate
+
+from core.models import CustomUser
+from hotels.models import BoardType, City, Hotel, RoomType
+from reservations.models import Booking, BookingRoom, Guest
+from . import mailer, outbox, sms, tasks
+from .models import EmailSettings, OutboxEvent, OutgoingSms, SmsSettings
+from .stubs import StubSMSProvider, StubSMTPServer
+from .tasks import send_email_batch_task, send_email_task
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend')
+class PooledMailerTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.server = StubSMTPServer().start()
+        self.addCleanup(self.server.stop)
+        self.addCleanup(mailer.close)
+        self.settings = EmailSettings.objects.create(
+            provider_name="stub", host='127.0.0.1', port=self.server.port,
+            username='noreply@example.com', password='', use_tls=False, is_active=True,
+        )
+
+    def email(self, recipient):
+        return {'subject': "تاییدیه", 'text_content': "رزرو شما ثبت شد.",
+                'html_template_name': 'notifications/email/booking_confrimation.html',
+                'recipient_list': [recipient], 'context': {}}
+
+    def test_emails_share_one_connection_and_reconnect_when_dropped(self):
+        send_email_batch_task([self.email(f'guest{i}@example.com') for i in range(3)])
+        with self.assertNumQueries(0):  # settings come from the reference cache
+            send_email_task(**self.email('guest3@example.com'))
+        self.assertEqual((len(self.server.messages), self.server.connections), (4, 1))
+
+        self.server.drop_connections()
+        self.assertTrue(send_email_task(**self.email('guest4@example.com')).startswith("1 emails sent"))
+        self.assertEqual((len(self.server.messages), self.server.connections), (5, 2))
+
+        # New settings (a reference version bump) replace the pooled connection.
+        self.settings.provider_name = "stub 2"
+        self.settings.save()
+        send_email_task(**self.email('guest5@example.com'))
+        self.assertEqual((len(self.server.messages), self.server.connections), (6, 3))
+
+
+class SmsDispatchTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.provider = StubSMSProvider().start()
+        self.addCleanup(self.provider.stop)
+        SmsSettings.objects.create(username='panel-user', password='panel-pass', sender_number='3000', is_active=True)
+        override = override_settings(SMS_PROVIDER_URL=self.provider.url)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_queued_messages_are_coalesced_into_one_flush(self):
+        with mock.patch.object(tasks.flush_sms_task, 'apply_async') as apply_async, \
+                self.captureOnCommitCallbacks(execute=True):
+            sms.queue_many([(f'0912000004{i}', "کد تخفیف شما: NOROOZ") for i in range(3)])
+            tasks.send_sms_task('09120000045', "رزرو شما تایید شد.")
+        apply_async.assert_called_once_with(countdown=sms.COALESCE_WINDOW)
+
+        self.provider.fail_next(1, status=429)  # not accepted, so retried by the session
+        self.assertEqual(sms.flush(), (4, 0, False))
+        self.assertEqual((len(self.provider.payloads), self.provider.requests), (2, 3))
+        self.assertEqual(sorted(self.provider.recipients), [f'0912000004{i}' for i in (0, 1, 2, 5)])
+        self.assertEqual({(p['uname'], p['pass']) for p in self.provider.payloads}, {('panel-user', 'panel-pass')})
+        self.assertEqual(OutgoingSms.objects.filter(status='sent').count(), 4)
+
+    def test_server_errors_are_never_sent_again(self):
+        with mock.patch.object(sms, 'schedule_flush'):
+            sms.queue('09120000047', "رزرو شما تایید شد.")
+        self.provider.fail_next(1, status=500)  # the POST may have been delivered
+        self.assertEqual(sms.flush(), (0, 1, False))
+        self.assertEqual(sms.flush(), (0, 0, False))
+        self.assertEqual(self.provider.requests, 1)
+        self.assertEqual(OutgoingSms.objects.values_list('status', 'attempts').get(), ('unknown', 1))
+
+    def test_failures_are_requeued_only_when_not_delivered(self):
+        response = requests.Response()
+        for error, outcome in (
+                (requests.ConnectionError(urllib3.exceptions.MaxRetryError(
+                    None, '/', urllib3.exceptions.NewConnectionError(None, "refused"))), 'queued'),
+                (requests.ConnectionError(urllib3.exceptions.ProtocolError("Connection aborted.")), 'unknown'),
+                (requests.ReadTimeout("read timed out"), 'unknown')):
+            self.assertEqual(sms._outcome(error), outcome)
+        for status, outcome in ((429, 'queued'), (400, 'failed'), (502, 'unknown')):
+            response.status_code = status
+            self.assertEqual(sms._outcome(requests.HTTPError(response=response)), outcome)
+
+    def test_rows_are_claimed_while_sent_and_expired_claims_are_retried(self):
+        with mock.patch.object(sms, 'schedule_flush'):
+            sms.queue('09120000048', "رزرو شما تایید شد.")
+
+        def send(settings, message, recipients):
+            self.assertEqual(OutgoingSms.objects.values_list('status', flat=True).get(), 'sending')
+            # A concurrent flush finds nothing to send.
+            self.assertEqual(sms._claim(timezone.now()), [])
+
+        with mock.patch.object(sms, 'send_to_provider', side_effect=send):
+            self.assertEqual(sms.flush(), (1, 0, False))
+
+        # A worker that died after claiming: the row is sent again once its lease expires.
+        OutgoingSms.objects.update(status='sending', lease_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(sms.flush(), (1, 0, False))
+        self.assertEqual(OutgoingSms.objects.values_list('status', 'attempts').get(), ('sent', 2))
+
+    def test_failed_batches_stay_queued_until_max_attempts(self):
+        with mock.patch.object(sms, 'schedule_flush'):
+            sms.queue('09120000046', "رزرو شما تایید شد.")
+        with mock.patch.object(sms, 'send_to_provider', side_effect=requests.ConnectTimeout("down")):
+            self.assertEqual(sms.flush(), (0, 1, False))
+            self.assertEqual(OutgoingSms.objects.values_list('status', 'attempts').get(), ('queued', 1))
+            OutgoingSms.objects.update(attempts=sms.MAX_ATTEMPTS - 1)
+            sms.flush()
+        self.assertEqual(OutgoingSms.objects.values_list('status', 'error').get(), ('failed', "down"))
+
+
+class NotificationOutboxTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        user = CustomUser.objects.create_user(username='outbox', password='password', mobile='09120000051')
+        city = City.objects.create(name="Outbox City", slug='outbox-city')
+        hotel = Hotel.objects.create(name="Outbox Hotel", slug='outbox-hotel', city=city, stars=3)
+        room_type = RoomType.objects.create(hotel=hotel, name="Single", code='SGL-OUT', base_capacity=1, price_per_night=500)
+        self.booking = Booking.objects.create(booking_code='51000001', user=user, check_in=jdate(1404, 7, 10),
+                                              check_out=jdate(1404, 7, 12), total_price=1000)
+        BookingRoom.objects.create(booking=self.booking, room_type=room_type,
+                                   board_type=BoardType.objects.create(name="Room Only", code='RO-OUT'))
+        Guest.objects.create(booking=self.booking, first_name="Sara", phone_number='09120000052')
+
+    def test_confirmation_is_recorded_once_in_the_transaction_and_drained_after_commit(self):
+        self.booking.status = 'confirmed'
+        with mock.patch.object(tasks.drain_outbox_task, 'apply_async') as apply_async, \
+                self.captureOnCommitCallbacks(execute=True):
+            # The agency rollup's pre_save SELECT, the booking UPDATE and the outbox INSERT.
+            with self.assertNumQueries(3):
+                self.booking.save()
+            self.booking.save()
+        apply_async.assert_called_once_with(countdown=outbox.DRAIN_WINDOW)
+        self.assertEqual(OutboxEvent.objects.filter(booking=self.booking, status='pending').count(), 1)
+
+        with mock.patch.object(sms, 'schedule_flush'):
+            self.assertEqual(outbox.drain(), (1, 0, False))
+        self.assertIn("Outbox Hotel", OutgoingSms.objects.get(recipient='09120000052').message)
+        self.assertEqual(OutboxEvent.objects.get().status, 'sent')
+        self.assertTrue(Booking.objects.get(pk=self.booking.pk).notification_sent)
+
+    def test_failed_events_are_retried_with_backoff(self):
+        outbox.record(self.booking.pk, 'booking_confirmed')
+        with mock.patch.dict(outbox.HANDLERS, {'booking_confirmed': mock.Mock(side_effect=RuntimeError("smtp down"))}):
+            self.assertEqual(outbox.drain(), (0, 1, False))
+            event = OutboxEvent.objects.get()
+            self.assertEqual((event.status, event.attempts, event.error), ('pending', 1, "smtp down"))
+            self.assertGreater(event.next_attempt_at, timezone.now() + outbox.RETRY_BASE_DELAY - timedelta(seconds=5))
+            self.assertEqual(outbox.drain(), (0, 0, False))  # not due yet
+
+            OutboxEvent.objects.update(attempts=outbox.MAX_ATTEMPTS - 1, next_attempt_at=timezone.now())
+            outbox.drain()
+        self.assertEqual(OutboxEvent.objects.get().status, 'failed')
+
+    def test_events_are_claimed_while_delivered_and_expired_claims_are_retried(self):
+        outbox.record(self.booking.pk, 'booking_confirmed')
+
+        def deliver(booking_id):
+            self.assertEqual(OutboxEvent.objects.get().status, 'processing')
+            # A concurrent drain finds nothing to deliver.
+            self.assertEqual(outbox.drain(), (0, 0, False))
+
+        with mock.patch.dict(outbox.HANDLERS, {'booking_confirmed': deliver}):
+            self.assertEqual(outbox.drain(), (1, 0, False))
+            # A worker that died after claiming: delivered again once its lease expires.
+            OutboxEvent.objects.update(status='processing', next_attempt_at=timezone.now() - timedelta(seconds=1))
+            self.assertEqual(outbox.drain(), (1, 0, False))
+        self.assertEqual(OutboxEvent.objects.values_list('status', 'attempts').get(), ('sent', 2))
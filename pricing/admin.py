@@ -1,10 +1,16 @@
 # pricing/admin.py
-# version: 2.1.0
+# version: 2.5.0
 # FIX: Merged duplicate PriceAdmin definitions and added Calendar View link.
+# FEATURE: Range saves are recorded in the inventory change log (changelog.py).
+# FEATURE: RateRangeAdmin - season rates; saves and deletes log the covered cells.
+# FEATURE: BoardRuleAdmin - derived board prices; changes log the derived cells.
+# FIX: Availability / Price deletes log their cells; range and rule deletes are logged by
+#      the post_delete receivers in signals.py.
 
 from django.contrib import admin
-from .models import Availability, Price
-from .forms import AvailabilityRangeForm, PriceRangeForm
+from .models import Availability, Price, RateRange, BoardRule, InventoryChange
+from . import changelog, inventory
+from .forms import AvailabilityRangeForm, PriceRangeForm, RateRangeForm
 from datetime import timedelta
 from django.urls import reverse
 from django.utils.html import format_html
@@ -30,6 +36,7 @@ class AvailabilityAdmin(admin.ModelAdmin):
         room_type = form.cleaned_data['room_type']
         quantity = form.cleaned_data['quantity']
 
+        cells = []
         current_date = start_date
         while current_date <= end_date:
             Availability.objects.update_or_create(
@@ -37,7 +44,18 @@ class AvailabilityAdmin(admin.ModelAdmin):
                 date=current_date,
                 defaults={'quantity': quantity}
             )
+            cells.append((room_type.id, current_date))
             current_date += timedelta(days=1)
+        changelog.record_availability(cells, source='admin')
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        changelog.record_availability([(obj.room_type_id, obj.date)], source='admin')
+
+    def delete_queryset(self, request, queryset):
+        cells = list(queryset.values_list('room_type_id', 'date'))
+        super().delete_queryset(request, queryset)
+        changelog.record_availability(cells, source='admin')
 
 @admin.register(Price)
 class PriceAdmin(admin.ModelAdmin):
@@ -67,6 +85,7 @@ class PriceAdmin(admin.ModelAdmin):
         child_price = form.cleaned_data['child_price']
         board_type = form.cleaned_data['board_type'] 
         
+        cells = []
         current_date = start_date
         while current_date <= end_date:
             Price.objects.update_or_create(
@@ -79,4 +98,62 @@ class PriceAdmin(admin.ModelAdmin):
                     'child_price': child_price,
                 }
             )
+            cells.append((room_type.id, board_type.id, current_date))
             current_date += timedelta(days=1)
+        changelog.record_prices(cells, source='admin')
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        changelog.record_prices([(obj.room_type_id, obj.board_type_id, obj.date)], source='admin')
+
+    def delete_queryset(self, request, queryset):
+        cells = list(queryset.values_list('room_type_id', 'board_type_id', 'date'))
+        super().delete_queryset(request, queryset)
+        changelog.record_prices(cells, source='admin')
+
+
+@admin.register(RateRange)
+class RateRangeAdmin(admin.ModelAdmin):
+    form = RateRangeForm
+    list_display = ('get_hotel_name', 'room_type', 'board_type', 'title', 'start_date', 'end_date', 'price_per_night', 'updated_at')
+    list_filter = ('room_type__hotel', 'board_type')
+    search_fields = ('title', 'room_type__name', 'room_type__hotel__name')
+    autocomplete_fields = ('room_type', 'board_type')
+
+    @admin.display(description='هتل', ordering='room_type__hotel')
+    def get_hotel_name(self, obj):
+        return obj.room_type.hotel.name
+
+    def save_model(self, request, obj, form, change):
+        previous = None
+        if change:
+            previous = RateRange.objects.filter(pk=obj.pk).values_list(
+                'room_type_id', 'board_type_id', 'start_date', 'end_date', 'weekdays').first()
+        super().save_model(request, obj, form, change)
+        inventory.record_rate_range(obj, previous)
+
+
+@admin.register(BoardRule)
+class BoardRuleAdmin(admin.ModelAdmin):
+    list_display = ('board_type', 'base_board_type', 'hotel', 'room_type', 'adult_supplement', 'child_supplement', 'updated_at')
+    list_filter = ('board_type', 'hotel')
+    autocomplete_fields = ('hotel', 'room_type', 'board_type', 'base_board_type')
+
+    def save_model(self, request, obj, form, change):
+        previous = BoardRule.objects.filter(pk=obj.pk).first() if change else None
+        super().save_model(request, obj, form, change)
+        inventory.record_board_rule(obj)
+        if previous is not None:
+            inventory.record_board_rule(previous)
+
+
+@admin.register(InventoryChange)
+class InventoryChangeAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'room_type_id', 'board_type_id', 'date', 'source', 'created_at')
+    list_filter = ('kind', 'source')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,221 @@
+# pricing/ari.py
+# version: 1.4.0
+# FEATURE: Bulk availability-and-rates (ARI) feed for agencies.
+#   All rooms of a set of hotels over a date range, with the agency's net rates from its
+#   compiled rate plan, in a columnar layout (one array per room / board, indexed by the
+#   'dates' list). Rows are streamed room by room, so NDJSON output never holds the feed.
+# FEATURE: Rates are resolved from season ranges plus per-day Price overrides (rates.py);
+#          a delta feed reports the cells of changed ranges and changed overrides.
+# FEATURE: Derived boards (BoardRule) are included; a delta reports them when their base
+#          cell or their rule changed.
+# FIX: The watermark carries the agency's rate plan version. A delta requested with a
+#      watermark from another plan version (a contract, markup or discount changed, which
+#      moves no inventory updated_at) returns the full feed flagged 'resync' instead of an
+#      empty delta.
+# FIX: Deltas and the ETag follow the change log (InventoryChange.seq, assigned in commit
+#      order) instead of max(updated_at): deletes are logged there, and a write committing
+#      after a newer one is no longer skipped. A delta where a changed cell has no value
+#      left is returned as a full 'resync' feed; timestamp watermarks resync too.
+
+import hashlib
+from datetime import timedelta
+from collections import defaultdict
+from itertools import groupby
+from operator import itemgetter
+
+from django.db.models import Max
+from django.utils.dateparse import parse_datetime
+
+from agencies.rate_plans import day_number, plan_version
+from hotels.models import RoomType
+from .models import Availability, InventoryChange
+from . import changelog, rates
+
+MAX_DAYS = 186
+MAX_HOTELS = 50
+WATERMARK_SEPARATOR = '~'
+
+
+def format_watermark(cursor, version):
+    return f"{cursor}{WATERMARK_SEPARATOR}{version}"
+
+
+def parse_watermark(value):
+    """
+    (cursor, plan_version) of a watermark. The timestamp watermarks of earlier responses
+    and bare values give (None, None), which always resyncs. Raises ValueError when it is
+    not a watermark.
+    """
+    cursor, _, version = value.partition(WATERMARK_SEPARATOR)
+    if version and not version.isdigit():
+        raise ValueError(value)
+    if cursor.isdigit():
+        return (int(cursor), int(version)) if version else (None, None)
+    if parse_datetime(cursor) is None:
+        raise ValueError(value)
+    return None, None
+
+
+class Feed:
+    """
+    One ARI request: the scope querysets plus their fingerprint (ETag and watermark).
+    since is (cursor, plan_version) from parse_watermark(); when the plan version is not
+    the current one the net rates of every cell may have changed, so the feed is full and
+    self.resync is set.
+    """
+
+    def __init__(self, rate_plan, hotel_ids, start, end, since=None):
+        self.rate_plan = rate_plan
+        self.plan_version = rate_plan.version if rate_plan.version is not None else plan_version(rate_plan.agency_id)
+        self.resync = since is not None and (since[0] is None or since[1] != self.plan_version)
+        self.hotel_ids = sorted(set(hotel_ids))
+        self.start, self.end = start, end
+        self.since = None if since is None or self.resync else since[0]
+        self.dates = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        self.rooms = list(
+            RoomType.objects.filter(hotel_id__in=self.hotel_ids).order_by('id').values('id', 'hotel_id', 'code', 'name')
+        )
+        self.room_ids = [room['id'] for room in self.rooms]
+        self.changes = InventoryChange.objects.filter(room_type_id__in=self.room_ids, date__range=(start, end))
+        self._fingerprint = None
+        self._changed = None
+
+    def fingerprint(self):
+        """
+        (etag, watermark) from one aggregate query (the newest change-log seq in scope,
+        after changelog.assign_sequence()); every write and delete of the scope is logged.
+        """
+        if self._fingerprint is None:
+            changelog.assign_sequence()
+            cursor = max(self.changes.aggregate(last=Max('seq'))['last'] or 0, self.since or 0)
+            parts = [
+                self.rate_plan.agency_id, self.plan_version,
+                self.hotel_ids, self.room_ids,
+                self.start, self.end, self.since, cursor,
+            ]
+            etag = '"%s"' % hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+            self._fingerprint = (etag, format_watermark(cursor, self.plan_version))
+        return self._fingerprint
+
+    def changed(self):
+        """
+        ({(room_id, day number)}, {(room_id, board_id, day number)}): the availability and
+        price cells logged after self.since, or None for a full feed. A changed cell that
+        has no value anymore (its row or range was deleted) cannot be told apart from an
+        unchanged one in a delta, so the feed falls back to a full resync.
+        """
+        if self.since is None or self._changed is not None:
+            return self._changed
+        availability, prices = set(), set()
+        for kind, room_id, board_id, day in self.changes.filter(seq__gt=self.since).values_list(
+                'kind', 'room_type_id', 'board_type_id', 'date').distinct():
+            if kind == changelog.AVAILABILITY:
+                availability.add((room_id, day_number(day)))
+            else:
+                prices.add((room_id, board_id, day_number(day)))
+        stocked = {
+            (room_id, day_number(day)) for room_id, day in Availability.objects.filter(
+                room_type_id__in={room_id for room_id, _ in availability}, date__range=(self.start, self.end),
+            ).values_list('room_type_id', 'date')
+        }
+        priced = rates.resolve({room_id for room_id, _, _ in prices}, self.dates,
+                               {board_id for _, board_id, _ in prices}) if prices else {}
+        if availability - stocked or prices - priced.keys():
+            self.resync, self.since = True, None
+            return None
+        self._changed = (availability, prices)
+        return self._changed
+
+    def header(self):
+        _, watermark = self.fingerprint()
+        self.changed()
+        return {
+            'from': str(self.start),
+            'to': str(self.end),
+            'since': str(self.since) if self.since is not None else None,
+            'resync': self.resync,
+            'watermark': watermark,
+            'dates': [str(day) for day in self.dates],
+        }
+
+    def _room_cells(self, room_id, room_ranges, room_prices, rules):
+        """{(board_id, i): amounts} of one room."""
+        lo, hi = day_number(self.start), day_number(self.end)
+        cells = {}
+        for _, board_id, start, end, weekdays, *amounts in room_ranges:
+            for number in rates.covered_days(start, end, weekdays, lo, hi):
+                cells[(room_id, board_id, number - lo)] = tuple(amounts)
+        for _, board_id, day, *amounts in room_prices:
+            cells[(room_id, board_id, day_number(day) - lo)] = tuple(amounts)
+        rates.derive(cells, rules)
+        return {key[1:]: amounts for key, amounts in cells.items()}
+
+    def iter_rooms(self):
+        """
+        One columnar dict per room. In a delta (since) feed only rooms with changes are
+        returned and null means "unchanged"; in a full feed null means "not set".
+        """
+        changed = self.changed()
+        rooms = self.rooms
+        if changed is not None:
+            changed_rooms = {cell[0] for cell in changed[0]} | {cell[0] for cell in changed[1]}
+            rooms = [room for room in rooms if room['id'] in changed_rooms]
+        room_ids = [room['id'] for room in rooms]
+        lo = day_number(self.start)
+        size = len(self.dates)
+        availabilities = _by_room(Availability.objects.filter(
+            room_type_id__in=room_ids, date__range=(self.start, self.end),
+        ).order_by('room_type_id', 'date').values_list('room_type_id', 'date', 'quantity'))
+        prices = _by_room(rates.overrides_between(room_ids, self.start, self.end).order_by(
+            'room_type_id', 'board_type_id', 'date').values_list(*rates.PRICE_FIELDS))
+        ranges = defaultdict(list)
+        for row in rates.ranges_between(room_ids, self.start, self.end).values_list(*rates.RANGE_FIELDS):
+            ranges[row[0]].append(row)
+        rules = rates.board_rules(room_ids)
+        next_avail, next_price = next(availabilities, None), next(prices, None)
+
+        for room in rooms:
+            room_avail = room_prices = ()
+            if next_avail and next_avail[0] == room['id']:
+                room_avail, next_avail = next_avail[1], next(availabilities, None)
+            if next_price and next_price[0] == room['id']:
+                room_prices, next_price = next_price[1], next(prices, None)
+            cells = self._room_cells(room['id'], ranges[room['id']], room_prices, rules)
+
+            stock = [None] * size
+            for _, day, quantity in room_avail:
+                i = day_number(day) - lo
+                if changed is None or (room['id'], i + lo) in changed[0]:
+                    stock[i] = quantity
+            if changed is not None:
+                cells = {(board_id, i): amounts for (board_id, i), amounts in cells.items()
+                         if (room['id'], board_id, i + lo) in changed[1]}
+
+            boards = []
+            for board_id, board_cells in groupby(sorted(cells.items()), key=lambda item: item[0][0]):
+                net, extra, child = [None] * size, [None] * size, [None] * size
+                for (_, i), (price_per_night, extra_person_price, child_price) in board_cells:
+                    price = self.rate_plan.apply({
+                        'price_per_night': price_per_night,
+                        'extra_person_price': extra_person_price,
+                        'child_price': child_price,
+                    }, room['hotel_id'], room['id'], self.dates[i])
+                    net[i] = int(price['price_per_night'])
+                    extra[i] = int(price['extra_person_price'])
+                    child[i] = int(price['child_price'])
+                boards.append({'board_id': board_id, 'net': net, 'extra': extra, 'child': child})
+
+            yield {
+                'room_id': room['id'],
+                'hotel_id': room['hotel_id'],
+                'code': room['code'],
+                'name': room['name'],
+                'availability': stock,
+                'boards': boards,
+            }
+
+
+def _by_room(rows):
+    """(room_id, [rows]) groups of a room-ordered values_list, read with a server-side cursor."""
+    for room_id, group in groupby(rows.iterator(chunk_size=2000), key=itemgetter(0)):
+        yield room_id, list(group)
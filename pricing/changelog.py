@@ -0,0 +1,152 @@
+# pricing/changelog.py
+# version: 1.3.0
+# FEATURE: Append-only change log of Availability / Price cells (InventoryChange).
+#   - Writers call record_availability() / record_prices() inside their transaction,
+#     so a rolled-back write leaves no entry.
+#   - Consumers keep a cursor (the last sequence number they handled) and call read()
+#     or iterate follow(); compact() drops superseded and past-date entries.
+# FEATURE: Recorded writes invalidate the cached admin pricing grid chunks (grid.py).
+# FEATURE: Price entries include the cells of boards derived from the written ones (BoardRule).
+# FIX: Consumers follow InventoryChange.seq, assigned in commit order by assign_sequence()
+#      after the writing transaction commits, instead of the insert-time id with a wall-clock
+#      settle delay: a writer committing later than SETTLE_SECONDS was skipped by cursors.
+
+from datetime import timedelta
+
+import jdatetime
+from django.db import connection, transaction
+from django.db.models import Exists, Max, OuterRef
+from django.utils import timezone
+
+from .models import InventoryChange
+from . import grid, rates
+
+AVAILABILITY = 'availability'
+PRICE = 'price'
+
+# pg_advisory_xact_lock key serializing assign_sequence().
+SEQUENCE_LOCK_ID = 7_310_001
+DEFAULT_BATCH = 500
+BATCH_SIZE = 1000
+
+
+# ==============================================================================
+# 1. WRITING
+# ==============================================================================
+
+def _record(kind, cells, source):
+    entries = [
+        InventoryChange(kind=kind, room_type_id=room_type_id, board_type_id=board_type_id or 0,
+                        date=date, source=source)
+        for room_type_id, board_type_id, date in cells
+    ]
+    if entries:
+        InventoryChange.objects.bulk_create(entries, batch_size=BATCH_SIZE)
+        transaction.on_commit(assign_sequence)
+        grid.invalidate_rooms({entry.room_type_id for entry in entries})
+    return len(entries)
+
+
+def record_availability(cells, source='other'):
+    """cells: iterable of (room_type_id, date)."""
+    return _record(AVAILABILITY, ((room_type_id, 0, date) for room_type_id, date in cells), source)
+
+
+def record_prices(cells, source='other'):
+    """cells: iterable of (room_type_id, board_type_id, date); derived-board cells are added."""
+    cells = list(cells)
+    return _record(PRICE, cells + rates.dependent_cells(cells), source)
+
+
+# ==============================================================================
+# 2. SEQUENCING
+# ==============================================================================
+
+def _lock_sequence():
+    # SQLite serializes writers on its own.
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [SEQUENCE_LOCK_ID])
+
+
+def assign_sequence():
+    """
+    Numbers the committed entries that have no seq yet, after the highest seq so far.
+    Runs under a transaction-scoped lock, so runs are serialized and each one only sees
+    entries committed before it: an entry committed later gets a higher number than every
+    entry already handed out. Called after each writing transaction commits and before reads.
+    Returns the number of entries sequenced.
+    """
+    sequenced = 0
+    while True:
+        with transaction.atomic():
+            _lock_sequence()
+            ids = list(InventoryChange.objects.filter(seq__isnull=True).order_by('id').values_list('id', flat=True)[:BATCH_SIZE])
+            if not ids:
+                return sequenced
+            last = InventoryChange.objects.aggregate(last=Max('seq'))['last'] or 0
+            changes = [InventoryChange(id=change_id, seq=last + offset) for offset, change_id in enumerate(ids, 1)]
+            InventoryChange.objects.bulk_update(changes, ['seq'])
+        sequenced += len(ids)
+
+
+# ==============================================================================
+# 3. READING
+# ==============================================================================
+
+def _entry(change):
+    return {
+        'seq': change.seq,
+        'kind': change.kind,
+        'room_type_id': change.room_type_id,
+        'board_type_id': change.board_type_id or None,
+        'date': str(change.date),
+        'source': change.source,
+        'created_at': change.created_at.isoformat(),
+    }
+
+
+def read(cursor=0, limit=DEFAULT_BATCH):
+    """(entries, next_cursor): sequenced entries after cursor, in commit order."""
+    assign_sequence()
+    changes = list(InventoryChange.objects.filter(seq__gt=cursor).order_by('seq')[:limit])
+    entries = [_entry(change) for change in changes]
+    return entries, (changes[-1].seq if changes else cursor)
+
+
+def follow(cursor=0, batch_size=DEFAULT_BATCH):
+    """Iterates every sequenced entry after cursor, one batch query at a time, until caught up."""
+    while True:
+        entries, cursor = read(cursor, batch_size)
+        yield from entries
+        if len(entries) < batch_size:
+            return
+
+
+def latest_cursor():
+    """Sequence number of the newest entry (0 for an empty log)."""
+    assign_sequence()
+    return InventoryChange.objects.aggregate(last=Max('seq'))['last'] or 0
+
+
+# ==============================================================================
+# 4. COMPACTION
+# ==============================================================================
+
+def compact(older_than_days=7, past_days=30):
+    """
+    - entries older than older_than_days are dropped when a newer entry exists for the
+      same cell (consumers re-read the current row, so only the latest one matters);
+    - entries for dates more than past_days in the past are dropped altogether.
+    The newest sequenced entry is always kept: assign_sequence() continues after it.
+    Returns the number of deleted entries.
+    """
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    entries = InventoryChange.objects.filter(seq__lt=latest_cursor())
+    newer = InventoryChange.objects.filter(
+        kind=OuterRef('kind'), room_type_id=OuterRef('room_type_id'),
+        board_type_id=OuterRef('board_type_id'), date=OuterRef('date'), seq__gt=OuterRef('seq'),
+    )
+    superseded, _ = entries.filter(created_at__lt=cutoff).filter(Exists(newer)).delete()
+    past, _ = entries.filter(date__lt=jdatetime.date.today() - timedelta(days=past_days)).delete()
+    return superseded + past
@@ -1,8 +1,9 @@
 # pricing/forms.py
+# FEATURE: RateRangeForm - season rate with a weekday checkbox list stored as a bit mask.
 
 from django import forms
 from django_jalali.forms import jDateField
-from .models import Availability, Price
+from .models import Availability, Price, RateRange
 from hotels.models import Hotel, RoomType, BoardType
 from jalali_date.widgets import AdminJalaliDateWidget
 
@@ -60,4 +61,43 @@ class PriceRangeForm(forms.ModelForm):
             self.fields['hotel'].initial = self.instance.room_type.hotel
             self.fields['room_type'].queryset = self.instance.room_type.hotel.room_types.order_by('name')
         else:
-            self.fields['room_type'].queryset = RoomType.objects.none()
\ No newline at end of file
+            self.fields['room_type'].queryset = RoomType.objects.none()
+
+WEEKDAY_CHOICES = [
+    (0, 'شنبه'), (1, 'یکشنبه'), (2, 'دوشنبه'), (3, 'سه‌شنبه'), (4, 'چهارشنبه'), (5, 'پنجشنبه'), (6, 'جمعه'),
+]
+
+
+class RateRangeForm(forms.ModelForm):
+    start_date = jDateField(label="از تاریخ", widget=AdminJalaliDateWidget)
+    end_date = jDateField(label="تا تاریخ", widget=AdminJalaliDateWidget)
+    weekday_list = forms.TypedMultipleChoiceField(
+        choices=WEEKDAY_CHOICES, coerce=int, widget=forms.CheckboxSelectMultiple,
+        label="روزهای هفته", initial=[day for day, _ in WEEKDAY_CHOICES],
+    )
+
+    class Meta:
+        model = RateRange
+        fields = [
+            'room_type', 'board_type', 'title', 'start_date', 'end_date', 'weekday_list',
+            'price_per_night', 'extra_person_price', 'child_price',
+        ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.fields['weekday_list'].initial = [day for day, _ in WEEKDAY_CHOICES if self.instance.weekdays & (1 << day)]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start_date, end_date = cleaned_data.get('start_date'), cleaned_data.get('end_date')
+        if start_date and end_date and end_date < start_date:
+            raise forms.ValidationError("تاریخ پایان نمی‌تواند قبل از تاریخ شروع باشد.")
+        return cleaned_data
+
+    def save(self, commit=True):
+        mask = 0
+        for day in self.cleaned_data['weekday_list']:
+            mask |= 1 << day
+        self.instance.weekdays = mask
+        return super().save(commit)
@@ -0,0 +1,95 @@
+# pricing/grid.py
+# version: 1.1.0
+# FEATURE: Data of the lazy admin pricing grid: every room and board of one hotel over a
+#          date window, cached per (hotel, window). The change log (changelog.py) bumps
+#          the hotel's cache version after each committed inventory write.
+# FEATURE: Prices shown are the resolved rates (season ranges + per-day overrides).
+
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+
+from agencies.rate_plans import day_number
+from hotels.models import BoardType, RoomType
+from .models import Availability
+from . import rates
+
+CHUNK_DAYS = 14
+MAX_CHUNK_DAYS = 62
+CACHE_TIMEOUT = 60 * 60
+
+
+def _version_key(hotel_id):
+    return f'pricing_grid:version:{hotel_id}'
+
+
+def hotel_version(hotel_id):
+    # Starts from a timestamp, so an evicted version key never repeats an old value.
+    key = _version_key(hotel_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(hotel_ids):
+    for hotel_id in hotel_ids:
+        try:
+            cache.incr(_version_key(hotel_id))
+        except ValueError:
+            pass  # no version yet: nothing cached for this hotel
+
+
+def invalidate_rooms(room_ids):
+    """Called by the change log; bumps the versions of the rooms' hotels once the write commits."""
+    hotel_ids = set(RoomType.objects.filter(id__in=set(room_ids)).values_list('hotel_id', flat=True))
+    if hotel_ids:
+        transaction.on_commit(lambda: _bump(hotel_ids))
+
+
+def build_chunk(hotel_id, start, days):
+    """Availability and all boards' prices of a hotel's rooms for days starting at start (5 queries)."""
+    dates = [start + timedelta(days=i) for i in range(days)]
+    end = dates[-1]
+    index = {str(day): i for i, day in enumerate(dates)}
+    rooms = list(RoomType.objects.filter(hotel_id=hotel_id).values('id', 'name'))
+    room_ids = [room['id'] for room in rooms]
+    boards = list(BoardType.objects.values('id', 'name'))
+
+    availability = {room_id: [None] * days for room_id in room_ids}
+    for room_id, day, quantity in Availability.objects.filter(
+            room_type_id__in=room_ids, date__range=(start, end)).values_list('room_type_id', 'date', 'quantity'):
+        availability[room_id][index[str(day)]] = quantity
+
+    prices = {room_id: {} for room_id in room_ids}
+    first = day_number(start)
+    for (room_id, board_id, number), (base, extra, child) in rates.resolve(room_ids, dates).items():
+        board = prices[room_id].setdefault(str(board_id), {
+            'base': [None] * days, 'extra': [None] * days, 'child': [None] * days,
+        })
+        i = number - first
+        board['base'][i], board['extra'][i], board['child'][i] = int(base), int(extra), int(child)
+
+    return {
+        'hotel_id': hotel_id,
+        'dates': [str(day) for day in dates],
+        'next': str(end + timedelta(days=1)),
+        'boards': boards,
+        'rooms': [
+            {'id': room['id'], 'name': room['name'],
+             'availability': availability[room['id']], 'prices': prices[room['id']]}
+            for room in rooms
+        ],
+    }
+
+
+def get_chunk(hotel_id, start, days=CHUNK_DAYS):
+    key = f'pricing_grid:{hotel_id}:{start}:{days}:{hotel_version(hotel_id)}'
+    chunk = cache.get(key)
+    if chunk is None:
+        chunk = build_chunk(hotel_id, start, days)
+        cache.set(key, chunk, CACHE_TIMEOUT)
+    return chunk
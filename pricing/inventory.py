@@ -0,0 +1,192 @@
+# pricing/inventory.py
+# version: 1.4.0
+# FEATURE: Set-based writes of Availability / Price cells.
+#   Cells are written with bulk_create(update_conflicts=True) on the models' unique keys
+#   (one statement per BATCH_SIZE cells instead of 2-3 per day), and the change log and
+#   landing-price refresh are issued once per batch.
+# FEATURE: save_grid() applies only the cells of the admin pricing grid that differ
+#          from the stored values.
+# FEATURE: save_grid() compares prices with the resolved rates (season ranges included),
+#          so a cell is only written as a per-day override when it differs from its season.
+# FEATURE: record_rate_range() logs the cells a season range covered / covers.
+# FEATURE: record_board_rule() logs the upcoming cells of a derived board after a rule change.
+# FEATURE: restock() returns cancelled rooms to stock with one UPDATE per room and increment.
+
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.db.models import F
+
+from django.utils import timezone
+
+from agencies.rate_plans import day_number
+from hotels import landing
+from hotels.models import RoomType
+from .models import Availability, Price
+from . import changelog, rates
+
+BATCH_SIZE = 1000
+# Upper bound on the cells one request may write (e.g. 50 rooms x 4 boards x 366 days).
+MAX_CELLS = 80000
+
+# Weekdays are Jalali: 0 = Saturday ... 6 = Friday.
+ALL_WEEKDAYS = frozenset(range(7))
+
+
+def jalali_weekday(day):
+    """0 = Saturday ... 6 = Friday, for gregorian and jdatetime dates alike."""
+    if hasattr(day, 'togregorian'):
+        day = day.togregorian()
+    return (day.weekday() + 2) % 7
+
+
+def expand_dates(start, end, weekdays=None):
+    """Gregorian dates from start to end (inclusive), restricted to the given Jalali weekdays."""
+    weekdays = ALL_WEEKDAYS if weekdays is None else frozenset(weekdays)
+    days = []
+    day = start
+    while day <= end:
+        if jalali_weekday(day) in weekdays:
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def upsert_availability(room_ids, dates, quantity, source='other'):
+    """Sets quantity on every (room, date) cell; returns the number of cells written."""
+    return write_availability({(room_id, day): quantity for room_id in room_ids for day in dates}, source)
+
+
+def upsert_prices(room_ids, board_ids, dates, price_per_night, extra_person_price=0, child_price=0, source='other'):
+    """Sets the three amounts on every (room, board, date) cell; returns the number of cells written."""
+    amounts = (price_per_night, extra_person_price, child_price)
+    return write_prices(
+        {(room_id, board_id, day): amounts for room_id in room_ids for board_id in board_ids for day in dates}, source)
+
+
+def write_availability(cells, source='other'):
+    """cells: {(room_id, date): quantity}, written in one upsert per BATCH_SIZE cells."""
+    objects = [Availability(room_type_id=room_id, date=day, quantity=quantity) for (room_id, day), quantity in cells.items()]
+    Availability.objects.bulk_create(
+        objects, batch_size=BATCH_SIZE, update_conflicts=True,
+        unique_fields=['room_type', 'date'], update_fields=['quantity', 'updated_at'],
+    )
+    changelog.record_availability(cells, source=source)
+    return len(objects)
+
+
+def restock(cells, source='booking'):
+    """
+    cells: {(room_id, date): rooms to add back}. Cells sharing a room and an increment are
+    updated together (F() increments, so concurrent bookings are not overwritten); cells
+    without an Availability row are left alone. Returns the number of rows updated.
+    """
+    groups = defaultdict(list)
+    for (room_id, day), quantity in cells.items():
+        if quantity:
+            groups[(room_id, quantity)].append(day)
+    updated = 0
+    for (room_id, quantity), days in groups.items():
+        updated += Availability.objects.filter(room_type_id=room_id, date__in=days).update(
+            quantity=F('quantity') + quantity, updated_at=timezone.now())
+    changelog.record_availability(cells, source=source)
+    return updated
+
+
+def write_prices(cells, source='other'):
+    """cells: {(room_id, board_id, date): (price_per_night, extra_person_price, child_price)}."""
+    objects = [
+        Price(room_type_id=room_id, board_type_id=board_id, date=day, price_per_night=base,
+              extra_person_price=extra, child_price=child)
+        for (room_id, board_id, day), (base, extra, child) in cells.items()
+    ]
+    Price.objects.bulk_create(
+        objects, batch_size=BATCH_SIZE, update_conflicts=True,
+        unique_fields=['room_type', 'board_type', 'date'],
+        update_fields=['price_per_night', 'extra_person_price', 'child_price', 'updated_at'],
+    )
+    changelog.record_prices(cells, source=source)
+    if cells:
+        refresh_landing_prices({room_id for room_id, _, _ in cells})
+    return len(objects)
+
+
+# Rule changes are logged for this many upcoming days (older cells are not re-read).
+RULE_LOG_DAYS = 365
+
+PRICE_COMPONENTS = ('base', 'extra', 'child')
+
+
+def save_grid(availability, prices, board_id, source='calendar'):
+    """
+    Applies the submitted cells of the admin pricing grid, skipping those equal to the
+    stored values. availability: {(room_id, date): quantity};
+    prices: {(room_id, date): {'base' | 'extra' | 'child': amount}} for one board.
+    Prices compare with the resolved rate (per-day row, else season range); a price row is
+    written whole, so components not submitted keep their resolved value (0 for a cell
+    without any rate). Returns (availability cells written, price cells written).
+    """
+    room_ids = {room_id for room_id, _ in availability} | {room_id for room_id, _ in prices}
+    dates = {day for _, day in availability} | {day for _, day in prices}
+
+    stored_quantities = {
+        (room_id, day): quantity
+        for room_id, day, quantity in Availability.objects.filter(
+            room_type_id__in=room_ids, date__in=dates).values_list('room_type_id', 'date', 'quantity')
+    } if availability else {}
+    changed_availability = {
+        cell: quantity for cell, quantity in availability.items() if stored_quantities.get(cell) != quantity
+    }
+
+    stored_prices = rates.resolve(room_ids, dates, [board_id]) if prices else {}
+    changed_prices = {}
+    for (room_id, day), components in prices.items():
+        stored = stored_prices.get((room_id, board_id, day_number(day)))
+        amounts = list(stored) if stored else [0, 0, 0]
+        for i, component in enumerate(PRICE_COMPONENTS):
+            if component in components:
+                amounts[i] = components[component]
+        if stored is None or tuple(amounts) != stored:
+            changed_prices[(room_id, board_id, day)] = tuple(amounts)
+
+    return (
+        write_availability(changed_availability, source) if changed_availability else 0,
+        write_prices(changed_prices, source) if changed_prices else 0,
+    )
+
+
+def record_rate_range(rate_range, previous=None, source='admin'):
+    """
+    After a RateRange save / delete: logs every cell the range covers now and, when given,
+    the (room, board, start, end, weekdays) extent it covered before, then refreshes landing prices.
+    """
+    extents = [(rate_range.room_type_id, rate_range.board_type_id, rate_range.start_date,
+                rate_range.end_date, rate_range.weekdays)]
+    if previous is not None:
+        extents.append(previous)
+    cells = set()
+    for room_id, board_id, start, end, weekdays in extents:
+        for number in rates.covered_days(start, end, weekdays, day_number(start), day_number(end)):
+            cells.add((room_id, board_id, date.fromordinal(number)))
+    changelog.record_prices(sorted(cells), source=source)
+    refresh_landing_prices({room_id for room_id, *_ in extents})
+    return len(cells)
+
+
+def record_board_rule(rule, source='admin'):
+    """After a BoardRule save / delete: logs the derived board on every upcoming day its base board is priced."""
+    room_ids = [rule.room_type_id] if rule.room_type_id else list(
+        RoomType.objects.filter(hotel_id=rule.hotel_id).values_list('id', flat=True))
+    today = date.today()
+    base_cells = rates.resolve(room_ids, [today + timedelta(days=i) for i in range(RULE_LOG_DAYS)],
+                               [rule.base_board_type_id])
+    cells = [(room_id, rule.board_type_id, date.fromordinal(number)) for room_id, _, number in base_cells]
+    changelog.record_prices(cells, source=source)
+    return len(cells)
+
+
+def refresh_landing_prices(room_ids):
+    """City landing 'starting from' prices follow price writes (one refresh per city, after commit)."""
+    city_ids = RoomType.objects.filter(id__in=room_ids).values_list('hotel__city_id', flat=True).order_by().distinct()
+    for city_id in set(city_ids):
+        landing.schedule_refresh(city_id)
@@ -0,0 +1,19 @@
+# pricing/management/commands/compact_prices.py
+# version: 1.0.0
+# FEATURE: Folds runs of identical per-day Price rows into season rate ranges.
+
+from django.core.management.base import BaseCommand
+
+from pricing import rates
+
+
+class Command(BaseCommand):
+    help = "Replaces runs of identical consecutive per-day prices with RateRange rows (resolved rates are unchanged)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--room', type=int, action='append', help="Only compact this room type id (repeatable).")
+        parser.add_argument('--min-run', type=int, default=rates.MIN_RUN_DAYS, help="Shortest run of days folded into a range.")
+
+    def handle(self, *args, **options):
+        created, deleted = rates.compact_prices(room_ids=options['room'], min_run=options['min_run'])
+        self.stdout.write(self.style.SUCCESS(f"{created} rate range(s) created, {deleted} per-day price row(s) removed."))
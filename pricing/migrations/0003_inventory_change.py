@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:17
+
+import django_jalali.db.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0002_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False, verbose_name='شماره ترتیب')),
+                ('kind', models.CharField(choices=[('availability', 'موجودی'), ('price', 'قیمت')], max_length=20, verbose_name='نوع')),
+                ('room_type_id', models.PositiveIntegerField(db_index=True, verbose_name='شناسه نوع اتاق')),
+                ('board_type_id', models.PositiveIntegerField(default=0, verbose_name='شناسه نوع سرویس')),
+                ('date', django_jalali.db.models.jDateField(verbose_name='تاریخ')),
+                ('source', models.CharField(choices=[('admin', 'پنل مدیریت'), ('calendar', 'تقویم قیمت\u200cگذاری'), ('bulk_api', 'API گروهی'), ('booking', 'رزرو'), ('other', 'سایر')], default='other', max_length=20, verbose_name='منبع')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='زمان ثبت')),
+            ],
+            options={
+                'verbose_name': 'تغییر موجودی/قیمت',
+                'verbose_name_plural': 'گزارش تغییرات موجودی و قیمت',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['kind', 'room_type_id', 'board_type_id', 'date'], name='inventory_change_cell_idx')],
+            },
+        ),
+    ]
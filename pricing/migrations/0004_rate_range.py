@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:24
+
+import django.db.models.deletion
+import django_jalali.db.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0009_citylandingaggregate'),
+        ('pricing', '0003_inventory_change'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateRange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(blank=True, max_length=100, verbose_name='عنوان فصل')),
+                ('start_date', django_jalali.db.models.jDateField(verbose_name='از تاریخ')),
+                ('end_date', django_jalali.db.models.jDateField(verbose_name='تا تاریخ')),
+                ('weekdays', models.PositiveSmallIntegerField(default=127, verbose_name='روزهای هفته')),
+                ('price_per_night', models.DecimalField(decimal_places=0, max_digits=20, verbose_name='قیمت پایه هر شب (تومان)')),
+                ('extra_person_price', models.DecimalField(decimal_places=0, default=0, max_digits=20, verbose_name='قیمت نفر اضافه (تومان)')),
+                ('child_price', models.DecimalField(decimal_places=0, default=0, max_digits=20, verbose_name='قیمت کودک (تومان)')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True, verbose_name='آخرین تغییر')),
+                ('board_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rate_ranges', to='hotels.boardtype', verbose_name='نوع سرویس')),
+                ('room_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rate_ranges', to='hotels.roomtype', verbose_name='نوع اتاق')),
+            ],
+            options={
+                'verbose_name': 'نرخ فصلی',
+                'verbose_name_plural': 'نرخ\u200cهای فصلی',
+                'ordering': ['start_date', 'id'],
+                'indexes': [models.Index(fields=['room_type', 'board_type', 'start_date', 'end_date'], name='rate_range_cell_idx')],
+            },
+        ),
+    ]
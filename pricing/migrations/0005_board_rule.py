@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0009_citylandingaggregate'),
+        ('pricing', '0004_rate_range'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BoardRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('adult_supplement', models.DecimalField(decimal_places=0, default=0, max_digits=20, verbose_name='مکمل هر بزرگسال در شب (تومان)')),
+                ('child_supplement', models.DecimalField(decimal_places=0, default=0, max_digits=20, verbose_name='مکمل هر کودک در شب (تومان)')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True, verbose_name='آخرین تغییر')),
+                ('base_board_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='base_rules', to='hotels.boardtype', verbose_name='نوع سرویس پایه')),
+                ('board_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='derived_rules', to='hotels.boardtype', verbose_name='نوع سرویس محاسبه\u200cشده')),
+                ('hotel', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='board_rules', to='hotels.hotel', verbose_name='هتل')),
+                ('room_type', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='board_rules', to='hotels.roomtype', verbose_name='نوع اتاق')),
+            ],
+            options={
+                'verbose_name': 'قاعده قیمت سرویس',
+                'verbose_name_plural': 'قواعد قیمت سرویس',
+                'constraints': [models.CheckConstraint(condition=models.Q(models.Q(('hotel__isnull', False), ('room_type__isnull', True)), models.Q(('hotel__isnull', True), ('room_type__isnull', False)), _connector='OR'), name='board_rule_hotel_xor_room'), models.UniqueConstraint(condition=models.Q(('room_type__isnull', True)), fields=('hotel', 'board_type'), name='board_rule_hotel_board_unique'), models.UniqueConstraint(condition=models.Q(('hotel__isnull', True)), fields=('room_type', 'board_type'), name='board_rule_room_board_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-19 09:04
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_seq(apps, schema_editor):
+    # Existing entries keep their id as sequence number, so consumers' cursors stay valid.
+    apps.get_model('pricing', 'InventoryChange').objects.update(seq=F('id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0005_board_rule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventorychange',
+            name='seq',
+            field=models.BigIntegerField(blank=True, null=True, unique=True, verbose_name='شماره ترتیب انتشار'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorychange',
+            index=models.Index(condition=models.Q(('seq__isnull', True)), fields=['id'], name='inventory_change_unseq_idx'),
+        ),
+        migrations.RunPython(backfill_seq, migrations.RunPython.noop),
+    ]
@@ -1,15 +1,23 @@
 # pricing/models.py
+# version: 1.5.0
+# FEATURE: updated_at on Availability / Price (indexed) for delta reads of the ARI feed.
+# FEATURE: InventoryChange - append-only change log of Availability / Price cells.
+# FEATURE: RateRange - season rates stored as one row per date range and weekday mask;
+#          per-day Price rows override them (resolved by pricing/rates.py).
+# FEATURE: BoardRule - board prices derived from a base board plus per-person supplements.
+# FIX: InventoryChange.seq - commit-ordered sequence number followed by change log consumers.
 
-
+from django.core.exceptions import ValidationError
 from django.db import models
 from django_jalali.db import models as jmodels
-from hotels.models import RoomType, BoardType # BoardType را اضافه می‌کنیم
+from hotels.models import Hotel, RoomType, BoardType # BoardType را اضافه می‌کنیم
 
 
 class Availability(models.Model):
     room_type = models.ForeignKey(RoomType, on_delete=models.CASCADE, related_name="availabilities", verbose_name="نوع اتاق")
     date = jmodels.jDateField(verbose_name="تاریخ")
     quantity = models.PositiveSmallIntegerField(default=0, verbose_name="تعداد موجود")
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name="آخرین تغییر")
 
     class Meta:
         verbose_name = "موجودی روزانه"
@@ -30,6 +38,7 @@ class Price(models.Model):
     price_per_night = models.DecimalField(max_digits=20, decimal_places=0, verbose_name="قیمت پایه آن شب (تومان)")
     extra_person_price = models.DecimalField(max_digits=20, decimal_places=0, verbose_name="قیمت نفر اضافه (تومان)")
     child_price = models.DecimalField(max_digits=20, decimal_places=0, verbose_name="قیمت کودک (تومان)")
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name="آخرین تغییر")
 
     class Meta:
         verbose_name = "قیمت روزانه"
@@ -40,3 +49,113 @@ class Price(models.Model):
 
     def __str__(self):
          return f"قیمت {self.room_type} ({self.board_type}) در تاریخ {self.date}"
+
+
+class RateRange(models.Model):
+    """
+    One season rate of a room / board: the amounts apply to every day from start_date to
+    end_date (inclusive) whose Jalali weekday is set in weekdays (bit 0 = Saturday ...
+    bit 6 = Friday). A per-day Price row of the same cell takes precedence; among
+    overlapping ranges the most recently created one wins.
+    """
+    ALL_WEEKDAYS = 0b1111111
+
+    room_type = models.ForeignKey(RoomType, on_delete=models.CASCADE, related_name="rate_ranges", verbose_name="نوع اتاق")
+    board_type = models.ForeignKey(BoardType, on_delete=models.CASCADE, related_name="rate_ranges", verbose_name="نوع سرویس")
+    title = models.CharField(max_length=100, blank=True, verbose_name="عنوان فصل")
+    start_date = jmodels.jDateField(verbose_name="از تاریخ")
+    end_date = jmodels.jDateField(verbose_name="تا تاریخ")
+    weekdays = models.PositiveSmallIntegerField(default=ALL_WEEKDAYS, verbose_name="روزهای هفته")
+
+    price_per_night = models.DecimalField(max_digits=20, decimal_places=0, verbose_name="قیمت پایه هر شب (تومان)")
+    extra_person_price = models.DecimalField(max_digits=20, decimal_places=0, default=0, verbose_name="قیمت نفر اضافه (تومان)")
+    child_price = models.DecimalField(max_digits=20, decimal_places=0, default=0, verbose_name="قیمت کودک (تومان)")
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name="آخرین تغییر")
+
+    class Meta:
+        verbose_name = "نرخ فصلی"
+        verbose_name_plural = "نرخ‌های فصلی"
+        ordering = ['start_date', 'id']
+        indexes = [models.Index(fields=['room_type', 'board_type', 'start_date', 'end_date'], name='rate_range_cell_idx')]
+
+    def __str__(self):
+        return f"{self.title or 'نرخ فصلی'} {self.room_type} ({self.board_type}) {self.start_date} تا {self.end_date}"
+
+
+class BoardRule(models.Model):
+    """
+    Derives the prices of board_type from base_board_type at read time (pricing/rates.py):
+    nightly price + adult_supplement x base capacity, extra person + adult_supplement,
+    child + child_supplement. A room-type rule replaces the hotel rule for the same board;
+    explicit prices (Price rows, RateRange) of the derived board take precedence, and the
+    base board must be priced explicitly (rules do not chain).
+    """
+    hotel = models.ForeignKey(Hotel, on_delete=models.CASCADE, null=True, blank=True, related_name="board_rules", verbose_name="هتل")
+    room_type = models.ForeignKey(RoomType, on_delete=models.CASCADE, null=True, blank=True, related_name="board_rules", verbose_name="نوع اتاق")
+    board_type = models.ForeignKey(BoardType, on_delete=models.CASCADE, related_name="derived_rules", verbose_name="نوع سرویس محاسبه‌شده")
+    base_board_type = models.ForeignKey(BoardType, on_delete=models.CASCADE, related_name="base_rules", verbose_name="نوع سرویس پایه")
+    adult_supplement = models.DecimalField(max_digits=20, decimal_places=0, default=0, verbose_name="مکمل هر بزرگسال در شب (تومان)")
+    child_supplement = models.DecimalField(max_digits=20, decimal_places=0, default=0, verbose_name="مکمل هر کودک در شب (تومان)")
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name="آخرین تغییر")
+
+    class Meta:
+        verbose_name = "قاعده قیمت سرویس"
+        verbose_name_plural = "قواعد قیمت سرویس"
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(hotel__isnull=False, room_type__isnull=True) | models.Q(hotel__isnull=True, room_type__isnull=False),
+                name='board_rule_hotel_xor_room',
+            ),
+            models.UniqueConstraint(fields=['hotel', 'board_type'], condition=models.Q(room_type__isnull=True), name='board_rule_hotel_board_unique'),
+            models.UniqueConstraint(fields=['room_type', 'board_type'], condition=models.Q(hotel__isnull=True), name='board_rule_room_board_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.board_type} = {self.base_board_type} + {self.adult_supplement} ({self.room_type or self.hotel})"
+
+    def clean(self):
+        if bool(self.hotel_id) == bool(self.room_type_id):
+            raise ValidationError("دقیقاً یکی از هتل یا نوع اتاق را انتخاب کنید.")
+        if self.board_type_id and self.board_type_id == self.base_board_type_id:
+            raise ValidationError("نوع سرویس پایه و محاسبه‌شده نمی‌توانند یکسان باشند.")
+
+
+class InventoryChange(models.Model):
+    """
+    One changed Availability / Price cell, written by every inventory write path
+    (pricing/changelog.py). Consumers follow seq, which is assigned after the writing
+    transaction commits, in commit order; the auto-increment id is assigned at insert time
+    and a long transaction can commit a lower id after a higher one.
+    """
+    KIND_CHOICES = (
+        ('availability', 'موجودی'),
+        ('price', 'قیمت'),
+    )
+    SOURCE_CHOICES = (
+        ('admin', 'پنل مدیریت'),
+        ('calendar', 'تقویم قیمت‌گذاری'),
+        ('bulk_api', 'API گروهی'),
+        ('booking', 'رزرو'),
+        ('other', 'سایر'),
+    )
+    id = models.BigAutoField(primary_key=True, verbose_name="شماره ترتیب")
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, verbose_name="نوع")
+    room_type_id = models.PositiveIntegerField(db_index=True, verbose_name="شناسه نوع اتاق")
+    # 0 for availability cells (they have no board).
+    board_type_id = models.PositiveIntegerField(default=0, verbose_name="شناسه نوع سرویس")
+    date = jmodels.jDateField(verbose_name="تاریخ")
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default='other', verbose_name="منبع")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name="زمان ثبت")
+    seq = models.BigIntegerField(null=True, blank=True, unique=True, verbose_name="شماره ترتیب انتشار")
+
+    class Meta:
+        verbose_name = "تغییر موجودی/قیمت"
+        verbose_name_plural = "گزارش تغییرات موجودی و قیمت"
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['kind', 'room_type_id', 'board_type_id', 'date'], name='inventory_change_cell_idx'),
+            models.Index(fields=['id'], condition=models.Q(seq__isnull=True), name='inventory_change_unseq_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.kind} {self.room_type_id}/{self.board_type_id} {self.date}"
@@ -0,0 +1,239 @@
+# pricing/rates.py
+# version: 1.2.0
+# FEATURE: Resolves nightly rates from season ranges (RateRange) and per-day Price rows.
+#   A cell (room, board, date) takes the amounts of its Price row if one exists, else those
+#   of the newest RateRange covering the date and its Jalali weekday. Readers get a dict of
+#   cells from two queries, however many days the ranges span.
+#   compact_prices() folds runs of identical per-day rows into ranges.
+# FEATURE: Boards without explicit prices are derived from a base board by BoardRule
+#          (one more query, plus one for the rooms' capacities when a rule applies).
+# FIX: compact_prices() locks each run's rows and deletes them only if their amounts are
+#      still the ones read; a run changed by a concurrent price write is rolled back and kept.
+
+from collections import defaultdict
+from datetime import date
+from itertools import groupby
+from operator import itemgetter
+
+from django.db import transaction
+from django.db.models import Q
+
+from agencies.rate_plans import day_number
+from hotels.models import RoomType
+from .models import BoardRule, Price, RateRange
+
+RANGE_FIELDS = ('room_type_id', 'board_type_id', 'start_date', 'end_date', 'weekdays',
+                'price_per_night', 'extra_person_price', 'child_price')
+PRICE_FIELDS = ('room_type_id', 'board_type_id', 'date', 'price_per_night', 'extra_person_price', 'child_price')
+RULE_FIELDS = ('room_type_id', 'hotel_id', 'board_type_id', 'base_board_type_id',
+               'adult_supplement', 'child_supplement', 'updated_at')
+
+# Runs of identical per-day rows shorter than this are left as Price rows.
+MIN_RUN_DAYS = 7
+
+
+def weekday_bit(number):
+    """Mask bit of a day number (gregorian ordinal): bit 0 = Saturday ... bit 6 = Friday."""
+    return 1 << ((date.fromordinal(number).weekday() + 2) % 7)
+
+
+def weekdays_mask(weekdays):
+    """Mask of an iterable of Jalali weekdays (0 = Saturday); None means every day."""
+    if weekdays is None:
+        return RateRange.ALL_WEEKDAYS
+    mask = 0
+    for weekday in weekdays:
+        mask |= 1 << weekday
+    return mask
+
+
+def covered_days(start, end, weekdays, lo, hi):
+    """Day numbers within [lo, hi] covered by a range from start to end with the weekdays mask."""
+    for number in range(max(day_number(start), lo), min(day_number(end), hi) + 1):
+        if weekdays & weekday_bit(number):
+            yield number
+
+
+def ranges_between(room_ids, start, end, board_ids=None):
+    """Ranges of the rooms overlapping start..end, oldest first (later ones override)."""
+    queryset = RateRange.objects.filter(room_type_id__in=room_ids, start_date__lte=end, end_date__gte=start)
+    if board_ids is not None:
+        queryset = queryset.filter(board_type_id__in=board_ids)
+    return queryset.order_by('id')
+
+
+def overrides_between(room_ids, start, end, board_ids=None):
+    queryset = Price.objects.filter(room_type_id__in=room_ids, date__range=(start, end))
+    if board_ids is not None:
+        queryset = queryset.filter(board_type_id__in=board_ids)
+    return queryset
+
+
+def rules_for(room_ids, board_ids=None):
+    """BoardRule rows applying to the rooms (directly or through their hotel)."""
+    hotel_ids = RoomType.objects.filter(id__in=room_ids).values('hotel_id')
+    queryset = BoardRule.objects.filter(Q(room_type_id__in=room_ids) | Q(hotel_id__in=hotel_ids))
+    if board_ids is not None:
+        queryset = queryset.filter(board_type_id__in=board_ids)
+    return queryset
+
+
+def board_rules(room_ids, board_ids=None):
+    """
+    {room_id: {base_board_id: [(board_id, adult_supplement, child_supplement, base_capacity, updated_at)]}}.
+    A room-type rule replaces the hotel rule for the same derived board.
+    """
+    room_ids = list(room_ids)
+    rows = list(rules_for(room_ids, board_ids).values_list(*RULE_FIELDS))
+    if not rows:
+        return {}
+    hotel_rules, room_rules = defaultdict(dict), defaultdict(dict)
+    for room_id, hotel_id, board_id, base_board_id, adult, child, updated_at in rows:
+        target = room_rules[room_id] if room_id else hotel_rules[hotel_id]
+        target[board_id] = (base_board_id, adult, child, updated_at)
+
+    rules = {}
+    for room_id, hotel_id, capacity in RoomType.objects.filter(id__in=room_ids).values_list('id', 'hotel_id', 'base_capacity'):
+        merged = {**hotel_rules.get(hotel_id, {}), **room_rules.get(room_id, {})}
+        by_base = defaultdict(list)
+        for board_id, (base_board_id, adult, child, updated_at) in merged.items():
+            by_base[base_board_id].append((board_id, adult, child, capacity, updated_at))
+        if by_base:
+            rules[room_id] = dict(by_base)
+    return rules
+
+
+def derive(cells, rules):
+    """
+    Adds the derived-board cells missing from cells ({(room_id, board_id, day): amounts})
+    using board_rules() output. Returns {derived key: (base key, rule updated_at)}.
+    """
+    derived = {}
+    for (room_id, board_id, day), (base, extra, child) in list(cells.items()):
+        for target_board, adult, child_supplement, capacity, updated_at in rules.get(room_id, {}).get(board_id, ()):
+            key = (room_id, target_board, day)
+            if key in cells and key not in derived:
+                continue  # explicitly priced
+            cells[key] = (base + adult * capacity, extra + adult, child + child_supplement)
+            derived[key] = ((room_id, board_id, day), updated_at)
+    return derived
+
+
+def dependent_cells(cells):
+    """(room_id, board_id, date) cells whose derived prices follow the given base cells."""
+    cells = list(cells)
+    rules = board_rules({room_id for room_id, _, _ in cells}) if cells else {}
+    return [
+        (room_id, target[0], day)
+        for room_id, board_id, day in cells
+        for target in rules.get(room_id, {}).get(board_id, ())
+    ]
+
+
+def resolve(room_ids, dates, board_ids=None):
+    """
+    {(room_id, board_id, day_number): (price_per_night, extra_person_price, child_price)}
+    for the given dates (gregorian or Jalali). Cells with neither a range, a Price row nor
+    a priced base board are absent.
+    """
+    numbers = {day_number(day) for day in dates}
+    room_ids = list(room_ids)
+    if not numbers or not room_ids:
+        return {}
+    lo, hi = min(numbers), max(numbers)
+    start, end = date.fromordinal(lo), date.fromordinal(hi)
+
+    rules = board_rules(room_ids, board_ids)
+    explicit_boards = board_ids
+    if board_ids is not None:
+        # Base boards of the requested derived boards are read too, then dropped.
+        explicit_boards = set(board_ids) | {base for room in rules.values() for base in room}
+
+    cells = {}
+    for room_id, board_id, range_start, range_end, weekdays, base, extra, child in ranges_between(
+            room_ids, start, end, explicit_boards).values_list(*RANGE_FIELDS):
+        for number in covered_days(range_start, range_end, weekdays, lo, hi):
+            if number in numbers:
+                cells[(room_id, board_id, number)] = (base, extra, child)
+
+    for room_id, board_id, day, base, extra, child in overrides_between(
+            room_ids, start, end, explicit_boards).values_list(*PRICE_FIELDS):
+        number = day_number(day)
+        if number in numbers:
+            cells[(room_id, board_id, number)] = (base, extra, child)
+
+    if rules:
+        derive(cells, rules)
+        if board_ids is not None:
+            wanted = {int(board_id) for board_id in board_ids}
+            cells = {key: amounts for key, amounts in cells.items() if key[1] in wanted}
+    return cells
+
+
+def daily_price(room_id, board_id, day):
+    """Amounts of one cell, or None. The range query only runs when there is no Price row."""
+    override = Price.objects.filter(room_type_id=room_id, board_type_id=board_id, date=day).values_list(
+        'price_per_night', 'extra_person_price', 'child_price').first()
+    if override is not None:
+        return override
+    return resolve([room_id], [day], [board_id]).get((room_id, board_id, day_number(day)))
+
+
+# ==============================================================================
+# COMPACTION
+# ==============================================================================
+
+def _runs(rows):
+    """Maximal runs of consecutive days with equal amounts in date-ordered (id, *PRICE_FIELDS) rows."""
+    run = []
+    for row in rows:
+        if run and (day_number(row[3]) != day_number(run[-1][3]) + 1 or row[4:] != run[-1][4:]):
+            yield run
+            run = []
+        run.append(row)
+    if run:
+        yield run
+
+
+class _RunChanged(Exception):
+    """A run's rows were written or deleted after they were read."""
+
+
+def compact_prices(room_ids=None, min_run=MIN_RUN_DAYS):
+    """
+    Replaces every run of at least min_run consecutive identical Price rows of a room /
+    board with one RateRange. The new range is the newest, so it wins over older ranges
+    exactly where the replaced rows did; resolved rates are unchanged.
+    Rows are read without locks; each run is re-checked under row locks and left alone if a
+    price write changed any of its rows meanwhile.
+    Returns (ranges created, Price rows deleted).
+    """
+    rows = Price.objects.order_by('room_type_id', 'board_type_id', 'date')
+    if room_ids is not None:
+        rows = rows.filter(room_type_id__in=room_ids)
+
+    created = deleted = 0
+    for (room_id, board_id), cell_rows in groupby(rows.values_list('id', *PRICE_FIELDS).iterator(chunk_size=2000),
+                                                  key=itemgetter(1, 2)):
+        for run in _runs(list(cell_rows)):
+            if len(run) < min_run:
+                continue
+            _, _, _, first_day, base, extra, child = run[0]
+            run_ids = [row[0] for row in run]
+            try:
+                with transaction.atomic():
+                    list(Price.objects.select_for_update().filter(id__in=run_ids).values_list('id', flat=True))
+                    RateRange.objects.create(
+                        room_type_id=room_id, board_type_id=board_id, start_date=first_day, end_date=run[-1][3],
+                        price_per_night=base, extra_person_price=extra, child_price=child,
+                    )
+                    run_deleted = Price.objects.filter(
+                        id__in=run_ids, price_per_night=base, extra_person_price=extra, child_price=child,
+                    ).delete()[0]
+                    if run_deleted != len(run):
+                        raise _RunChanged()
+            except _RunChanged:
+                continue
+            deleted += run_deleted
+            created += 1
+    return created, deleted
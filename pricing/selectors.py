@@ -1,77 +1,99 @@
 # pricing/selectors.py
-# version: 6.1.0
-# FIX: Added 'HotelImage' import and logic to fetch 'main_image' for search results.
-# FEATURE: Includes hotel image URL in the find_available_hotels output.
+# version: 6.5.0
+# PERF: Stars / amenity / category filters are applied before price computation,
+#       using the precomputed Hotel bitsets (hotels/feature_bits.py).
+# PERF: Agency contract resolution uses the compiled rate plan (agencies/rate_plans.py)
+#       instead of two queries per night; default_discount_percentage is now applied.
+# FEATURE: Public rates are resolved from season ranges plus per-day overrides (rates.py);
+#          search and multi-room quotes read all nights of a stay in two queries.
+# FEATURE: Multi-room quotes return each room's nightly amounts (snapshotted on BookingRoom).
 
 from datetime import timedelta
 from django.db.models import Count
 # FIX: Added HotelImage to imports
 from hotels.models import RoomType, BoardType, Hotel, HotelImage
-from agencies.models import Contract, StaticRate
-from .models import Price
+from hotels import feature_bits
+from agencies.rate_plans import get_rate_plan_for_user, day_number
+from . import rates
 from django.shortcuts import get_object_or_404
 from decimal import Decimal
 from collections import defaultdict
 
-def _get_daily_price_for_user(room_type: RoomType, board_type: BoardType, date, user):
+def _price_info(amounts):
+    """amounts: (price_per_night, extra_person_price, child_price) as resolved by rates.py."""
+    return {
+        'price_per_night': amounts[0],
+        'extra_person_price': amounts[1],
+        'child_price': amounts[2],
+    }
+
+def _get_daily_price_for_user(room_type: RoomType, board_type: BoardType, date, user, rate_plan=None):
     """
     Calculates the price for a single room on a specific day for a given user.
+    Agency prices come from the compiled rate plan (agencies/rate_plans.py), so the
+    contract lookup costs no query. Callers pricing many nights can pass rate_plan.
     """
-    public_price_obj = Price.objects.filter(room_type=room_type, board_type=board_type, date=date).first()
+    public_price = rates.daily_price(room_type.id, board_type.id, date)
 
-    if not public_price_obj:
+    if not public_price:
         return None
-    
-    final_price = {
-        'price_per_night': public_price_obj.price_per_night,
-        'extra_person_price': public_price_obj.extra_person_price,
-        'child_price': public_price_obj.child_price,
-    }
 
-    if not user or not user.is_authenticated:
-        return final_price
+    final_price = _price_info(public_price)
 
-    agency_user = user.agency_profile if hasattr(user, 'agency_profile') else None
-    if not user.is_authenticated or not agency_user:
+    if rate_plan is None:
+        rate_plan = get_rate_plan_for_user(user)
+    if rate_plan is None:
         return final_price
 
-    contract = Contract.objects.filter(
-        agency=agency_user.agency,
-        start_date__lte=date,
-        end_date__gte=date,
-        hotel=room_type.hotel,
-        is_active=True
-    ).order_by('-priority').first()
-
-    if not contract:
-        return final_price
+    return rate_plan.apply(final_price, room_type.hotel_id, room_type.id, date)
 
-    static_rate = StaticRate.objects.filter(contract=contract, room_type=room_type).first()
-    if static_rate:
-        final_price['price_per_night'] = static_rate.price_per_night
-        final_price['extra_person_price'] = static_rate.extra_person_price
-        final_price['child_price'] = static_rate.child_price
-        return final_price
-
-    if contract.contract_type == 'dynamic' and contract.discount_percentage > 0:
-        discount = final_price['price_per_night'] * (contract.discount_percentage / Decimal(100))
-        final_price['price_per_night'] -= discount
-
-    return final_price
+def _parse_id_list(value):
+    """Accepts "1,2,3" (from the URL) or a list of ids."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(',')
+    try:
+        return [int(v) for v in value if str(v).strip().isdigit()]
+    except (TypeError, ValueError):
+        return []
 
 def find_available_hotels(city_id: int, check_in_date, check_out_date, user, **filters):
     """
-    جستجوی هتل‌های موجود بر اساس شهر و تاریخ، با قابلیت فیلتر قیمت و ستاره.
+    جستجوی هتل‌های موجود بر اساس شهر و تاریخ، با قابلیت فیلتر قیمت، ستاره، امکانات و دسته‌بندی.
+    Filters that don't depend on price (stars, amenities, categories) narrow the candidate
+    hotels first, so filtered searches compute fewer prices, not more.
+      - amenities: hotel must have ALL the given Amenity ids
+      - categories: hotel must be in ANY of the given HotelCategory ids
     """
     duration = (check_out_date - check_in_date).days
     if duration <= 0:
         return []
 
     date_range = [check_in_date + timedelta(days=i) for i in range(duration)]
+    rate_plan = get_rate_plan_for_user(user)
+
+    # پردازش فیلتر ستاره (تبدیل رشته "3,4,5" به لیست اعداد)
+    target_stars = _parse_id_list(filters.get('stars'))
+    amenity_ids = _parse_id_list(filters.get('amenities'))
+    category_ids = _parse_id_list(filters.get('categories'))
+
+    # گام ۰: پیش‌فیلتر هتل‌ها بدون محاسبه قیمت (بیت‌ست امکانات/دسته‌بندی)
+    room_filter = {'hotel__city_id': city_id}
+    if target_stars:
+        room_filter['hotel__stars__in'] = target_stars
+    if amenity_ids or category_ids:
+        hotel_rows = Hotel.objects.filter(city_id=city_id).values_list('id', 'amenity_bits', 'category_bits')
+        if target_stars:
+            hotel_rows = hotel_rows.filter(stars__in=target_stars)
+        candidate_hotel_ids = feature_bits.matching_hotel_ids(hotel_rows, amenity_ids, category_ids)
+        if not candidate_hotel_ids:
+            return []
+        room_filter['hotel_id__in'] = candidate_hotel_ids
 
     # گام ۱: پیدا کردن شناسه اتاق‌هایی که در کل بازه زمانی ظرفیت دارند
     available_room_ids = RoomType.objects.filter(
-        hotel__city_id=city_id,
+        **room_filter,
         availabilities__date__in=date_range,
         availabilities__quantity__gt=0
     ).annotate(
@@ -80,18 +102,17 @@ def find_available_hotels(city_id: int, check_in_date, check_out_date, user, **f
         num_available_days=duration
     ).values_list('id', flat=True)
 
+    available_room_ids = list(available_room_ids)
     if not available_room_ids:
         return []
 
-    # گام ۲: دریافت یکجای تمام قیمت‌ها برای جلوگیری از N+1 Query
-    all_prices = Price.objects.filter(
-        room_type_id__in=available_room_ids,
-        date__in=date_range
-    ).select_related('room_type__hotel', 'board_type').order_by('date')
-    
-    prices_map = defaultdict(lambda: defaultdict(list))
-    for price in all_prices:
-        prices_map[price.room_type_id][price.date].append(price)
+    # گام ۲: دریافت یکجای تمام قیمت‌ها (بازه‌های فصلی + قیمت‌های روزانه) برای جلوگیری از N+1 Query
+    day_numbers = [day_number(date) for date in date_range]
+    cells = rates.resolve(available_room_ids, date_range)
+    prices_map = defaultdict(lambda: defaultdict(dict))
+    for (room_id, board_id, number), amounts in cells.items():
+        prices_map[room_id][board_id][number] = amounts
+    rooms_map = RoomType.objects.select_related('hotel').in_bulk(available_room_ids)
 
     # گام ۳: محاسبه ارزان‌ترین قیمت برای هر هتل
     hotel_min_prices = defaultdict(lambda: float('inf'))
@@ -99,47 +120,28 @@ def find_available_hotels(city_id: int, check_in_date, check_out_date, user, **f
 
     for room_id in available_room_ids:
         min_room_total_price = float('inf')
-        
-        # پیدا کردن BoardType هایی که برای کل مدت اقامت قیمت دارند
-        board_type_day_counts = defaultdict(int)
-        for date in date_range:
-            for price_obj in prices_map[room_id][date]:
-                board_type_day_counts[price_obj.board_type_id] += 1
-        
-        valid_board_type_ids = [bt_id for bt_id, count in board_type_day_counts.items() if count == duration]
+        hotel = rooms_map[room_id].hotel
 
-        if not valid_board_type_ids:
-            continue 
+        # محاسبه قیمت کل برای هر سرویسی که برای کل مدت اقامت قیمت دارد
+        for nights in prices_map[room_id].values():
+            if len(nights) != duration:
+                continue
 
-        # محاسبه قیمت کل برای هر سرویس معتبر
-        for bt_id in valid_board_type_ids:
             current_board_total_price = Decimal(0)
-            is_valid_stay = True
-            
-            for date in date_range:
-                price_obj_for_day = next((p for p in prices_map[room_id][date] if p.board_type_id == bt_id), None)
-                if price_obj_for_day is None: 
-                    is_valid_stay = False; break
-                
-                price_info = _get_daily_price_for_user(price_obj_for_day.room_type, price_obj_for_day.board_type, date, user)
-                if price_info is None: 
-                    is_valid_stay = False; break 
-                
+            for date, number in zip(date_range, day_numbers):
+                price_info = _price_info(nights[number])
+                if rate_plan is not None:
+                    price_info = rate_plan.apply(price_info, hotel.id, room_id, date)
+
                 current_board_total_price += price_info['price_per_night']
 
-            if is_valid_stay and current_board_total_price < min_room_total_price:
+            if current_board_total_price < min_room_total_price:
                 min_room_total_price = current_board_total_price
 
         if min_room_total_price == float('inf') or min_room_total_price <= 0: 
             continue
             
         avg_price = min_room_total_price / Decimal(duration)
-        
-        # دسترسی به آبجکت هتل از طریق اولین قیمت پیدا شده برای اتاق
-        first_price_obj = all_prices.filter(room_type_id=room_id).first()
-        if not first_price_obj: continue
-        
-        hotel = first_price_obj.room_type.hotel
         hotel_id = hotel.id
 
         # ذخیره کمترین قیمت هتل و جزئیات آن
@@ -162,19 +164,6 @@ def find_available_hotels(city_id: int, check_in_date, check_out_date, user, **f
         if img.hotel_id not in image_map:
             image_map[img.hotel_id] = img.image.url
 
-    # پردازش فیلتر ستاره (تبدیل رشته "3,4,5" به لیست اعداد)
-    target_stars = []
-    if filters.get('stars'):
-        try:
-            # اگر فرمت string باشد (از URL) آن را تبدیل کن، اگر لیست باشد همان را استفاده کن
-            stars_input = filters['stars']
-            if isinstance(stars_input, str):
-                target_stars = [int(s) for s in stars_input.split(',') if s.strip().isdigit()]
-            elif isinstance(stars_input, list):
-                target_stars = [int(s) for s in stars_input]
-        except:
-            pass
-
     # گام ۴: ساخت لیست نهایی و اعمال فیلترها
     results = []
     for hotel_id, info in hotel_details.items():
@@ -185,10 +174,6 @@ def find_available_hotels(city_id: int, check_in_date, check_out_date, user, **f
            (filters.get('max_price') and min_price > filters['max_price']):
             continue
 
-        # ۲. فیلتر ستاره
-        if target_stars and info['stars'] not in target_stars:
-            continue
-
         results.append({
             'hotel_id': info['id'],
             'hotel_name': info['name'],
@@ -212,6 +197,8 @@ def calculate_multi_booking_price(booking_rooms, check_in_date, check_out_date,
     duration = (check_out_date - check_in_date).days
     if duration <= 0: return None
 
+    date_range = [check_in_date + timedelta(days=i) for i in range(duration)]
+    rate_plan = get_rate_plan_for_user(user)
     total_room_price = Decimal(0)
     hotel = None # To store the hotel object for tax calculation
     room_specific_prices = []
@@ -234,26 +221,32 @@ def calculate_multi_booking_price(booking_rooms, check_in_date, check_out_date,
         if hotel is None: hotel = room_type.hotel
 
         room_selection_price = Decimal(0)
-        
-        for i in range(duration):
-            current_date = check_in_date + timedelta(days=i)
-            price_info = _get_daily_price_for_user(room_type, board_type, current_date, user)
-            
-            if price_info is None:
+        nightly_prices = []
+        nights = rates.resolve([room_type_id], date_range, [board_type_id])
+
+        for current_date in date_range:
+            amounts = nights.get((room_type_id, board_type_id, day_number(current_date)))
+            if amounts is None:
                 return None
+            price_info = _price_info(amounts)
+            if rate_plan is not None:
+                price_info = rate_plan.apply(price_info, room_type.hotel_id, room_type_id, current_date)
 
             daily_base_price_total = price_info['price_per_night'] * quantity
             daily_extra_adults_cost = Decimal(extra_adults) * price_info['extra_person_price'] * quantity
             daily_children_cost = Decimal(children) * price_info['child_price'] * quantity
             
-            room_selection_price += daily_base_price_total + daily_extra_adults_cost + daily_children_cost
+            night_price = daily_base_price_total + daily_extra_adults_cost + daily_children_cost
+            room_selection_price += night_price
+            nightly_prices.append(str(night_price))
 
         total_room_price += room_selection_price
 
         room_specific_prices.append({
             'room_type_id': room_type_id,
             'board_type_id': board_type_id,
-            'total_price': room_selection_price
+            'total_price': room_selection_price,
+            'nightly_prices': nightly_prices
         })
 
     # --- TAX CALCULATION LOGIC ---
@@ -1,5 +1,6 @@
-#pricing/serializers.py v1.0.1
+#pricing/serializers.py v1.1.0
 #Update: Added HotelSearchResultSerializer to support the new hotel search API response structure.
+#Update: Bulk stock / price serializers accept many rooms, many boards and a weekday filter.
 from rest_framework import serializers
 
 # سریالایزر جدید برای نتایج جستجوی هتل
@@ -47,21 +48,46 @@ class PriceQuoteOutputSerializer(serializers.Serializer):
     children_cost = serializers.DecimalField(max_digits=20, decimal_places=0)
     total_price = serializers.DecimalField(max_digits=20, decimal_places=0)
 
-class BulkUpdateStockSerializer(serializers.Serializer):
-    room = serializers.IntegerField()
+class _BulkInventorySerializer(serializers.Serializer):
+    """
+    Shared fields of the bulk inventory APIs: 'room' (one id) or 'rooms' (list),
+    a gregorian date range and an optional list of Jalali weekdays (0 = Saturday).
+    """
+    room = serializers.IntegerField(required=False)
+    rooms = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
     start_date = serializers.DateField()
     end_date = serializers.DateField()
+    weekdays = serializers.ListField(child=serializers.IntegerField(min_value=0, max_value=6), required=False)
+
+    def validate(self, attrs):
+        rooms = attrs.pop('rooms', None) or ([attrs.pop('room')] if 'room' in attrs else [])
+        if not rooms:
+            raise serializers.ValidationError("حداقل یک اتاق (room یا rooms) الزامی است.")
+        attrs['rooms'] = sorted(set(rooms))
+        if attrs['start_date'] > attrs['end_date']:
+            raise serializers.ValidationError("تاریخ شروع نمی‌تواند بعد از تاریخ پایان باشد.")
+        return attrs
+
+
+class BulkUpdateStockSerializer(_BulkInventorySerializer):
     quantity = serializers.IntegerField(min_value=0)
 
-class BulkUpdatePriceSerializer(serializers.Serializer):
-    room = serializers.IntegerField()
-    start_date = serializers.DateField()
-    end_date = serializers.DateField()
-    board_type = serializers.IntegerField()
+
+class BulkUpdatePriceSerializer(_BulkInventorySerializer):
+    board_type = serializers.IntegerField(required=False)
+    board_types = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
     price = serializers.DecimalField(max_digits=14, decimal_places=0)
     extra_price = serializers.DecimalField(max_digits=14, decimal_places=0, required=False, default=0)
     child_price = serializers.DecimalField(max_digits=14, decimal_places=0, required=False, default=0)
 
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        boards = attrs.pop('board_types', None) or ([attrs.pop('board_type')] if 'board_type' in attrs else [])
+        if not boards:
+            raise serializers.ValidationError("حداقل یک نوع سرویس (board_type یا board_types) الزامی است.")
+        attrs['board_types'] = sorted(set(boards))
+        return attrs
+
 class CalendarQuerySerializer(serializers.Serializer):
     room = serializers.IntegerField()
     start_date = serializers.DateField()
@@ -0,0 +1,21 @@
+# pricing/signals.py
+# version: 1.0.0
+# FEATURE: Logs the cells of deleted season ranges and board rules in the change log,
+#          whatever deletes them (admin, cascades, shell), so change-log consumers and
+#          ARI deltas see the removal.
+
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import RateRange, BoardRule
+from . import inventory
+
+
+@receiver(post_delete, sender=RateRange)
+def log_deleted_rate_range(sender, instance, **kwargs):
+    inventory.record_rate_range(instance)
+
+
+@receiver(post_delete, sender=BoardRule)
+def log_deleted_board_rule(sender, instance, **kwargs):
+    inventory.record_board_rule(instance)
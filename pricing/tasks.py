@@ -0,0 +1,14 @@
+# pricing/tasks.py
+# version: 1.0.0
+# FEATURE: Daily compaction of the inventory change log.
+
+from celery import shared_task
+
+from . import changelog
+
+
+@shared_task
+def compact_inventory_changes(older_than_days=7, past_days=30):
+    """Scheduled in CELERY_BEAT_SCHEDULE (settings.py); see changelog.compact()."""
+    deleted = changelog.compact(older_than_days=older_than_days, past_days=past_days)
+    return f"Compacted {deleted} change log entries."
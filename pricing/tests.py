@@ -1,23 +1,38 @@
-# pricing/tests.py v1.5
+# pricing/tests.py v1.16
+# Feature: Tests for the agency ARI feed (change-log deltas, deletes included).
+# Feature: Tests for the inventory change log (commit-ordered cursor).
+# Feature: Tests for the set-based bulk stock / price APIs.
+# Feature: Test for the diff-based calendar grid save.
+# Feature: Test for the cached, lazy admin pricing grid.
+# Feature: Tests for season rate ranges and their compaction (concurrent writes kept).
+# Feature: Test for derived board prices (BoardRule).
 # This file is correct and correctly identifies the bug in the selector.
+from django.contrib import admin
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
 from jdatetime import date as jdate
 from decimal import Decimal
 from datetime import timedelta
+from unittest import mock
 
 from core.models import CustomUser
 from hotels.models import City, Hotel, RoomType, BoardType
 from agencies.models import Agency, Contract, AgencyUser
-from .models import Availability, Price
-from .selectors import find_available_hotels, _get_daily_price_for_user
+from .models import Availability, Price, InventoryChange, RateRange, BoardRule
+from . import changelog, inventory, rates
+from .admin import PriceAdmin
+from agencies.rate_plans import day_number
+from .selectors import find_available_hotels, calculate_multi_booking_price, _get_daily_price_for_user
 
 class PricingSelectorTests(TestCase):
 
     @classmethod
     def setUpTestData(cls):
         """Set up non-modified objects used by all test methods."""
-        cls.normal_user = CustomUser.objects.create_user(username='normaluser', password='password')
-        cls.agency_user = CustomUser.objects.create_user(username='agencyuser', password='password')
+        cls.normal_user = CustomUser.objects.create_user(username='normaluser', password='password', mobile='09120000010')
+        cls.agency_user = CustomUser.objects.create_user(username='agencyuser', password='password', mobile='09120000011')
 
         cls.city = City.objects.create(name="Test City", slug="test-city")
         cls.hotel = Hotel.objects.create(name="Test Hotel", slug="test-hotel", city=cls.city, stars=5)
@@ -97,3 +112,335 @@ class PricingSelectorTests(TestCase):
         )
         self.assertIsNotNone(price_info)
         self.assertEqual(price_info['price_per_night'], Decimal('900000.00'))
+
+
+class AgencyARIFeedTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        city = City.objects.create(name="Shiraz", slug="shiraz")
+        cls.hotel = Hotel.objects.create(name="Chamran", slug="chamran", city=city)
+        cls.board = BoardType.objects.create(name="Full Board", code="FB")
+        cls.rooms = [
+            RoomType.objects.create(hotel=cls.hotel, name=f"Room {i}", code=f"CH-{i}", price_per_night=1)
+            for i in range(2)
+        ]
+        agency = Agency.objects.create(name="Ari Agency")
+        cls.user = CustomUser.objects.create_user(username='ari', password='password', mobile='09120000012')
+        AgencyUser.objects.create(user=cls.user, agency=agency)
+        Contract.objects.create(agency=agency, hotel=cls.hotel, title="10%", contract_type='dynamic',
+                                discount_percentage=10, start_date=jdate(1404, 1, 1), end_date=jdate(1404, 12, 29))
+        for room in cls.rooms:
+            for day in range(1, 4):
+                Availability.objects.create(room_type=room, date=jdate(1404, 6, day), quantity=day)
+                Price.objects.create(room_type=room, board_type=cls.board, date=jdate(1404, 6, day),
+                                     price_per_night=1000000, extra_person_price=200000, child_price=100000)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.params = {'hotels': str(self.hotel.pk), 'from': '1404-06-01', 'to': '1404-06-04'}
+
+    def test_full_feed_is_columnar_with_net_rates(self):
+        response = self.client.get('/pricing/api/ari/', self.params)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['dates'], ['1404-06-01', '1404-06-02', '1404-06-03', '1404-06-04'])
+        room = data['rooms'][0]
+        self.assertEqual(room['availability'], [1, 2, 3, None])
+        self.assertEqual(room['boards'][0]['net'], [900000, 900000, 900000, None])
+
+        lines = b''.join(self.client.get('/pricing/api/ari/', dict(self.params, **{'as': 'ndjson'})).streaming_content)
+        self.assertEqual(len(lines.splitlines()), 3)
+
+    def test_etag_and_since_deltas(self):
+        response = self.client.get('/pricing/api/ari/', self.params)
+        etag, watermark = response['ETag'], response.json()['watermark']
+        self.assertEqual(self.client.get('/pricing/api/ari/', self.params, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        inventory.write_availability({(self.rooms[1].pk, jdate(1404, 6, 2)): 9})
+        response = self.client.get('/pricing/api/ari/', dict(self.params, since=watermark), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        rooms = response.json()['rooms']
+        self.assertEqual([room['room_id'] for room in rooms], [self.rooms[1].pk])
+        self.assertEqual(rooms[0]['availability'], [None, 9, None, None])
+        self.assertEqual(rooms[0]['boards'], [])
+
+    def test_rate_plan_change_resyncs_a_delta(self):
+        watermark = self.client.get('/pricing/api/ari/', self.params).json()['watermark']
+        delta = self.client.get('/pricing/api/ari/', dict(self.params, since=watermark)).json()
+        self.assertEqual((delta['resync'], delta['rooms']), (False, []))
+
+        # No inventory row changes, but every net rate does.
+        contract = Contract.objects.get(hotel=self.hotel)
+        contract.discount_percentage = 20
+        contract.save()
+        response = self.client.get('/pricing/api/ari/', dict(self.params, since=watermark)).json()
+        self.assertTrue(response['resync'])
+        self.assertEqual(len(response['rooms']), 2)
+        self.assertEqual(response['rooms'][0]['boards'][0]['net'], [800000, 800000, 800000, None])
+        self.assertNotEqual(response['watermark'], watermark)
+
+        # A bare cursor (no plan version) and an old timestamp watermark always resync.
+        bare = self.client.get('/pricing/api/ari/', dict(self.params, since=watermark.split('~')[0])).json()
+        self.assertTrue(bare['resync'])
+        legacy = self.client.get('/pricing/api/ari/', dict(self.params, since='2025-08-23T10:00:00+00:00~1')).json()
+        self.assertTrue(legacy['resync'])
+
+    def test_deleted_overrides_and_ranges_show_in_a_delta(self):
+        room = self.rooms[0]
+        season = RateRange.objects.create(room_type=room, board_type=self.board, start_date=jdate(1404, 6, 1),
+                                          end_date=jdate(1404, 6, 4), price_per_night=500000)
+        inventory.record_rate_range(season)
+        response = self.client.get('/pricing/api/ari/', self.params)
+        etag, watermark = response['ETag'], response.json()['watermark']
+        self.assertEqual(response.json()['rooms'][0]['boards'][0]['net'], [900000, 900000, 900000, 450000])
+
+        # The cell falls back to its season rate.
+        PriceAdmin(Price, admin.site).delete_model(None, Price.objects.get(room_type=room, date=jdate(1404, 6, 2)))
+        response = self.client.get('/pricing/api/ari/', dict(self.params, since=watermark), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        delta = response.json()
+        self.assertFalse(delta['resync'])
+        self.assertEqual([r['room_id'] for r in delta['rooms']], [room.pk])
+        self.assertEqual(delta['rooms'][0]['boards'][0]['net'], [None, 450000, None, None])
+
+        # Without the season two cells have no rate left, which a delta cannot express.
+        season.delete()
+        delta = self.client.get('/pricing/api/ari/', dict(self.params, since=delta['watermark'])).json()
+        self.assertTrue(delta['resync'])
+        self.assertEqual(len(delta['rooms']), 2)
+        self.assertEqual(delta['rooms'][0]['boards'][0]['net'], [900000, None, 900000, None])
+
+
+class InventoryChangeLogTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        city = City.objects.create(name="Yazd", slug="yazd")
+        hotel = Hotel.objects.create(name="Moshir", slug="moshir", city=city)
+        cls.room = RoomType.objects.create(hotel=hotel, name="Twin", code="MO-T", price_per_night=1)
+        cls.board = BoardType.objects.create(name="Room Only", code="RO")
+
+    def test_bulk_api_writes_are_logged_and_followed(self):
+        response = APIClient().post('/pricing/api/inventory/update-stock/', {
+            'room': self.room.pk, 'start_date': '2025-09-01', 'end_date': '2025-09-05', 'quantity': 4,
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(InventoryChange.objects.filter(kind='availability', source='bulk_api').count(), 5)
+
+        entries, cursor = changelog.read(0, limit=3)
+        self.assertEqual(len(entries), 3)
+        self.assertEqual([entry['seq'] for entry in changelog.follow(cursor, batch_size=1)], [
+            change.seq for change in InventoryChange.objects.order_by('seq')[3:]
+        ])
+        self.assertEqual(changelog.read(changelog.latest_cursor()), ([], changelog.latest_cursor()))
+
+    def test_an_entry_committed_late_with_a_lower_id_is_not_skipped(self):
+        day = jdate.today() + timedelta(days=3)
+        changelog.record_availability([(self.room.pk, day)])
+        entries, cursor = changelog.read(0)
+        self.assertEqual(len(entries), 1)
+        # A long transaction that inserted before the entry above commits only now.
+        late = InventoryChange.objects.create(id=InventoryChange.objects.get().id - 1, kind='price',
+                                              room_type_id=self.room.pk, board_type_id=self.board.pk, date=day)
+        entries, next_cursor = changelog.read(cursor)
+        self.assertEqual([(entry['kind'], entry['seq']) for entry in entries], [('price', cursor + 1)])
+        self.assertEqual(InventoryChange.objects.get(pk=late.pk).seq, next_cursor)
+
+    def test_compaction_keeps_the_latest_entry_per_cell(self):
+        day = jdate.today() + timedelta(days=10)
+        changelog.record_availability([(self.room.pk, day), (self.room.pk, jdate.today() - timedelta(days=40))])
+        changelog.record_prices([(self.room.pk, self.board.pk, day)] * 3, source='admin')
+        InventoryChange.objects.update(created_at=timezone.now() - timedelta(days=8))
+        latest = InventoryChange.objects.filter(kind='price').order_by('-id').first()
+
+        self.assertEqual(changelog.compact(older_than_days=7, past_days=30), 3)
+        self.assertEqual(list(InventoryChange.objects.filter(kind='price')), [latest])
+        self.assertEqual(InventoryChange.objects.filter(kind='availability').count(), 1)
+
+
+class BulkInventoryAPITests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        city = City.objects.create(name="Isfahan", slug="isfahan")
+        hotel = Hotel.objects.create(name="Abbasi", slug="abbasi", city=city)
+        cls.rooms = [RoomType.objects.create(hotel=hotel, name=f"R{i}", code=f"AB-{i}", price_per_night=1) for i in range(3)]
+        cls.boards = [BoardType.objects.create(name=f"B{i}", code=f"AB{i}") for i in range(2)]
+
+    def test_price_upsert_covers_rooms_boards_and_weekdays(self):
+        room_ids = [room.pk for room in self.rooms]
+        board_ids = [board.pk for board in self.boards]
+        Price.objects.create(room_type=self.rooms[0], board_type=self.boards[0], date=jdate(1404, 6, 1),
+                             price_per_night=1, extra_person_price=1, child_price=1)
+        payload = {
+            'rooms': room_ids, 'board_types': board_ids,
+            # 1404-06-01 .. 1404-06-14 (gregorian 2025-08-23 .. 2025-09-05), Saturdays and Fridays only.
+            'start_date': '2025-08-23', 'end_date': '2025-09-05', 'weekdays': [0, 6],
+            'price': 2000000, 'extra_price': 300000,
+        }
+        with self.assertNumQueries(9):
+            response = APIClient().post('/pricing/api/inventory/update-price/', payload, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['cells'], 3 * 2 * 4)
+
+        prices = Price.objects.filter(room_type_id__in=room_ids)
+        self.assertEqual(prices.count(), 24)
+        self.assertEqual({jdate.fromgregorian(date=p.date.togregorian()).weekday() for p in prices}, {0, 6})
+        updated = prices.get(room_type=self.rooms[0], board_type=self.boards[0], date=jdate(1404, 6, 1))
+        self.assertEqual((updated.price_per_night, updated.extra_person_price, updated.child_price), (2000000, 300000, 0))
+        self.assertEqual(InventoryChange.objects.filter(kind='price').count(), 24)
+
+    def test_invalid_requests(self):
+        client = APIClient()
+        payload = {'rooms': [self.rooms[0].pk, 999999], 'start_date': '2025-08-23', 'end_date': '2025-08-24', 'quantity': 2}
+        self.assertEqual(client.post('/pricing/api/inventory/update-stock/', payload, format='json').status_code, 400)
+        payload['rooms'] = [self.rooms[0].pk]
+        payload['start_date'] = '2025-09-01'
+        self.assertEqual(client.post('/pricing/api/inventory/update-stock/', payload, format='json').status_code, 400)
+        self.assertFalse(Availability.objects.exists())
+
+    def test_calendar_grid_saves_only_changed_cells(self):
+        staff = CustomUser.objects.create_user(username='staff', password='password', mobile='09120000013', is_staff=True)
+        self.client.force_login(staff)
+        room, board = self.rooms[0], self.boards[0]
+        Availability.objects.create(room_type=room, date=jdate(1404, 6, 1), quantity=3)
+        Price.objects.create(room_type=room, board_type=board, date=jdate(1404, 6, 1),
+                             price_per_night=1000, extra_person_price=200, child_price=100)
+        url = f'/pricing/admin/calendar-pricing/?hotel_id={room.hotel_id}&board_type_id={board.pk}'
+        post = {
+            f'avail_{room.pk}_1404-06-01': '3',             # unchanged
+            f'avail_{room.pk}_1404-06-02': '5',
+            f'price_base_{room.pk}_1404-06-01': '1,000',    # unchanged
+            f'price_extra_{room.pk}_1404-06-01': '250',
+            f'price_base_{room.pk}_1404-06-02': '2 000',
+        }
+        response = self.client.post(url, post, follow=True)
+        self.assertIn("1 خانه موجودی و 2 خانه قیمت", str(list(response.context['messages'])[0]))
+        self.assertEqual(InventoryChange.objects.count(), 3)
+
+        stored = Price.objects.get(room_type=room, date=jdate(1404, 6, 1))
+        self.assertEqual((stored.price_per_night, stored.extra_person_price, stored.child_price), (1000, 250, 100))
+        self.assertEqual(Price.objects.get(room_type=room, date=jdate(1404, 6, 2)).price_per_night, 2000)
+        self.assertEqual(Availability.objects.get(room_type=room, date=jdate(1404, 6, 2)).quantity, 5)
+
+        response = self.client.post(url, post, follow=True)
+        self.assertIn("تغییری", str(list(response.context['messages'])[0]))
+
+    def test_pricing_grid_chunks_are_cached_until_a_write(self):
+        cache.clear()
+        staff = CustomUser.objects.create_user(username='grid', password='password', mobile='09120000014', is_staff=True)
+        self.client.force_login(staff)
+        room, board = self.rooms[0], self.boards[1]
+        Price.objects.create(room_type=room, board_type=board, date=jdate(1404, 6, 2),
+                             price_per_night=1000, extra_person_price=200, child_price=100)
+        self.assertEqual(self.client.get('/pricing/admin/pricing-grid/').status_code, 200)
+        url = f'/pricing/admin/pricing-grid/data/?hotel_id={room.hotel_id}&from=1404-06-01&days=3'
+
+        chunk = self.client.get(url).json()
+        self.assertEqual(chunk['dates'], ['1404-06-01', '1404-06-02', '1404-06-03'])
+        self.assertEqual(chunk['next'], '1404-06-04')
+        self.assertEqual(chunk['rooms'][0]['prices'][str(board.pk)]['base'], [None, 1000, None])
+        with self.assertNumQueries(2):  # session and user only
+            self.assertEqual(self.client.get(url).json(), chunk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {
+                'availability': [[room.pk, '1404-06-01', 4]],
+                'prices': [[room.pk, board.pk, '1404-06-02', 'extra', '300']],
+            }, content_type='application/json')
+        self.assertEqual(response.json()['prices'], 1)
+        chunk = self.client.get(url).json()
+        self.assertEqual(chunk['rooms'][0]['availability'], [4, None, None])
+        self.assertEqual(chunk['rooms'][0]['prices'][str(board.pk)]['extra'], [None, 300, None])
+        self.assertEqual(self.client.post(url, '{"prices": [[1, 1, "x", "base", 1]]}',
+                                          content_type='application/json').status_code, 400)
+
+
+class SeasonRateTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        city = City.objects.create(name="Kashan", slug="kashan")
+        cls.hotel = Hotel.objects.create(name="Ameri", slug="ameri", city=city)
+        cls.room = RoomType.objects.create(hotel=cls.hotel, name="Suite", code="AM-S", price_per_night=1)
+        cls.board = BoardType.objects.create(name="Half Board", code="HB")
+        cls.user = CustomUser.objects.create_user(username='season', password='password', mobile='09120000015')
+        # 1404-07-01 is a Tuesday; weekdays 5 and 6 are Thursday and Friday.
+        cls.start = jdate(1404, 7, 1)
+        cls.days = [cls.start + timedelta(days=i) for i in range(10)]
+
+    def test_overrides_and_newer_ranges_take_precedence(self):
+        RateRange.objects.create(room_type=self.room, board_type=self.board, start_date=self.start,
+                                 end_date=jdate(1404, 7, 30), price_per_night=1000, extra_person_price=100)
+        RateRange.objects.create(room_type=self.room, board_type=self.board, start_date=self.start,
+                                 end_date=jdate(1404, 7, 30), weekdays=rates.weekdays_mask([5, 6]), price_per_night=1500)
+        Price.objects.create(room_type=self.room, board_type=self.board, date=jdate(1404, 7, 2),
+                             price_per_night=900, extra_person_price=90, child_price=0)
+
+        with self.assertNumQueries(3):
+            cells = rates.resolve([self.room.pk], self.days)
+        nightly = [cells[(self.room.pk, self.board.pk, day_number(day))][0] for day in self.days]
+        self.assertEqual(nightly, [1000, 900, 1500, 1500, 1000, 1000, 1000, 1000, 1000, 1500])
+        self.assertIsNone(rates.daily_price(self.room.pk, self.board.pk, jdate(1404, 8, 1)))
+
+        for day in self.days[:4]:
+            Availability.objects.create(room_type=self.room, date=day, quantity=2)
+        results = find_available_hotels(self.hotel.city_id, self.days[0], self.days[4], self.user)
+        self.assertEqual(results[0]['min_price'], Decimal(1000 + 900 + 1500 + 1500) / 4)
+        quote = calculate_multi_booking_price([{
+            'room_type_id': self.room.pk, 'board_type_id': self.board.pk, 'quantity': 1, 'adults': 1,
+        }], self.days[0], self.days[2], self.user)
+        self.assertEqual(quote['total_room_price'], 1000 + 100 + 900 + 90)
+
+    def test_compaction_keeps_resolved_rates(self):
+        for i, day in enumerate(self.days):
+            Price.objects.create(room_type=self.room, board_type=self.board, date=day,
+                                 price_per_night=2000 if i < 8 else 2500, extra_person_price=0, child_price=0)
+        before = rates.resolve([self.room.pk], self.days)
+
+        self.assertEqual(rates.compact_prices(), (1, 8))
+        self.assertEqual(Price.objects.count(), 2)
+        self.assertEqual(RateRange.objects.get().end_date, jdate(1404, 7, 8))
+        self.assertEqual(rates.resolve([self.room.pk], self.days), before)
+
+    def test_compaction_keeps_a_run_written_meanwhile(self):
+        for day in self.days[:8]:
+            Price.objects.create(room_type=self.room, board_type=self.board, date=day,
+                                 price_per_night=2000, extra_person_price=0, child_price=0)
+        changed = Price.objects.get(date=self.days[3])
+        runs = rates._runs
+
+        def runs_then_price_write(rows):
+            found = list(runs(rows))
+            # A calendar save lands between the unlocked read and the run's transaction.
+            Price.objects.filter(pk=changed.pk).update(price_per_night=3000)
+            return found
+
+        with mock.patch.object(rates, '_runs', side_effect=runs_then_price_write):
+            self.assertEqual(rates.compact_prices(), (0, 0))
+        self.assertFalse(RateRange.objects.exists())
+        self.assertEqual(Price.objects.count(), 8)
+        self.assertEqual(rates.daily_price(self.room.pk, self.board.pk, self.days[3])[0], 3000)
+
+    def test_derived_boards_follow_their_base_board(self):
+        full_board = BoardType.objects.create(name="Full Board", code="FB")
+        RateRange.objects.create(room_type=self.room, board_type=self.board, start_date=self.start,
+                                 end_date=jdate(1404, 7, 30), price_per_night=1000, extra_person_price=100, child_price=50)
+        BoardRule.objects.create(hotel=self.hotel, board_type=full_board, base_board_type=self.board,
+                                 adult_supplement=200, child_supplement=80)
+        Price.objects.create(room_type=self.room, board_type=full_board, date=jdate(1404, 7, 2),
+                             price_per_night=1234, extra_person_price=0, child_price=0)
+
+        cells = rates.resolve([self.room.pk], self.days[:3], [full_board.pk])
+        # Base capacity 2: 1000 + 2 x 200; the explicit Price row wins on 1404-07-02.
+        self.assertEqual(sorted(cells.values()), [(1234, 0, 0), (1400, 300, 130), (1400, 300, 130)])
+        self.assertEqual({board_id for _, board_id, _ in cells}, {full_board.pk})
+
+        BoardRule.objects.create(room_type=self.room, board_type=full_board, base_board_type=self.board, adult_supplement=0)
+        self.assertEqual(rates.daily_price(self.room.pk, full_board.pk, self.start), (1000, 100, 50))
+
+        changelog.record_prices([(self.room.pk, self.board.pk, self.start)])
+        self.assertEqual(set(InventoryChange.objects.values_list('board_type_id', flat=True)), {self.board.pk, full_board.pk})
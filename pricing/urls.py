@@ -1,5 +1,8 @@
-# pricing/urls.py v1.0.1
+# pricing/urls.py v1.3.0
 # Update: Changed the search URL to point to the new HotelSearchAPIView.
+# Feature: Bulk ARI feed for agencies.
+# Feature: Inventory change feed.
+# Feature: Lazy admin pricing grid.
 from django.urls import path
 from . import views
 
@@ -14,8 +17,12 @@ urlpatterns = [
     path('api/calculate-price/', views.PriceQuoteAPIView.as_view(), name='price_quote_api'),
     path('api/calculate-multi-price/', views.PriceQuoteMultiRoomAPIView.as_view(), name='price_quote_multi_api'),
     path('admin/calendar-pricing/', views.calendar_pricing_view, name='calendar_pricing'),
+    path('admin/pricing-grid/', views.pricing_grid_view, name='pricing_grid'),
+    path('admin/pricing-grid/data/', views.pricing_grid_data, name='pricing_grid_data'),
     path('api/room-calendar/<int:room_id>/', views.get_room_calendar, name='room_calendar_api'),
     path('api/inventory/update-stock/', views.BulkUpdateStockAPIView.as_view(), name='bulk_update_stock'),
     path('api/inventory/update-price/', views.BulkUpdatePriceAPIView.as_view(), name='bulk_update_price'),
+    path('api/inventory/changes/', views.InventoryChangeFeedAPIView.as_view(), name='inventory_change_feed'),
+    path('api/ari/', views.AgencyARIFeedAPIView.as_view(), name='agency_ari_feed'),
     path('api/inventory/calendar/', views.RoomCalendarRangeAPIView.as_view(), name='room_calendar_range'),
 ]
@@ -1,17 +1,34 @@
 # pricing/views.py
-# version: 3.0.1
-# FIX: Added input sanitization to remove spaces and non-breaking spaces (\xa0) from numbers.
+# version: 3.8.1
+# FEATURE: AgencyARIFeedAPIView - bulk availability and agency net rates for many hotels
+#          (columnar JSON or NDJSON, ETag / If-None-Match, 'since' deltas).
+# FEATURE: Calendar and bulk writes are recorded in the inventory change log;
+#          InventoryChangeFeedAPIView serves it by cursor.
+# PERF: BulkUpdateStockAPIView / BulkUpdatePriceAPIView write through set-based upserts
+#       (many rooms / boards, weekday filter); dropped the non-existent Price.is_active.
+# PERF: calendar_pricing_view saves only changed grid cells, as two bulk upserts.
+# FEATURE: pricing_grid_view / pricing_grid_data - lazy multi-month, all-boards grid.
+# FEATURE: Calendars show resolved rates (season ranges + per-day overrides, rates.py).
+# FIX: HotelSearchAPIView passes stars / price / amenity / category filters to the selector
+#      as keyword arguments (they were previously swallowed under a single 'filters' key).
+# FIX: AgencyARIFeedAPIView parses 'since' as a plan-versioned watermark (ari.parse_watermark).
+# FIX: AgencyARIFeedAPIView deltas follow the change log cursor; dropped an unused import.
 from datetime import datetime, timedelta, date
+from decimal import Decimal, InvalidOperation
 from django.shortcuts import render, redirect
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
 from django.db import transaction
-from django.http import JsonResponse
+import json
+import time
+
+from django.http import JsonResponse, StreamingHttpResponse, HttpResponseNotModified
 
 # Third-party imports
 from rest_framework.views import APIView
 from rest_framework.decorators import api_view, permission_classes, authentication_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
+from rest_framework.authentication import TokenAuthentication
 from rest_framework.response import Response
 from rest_framework import status
 from jdatetime import date as jdate, timedelta
@@ -19,9 +36,11 @@ import jdatetime
 
 # Local imports
 from hotels.models import RoomType, Hotel, BoardType
-from .models import Price, Availability
+from .models import Availability
 from .serializers import BulkUpdateStockSerializer, BulkUpdatePriceSerializer, CalendarQuerySerializer
-from .selectors import find_available_hotels, calculate_multi_booking_price
+from .selectors import find_available_hotels, calculate_multi_booking_price, _parse_id_list
+from . import ari, changelog, grid, inventory, rates
+from agencies.rate_plans import get_rate_plan, get_rate_plan_for_user, day_number
 from .serializers import (
     HotelSearchResultSerializer, 
     PriceQuoteInputSerializer, 
@@ -98,27 +117,19 @@ def get_room_calendar(request, room_id):
     end_str = end_date.isoformat()
 
     # --- اصلاح فیلتر قیمت ---
-    price_qs = Price.objects.filter(
-        room_type_id=room_id,
-        date__range=[start_str, end_str]
-    )
-    
-    # اگر برد خاصی انتخاب شده، فیلتر کن
-    if board_type_id:
-        price_qs = price_qs.filter(board_type_id=board_type_id)
-    else:
-        # اگر انتخاب نشده، اولین برد موجود را برگردان (یا منطق پیش‌فرض خودتان)
-        # برای جلوگیری از تداخل، بهتر است همیشه برد ارسال شود.
-        pass
-
-    prices = price_qs.values('date', 'price_per_night')
-    
+    # قیمت‌ها از بازه‌های فصلی و قیمت‌های روزانه خوانده می‌شوند (pricing/rates.py)
+    month_dates = [start_date + timedelta(days=i) for i in range(days_in_month)]
+    board_ids = [int(board_type_id)] if board_type_id and str(board_type_id).isdigit() else None
+    price_map = {}
+    for (_, _, number), (base, _, _) in rates.resolve([int(room_id)], month_dates, board_ids).items():
+        # بدون انتخاب برد، کمترین قیمت پایه نمایش داده می‌شود
+        price_map[number] = min(price_map.get(number, base), base)
+
     availabilities = Availability.objects.filter(
         room_type_id=room_id,
         date__range=[start_str, end_str]
     ).values('date', 'quantity')
 
-    price_map = {str(p['date']): p['price_per_night'] for p in prices}
     avail_map = {str(a['date']): a['quantity'] for a in availabilities}
 
     calendar_data = []
@@ -128,7 +139,7 @@ def get_room_calendar(request, room_id):
         date_str_jalali = current_jalali.isoformat() 
         
         qty = avail_map.get(date_str_jalali, 0)
-        price = price_map.get(date_str_jalali, 0)
+        price = price_map.get(day_number(current_jalali), 0)
         
         is_available = qty > 0 and price > 0
         
@@ -170,12 +181,24 @@ class HotelSearchAPIView(APIView):
             check_in_gregorian = check_in_jalali.togregorian()
             check_out_gregorian = check_in_gregorian + timedelta(days=duration)
             
+            filters = {
+                key: request.query_params[key]
+                for key in ('stars', 'amenities', 'categories')
+                if request.query_params.get(key)
+            }
+            for key in ('min_price', 'max_price'):
+                if request.query_params.get(key):
+                    try:
+                        filters[key] = Decimal(to_english_digits(request.query_params[key]))
+                    except InvalidOperation:
+                        return Response({"error": "فیلتر قیمت نامعتبر است."}, status=400)
+
             results = find_available_hotels(
                 city_id=city_id,
                 check_in_date=check_in_gregorian, # ارسال تاریخ میلادی به سلکتور
                 check_out_date=check_out_gregorian,
                 user=request.user,
-                filters=request.query_params
+                **filters
             )
             return Response(results)
         except Exception as e:
@@ -236,6 +259,32 @@ class PriceQuoteMultiRoomAPIView(APIView):
 # 2. ADMIN VIEWS (Calendar Pricing Table)
 # ==============================================================================
 
+def _parse_grid_post(post):
+    """
+    Grid inputs -> ({(room_id, date): quantity}, {(room_id, date): {component: amount}}).
+    Names are avail_<room>_<jalali date> and price_<base|extra|child>_<room>_<jalali date>;
+    empty inputs are ignored.
+    """
+    availability, prices = {}, {}
+    for key, value in post.items():
+        if not value or key == 'csrfmiddlewaretoken':
+            continue
+        parts = key.split('_')
+        if key.startswith('avail_') and len(parts) == 3:
+            room_id, date_str = parts[1], parts[2]
+            availability[(int(room_id), _jalali_from_str(date_str))] = clean_int(value)
+        elif key.startswith('price_') and len(parts) == 4 and parts[1] in inventory.PRICE_COMPONENTS:
+            # clean_int handles '2 680 000' and '2,680,000'
+            room_id, date_str = parts[2], parts[3]
+            prices.setdefault((int(room_id), _jalali_from_str(date_str)), {})[parts[1]] = clean_int(value)
+    return availability, prices
+
+
+def _jalali_from_str(value):
+    year, month, day = map(int, to_english_digits(value).split('-'))
+    return jdate(year, month, day)
+
+
 @staff_member_required
 def calendar_pricing_view(request):
     """
@@ -264,58 +313,25 @@ def calendar_pricing_view(request):
         selected_board_id = str(board_types.first().id)
 
     # 3. Handle POST (Saving Data)
+    # The grid submits only the inputs whose value changed (see calendar_view.html);
+    # save_grid() additionally skips cells equal to the stored values and writes the
+    # rest as two bulk upserts.
     if request.method == 'POST':
         try:
+            availability, prices = _parse_grid_post(request.POST)
+            started = time.perf_counter()
             with transaction.atomic():
-                for key, value in request.POST.items():
-                    if not value or key == 'csrfmiddlewaretoken': 
-                        continue
-                    
-                    parts = key.split('_')
-                    if len(parts) < 3: 
-                        continue
-
-                    if key.startswith('avail_'):
-                        room_id = parts[1]
-                        date_str = parts[2]
-                        # FIX: Use clean_int function
-                        qty = clean_int(value)
-                        
-                        Availability.objects.update_or_create(
-                            room_type_id=room_id,
-                            date=date_str,
-                            defaults={'quantity': qty}
-                        )
-                        
-                    elif key.startswith('price_'):
-                        price_type = parts[1]
-                        room_id = parts[2]
-                        date_str = parts[3]
-                        
-                        # FIX: Use clean_int function (Handles '2 680 000' and '2,680,000')
-                        amount = clean_int(value)
-                        
-                        price_obj, created = Price.objects.get_or_create(
-                            room_type_id=room_id,
-                            board_type_id=selected_board_id,
-                            date=date_str,
-                            defaults={
-                                'price_per_night': 0,
-                                'extra_person_price': 0,
-                                'child_price': 0
-                            }
-                        )
-                        
-                        if price_type == 'base':
-                            price_obj.price_per_night = amount
-                        elif price_type == 'extra':
-                            price_obj.extra_person_price = amount
-                        elif price_type == 'child':
-                            price_obj.child_price = amount
-                        
-                        price_obj.save()
-                        
-            messages.success(request, "تغییرات با موفقیت ذخیره شد.")
+                avail_count, price_count = inventory.save_grid(
+                    availability, prices, int(selected_board_id), source='calendar')
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if avail_count or price_count:
+                messages.success(
+                    request,
+                    f"تغییرات با موفقیت ذخیره شد: {avail_count} خانه موجودی و {price_count} خانه قیمت "
+                    f"در {elapsed_ms:.0f} میلی‌ثانیه."
+                )
+            else:
+                messages.info(request, "تغییری برای ذخیره وجود نداشت.")
         except Exception as e:
             messages.error(request, f"خطا در ذخیره‌سازی: {str(e)}")
         
@@ -348,23 +364,25 @@ def calendar_pricing_view(request):
         for a in avail_qs:
             avail_map[(a.room_type_id, str(a.date))] = a.quantity
         
-        price_qs = Price.objects.filter(room_type__in=rooms, board_type_id=selected_board_id, date__in=month_dates)
-        price_map = {}
-        for p in price_qs:
-            price_map[(p.room_type_id, str(p.date))] = p
+        # قیمت‌های نمایش داده شده همان نرخ نهایی هستند (بازه فصلی یا قیمت روزانه)
+        first_number = day_number(first_day_of_month)
+        price_map = rates.resolve(
+            [room.id for room in rooms], [first_day_of_month + timedelta(days=i) for i in range(days_in_month)],
+            [selected_board_id],
+        ) if selected_board_id else {}
 
         for room in rooms:
             days_info = []
-            for d_str in month_dates:
+            for i, d_str in enumerate(month_dates):
                 availability = avail_map.get((room.id, d_str), 0)
-                price_obj = price_map.get((room.id, d_str))
+                amounts = price_map.get((room.id, int(selected_board_id or 0), first_number + i))
                 
                 days_info.append({
                     'date_str': d_str,
                     'availability': availability,
-                    'price_base': int(price_obj.price_per_night) if price_obj else None,
-                    'price_extra': int(price_obj.extra_person_price) if price_obj else None,
-                    'price_child': int(price_obj.child_price) if price_obj else None,
+                    'price_base': int(amounts[0]) if amounts else None,
+                    'price_extra': int(amounts[1]) if amounts else None,
+                    'price_child': int(amounts[2]) if amounts else None,
                 })
             
             room_data.append({
@@ -389,6 +407,65 @@ def calendar_pricing_view(request):
     
     return render(request, 'admin/pricing/calendar_view.html', context)
 
+@staff_member_required
+def pricing_grid_view(request):
+    """Multi-month, all-boards grid; the page loads date chunks from pricing_grid_data as it scrolls."""
+    hotels = Hotel.objects.all()
+    today = jdate.today()
+    context = {
+        'hotels': hotels,
+        'selected_hotel_id': int(request.GET.get('hotel_id') or (hotels.first().id if hotels.exists() else 0)),
+        'start_date': request.GET.get('from') or str(jdate(today.year, today.month, 1)),
+        'chunk_days': grid.CHUNK_DAYS,
+        'title': 'جدول قیمت و ظرفیت (همه سرویس‌ها)',
+    }
+    return render(request, 'admin/pricing/grid_view.html', context)
+
+
+@staff_member_required
+def pricing_grid_data(request):
+    """
+    GET ?hotel_id=&from=<jalali>&days=N: one cached chunk of the grid (all rooms and boards).
+    POST (JSON) {"availability": [[room, date, qty]], "prices": [[room, board, date, component, amount]]}:
+    saves the changed cells with inventory.save_grid(), one board at a time, in one transaction.
+    """
+    if request.method == 'POST':
+        try:
+            payload = json.loads(request.body)
+            availability = {
+                (int(room_id), _jalali_from_str(day)): clean_int(quantity)
+                for room_id, day, quantity in payload.get('availability', [])
+            }
+            prices_by_board = {}
+            for room_id, board_id, day, component, amount in payload.get('prices', []):
+                if component not in inventory.PRICE_COMPONENTS:
+                    raise ValueError(component)
+                cell = prices_by_board.setdefault(int(board_id), {}).setdefault((int(room_id), _jalali_from_str(day)), {})
+                cell[component] = clean_int(amount)
+        except (ValueError, TypeError, AttributeError):
+            return JsonResponse({'error': 'داده‌های ارسالی نامعتبر است.'}, status=400)
+
+        started = time.perf_counter()
+        with transaction.atomic():
+            avail_count, _ = inventory.save_grid(availability, {}, None, source='calendar')
+            price_count = sum(
+                inventory.save_grid({}, prices, board_id, source='calendar')[1]
+                for board_id, prices in prices_by_board.items()
+            )
+        return JsonResponse({
+            'availability': avail_count,
+            'prices': price_count,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000),
+        })
+
+    try:
+        hotel_id = int(request.GET['hotel_id'])
+        start = _jalali_from_str(request.GET['from'])
+        days = min(int(request.GET.get('days', grid.CHUNK_DAYS)), grid.MAX_CHUNK_DAYS)
+    except (KeyError, ValueError):
+        return JsonResponse({'error': 'پارامترهای hotel_id و from الزامی است.'}, status=400)
+    return JsonResponse(grid.get_chunk(hotel_id, start, max(days, 1)))
+
 class RoomCalendarRangeAPIView(APIView):
     def get(self, request):
         room_id = request.query_params.get('room')
@@ -415,33 +492,23 @@ class RoomCalendarRangeAPIView(APIView):
                 if hasattr(d_val, 'togregorian'): d_val = d_val.togregorian()
                 avail_map[str(d_val)] = item['quantity']
 
-            # --- Price ---
-            price_qs = Price.objects.filter(
-                room_type_id=room_id,
-                date__range=[start_date, end_date]
-            )
-
+            # --- Price --- (بازه‌های فصلی + قیمت‌های روزانه، pricing/rates.py)
+            days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
             if board_type_id and board_type_id not in ['null', 'undefined', '']:
-                price_qs = price_qs.filter(board_type_id=int(board_type_id))
-                # ADDED: دریافت فیلدهای نفر اضافه و کودک
-                prices = price_qs.values('date', 'price_per_night', 'extra_person_price', 'child_price')
+                cells = rates.resolve([int(room_id)], days, [int(board_type_id)])
             else:
                 # در حالت نمایش کلی، میانگین یا مینیمم را می‌گیریم (برای سادگی فعلا مینیمم پایه)
-                prices = price_qs.values('date').annotate(
-                    price_per_night=Min('price_per_night'),
-                    extra_person_price=Min('extra_person_price'), # ADDED
-                    child_price=Min('child_price') # ADDED
-                )
+                cells = rates.resolve([int(room_id)], days)
 
             price_map = {}
-            for item in prices:
-                d_val = item['date']
-                if hasattr(d_val, 'togregorian'): d_val = d_val.togregorian()
+            for (_, _, number), (base, extra, child) in cells.items():
+                d_str = str(date.fromordinal(number))
+                current = price_map.get(d_str)
                 # ADDED: ذخیره تمام آبجکت قیمت به جای فقط یک عدد
-                price_map[str(d_val)] = {
-                    'base': item['price_per_night'],
-                    'extra': item.get('extra_person_price', 0),
-                    'child': item.get('child_price', 0)
+                price_map[d_str] = {
+                    'base': min(current['base'], base) if current else base,
+                    'extra': min(current['extra'], extra) if current else extra,
+                    'child': min(current['child'], child) if current else child,
                 }
 
             # 3. ساخت خروجی نهایی
@@ -474,76 +541,144 @@ class RoomCalendarRangeAPIView(APIView):
 # 2. API آپدیت موجودی (بازگردانی شده)
 # ----------------------------------------------------------------
 class BulkUpdateStockAPIView(APIView):
+    """
+    {"rooms": [..] (or "room"), "start_date", "end_date", "quantity", "weekdays": [0..6]?}
+    Written as one set-based upsert (pricing/inventory.py).
+    """
     def post(self, request):
-        try:
-            room_id = request.data.get('room')
-            start_date = request.data.get('start_date')
-            end_date = request.data.get('end_date')
-            quantity = request.data.get('quantity')
-
-            if not all([room_id, start_date, end_date, quantity is not None]):
-                return Response({'error': 'Incomplete data'}, status=400)
-
-            start = datetime.strptime(start_date, "%Y-%m-%d").date()
-            end = datetime.strptime(end_date, "%Y-%m-%d").date()
-            delta = (end - start).days
-
-            with transaction.atomic():
-                for i in range(delta + 1):
-                    current_date = start + timedelta(days=i)
-                    Availability.objects.update_or_create(
-                        room_type_id=room_id,
-                        date=current_date,
-                        defaults={'quantity': quantity}
-                    )
-            
-            return Response({'message': 'Inventory updated successfully'})
-        except Exception as e:
-            return Response({'error': str(e)}, status=500)
+        serializer = BulkUpdateStockSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=400)
+        data = serializer.validated_data
+
+        dates, error = _bulk_scope(data, len(data['rooms']))
+        if error:
+            return error
+        with transaction.atomic():
+            count = inventory.upsert_availability(data['rooms'], dates, data['quantity'], source='bulk_api')
+        return Response({'message': 'Inventory updated successfully', 'cells': count})
 
 # ----------------------------------------------------------------
 # 3. API آپدیت قیمت (بازگردانی شده - مورد نیاز برای رفع خطا)
 # ----------------------------------------------------------------
 class BulkUpdatePriceAPIView(APIView):
+    """
+    {"rooms": [..], "board_types": [..] (or "room" / "board_type"), "start_date", "end_date",
+     "price", "extra_price"?, "child_price"?, "weekdays": [0..6]?}
+    Written as one set-based upsert (pricing/inventory.py).
+    """
     def post(self, request):
+        serializer = BulkUpdatePriceSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=400)
+        data = serializer.validated_data
+
+        if BoardType.objects.filter(id__in=data['board_types']).count() != len(data['board_types']):
+            return Response({'error': 'نوع سرویس نامعتبر است.'}, status=400)
+        dates, error = _bulk_scope(data, len(data['rooms']) * len(data['board_types']))
+        if error:
+            return error
+        with transaction.atomic():
+            count = inventory.upsert_prices(
+                data['rooms'], data['board_types'], dates,
+                data['price'], data['extra_price'], data['child_price'], source='bulk_api',
+            )
+        return Response({'message': 'Prices updated successfully', 'cells': count})
+
+
+def _bulk_scope(data, cells_per_day):
+    """(dates, None) for a valid bulk request, or (None, error Response)."""
+    if RoomType.objects.filter(id__in=data['rooms']).count() != len(data['rooms']):
+        return None, Response({'error': 'اتاق نامعتبر است.'}, status=400)
+    dates = inventory.expand_dates(data['start_date'], data['end_date'], data.get('weekdays'))
+    if len(dates) * cells_per_day > inventory.MAX_CELLS:
+        return None, Response({'error': f'حداکثر {inventory.MAX_CELLS} خانه در هر درخواست قابل ثبت است.'}, status=400)
+    return dates, None
+
+
+# ==============================================================================
+# 4. B2B ARI FEED
+# ==============================================================================
+
+class AgencyARIFeedAPIView(APIView):
+    """
+    Availability and agency net rates for all rooms of several hotels in one call:
+    ?hotels=1,2,3&from=1404-05-01&to=1404-05-31[&since=<watermark>][&as=ndjson]
+    Dates are Jalali. 'since' takes the 'watermark' of a previous response (a change log
+    cursor) and returns only the cells logged after it; if the agency's rates changed
+    meanwhile, or a changed cell has no value left, the full feed is returned with
+    'resync': true. Responses carry an ETag; a matching If-None-Match is answered with 304
+    after one aggregate query on the change log, without building the feed.
+    """
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        rate_plan = get_rate_plan_for_user(request.user)
+        if rate_plan is None and getattr(request.user, 'agency_id', None):
+            rate_plan = get_rate_plan(request.user.agency_id)
+        if rate_plan is None:
+            return Response({"error": "شما کاربر آژانسی نیستید."}, status=status.HTTP_403_FORBIDDEN)
+
+        hotel_ids = _parse_id_list(request.query_params.get('hotels'))
+        if not hotel_ids or len(hotel_ids) > ari.MAX_HOTELS:
+            return Response({"error": f"لیست هتل‌ها الزامی است (حداکثر {ari.MAX_HOTELS} هتل)."}, status=400)
         try:
-            room_id = request.data.get('room')
-            start_date = request.data.get('start_date')
-            end_date = request.data.get('end_date')
-            board_type = request.data.get('board_type')
-            price = request.data.get('price')
-            
-            # فیلدهای اختیاری
-            extra_price = request.data.get('extra_price', 0)
-            child_price = request.data.get('child_price', 0)
+            start = jdatetime.date(*map(int, to_english_digits(request.query_params['from']).split('-')))
+            end = jdatetime.date(*map(int, to_english_digits(request.query_params['to']).split('-')))
+        except (KeyError, TypeError, ValueError):
+            return Response({"error": "بازه تاریخ (from / to) نامعتبر است. (YYYY-MM-DD)"}, status=400)
+        if not 0 <= (end - start).days < ari.MAX_DAYS:
+            return Response({"error": f"بازه تاریخ باید حداکثر {ari.MAX_DAYS} روز باشد."}, status=400)
+
+        since = None
+        if request.query_params.get('since'):
+            try:
+                since = ari.parse_watermark(request.query_params['since'])
+            except ValueError:
+                return Response({"error": "پارامتر since نامعتبر است."}, status=400)
+
+        feed = ari.Feed(rate_plan, hotel_ids, start, end, since=since)
+        etag, _ = feed.fingerprint()
+        if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+
+        if request.query_params.get('as') == 'ndjson':
+            # First line is the header (dates, watermark), then one line per room.
+            lines = (json.dumps(item, ensure_ascii=False) + '\n'
+                     for item in _chain_header(feed.header(), feed.iter_rooms()))
+            response = StreamingHttpResponse(lines, content_type='application/x-ndjson; charset=utf-8')
+        else:
+            response = JsonResponse(dict(feed.header(), rooms=list(feed.iter_rooms())),
+                                    json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')})
+        response['ETag'] = etag
+        return response
 
-            if not all([room_id, start_date, end_date, board_type, price]):
-                return Response({'error': 'Incomplete data'}, status=400)
 
-            start = datetime.strptime(start_date, "%Y-%m-%d").date()
-            end = datetime.strptime(end_date, "%Y-%m-%d").date()
-            delta = (end - start).days
+def _chain_header(header, rooms):
+    yield header
+    yield from rooms
 
-            with transaction.atomic():
-                for i in range(delta + 1):
-                    current_date = start + timedelta(days=i)
-                    
-                    # تبدیل board_type به عدد صحیح برای جلوگیری از خطا
-                    board_id = int(board_type)
-                    
-                    Price.objects.update_or_create(
-                        room_type_id=room_id,
-                        date=current_date,
-                        board_type_id=board_id,
-                        defaults={
-                            'price_per_night': price,
-                            'extra_person_price': extra_price,
-                            'child_price': child_price,
-                            'is_active': True
-                        }
-                    )
-            
-            return Response({'message': 'Prices updated successfully'})
-        except Exception as e:
-            print(f"Price Update Error: {e}")
-            return Response({'error': str(e)}, status=500)
+
+# ==============================================================================
+# 5. INVENTORY CHANGE FEED
+# ==============================================================================
+
+class InventoryChangeFeedAPIView(APIView):
+    """
+    Changed Availability / Price cells after ?cursor= (a sequence number, 0 = from the
+    start), at most ?limit= entries. Pass next_cursor back to continue; an empty list
+    means the consumer is caught up.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        try:
+            cursor = int(request.query_params.get('cursor', 0))
+            limit = min(int(request.query_params.get('limit', changelog.DEFAULT_BATCH)), 5000)
+        except ValueError:
+            return Response({"error": "cursor و limit باید عدد باشند."}, status=400)
+        entries, next_cursor = changelog.read(cursor, max(limit, 1))
+        return Response({'changes': entries, 'next_cursor': next_cursor})
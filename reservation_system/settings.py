@@ -171,12 +171,52 @@ JALALI_DATE_DEFAULTS = {
     'StaticFiles': False,
 }
 
+# CACHE SETTINGS
+# Must be shared by every web and Celery process: the version keys of the reference data
+# (core/reference.py) and of the agency rate plans are bumped by the process that saves a
+# change and read by all the others. A per-process (local-memory) cache would keep the
+# other processes on stale data until restart.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': env('CACHE_URL', default='redis://localhost:6379/1'),
+    }
+}
+
 # CELERY SETTINGS
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
+CELERY_BEAT_SCHEDULE = {
+    # Landing min prices follow Price changes, which do not fire hotel signals.
+    'refresh-city-landing-aggregates': {
+        'task': 'hotels.tasks.refresh_city_landing_aggregates',
+        'schedule': 60 * 60,
+    },
+    'compact-inventory-change-log': {
+        'task': 'pricing.tasks.compact_inventory_changes',
+        'schedule': 24 * 60 * 60,
+    },
+    'verify-wallet-ledger': {
+        'task': 'core.tasks.verify_wallet_ledger',
+        'schedule': 24 * 60 * 60,
+    },
+    # Safety net for queued SMS whose scheduled flush was lost or failed.
+    'flush-sms-queue': {
+        'task': 'notifications.tasks.flush_sms_task',
+        'schedule': 60,
+    },
+    # Retries of failed outbox events (and any drain lost after commit).
+    'drain-notification-outbox': {
+        'task': 'notifications.tasks.drain_outbox_task',
+        'schedule': 60,
+    },
+}
+
+# Multi-recipient send endpoint of the SMS provider; empty: sends are only logged.
+SMS_PROVIDER_URL = os.environ.get('SMS_PROVIDER_URL', '')
 
 STATICFILES_DIRS = [BASE_DIR / 'static']
 
@@ -1,5 +1,6 @@
 # FILE: back/reservations/admin.py
-# version: 5.0.0
+# version: 5.1.0
+# FEATURE: Streaming CSV / XLSX export actions for the booking list.
 # STRATEGY: Back to Standard. Strict ReadOnly for Rooms/Financials.
 # UI: CSS handles hiding buttons. Python handles Data Safety.
 
@@ -15,6 +16,8 @@ import traceback
 from .models import Booking, Guest, BookingRoom, OfflineBank, PaymentConfirmation 
 from .forms import BookingForm
 from .pdf_utils import generate_booking_confirmation_pdf 
+from .exports import ADMIN_BOOKING_COLUMNS, booking_export_rows
+from core.exports import export_response
 
 # ==========================================
 # 1. INLINES
@@ -98,6 +101,7 @@ class BookingAdmin(admin.ModelAdmin):
     search_fields = ('booking_code', 'user__username', 'guests__last_name')
     
     inlines = [PaymentConfirmationInline, BookingRoomInline, GuestInline]
+    actions = ['export_as_csv', 'export_as_xlsx']
 
     # لیست فیلدهایی که نباید قابل ویرایش باشند
     readonly_fields = (
@@ -136,6 +140,16 @@ class BookingAdmin(admin.ModelAdmin):
         css = { 'all': ('admin/css/custom_admin.css',) }
 
     # --- Actions ---
+    @admin.action(description="خروجی CSV رزروهای انتخاب شده")
+    def export_as_csv(self, request, queryset):
+        return export_response('csv', 'bookings', ADMIN_BOOKING_COLUMNS,
+                               booking_export_rows(queryset, ADMIN_BOOKING_COLUMNS))
+
+    @admin.action(description="خروجی اکسل رزروهای انتخاب شده")
+    def export_as_xlsx(self, request, queryset):
+        return export_response('xlsx', 'bookings', ADMIN_BOOKING_COLUMNS,
+                               booking_export_rows(queryset, ADMIN_BOOKING_COLUMNS))
+
     def get_urls(self):
         urls = super().get_urls()
         custom_urls = [
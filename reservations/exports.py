@@ -0,0 +1,36 @@
+# reservations/exports.py
+# version: 1.0.0
+# FEATURE: Booking list columns for the streaming CSV / XLSX exports (core/exports.py),
+#          shared by the agency export endpoint and the admin booking list.
+
+from django.db.models import OuterRef, Subquery
+
+from core.exports import ExportColumn
+from .models import Booking, BookingRoom
+
+BOOKING_COLUMNS = [
+    ExportColumn("کد رزرو", 'booking_code'),
+    ExportColumn("زمان ثبت", 'created_at'),
+    ExportColumn("هتل", 'hotel_name'),
+    ExportColumn("تاریخ ورود", 'check_in'),
+    ExportColumn("تاریخ خروج", 'check_out'),
+    ExportColumn("وضعیت", 'status', choices=Booking.STATUS_CHOICES),
+    ExportColumn("قیمت نهایی", 'total_price'),
+    ExportColumn("مبلغ پرداخت شده", 'paid_amount'),
+]
+
+ADMIN_BOOKING_COLUMNS = BOOKING_COLUMNS + [
+    ExportColumn("کاربر", 'user__username'),
+    ExportColumn("موبایل", 'user__mobile'),
+    ExportColumn("آژانس", 'agency__name'),
+]
+
+
+def booking_export_rows(queryset, columns=BOOKING_COLUMNS):
+    """.values() rows for the given columns; the hotel comes from the first booked room, in the same query."""
+    first_hotel = BookingRoom.objects.filter(booking=OuterRef('pk')).order_by('pk').values('room_type__hotel__name')[:1]
+    return (
+        queryset.annotate(hotel_name=Subquery(first_hotel))
+        .order_by('-created_at')
+        .values(*[column.key for column in columns])
+    )
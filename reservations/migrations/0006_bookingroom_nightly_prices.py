@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0005_alter_booking_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookingroom',
+            name='nightly_prices',
+            field=models.JSONField(blank=True, default=list, editable=False, verbose_name='مبالغ شبانه'),
+        ),
+    ]
@@ -1,7 +1,9 @@
 # reservations/models.py
-# version: 0.0.7
+# version: 0.0.8
 # REFACTOR: Reverted GenericForeignKey fields in PaymentConfirmation to be non-nullable
 #           to enforce data integrity after the schema migration.
+# FEATURE: BookingRoom.nightly_prices - snapshot of the nightly amounts charged, used by
+#          the cancellation engine (cancellations/engine.py).
 
 # ... (imports and other models remain the same) ...
 import random
@@ -92,6 +94,8 @@ class BookingRoom(models.Model):
     children = models.PositiveSmallIntegerField(default=0, verbose_name="تعداد کودکان این اتاق")
     extra_requests = models.TextField(blank=True, null=True, verbose_name="درخواست‌های اضافی اتاق")
     total_price = models.DecimalField(max_digits=20, decimal_places=0, default=0, verbose_name="قیمت کل این ردیف اتاق")
+    # One amount (as a string, before VAT, all rooms of the row) per night of the stay.
+    nightly_prices = models.JSONField(default=list, blank=True, editable=False, verbose_name="مبالغ شبانه")
     class Meta:
         verbose_name = "اتاق رزرو شده"
         verbose_name_plural = "اتاق‌های رزرو شده"
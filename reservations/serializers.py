@@ -1,7 +1,8 @@
 # reservations/serializers.py
-# version: 1.2.5
+# version: 1.3.0
 # REFACTOR: Upgraded PaymentConfirmationSerializer to support GenericForeignKey,
 #           allowing it to link to both Bookings and WalletTransactions.
+# FEATURE: CreateBookingAPISerializer accepts 'pay_with_credit' for agency credit bookings.
 
 from rest_framework import serializers
 from django.contrib.contenttypes.models import ContentType
@@ -184,6 +185,8 @@ class CreateBookingAPISerializer(serializers.Serializer):
     check_out = serializers.CharField(max_length=10)
     guests = GuestSerializer(many=True, allow_empty=False)
     agency_id = serializers.IntegerField(required=False, allow_null=True)
+    # Agency bookings only: charge the booking to the agency's credit (see agencies/ledger.py).
+    pay_with_credit = serializers.BooleanField(required=False, default=False)
     rules_accepted = serializers.BooleanField(write_only=True)
 
     def __init__(self, *args, **kwargs):
@@ -218,6 +221,9 @@ class CreateBookingAPISerializer(serializers.Serializer):
         
         if not data['guests']:
             raise serializers.ValidationError("حداقل اطلاعات یک میهمان (سرپرست) الزامی است.")
+
+        if data.get('pay_with_credit') and not data.get('agency_id'):
+            raise serializers.ValidationError("پرداخت اعتباری فقط برای رزرو آژانسی امکان‌پذیر است.")
             
         # You can add more complex validation logic here if needed.
         return data
@@ -1,7 +1,10 @@
 # FILE: reservations/signals.py
-# version: 1.4.1
+# version: 1.5.0
 # FIX: Restored 'post_booking_creation' signal definition to resolve ImportError.
 # FEATURE: Includes both Notification logic and Financial Reconciliation State Machine.
+# PERF: Site name for the confirmation SMS comes from the reference-data cache.
+# REFACTOR: Confirmation notifications go through the transactional outbox
+#           (notifications/outbox.py) instead of queuing tasks inside the transaction.
 
 import django.dispatch
 from django.db.models.signals import post_save
@@ -13,8 +16,8 @@ from django.contrib.contenttypes.models import ContentType
 import logging
 
 from .models import Booking, PaymentConfirmation
-from core.models import SiteSettings, WalletTransaction
-from notifications.tasks import send_booking_confirmation_email_task, send_sms_task
+from core.models import WalletTransaction
+from notifications import outbox
 
 # --- 1. Define Custom Signal (This fixed the error) ---
 post_booking_creation = django.dispatch.Signal()
@@ -25,48 +28,12 @@ logger = logging.getLogger(__name__)
 @receiver(post_save, sender=Booking)
 def send_booking_notifications(sender, instance, created, **kwargs):
     """
-    Sends confirmation notifications via Email (with PDF) and SMS 
-    only when the booking status is changed to 'confirmed'.
+    Records the 'booking_confirmed' outbox event when the booking status is 'confirmed'.
+    The event is written in the booking's transaction and delivered (Email with PDF, SMS)
+    by the outbox drain after commit; one INSERT, ignored if already recorded.
     """
-    
-    # Fire notifications only when status is 'confirmed' and it hasn't been sent before
     if instance.status == 'confirmed' and not instance.notification_sent:
-        
-        guest = instance.guests.first()
-        if not guest:
-            logger.warning(f"Booking {instance.booking_code} confirmed but has no guest. Skipping notifications.")
-            return
-
-        try:
-            # A. Send Confirmation PDF Email
-            if hasattr(guest, 'email') and guest.email:
-                send_booking_confirmation_email_task.delay(
-                    booking_id=instance.id,
-                    email_type='confirmed'
-                )
-            else:
-                logger.warning(f"Booking {instance.booking_code} confirmed, but guest has no email address.")
-
-            # B. Send Confirmation SMS
-            if hasattr(guest, 'phone_number') and guest.phone_number:
-                first_booking_room = instance.booking_rooms.first()
-                hotel_name = first_booking_room.room_type.hotel.name if first_booking_room else ""
-                site_settings = SiteSettings.objects.first()
-                site_name = site_settings.site_name if site_settings else "سامانه رزرواسیون"
-                
-                message = f"رزرو شما با کد {instance.booking_code} در هتل {hotel_name} تایید شد. {site_name}"
-                send_sms_task.delay(
-                    recipient_number=guest.phone_number,
-                    message=message
-                )
-            
-            # Mark as notified to prevent duplicate sends
-            Booking.objects.filter(pk=instance.pk).update(notification_sent=True)
-            logger.info(f"Submitted 'confirmed' notification tasks for booking {instance.booking_code}")
-
-        except Exception as e:
-            logger.error(f"Failed to submit notification tasks for booking {instance.booking_code}: {e}")
-            pass
+        outbox.record(instance.pk, 'booking_confirmed')
 
 # --- 3. Financial Reconciliation & State Machine Logic ---
 @receiver(post_save, sender=PaymentConfirmation)
@@ -1,3 +1,200 @@
+# reservations/tests.py
+# version: 1.3.0
+# FEATURE: Tests for the compiled cancellation engine and the cancellation API.
+# FEATURE: Test for the chunked bulk cancellation job.
+# FEATURE: Test for the cached cancellation fee preview.
+# FEATURE: Test for the interval-compiled cancellation policy with a very wide rule.
+# FIX: Test that bulk cancellations reject and never match non-cancellable statuses.
+
+from datetime import date, timedelta
+from decimal import Decimal
+from itertools import count
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
 from django.test import TestCase
+from jdatetime import date as jdate
+from rest_framework.test import APIClient
+
+from agencies.models import Agency, AgencyTransaction
+from cancellations import bulk, tasks
+from cancellations.forms import BulkCancellationJobForm
+from cancellations.engine import CancellationEngine, CompiledPolicy, PeakCalendar, booking_fees
+from cancellations.services import fee_preview
+from cancellations.models import CancellationPolicy, CancellationRule, BulkCancellationJob
+from cancellations.serializers import BulkCancellationJobSerializer
+from core import ledger
+from core.models import CustomUser, SpecialPeriod, Wallet
+from notifications.models import OutgoingSms
+from hotels.models import City, Hotel, RoomType, BoardType
+from pricing.models import Availability
+from .models import Booking, BookingRoom, Guest
+
+TODAY = date(2025, 9, 23)  # 1404-07-01
+BOOKING_CODES = count(10000000)
+
+
+class CancellationEngineTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='canceller', password='password', mobile='09120000031')
+        normal = CancellationPolicy.objects.create(name="عادی")
+        CancellationRule.objects.create(policy=normal, days_before_checkin_min=3, days_before_checkin_max=30,
+                                        penalty_type='PERCENT_FIRST_NIGHT', penalty_value=50)
+        CancellationRule.objects.create(policy=normal, days_before_checkin_min=0, days_before_checkin_max=2,
+                                        penalty_type='FIXED_NIGHTS', penalty_value=Decimal('1.5'))
+        peak = CancellationPolicy.objects.create(name="پیک")
+        CancellationRule.objects.create(policy=peak, days_before_checkin_min=0, days_before_checkin_max=365,
+                                        penalty_type='PERCENT_TOTAL', penalty_value=20)
+        city = City.objects.create(name="Cancel City", slug='cancel-city')
+        cls.hotel = Hotel.objects.create(name="Cancel Hotel", slug='cancel-hotel', city=city, stars=4,
+                                         cancellation_policy_normal=normal, cancellation_policy_peak=peak)
+        cls.room_type = RoomType.objects.create(hotel=cls.hotel, name="Double", code='DBL-CAN', base_capacity=2,
+                                                price_per_night=Decimal('1000'))
+        cls.board_type = BoardType.objects.create(name="Room Only", code='RO')
+        SpecialPeriod.objects.create(name="نوروز", start_date=date(2026, 3, 16), end_date=date(2026, 3, 31))
+
+    def setUp(self):
+        cache.clear()
+
+    def book(self, check_in, nightly_prices, vat=0, paid=0):
+        room_total = sum(Decimal(price) for price in nightly_prices)
+        booking = Booking.objects.create(
+            booking_code=str(next(BOOKING_CODES)), user=self.user, check_in=jdate.fromgregorian(date=check_in),
+            check_out=jdate.fromgregorian(date=check_in + timedelta(days=len(nightly_prices))),
+            total_price=room_total + vat, total_room_price=room_total, total_vat=vat, paid_amount=paid,
+            status='awaiting_confirmation',
+        )
+        BookingRoom.objects.create(booking=booking, room_type=self.room_type, board_type=self.board_type,
+                                   total_price=room_total, nightly_prices=nightly_prices)
+        return booking
+
+    def test_fees_use_the_snapshotted_nights(self):
+        far = self.book(TODAY + timedelta(days=10), ['4000', '1000', '1000'], vat=600)
+        near = self.book(TODAY + timedelta(days=1), ['4000', '1000', '1000'])
+        peak = self.book(date(2026, 3, 20), ['3000', '3000'])
+        no_rule = self.book(TODAY + timedelta(days=45), ['1000'])
+        legacy = self.book(TODAY + timedelta(days=10), ['2500', '500'])
+        BookingRoom.objects.filter(booking=legacy).update(nightly_prices=[])
+
+        self.assertEqual(booking_fees([far.pk, near.pk, peak.pk, no_rule.pk, legacy.pk], today=TODAY), {
+            far.pk: Decimal(2200),     # 50% of the first night, VAT included (4000 * 1.1)
+            near.pk: Decimal(4500),    # 1.5 nights: 4000 + half of 1000
+            peak.pk: Decimal(1200),    # peak policy: 20% of the total
+            no_rule.pk: Decimal(0),
+            legacy.pk: Decimal(750),   # no snapshot: 50% of total / nights
+        })
+
+    def test_policy_is_compiled_into_intervals(self):
+        policy = CompiledPolicy([  # most specific first, as reference.cancellation_policies() orders them
+            (10, 100000, 'PERCENT_TOTAL', Decimal(10)),
+            (5, 20, 'PERCENT_TOTAL', Decimal(50)),
+            (0, 2, 'FIXED_NIGHTS', Decimal(1)),
+        ])
+        self.assertEqual(len(policy.starts), 3)
+        self.assertEqual([policy.rule_for(days) for days in (100001, 15, 7, 3, 0)], [
+            None, ('PERCENT_TOTAL', Decimal(10)), ('PERCENT_TOTAL', Decimal(50)), None, ('FIXED_NIGHTS', Decimal(1)),
+        ])
+        engine = CancellationEngine({1: policy}, PeakCalendar([]))
+        self.assertEqual(engine.schedule((1, None), 1000, Decimal(1000), [Decimal(500), Decimal(500)]), [
+            (None, -99001, 0), (-99000, 990, 100), (991, 995, 500), (996, 997, 0), (998, None, 500),
+        ])
+
+    def test_batch_query_count_does_not_grow_with_bookings(self):
+        bookings = [self.book(TODAY + timedelta(days=5), ['1000', '1000']) for _ in range(30)]
+        booking_fees([bookings[0].pk], today=TODAY)  # compiles the engine
+        with self.assertNumQueries(3):
+            fees = booking_fees([booking.pk for booking in bookings], today=TODAY)
+        self.assertEqual(set(fees.values()), {Decimal(500)})
+
+    def test_cancel_refunds_the_paid_amount_minus_the_fee(self):
+        booking = self.book(date.today() + timedelta(days=10), ['4000', '1000'], paid=5000)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post('/reservations/api/bookings/cancel/', {'booking_code': booking.booking_code}, format='json')
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual((response.json()['cancellation_fee'], response.json()['refund_amount']), (2000, 3000))
+        self.assertEqual(Wallet.objects.get(user=self.user).balance, 3000)
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'cancelled')
+
+    def test_fee_preview_is_served_from_the_cached_schedule(self):
+        booking = self.book(TODAY + timedelta(days=10), ['4000', '1000'], paid=5000)
+        self.assertEqual(fee_preview(booking, today=TODAY), [
+            {'from_date': '1404-07-01', 'to_date': '1404-07-08', 'cancellation_fee': 2000, 'refund_amount': 3000},
+            {'from_date': '1404-07-09', 'to_date': None, 'cancellation_fee': 4500, 'refund_amount': 500},
+        ])
+        with self.assertNumQueries(1):  # the hotel's policy ids; the schedule comes from the cache
+            fee_preview(booking, today=TODAY)
+
+        # A rule change bumps the reference version and the schedule is rebuilt.
+        rule = CancellationRule.objects.get(penalty_type='PERCENT_FIRST_NIGHT')
+        rule.penalty_value = 25
+        rule.save()
+        self.assertEqual(fee_preview(booking, today=TODAY)[0]['cancellation_fee'], 1000)
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        current = self.book(date.today() + timedelta(days=1), ['4000', '1000'], paid=5000)
+        response = client.get(f'/reservations/api/bookings/{current.booking_code}/cancellation-fees/')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual((response.json()['cancellation_fee'], len(response.json()['schedule'])), (4500, 1))
+
+    def test_bulk_cancellation_job_runs_in_resumable_chunks(self):
+        check_in = date.today() + timedelta(days=10)
+        for night in range(2):
+            Availability.objects.create(room_type=self.room_type, date=jdate.fromgregorian(date=check_in + timedelta(days=night)), quantity=3)
+        wallet_booking = self.book(check_in, ['4000', '1000'], paid=5000)
+        Guest.objects.create(booking=wallet_booking, first_name="Ali", phone_number='09120000032')
+        agency = Agency.objects.create(name="Bulk Agency")
+        credit_booking = self.book(check_in, ['4000', '1000'], paid=5000)
+        Booking.objects.filter(pk=credit_booking.pk).update(agency=agency)
+        AgencyTransaction.objects.create(agency=agency, booking=credit_booking, amount=5000, transaction_type='booking')
+        unpaid = self.book(check_in, ['4000', '1000'])
+        other_hotel_day = self.book(date.today() + timedelta(days=40), ['1000'])
+
+        job = BulkCancellationJob.objects.create(hotel=self.hotel, check_in_to=jdate.fromgregorian(date=check_in), reason="تعطیلی هتل")
+        # Tasks run inline: each chunk queues the next one from its on-commit callback.
+        with mock.patch.object(bulk, 'CHUNK_SIZE', 2), \
+                mock.patch.object(tasks.run_bulk_cancellation, 'delay', side_effect=tasks.run_bulk_cancellation), \
+                mock.patch.object(tasks.notify_cancelled_bookings, 'delay', side_effect=tasks.notify_cancelled_bookings), \
+                mock.patch('notifications.sms.schedule_flush'), \
+                self.captureOnCommitCallbacks(execute=True):
+            bulk.start(job)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.progress, job.total_bookings, job.cancelled_bookings), ('completed', 100, 3, 3))
+        self.assertEqual((job.fee_amount, job.refund_amount), (6000, 6000))  # 50% of the 4000 first night each
+        self.assertEqual(set(Booking.objects.filter(status='cancelled').values_list('id', flat=True)),
+                         {wallet_booking.pk, credit_booking.pk, unpaid.pk})
+        self.assertEqual(Booking.objects.get(pk=other_hotel_day.pk).status, 'awaiting_confirmation')
+        self.assertEqual(list(Availability.objects.order_by('date').values_list('quantity', flat=True)), [6, 6])
+        self.assertEqual(Wallet.objects.get(user=self.user).balance, 3000)
+        self.assertEqual(ledger.verify(), [])
+        self.assertEqual(Agency.objects.get(pk=agency.pk).current_balance, 2000)
+        self.assertEqual(list(OutgoingSms.objects.values_list('recipient', flat=True)), ['09120000032'])
+
+    def test_bulk_cancellation_never_matches_cancelled_bookings(self):
+        cancelled = self.book(date.today() + timedelta(days=10), ['1000'], paid=1000)
+        Booking.objects.filter(pk=cancelled.pk).update(status='cancelled')
+        fields = {'hotel': self.hotel.pk, 'reason': "تعطیلی هتل", 'waive_fees': True, 'booking_statuses': ['cancelled']}
+        serializer = BulkCancellationJobSerializer(data=fields)
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('booking_statuses', serializer.errors)
+        form = BulkCancellationJobForm(data=fields)
+        self.assertFalse(form.is_valid())
+        self.assertIn('booking_statuses', form.errors)
+        job = BulkCancellationJob(hotel=self.hotel, reason="تعطیلی هتل", waive_fees=True, booking_statuses=['cancelled'])
+        with self.assertRaises(ValidationError):
+            job.full_clean()
 
-# Create your tests here.
+        # A job row written past the validation still matches nothing.
+        job.status = 'running'
+        job.save()
+        self.assertFalse(bulk.run_chunk(job.pk))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.cancelled_bookings, job.refund_amount), ('completed', 0, 0))
+        self.assertFalse(Wallet.objects.filter(user=self.user, balance__gt=0).exists())
@@ -1,7 +1,8 @@
 # reservations/urls.py
-# version: 1.1.0
+# version: 1.2.0
 # FIX: Added the URL pattern for the PayWithWalletAPIView to fix the 404 error.
 # FEATURE: Added URL for GuestBookingLookupAPIView to allow unregistered users to track confirmed bookings.
+# FEATURE: Added URL for the cancellation fee preview.
 
 from django.urls import path
 from .views import (
@@ -12,7 +13,7 @@ from .views import (
     OfflineBankListAPIView, PaymentConfirmationAPIView,
     GuestBookingLookupAPIView,
     OperatorBookingConfirmationAPIView,
-    CancelBookingAPIView,
+    CancelBookingAPIView, CancellationFeePreviewAPIView,
     BookingConfirmationPDFView
 )
 from rest_framework import routers
@@ -38,6 +39,7 @@ urlpatterns = [
     path('my-bookings/', MyBookingsAPIView.as_view(), name='my-bookings'),
     # --- Cancellation URL ---
     path('api/bookings/cancel/', CancelBookingAPIView.as_view(), name='cancel_booking_api'),
+    path('api/bookings/<str:booking_code>/cancellation-fees/', CancellationFeePreviewAPIView.as_view(), name='cancellation_fee_preview_api'),
     path('booking-request/', BookingRequestAPIView.as_view(), name='booking-request'),
 
     # Operator Actions
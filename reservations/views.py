@@ -1,7 +1,19 @@
 # reservations/views.py
-# version: 2.0.9
+# version: 2.6.0
 # FIX: Aligned CreateBookingAPIView with new serializer fields (extra_adults, children_count)
 #      and added logic to process and save 'selected_services'.
+# FEATURE: Agency credit bookings (pay_with_credit) are charged through agencies.ledger,
+#          which enforces credit_limit and the credit blacklist atomically.
+# FEATURE: Inventory decrements are recorded in the pricing change log.
+# FIX: Cancellation refunds no longer touch Wallet.balance directly (F was never imported);
+#      the completed refund transaction is applied by the wallet ledger (core/ledger.py).
+# FIX: Wallet payments and refunds go through core.ledger.debit / credit: the balance check
+#      is a conditional UPDATE, so concurrent payments cannot overdraw a wallet. The booking
+#      row is locked so it cannot be paid or refunded twice.
+# FEATURE: BookingRoom rows store their nightly amounts for the cancellation engine.
+# FIX: Cancellation refunds are based on the amount actually paid (total_amount did not exist,
+#      and an unpaid booking must not be refunded).
+# FEATURE: CancellationFeePreviewAPIView - the fee schedule of a booking before cancelling it.
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -26,14 +38,17 @@ from .serializers import (
 from pricing.selectors import calculate_multi_booking_price
 from hotels.models import RoomType, BoardType
 from pricing.models import Availability
+from pricing import changelog
 from core.models import WalletTransaction,Wallet
 from .models import Booking, Guest, BookingRoom, OfflineBank, PaymentConfirmation 
 from .pdf_utils import generate_booking_confirmation_pdf
 from agencies.models import Agency, AgencyTransaction, AgencyUser
+from agencies import ledger
+from core import ledger as wallet_ledger
 from rest_framework.permissions import AllowAny, IsAuthenticated 
 from django.utils.decorators import method_decorator
 from django.apps import apps
-from cancellations.services import calculate_cancellation_fee
+from cancellations.services import calculate_cancellation_fee, fee_preview
 
 CustomUser = get_user_model()
 
@@ -50,6 +65,33 @@ else:
 
 
 # --- CancelBookingAPIView  ---
+# Statuses a user may cancel (adjust as needed based on your business logic)
+CANCELLABLE_STATUSES = ['confirmed', 'pending', 'awaiting_confirmation']
+
+
+class CancellationFeePreviewAPIView(APIView):
+    """
+    Shows the cancellation fee and refund of the user's booking for every date from today
+    until check-in, so the fee is known before cancelling.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, booking_code):
+        booking = get_object_or_404(Booking, booking_code=booking_code, user=request.user)
+        if booking.status not in CANCELLABLE_STATUSES:
+            return Response(
+                {"error": f"رزرو در وضعیت '{booking.get_status_display()}' قابل لغو نیست."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        schedule = fee_preview(booking)
+        return Response({
+            "booking_code": booking.booking_code,
+            "paid_amount": booking.paid_amount,
+            "cancellation_fee": schedule[0]['cancellation_fee'] if schedule else Decimal(0),
+            "schedule": schedule,
+        }, status=status.HTTP_200_OK)
+
+
 class CancelBookingAPIView(APIView):
     """
     Handles the cancellation of a booking by an authenticated user.
@@ -66,13 +108,11 @@ class CancelBookingAPIView(APIView):
         try:
             # Retrieve the booking, ensuring it belongs to the user and is in a cancellable state
             booking = get_object_or_404(
-                Booking,
+                Booking.objects.select_for_update(),
                 booking_code=booking_code,
                 user=request.user
             )
 
-            # Define cancellable statuses (adjust as needed based on your business logic)
-            CANCELLABLE_STATUSES = ['confirmed', 'pending', 'awaiting_confirmation']
             if booking.status not in CANCELLABLE_STATUSES:
                 return Response(
                     {"error": f"رزرو در وضعیت '{booking.get_status_display()}' قابل لغو نیست."},
@@ -81,7 +121,7 @@ class CancelBookingAPIView(APIView):
 
             # 1. Calculate Cancellation Fee
             cancellation_fee = calculate_cancellation_fee(booking)
-            refund_amount = (booking.total_amount or Decimal(0)) - cancellation_fee
+            refund_amount = (booking.paid_amount or Decimal(0)) - cancellation_fee
             refund_amount = max(Decimal(0), refund_amount) # Ensure refund is not negative
 
             # 2. Update Booking Status
@@ -92,16 +132,12 @@ class CancelBookingAPIView(APIView):
             if refund_amount > 0:
                 try:
                     wallet = Wallet.objects.get(user=request.user)
-                    # Use F() expression for safe concurrent update
-                    wallet.balance = F('balance') + refund_amount
-                    wallet.save(update_fields=['balance'])
 
-                    # 4. Create Refund Transaction Record
-                    WalletTransaction.objects.create(
-                        wallet=wallet,
+                    # 4. Credit the wallet and record the refund transaction in one step
+                    wallet_ledger.credit(
+                        wallet.pk,
+                        refund_amount, # Positive amount for refund
                         transaction_type='refund',
-                        amount=refund_amount, # Positive amount for refund
-                        status='completed',
                         booking=booking,
                         description=f"بازگشت وجه لغو رزرو {booking.booking_code} (جریمه: {cancellation_fee})"
                     )
@@ -135,30 +171,29 @@ class PayWithWalletAPIView(APIView):
     @transaction.atomic
     def post(self, request, booking_code):
         try:
-            booking = Booking.objects.get(booking_code=booking_code, user=request.user, status='pending')
+            # Locked so two concurrent requests cannot both pay the same booking
+            booking = Booking.objects.select_for_update().get(booking_code=booking_code, user=request.user, status='pending')
         except Booking.DoesNotExist:
             return Response({"error": "رزرو یافت نشد یا در وضعیت مناسب برای پرداخت نیست."}, status=status.HTTP_404_NOT_FOUND)
 
         wallet = get_object_or_404(Wallet, user=request.user)
 
-        if wallet.balance < booking.total_price:
-            return Response({"error": "موجودی کیف پول شما برای پرداخت این رزرو کافی نیست."}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Create a wallet transaction for the payment
-        WalletTransaction.objects.create(
-            wallet=wallet,
-            transaction_type='payment',
-            amount=-booking.total_price,  # Negative amount for payment
-            status='completed',
-            booking=booking,
-            description=f"پرداخت هزینه رزرو شماره {booking.booking_code}"
-        )
+        # The balance check and the debit are one conditional UPDATE (core/ledger.py)
+        try:
+            wallet_ledger.debit(
+                wallet.pk,
+                booking.total_price,
+                transaction_type='payment',
+                booking=booking,
+                description=f"پرداخت هزینه رزرو شماره {booking.booking_code}"
+            )
+        except ValidationError as e:
+            return Response({"error": e.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
 
         # Update booking status to confirmed
         booking.status = 'confirmed'
         booking.paid_amount = booking.total_price
         booking.save(update_fields=['status', 'paid_amount'])
-        booking.save(update_fields=['status'])
 
         return Response({"success": True, "message": "پرداخت با موفقیت انجام شد و رزرو شما تایید گردید."}, status=status.HTTP_200_OK)
 
@@ -361,6 +396,7 @@ class CreateBookingAPIView(APIView):
                     None
                 )
                 room_total_price = room_price_details['total_price'] if room_price_details else Decimal(0)
+                nightly_prices = room_price_details.get('nightly_prices', []) if room_price_details else []
                 
                 BookingRoom.objects.create(
                     booking=booking, 
@@ -370,13 +406,15 @@ class CreateBookingAPIView(APIView):
                     adults=room_data['adults'], 
                     children=room_data['children'],
                     extra_requests=room_data.get('extra_requests'), 
-                    total_price=room_total_price
+                    total_price=room_total_price,
+                    nightly_prices=nightly_prices
                 )
 
                 for date in date_range:
                     availability_obj = availability_map[(room_type_id, date)]
                     availability_obj.quantity -= room_data['quantity']
                     availability_obj.save()
+                changelog.record_availability(((room_type_id, date) for date in date_range), source='booking')
 
             for guest_data in validated_data['guests']:
                 guest_data.pop('wants_to_register', None)
@@ -420,10 +458,17 @@ class CreateBookingAPIView(APIView):
             
             booking.save(update_fields=['total_price', 'total_service_price', 'total_vat'])
 
+            if agency and validated_data.get('pay_with_credit'):
+                ledger.charge_booking_on_credit(agency, booking, booking.total_price, created_by=user)
+                booking.paid_amount = booking.total_price
+                if booking.status == 'pending':
+                    booking.status = 'confirmed'
+                booking.save(update_fields=['paid_amount', 'status'])
+
         except ValidationError as e:
-            if 'booking' in locals():
-                booking.delete()
-            error_message = str(e) if isinstance(e, ValidationError) else "خطای ناشناخته در فرآیند رزرو."
+            # Undo everything written so far (availability, booking rows, ledger).
+            transaction.set_rollback(True)
+            error_message = ' '.join(e.messages) if e.messages else "خطای ناشناخته در فرآیند رزرو."
             return Response({"error": error_message}, status=status.HTTP_400_BAD_REQUEST)
             
         return Response(
@@ -431,7 +476,7 @@ class CreateBookingAPIView(APIView):
                 "success": True, 
                 "booking_code": booking.booking_code, 
                 "total_price": booking.total_price,
-                "payment_type": 'online' if hotel.is_online else 'offline'
+                "payment_type": 'credit' if booking.paid_amount else ('online' if hotel.is_online else 'offline')
             },
             status=status.HTTP_201_CREATED
         )